@@ -1,6 +1,16 @@
 """Calculation of quality metrics for perturbation profiling experiments."""
 from .evaluate import evaluate
+from .bootstrap import bootstrap_evaluate
+from .permutation import permutation_test
+from .stream import stream_evaluate
 from cytominer_eval import __about__
 from cytominer_eval.__about__ import __version__
 
-__all__ = [evaluate, __about__, __version__]
+__all__ = [
+    evaluate,
+    bootstrap_evaluate,
+    permutation_test,
+    stream_evaluate,
+    __about__,
+    __version__,
+]
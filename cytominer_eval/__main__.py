@@ -0,0 +1,6 @@
+"""Allow running the command line interface with ``python -m cytominer_eval``."""
+import sys
+
+from cytominer_eval.cli import main
+
+sys.exit(main())
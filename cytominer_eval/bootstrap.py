@@ -0,0 +1,502 @@
+"""Bootstrap confidence intervals of similarity-based evaluation metrics.
+
+The pairwise similarity matrix is calculated once. Each bootstrap replicate gathers
+the rows and columns of resampled profiles from that matrix, and calculates the metric
+directly from the gathered matrix. Ranking metrics resampled by profile rank the
+connections of each group once, and resample the ranked groups.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+from cytominer_eval.transform import metric_matrix
+from cytominer_eval.utils.availability_utils import (
+    check_bootstrap_operation,
+    check_resample_method,
+)
+from cytominer_eval.utils.cache_utils import EvaluationCache
+from cytominer_eval.utils.matrix_operation_utils import (
+    get_ranked_replicates,
+    get_valid_pairs,
+    matrix_enrichment,
+    matrix_hitk,
+    matrix_precision_recall,
+    matrix_replicate_reproducibility,
+)
+from cytominer_eval.utils.io_utils import ProfileArrays
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.parallel_utils import run_tasks, share_array
+from cytominer_eval.utils.profiling_utils import profile_stage
+from cytominer_eval.utils.shared_utils import SharedProfiles
+
+
+def bootstrap_evaluate(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    replicate_groups: List[str],
+    operation: str = "replicate_reproducibility",
+    groupby_columns: List[str] = ["Metadata_broad_sample"],
+    similarity_metric: str = "pearson",
+    replicate_reproducibility_quantile: float = 0.95,
+    precision_recall_k: Union[int, List[int]] = 10,
+    enrichment_percentile: Union[float, List[float]] = 0.99,
+    hitk_percent_list: List[int] = [2, 5, 10],
+    n_bootstrap: int = 1000,
+    resample: str = "profiles",
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+    cache: EvaluationCache = None,
+    return_distribution: bool = False,
+):
+    r"""Estimate bootstrap percentile intervals of an evaluation metric
+
+    Profiles (or whole replicate groups) are resampled with replacement, and the metric
+    is recalculated on each resample. Pairs of a profile with a copy of itself are
+    ignored. Each drawn copy of a replicate group is a separate replicate group (and
+    groupby_columns group), which is not compared with other copies of the same group.
+    For precision_recall and hitk, resample="profiles" ranks the connections of each
+    groupby_columns group among all profiles once, and resamples the ranked groups,
+    each drawn copy counting as a separate group.
+
+    Parameters
+    ----------
+    profiles : {pandas.DataFrame, cytominer_eval.utils.io_utils.ProfileArrays, cytominer_eval.utils.shared_utils.SharedProfiles}
+        profiles must be a pandas DataFrame with profile samples as rows and profile
+        features as columns. The columns should contain both metadata and feature
+        measurements. Alternatively, a feature array and a metadata table held
+        separately, or profiles in shared memory, whose similarity matrix is reused.
+    features : list
+        A list of strings corresponding to feature measurement column names in the
+        `profiles` DataFrame.
+    replicate_groups : list
+        A list of metadata column names indicating replicate profiles
+    operation : {'replicate_reproducibility', 'precision_recall', 'enrichment', 'hitk'}, optional
+        The evaluation metric to bootstrap. Defaults to "replicate_reproducibility".
+    groupby_columns : list, optional
+        Only used for operation = 'precision_recall' and 'hitk'. See
+        :py:func:`cytominer_eval.evaluate.evaluate`.
+    similarity_metric : {'pearson', 'spearman', 'kendall'}, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    n_bootstrap : int, optional
+        The number of bootstrap replicates. Defaults to 1000.
+    resample : {'profiles', 'groups'}, optional
+        Whether to resample individual profiles ("profiles", default), or replicate
+        groups with all their profiles ("groups").
+    confidence : float, optional
+        The coverage of the percentile interval, whose bounds are order statistics of
+        the bootstrap replicates, so that infinite odds ratios are kept. Defaults to
+        0.95.
+    seed : int, optional
+        Seed of the random resampling. Results do not depend on n_jobs.
+    n_jobs : int, optional
+        How many worker processes to use. Defaults to 1 (serial), -1 uses all cores.
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix is looked up in, and stored to, the
+        cache, shared with :py:func:`cytominer_eval.evaluate.evaluate`.
+    return_distribution : bool, optional
+        If True, also return the metric of every bootstrap replicate. Defaults to False.
+
+    Returns
+    -------
+    {pd.DataFrame, (pd.DataFrame, pd.DataFrame)}
+        A dataframe with one row per metric ("metric") holding the metric of the input
+        profiles ("estimate"), and the "lower" and "upper" bound of the interval. If
+        `return_distribution = True`, also return a bootstrap replicates x metrics
+        dataframe.
+
+    Other Parameters
+    -----------------------------
+    replicate_reproducibility_quantile, precision_recall_k, enrichment_percentile, hitk_percent_list
+        The parameters of the operation, see :py:func:`cytominer_eval.evaluate.evaluate`.
+        Precision and recall are averaged over the groupby_columns groups.
+    """
+    check_bootstrap_operation(operation)
+    check_resample_method(resample)
+    assert n_bootstrap > 0, "n_bootstrap must be positive"
+    assert 0 < confidence < 1, "confidence must be between 0 and 1"
+
+    if isinstance(precision_recall_k, (int, np.integer)):
+        precision_recall_k = [precision_recall_k]
+    if isinstance(enrichment_percentile, (int, float, np.floating)):
+        enrichment_percentile = [enrichment_percentile]
+
+    with profile_stage("bootstrap"):
+        shared = isinstance(profiles, SharedProfiles)
+        if shared:
+            profiles.check(features=features, similarity_metric=similarity_metric)
+            similarity = profiles.similarity()
+        else:
+            similarity = metric_matrix(
+                df=profiles,
+                features=features,
+                similarity_metric=similarity_metric,
+                cache=cache,
+            ).values
+
+        if isinstance(profiles, (ProfileArrays, SharedProfiles)):
+            group_codes = profiles.group_codes(replicate_groups)
+        else:
+            group_codes = get_group_codes(
+                df=profiles, replicate_groups=replicate_groups
+            )
+        groupby_codes = None
+        if operation in ["precision_recall", "hitk"] and isinstance(
+            profiles, (ProfileArrays, SharedProfiles)
+        ):
+            groupby_codes = profiles.group_codes(groupby_columns)
+        elif operation in ["precision_recall", "hitk"]:
+            groupby_codes = get_group_codes(
+                df=profiles, replicate_groups=groupby_columns
+            )
+
+        params = {
+            "operation": operation,
+            "quantile_over_null": replicate_reproducibility_quantile,
+            "k": precision_recall_k,
+            "percentile": enrichment_percentile,
+            "percent_list": hitk_percent_list,
+        }
+
+        # Resamples are drawn up front so that results do not depend on n_jobs
+        rng = np.random.default_rng(seed)
+        if resample == "profiles" and operation in ["precision_recall", "hitk"]:
+            distribution = _bootstrap_ranked(
+                similarity=similarity,
+                group_codes=group_codes,
+                groupby_codes=groupby_codes,
+                params=params,
+                rng=rng,
+                n_bootstrap=n_bootstrap,
+            )
+        else:
+            resamples = [
+                draw_resample(rng=rng, group_codes=group_codes, resample=resample)
+                for _ in range(n_bootstrap)
+            ]
+            distribution = _bootstrap_resamples(
+                similarity=profiles.similarity_array if shared else similarity,
+                group_codes=group_codes,
+                groupby_codes=groupby_codes,
+                params=params,
+                resamples=resamples,
+                n_jobs=n_jobs,
+            )
+
+        names = get_metric_names(**params)
+        estimate = calculate_matrix_metric(
+            similarity=similarity,
+            group_codes=group_codes,
+            groupby_codes=groupby_codes,
+            **params
+        )
+
+    interval = get_percentile_interval(distribution, confidence=confidence)
+    summary_df = pd.DataFrame(
+        {
+            "metric": names,
+            "estimate": estimate,
+            "lower": interval[0],
+            "upper": interval[1],
+        }
+    )
+
+    if return_distribution:
+        return (summary_df, pd.DataFrame(distribution, columns=names))
+
+    return summary_df
+
+
+def draw_resample(
+    rng: np.random.Generator, group_codes: np.ndarray, resample: str = "profiles"
+) -> (np.array, np.array):
+    r"""Helper function to draw the profile indices of one bootstrap replicate
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random number generator
+    group_codes : np.ndarray
+        The replicate group code of each profile
+    resample : {'profiles', 'groups'}, optional
+        Whether to resample profiles (default) or replicate groups
+
+    Returns
+    -------
+    (np.array, np.array)
+        The indices of the resampled profiles, and the draw each resampled profile
+        belongs to. Profiles of one drawn copy of a replicate group share a draw.
+    """
+    n_profiles = group_codes.shape[0]
+    if resample == "profiles":
+        return rng.integers(0, n_profiles, size=n_profiles), np.arange(n_profiles)
+
+    order = np.argsort(group_codes, kind="stable")
+    starts = np.searchsorted(group_codes[order], np.arange(group_codes.max() + 2))
+    groups = rng.integers(0, starts.shape[0] - 1, size=starts.shape[0] - 1)
+    index = np.concatenate([order[starts[g] : starts[g + 1]] for g in groups])
+    draws = np.repeat(np.arange(groups.shape[0]), starts[groups + 1] - starts[groups])
+    return index, draws
+
+
+def get_resample_pairs(
+    similarity: np.ndarray,
+    group_codes: np.ndarray,
+    groupby_codes: np.ndarray,
+    index: np.ndarray,
+    draws: np.ndarray,
+) -> (np.array, np.array, np.array):
+    r"""Helper function to label the profiles and pairs of one bootstrap replicate
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        The similarity matrix of the resampled profiles
+    group_codes : np.ndarray
+        The replicate group code of each original profile
+    groupby_codes : np.ndarray
+        The groupby_columns code of each original profile, or None
+    index, draws : np.ndarray
+        Output from :py:func:`cytominer_eval.bootstrap.draw_resample`
+
+    Returns
+    -------
+    (np.array, np.array, np.array)
+        The pairs to consider, and the replicate group and groupby_columns codes of
+        the resampled profiles. Each drawn copy of a replicate group is a separate
+        group, whose profiles are not compared with other copies of the same group.
+    """
+    valid = get_valid_pairs(similarity=similarity, profile_ids=index)
+    resample_codes = group_codes[index]
+    resample_groupby_codes = None if groupby_codes is None else groupby_codes[index]
+
+    if draws.max() + 1 < index.shape[0]:
+        # Copies of a group are never replicates of each other
+        valid &= (resample_codes[:, np.newaxis] != resample_codes[np.newaxis, :]) | (
+            draws[:, np.newaxis] == draws[np.newaxis, :]
+        )
+        resample_codes = draws
+        if resample_groupby_codes is not None:
+            resample_groupby_codes = resample_groupby_codes * (draws.max() + 1) + draws
+
+    return valid, resample_codes, resample_groupby_codes
+
+
+def get_percentile_interval(
+    distribution: np.ndarray, confidence: float = 0.95
+) -> np.array:
+    r"""Helper function to calculate percentile intervals of bootstrap replicates
+
+    Parameters
+    ----------
+    distribution : np.ndarray
+        A bootstrap replicates x metrics array. NaN replicates are ignored.
+    confidence : float, optional
+        The coverage of the interval. Defaults to 0.95.
+
+    Returns
+    -------
+    np.array
+        A 2 x metrics array of the lower and upper bounds. The bounds are order
+        statistics of the replicates, which may be infinite, e.g. for odds ratios
+        without non-replicates among the top connections. Metrics without defined
+        replicates have NaN bounds.
+    """
+    alpha = (1 - confidence) / 2
+    interval = np.full((2, distribution.shape[1]), np.nan)
+    for i in range(distribution.shape[1]):
+        values = np.sort(distribution[~np.isnan(distribution[:, i]), i])
+        if values.shape[0] == 0:
+            continue
+        interval[0, i] = values[int(np.floor(alpha * (values.shape[0] - 1)))]
+        interval[1, i] = values[int(np.ceil((1 - alpha) * (values.shape[0] - 1)))]
+    return interval
+
+
+def get_metric_names(
+    operation: str,
+    k: List[int],
+    percentile: List[float],
+    percent_list: List[int],
+    **kwargs
+) -> List[str]:
+    r"""Helper function to name the metrics calculated by
+    :py:func:`cytominer_eval.bootstrap.calculate_matrix_metric`
+    """
+    if operation == "replicate_reproducibility":
+        return ["replicate_reproducibility"]
+    if operation == "precision_recall":
+        return ["precision_at_{k}".format(k=x) for x in k] + [
+            "recall_at_{k}".format(k=x) for x in k
+        ]
+    if operation == "enrichment":
+        return ["ods_ratio_at_{p}".format(p=x) for x in percentile]
+    return ["percent_score_at_{p}".format(p=x) for x in percent_list]
+
+
+def calculate_matrix_metric(
+    similarity: np.ndarray,
+    group_codes: np.ndarray,
+    groupby_codes: np.ndarray,
+    operation: str,
+    quantile_over_null: float,
+    k: List[int],
+    percentile: List[float],
+    percent_list: List[int],
+    profile_ids: np.ndarray = None,
+    valid: np.ndarray = None,
+) -> np.array:
+    r"""Calculate a similarity-based metric from a similarity matrix
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    group_codes : np.ndarray
+        The replicate group code of each profile
+    groupby_codes : np.ndarray
+        Only used for operation = 'precision_recall' and 'hitk'. The groupby_columns
+        code of each profile.
+    operation : {'replicate_reproducibility', 'precision_recall', 'enrichment', 'hitk'}
+        The evaluation metric to calculate
+    profile_ids : np.ndarray, optional
+        The original profile of each row, see
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_valid_pairs`
+    valid : np.ndarray, optional
+        A profiles x profiles boolean matrix of pairs to consider. Defaults to the
+        pairs of distinct profiles with a defined similarity.
+
+    Returns
+    -------
+    np.array
+        The metrics named by :py:func:`cytominer_eval.bootstrap.get_metric_names`
+
+    Other Parameters
+    -----------------------------
+    quantile_over_null, k, percentile, percent_list
+        The parameters of the operation
+    """
+    if valid is None:
+        valid = get_valid_pairs(similarity=similarity, profile_ids=profile_ids)
+
+    if operation == "replicate_reproducibility":
+        return np.array(
+            [
+                matrix_replicate_reproducibility(
+                    similarity=similarity,
+                    valid=valid,
+                    group_codes=group_codes,
+                    quantile_over_null=quantile_over_null,
+                )
+            ]
+        )
+    if operation == "enrichment":
+        return matrix_enrichment(
+            similarity=similarity,
+            valid=valid,
+            group_codes=group_codes,
+            percentile=percentile,
+        )
+
+    ranked_replicates = get_ranked_replicates(
+        similarity=similarity,
+        valid=valid,
+        group_codes=group_codes,
+        groupby_codes=groupby_codes,
+    )
+    return _ranked_metric(
+        ranked_replicates, operation=operation, k=k, percent_list=percent_list
+    )
+
+
+def _ranked_metric(
+    ranked_replicates: np.ndarray,
+    operation: str,
+    k: List[int],
+    percent_list: List[int],
+    **kwargs
+) -> np.array:
+    if operation == "precision_recall":
+        return np.concatenate(matrix_precision_recall(ranked_replicates, k=k))
+    return matrix_hitk(ranked_replicates, percent_list=percent_list)
+
+
+def _bootstrap_ranked(
+    similarity: np.ndarray,
+    group_codes: np.ndarray,
+    groupby_codes: np.ndarray,
+    params: dict,
+    rng: np.random.Generator,
+    n_bootstrap: int,
+) -> np.array:
+    # Connections are ranked among all profiles once, and the ranked groups are
+    # resampled, so that groups keep all their replicates
+    ranked_replicates = get_ranked_replicates(
+        similarity=similarity,
+        valid=get_valid_pairs(similarity=similarity),
+        group_codes=group_codes,
+        groupby_codes=groupby_codes,
+    )
+    n_groups = ranked_replicates.shape[0]
+
+    results = []
+    for _ in range(n_bootstrap):
+        index = rng.integers(0, n_groups, size=n_groups)
+        results.append(_ranked_metric(ranked_replicates[index], **params))
+
+    return np.array(results, dtype=np.float64).reshape(n_bootstrap, -1)
+
+
+def _bootstrap_resamples(
+    similarity: np.ndarray,
+    group_codes: np.ndarray,
+    groupby_codes: np.ndarray,
+    params: dict,
+    resamples: List[tuple],
+    n_jobs: int,
+) -> np.array:
+    n_bootstrap = len(resamples)
+    n_tasks = 1 if n_jobs == 1 else min(n_bootstrap, 4 * max(n_jobs, 1))
+    # Workers map the memory of shared profiles rather than a new copy
+    with share_array(similarity, n_jobs=n_jobs) as shared_similarity:
+        tasks = []
+        for chunk in np.array_split(np.arange(n_bootstrap), n_tasks):
+            chunk_resamples = [resamples[i] for i in chunk]
+            tasks.append(
+                (
+                    shared_similarity,
+                    group_codes,
+                    groupby_codes,
+                    params,
+                    chunk_resamples,
+                )
+            )
+        return np.concatenate(run_tasks(_bootstrap_task, tasks, n_jobs=n_jobs), axis=0)
+
+
+def _bootstrap_task(task) -> np.array:
+    similarity, group_codes, groupby_codes, params, resamples = task
+    similarity = np.asarray(similarity)
+
+    results = []
+    for index, draws in resamples:
+        resample_similarity = similarity[np.ix_(index, index)]
+        valid, resample_codes, resample_groupby_codes = get_resample_pairs(
+            similarity=resample_similarity,
+            group_codes=group_codes,
+            groupby_codes=groupby_codes,
+            index=index,
+            draws=draws,
+        )
+        results.append(
+            calculate_matrix_metric(
+                similarity=resample_similarity,
+                group_codes=resample_codes,
+                groupby_codes=resample_groupby_codes,
+                valid=valid,
+                **params
+            )
+        )
+
+    return np.array(results, dtype=np.float64).reshape(len(resamples), -1)
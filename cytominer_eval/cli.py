@@ -0,0 +1,346 @@
+"""Command line interface to evaluate many profile files at once.
+
+Example
+-------
+Evaluate all plates of a batch with four worker processes::
+
+    cytominer-eval run "batch/*/*_normalized_feature_select.csv.gz" \\
+        --operation replicate_reproducibility enrichment \\
+        --replicate-groups Metadata_broad_sample Metadata_mg_per_ml \\
+        --n-jobs 4 --memory-budget 8G --output results.parquet
+"""
+import sys
+import glob
+import argparse
+import pandas as pd
+from typing import List
+
+from cytominer_eval.evaluate import evaluate
+from cytominer_eval.utils.availability_utils import (
+    get_available_eval_metrics,
+    get_available_similarity_metrics,
+)
+from cytominer_eval.utils.io_utils import (
+    read_profile_arrays,
+    read_profile_columns,
+    select_metadata_columns,
+)
+from cytominer_eval.utils.parallel_utils import run_tasks
+
+_BYTE_UNITS = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_bytes(value: str) -> int:
+    r"""Helper function to convert a human readable size (e.g. "4G") to bytes
+
+    Parameters
+    ----------
+    value : str
+        An integer, optionally followed by one of K, M, G or T (powers of 1024)
+
+    Returns
+    -------
+    int
+        The number of bytes
+    """
+    value = str(value).strip().upper().rstrip("B")
+    if value[-1:] in _BYTE_UNITS:
+        return int(float(value[:-1]) * _BYTE_UNITS[value[-1]])
+    return int(value)
+
+
+def format_result(result, operation: str) -> pd.DataFrame:
+    r"""Convert the output of any evaluation operation to a long dataframe
+
+    Parameters
+    ----------
+    result : {float, tuple, pandas.DataFrame}
+        The output of :py:func:`cytominer_eval.evaluate.evaluate`
+    operation : str
+        The operation that produced the result
+
+    Returns
+    -------
+    pandas.DataFrame
+        The result as a dataframe. Scalar results are stored in a column named after
+        the operation; hit@k percent scores in "percent" and "score" columns.
+    """
+    if operation == "hitk":
+        _, percent_scores = result
+        return pd.DataFrame(
+            {"percent": list(percent_scores), "score": list(percent_scores.values())}
+        )
+
+    if isinstance(result, pd.DataFrame):
+        return result.reset_index(drop=True)
+
+    return pd.DataFrame({operation: [result]})
+
+
+def evaluate_file(task: dict) -> pd.DataFrame:
+    r"""Evaluate all requested operations for a single profile file
+
+    Usage: Designed to be called by worker processes. See
+    :py:func:`cytominer_eval.cli.run`.
+
+    Parameters
+    ----------
+    task : dict
+        The keys "path", "operations", "meta_prefixes", "features" and
+        "evaluate_kwargs", as built by :py:func:`cytominer_eval.cli.run`
+
+    Returns
+    -------
+    pandas.DataFrame
+        One long dataframe of results with "file" and "operation" columns
+    """
+    path = task["path"]
+    columns = read_profile_columns(path)
+    meta_features = select_metadata_columns(columns, task["meta_prefixes"])
+
+    features = task["features"]
+    if features is None:
+        features = [x for x in columns if x not in meta_features]
+
+    # Only read the columns that are used in the evaluation, in batches of rows
+    profiles = read_profile_arrays(path, features=features, meta_features=meta_features)
+
+    results = []
+    for operation in task["operations"]:
+        evaluate_kwargs = dict(task["evaluate_kwargs"])
+        evaluate_kwargs["replicate_groups"] = evaluate_kwargs["replicate_groups"][
+            operation
+        ]
+
+        result = evaluate(
+            profiles=profiles,
+            features=features,
+            meta_features=meta_features,
+            operation=operation,
+            **evaluate_kwargs,
+        )
+
+        result_df = format_result(result, operation)
+        result_df.insert(0, "operation", operation)
+        result_df.insert(0, "file", str(path))
+        results.append(result_df)
+
+    return pd.concat(results, sort=False, ignore_index=True)
+
+
+def write_results(results_df: pd.DataFrame, output: str) -> None:
+    r"""Write evaluation results to a single Parquet or CSV file
+
+    Parameters
+    ----------
+    results_df : pandas.DataFrame
+        The results to write
+    output : str
+        The output location. Paths ending in ".parquet" are written as Parquet
+        (requires pyarrow), all other paths as CSV.
+
+    Returns
+    -------
+    None
+    """
+    if str(output).endswith(".parquet"):
+        # Columns shared by different operations may mix types; missing values are
+        # kept as nulls
+        results_df = results_df.copy()
+        for col in results_df.select_dtypes(include="object").columns:
+            values = results_df[col]
+            results_df[col] = values.where(values.isna(), values.astype(str))
+        results_df.to_parquet(output, index=False)
+    else:
+        results_df.to_csv(output, index=False)
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    r"""Helper function to expand glob patterns into a sorted list of unique files
+
+    Parameters
+    ----------
+    patterns : list
+        Glob patterns or file paths
+
+    Returns
+    -------
+    list
+        Matching file paths
+    """
+    paths = []
+    for pattern in patterns:
+        paths += glob.glob(pattern, recursive=True)
+    return sorted(set(paths))
+
+
+def run(args: argparse.Namespace) -> pd.DataFrame:
+    r"""Evaluate all profile files as specified by parsed command line arguments
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed arguments of the "run" command
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results of all files and operations
+    """
+    paths = expand_paths(args.profiles)
+    assert len(paths) > 0, "No profile files match {p}".format(p=args.profiles)
+
+    replicate_groups = {x: args.replicate_groups for x in args.operation}
+    if "grit" in args.operation:
+        replicate_groups["grit"] = {
+            "profile_col": args.grit_profile_col,
+            "replicate_group_col": args.grit_replicate_group_col,
+        }
+    if "mp_value" in args.operation:
+        replicate_groups["mp_value"] = args.mp_value_replicate_id
+
+    evaluate_kwargs = {
+        "replicate_groups": replicate_groups,
+        "similarity_metric": args.similarity_metric,
+        "groupby_columns": args.groupby_columns,
+        "replicate_reproducibility_quantile": args.replicate_reproducibility_quantile,
+        "precision_recall_k": args.precision_recall_k,
+        "grit_control_perts": args.control_perts,
+        "enrichment_percentile": args.enrichment_percentile,
+        "hitk_percent_list": args.hitk_percent_list,
+        "memory_budget": args.memory_budget,
+    }
+
+    tasks = [
+        {
+            "path": path,
+            "operations": args.operation,
+            "meta_prefixes": args.meta_prefix,
+            "features": args.features,
+            "evaluate_kwargs": evaluate_kwargs,
+        }
+        for path in paths
+    ]
+
+    results = run_tasks(evaluate_file, tasks, n_jobs=args.n_jobs)
+    results_df = pd.concat(results, sort=False, ignore_index=True)
+
+    write_results(results_df, args.output)
+    return results_df
+
+
+def get_parser() -> argparse.ArgumentParser:
+    r"""Build the command line argument parser
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        The parser of the cytominer-eval command
+    """
+    parser = argparse.ArgumentParser(
+        prog="cytominer-eval",
+        description="Evaluate the quality of perturbation profiles.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser(
+        "run", help="Evaluate CSV or Parquet profile files"
+    )
+    run_parser.add_argument(
+        "profiles", nargs="+", help="Profile files or glob patterns (quote patterns)"
+    )
+    run_parser.add_argument(
+        "--output", required=True, help="Output file (.parquet or .csv)"
+    )
+    run_parser.add_argument(
+        "--operation",
+        nargs="+",
+        default=["replicate_reproducibility"],
+        choices=get_available_eval_metrics(),
+        help="Evaluation operations to calculate",
+    )
+    run_parser.add_argument(
+        "--replicate-groups",
+        nargs="+",
+        default=["Metadata_broad_sample"],
+        help="Metadata columns indicating replicate profiles",
+    )
+    run_parser.add_argument(
+        "--meta-prefix",
+        nargs="+",
+        default=["Metadata_"],
+        help="Column name prefixes of metadata columns",
+    )
+    run_parser.add_argument(
+        "--features",
+        nargs="+",
+        default=None,
+        help="Feature columns. Defaults to all columns that are not metadata",
+    )
+    run_parser.add_argument(
+        "--similarity-metric",
+        default="pearson",
+        choices=get_available_similarity_metrics(),
+    )
+    run_parser.add_argument(
+        "--groupby-columns", nargs="+", default=["Metadata_broad_sample"]
+    )
+    run_parser.add_argument(
+        "--replicate-reproducibility-quantile", type=float, default=0.95
+    )
+    run_parser.add_argument("--precision-recall-k", nargs="+", type=int, default=[10])
+    run_parser.add_argument(
+        "--enrichment-percentile", nargs="+", type=float, default=[0.99]
+    )
+    run_parser.add_argument(
+        "--hitk-percent-list", nargs="+", type=int, default=[2, 5, 10]
+    )
+    run_parser.add_argument(
+        "--control-perts",
+        nargs="+",
+        default=["None"],
+        help="Control perturbations for grit and mp_value",
+    )
+    run_parser.add_argument("--grit-profile-col", default=None)
+    run_parser.add_argument("--grit-replicate-group-col", default=None)
+    run_parser.add_argument("--mp-value-replicate-id", default=None)
+    run_parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (-1 for all cores)",
+    )
+    run_parser.add_argument(
+        "--memory-budget",
+        type=parse_bytes,
+        default=None,
+        help="Memory budget per worker (e.g. 8G). Files that are estimated to exceed "
+        "it use lower memory strategies, or fail before any computation",
+    )
+    run_parser.set_defaults(func=run)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    r"""Entry point of the cytominer-eval command
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. Defaults to sys.argv[1:].
+
+    Returns
+    -------
+    int
+        The exit status
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
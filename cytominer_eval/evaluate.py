@@ -2,23 +2,52 @@
 
 The primary entrypoint into quickly evaluating profile quality.
 """
+import numpy as np
 import pandas as pd
 from typing import List, Union
 
-from cytominer_eval.transform import metric_melt
-from cytominer_eval.utils.transform_utils import check_replicate_groups
-from cytominer_eval.operations import (
-    replicate_reproducibility,
-    precision_recall,
-    grit,
-    mp_value,
-    enrichment,
-    hitk,
+from cytominer_eval.transform import metric_melt, metric_matrix
+from cytominer_eval.utils.transform_utils import (
+    assert_pandas_dtypes,
+    check_replicate_groups,
+    get_knn_graph,
+)
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.availability_utils import check_output_format
+from cytominer_eval.utils.arrow_utils import is_arrow_table
+from cytominer_eval.utils.io_utils import (
+    ProfileArrays,
+    is_profile_path,
+    read_profile_arrays,
+)
+from cytominer_eval.utils.polars_utils import (
+    is_polars_frame,
+    pandas_to_frame,
+    polars_to_arrow,
+    profiles_to_pandas,
+)
+from cytominer_eval.utils.cache_utils import (
+    EvaluationCache,
+    hash_pandas,
+    hash_parameters,
+)
+from cytominer_eval.utils.profiling_utils import (
+    EvaluationProfiler,
+    activate_profiler,
+    get_active_profiler,
+    profile_stage,
+)
+from cytominer_eval.utils.planner_utils import plan_evaluation
+from cytominer_eval.utils.shared_utils import SharedProfiles
+from cytominer_eval.operations.registry import (
+    OperationSpec,
+    get_operation,
+    get_operation_spec,
 )
 
 
 def evaluate(
-    profiles: pd.DataFrame,
+    profiles: Union[pd.DataFrame, SharedProfiles],
     features: List[str],
     meta_features: List[str],
     replicate_groups: Union[List[str], dict],
@@ -33,6 +62,14 @@ def evaluate(
     mp_value_params: dict = {},
     enrichment_percentile: Union[float, List[float]] = 0.99,
     hitk_percent_list=[2, 5, 10],
+    cache: EvaluationCache = None,
+    profiler: EvaluationProfiler = None,
+    similarity_strategy: str = "auto",
+    memory_budget: int = None,
+    operation_params: dict = {},
+    n_jobs: int = 1,
+    backend: str = "processes",
+    output_format: str = None,
 ):
     r"""Evaluate profile quality and strength.
 
@@ -42,10 +79,17 @@ def evaluate(
 
     Parameters
     ----------
-    profiles : pandas.DataFrame
-        profiles must be a pandas DataFrame with profile samples as rows and profile
-        features as columns. The columns should contain both metadata and feature
-        measurements.
+    profiles : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame, str, cytominer_eval.utils.io_utils.ProfileArrays, cytominer_eval.utils.shared_utils.SharedProfiles}
+        profiles must be a pandas DataFrame, a pyarrow.Table or a Polars frame with
+        profile samples as rows and profile features as columns. The columns should
+        contain both metadata and feature measurements. Only the metadata and feature
+        columns of a polars.LazyFrame are collected. Alternatively, the location of a
+        CSV or Parquet file, whose metadata and feature columns are read in batches
+        (see :py:func:`cytominer_eval.utils.io_utils.read_profile_arrays`), a feature
+        array and a metadata table held separately in a
+        :py:class:`cytominer_eval.utils.io_utils.ProfileArrays`, or profiles placed in
+        shared memory, whose pairwise similarities are reused, for example by several
+        worker processes.
     features : list
         A list of strings corresponding to feature measurement column names in the
         `profiles` DataFrame. All features listed must be found in `profiles`.
@@ -66,7 +110,8 @@ def evaluate(
         :py:func:`cytominer_eval.transform.util.check_replicate_groups`.
     operation : {'replicate_reproducibility', 'precision_recall', 'grit', 'mp_value'}, optional
         The specific evaluation metric to calculate. The default is
-        "replicate_reproducibility".
+        "replicate_reproducibility". Operations added with
+        :py:func:`cytominer_eval.operations.register_operation` are also supported.
     groupby_columns : List of str
         Only used for operation = 'precision_recall' and 'hitk'
         Column by which the similarity matrix is grouped and by which the operation is calculated.
@@ -116,62 +161,370 @@ def evaluate(
         A list of percentages at which to calculate the percent scores, ie the amount of indexes below this percentage.
         If percent_list == "all" a full dict with the length of classes will be created.
         Percentages are given as integers, ie 50 means 50 %.
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, memoize the pairwise similarity matrix, the melted similarities
+        and the final result. Entries are keyed by a hash of the profile content and
+        all operation parameters, so repeated calls with identical inputs are answered
+        from the cache. Note that `operation='mp_value'` results, which rely on random
+        permutations, are cached as first computed.
+    profiler : cytominer_eval.utils.profiling_utils.EvaluationProfiler, optional
+        If provided, record wall time, CPU time, memory and row counts of each
+        evaluation stage (validation, dtype conversion, pairwise similarity, melting,
+        replicate assignment and the operation itself). Retrieve the measurements with
+        `profiler.report()`. Instrumentation is disabled by default.
+    similarity_strategy : {'auto', 'dense', 'tiled', 'packed'}, optional
+        How to calculate and melt pairwise similarities. If "auto" (default), the
+        planner selects the "dense" strategy if it is estimated to fit
+        `memory_budget`, and the lower memory "tiled" strategy otherwise, unless
+        features have missing values, which only "dense" supports. "packed"
+        stores only the upper triangle of the similarity matrix, see
+        :py:func:`cytominer_eval.transform.metric_melt`. The chosen plan is attached
+        to `profiler.annotations["plan"]` if a profiler is provided. See
+        :py:func:`cytominer_eval.utils.planner_utils.plan_evaluation`.
+    memory_budget : int, optional
+        The memory available to the evaluation in bytes. If the evaluation is
+        estimated to exceed the budget with every strategy, a MemoryError is raised
+        before any computation. Defaults to None (no limit).
+    operation_params : {{}, ...}, optional
+        Additional keyword arguments passed to the operation, mostly for operations
+        registered with :py:func:`cytominer_eval.operations.register_operation`. For
+        `operation='mp_value'`, `{"n_jobs": 4, "checkpoint": "mp_value.jsonl"}` runs
+        perturbations in 4 processes and saves each mp-value as soon as it is
+        calculated, see :py:func:`cytominer_eval.operations.mp_value.mp_value`.
+    n_jobs : int, optional
+        Only used for operations calculated per group: grit, mp_value,
+        precision_recall and hitk. How many workers to use. Defaults to 1 (serial), -1
+        uses all cores. Results equal serial results, except for mp_value, see
+        :py:func:`cytominer_eval.operations.mp_value.mp_value`.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run the workers of `n_jobs`, see
+        :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`. Defaults to
+        "processes".
+    output_format : {'pandas', 'arrow', 'polars'}, optional
+        Whether operations that output a dataframe return a pandas.DataFrame, a
+        pyarrow.Table or a polars.DataFrame, with dictionary-encoded (categorical)
+        string columns for the latter two. Other results are returned as is. Defaults
+        to "polars" for Polars profiles, and "pandas" otherwise.
     """
-    # Check replicate groups input
-    check_replicate_groups(eval_metric=operation, replicate_groups=replicate_groups)
-
-    if operation != "mp_value":
-        # Melt the input profiles to long format
-        similarity_melted_df = metric_melt(
-            df=profiles,
-            features=features,
-            metadata_features=meta_features,
-            similarity_metric=similarity_metric,
-            eval_metric=operation,
-        )
+    with activate_profiler(profiler), profile_stage("evaluate"):
+        # Check replicate groups input
+        with profile_stage("validation"):
+            check_replicate_groups(
+                eval_metric=operation, replicate_groups=replicate_groups
+            )
+            if output_format is None:
+                output_format = "polars" if is_polars_frame(profiles) else "pandas"
+            check_output_format(output_format)
+            profiles = _read_profiles(profiles, features, meta_features)
+            shared = isinstance(profiles, SharedProfiles)
+            if shared:
+                profiles.check(features=features, similarity_metric=similarity_metric)
 
-    # Perform the input operation
-    if operation == "replicate_reproducibility":
-        metric_result = replicate_reproducibility(
-            similarity_melted_df=similarity_melted_df,
-            replicate_groups=replicate_groups,
-            quantile_over_null=replicate_reproducibility_quantile,
-            return_median_correlations=replicate_reproducibility_return_median_cor,
-        )
-    elif operation == "precision_recall":
-        metric_result = precision_recall(
-            similarity_melted_df=similarity_melted_df,
-            replicate_groups=replicate_groups,
-            groupby_columns=groupby_columns,
-            k=precision_recall_k,
+        with profile_stage("plan"):
+            plan = plan_evaluation(
+                n_profiles=profiles.n_profiles if shared else profiles.shape[0],
+                n_features=len(features),
+                n_meta_features=len(meta_features),
+                operation=operation,
+                similarity_metric=similarity_metric,
+                similarity_strategy=similarity_strategy,
+                memory_budget=memory_budget,
+                replicate_groups=replicate_groups,
+                missing_features=_has_missing_features(profiles, features),
+            )
+            if get_active_profiler() is not None:
+                get_active_profiler().annotate("plan", plan)
+
+        if cache is not None:
+            if shared:
+                profiles_key = profiles.key
+            else:
+                # Sorted, so that the key does not depend on the order of a set
+                used_columns = sorted(set(meta_features) | set(features))
+                profiles_key = hash_pandas(
+                    _to_profiles(profiles, features, meta_features).loc[:, used_columns]
+                )
+            result_key = hash_parameters(
+                profiles=profiles_key,
+                features=list(features),
+                meta_features=list(meta_features),
+                replicate_groups=replicate_groups,
+                operation=operation,
+                groupby_columns=groupby_columns,
+                similarity_metric=similarity_metric,
+                replicate_reproducibility_quantile=replicate_reproducibility_quantile,
+                replicate_reproducibility_return_median_cor=replicate_reproducibility_return_median_cor,
+                precision_recall_k=precision_recall_k,
+                grit_control_perts=grit_control_perts,
+                grit_replicate_summary_method=grit_replicate_summary_method,
+                mp_value_params=mp_value_params,
+                enrichment_percentile=enrichment_percentile,
+                hitk_percent_list=hitk_percent_list,
+                operation_params=operation_params,
+                similarity_dtype=cache.similarity_dtype,
+            )
+            found, metric_result = cache.get("result", result_key)
+            if found:
+                return _format_result(metric_result, output_format)
+
+        spec = get_operation_spec(operation)
+        builtin_kwargs = {
+            "replicate_reproducibility": {
+                "replicate_groups": replicate_groups,
+                "quantile_over_null": replicate_reproducibility_quantile,
+                "return_median_correlations": replicate_reproducibility_return_median_cor,
+            },
+            "precision_recall": {
+                "replicate_groups": replicate_groups,
+                "groupby_columns": groupby_columns,
+                "k": precision_recall_k,
+                "n_jobs": n_jobs,
+                "backend": backend,
+            },
+            "grit": {
+                "control_perts": grit_control_perts,
+                "profile_col": replicate_groups["profile_col"]
+                if isinstance(replicate_groups, dict)
+                else None,
+                "replicate_group_col": replicate_groups["replicate_group_col"]
+                if isinstance(replicate_groups, dict)
+                else None,
+                "replicate_summary_method": grit_replicate_summary_method,
+                "n_jobs": n_jobs,
+                "backend": backend,
+            },
+            "mp_value": {
+                "df": None,
+                "control_perts": grit_control_perts,
+                "replicate_id": replicate_groups,
+                "features": features,
+                "params": mp_value_params,
+                "n_jobs": n_jobs,
+                "backend": backend,
+            },
+            "enrichment": {
+                "replicate_groups": replicate_groups,
+                "percentile": enrichment_percentile,
+            },
+            "hitk": {
+                "replicate_groups": replicate_groups,
+                "groupby_columns": groupby_columns,
+                "percent_list": hitk_percent_list,
+                "n_jobs": n_jobs,
+                "backend": backend,
+            },
+        }
+        if operation == "mp_value":
+            operation_kwargs = builtin_kwargs[operation]
+            operation_kwargs["df"] = _to_profiles(profiles, features, meta_features)
+        elif operation in builtin_kwargs:
+            operation_kwargs = builtin_kwargs[operation]
+        else:
+            operation_kwargs = _shared_inputs(
+                spec=spec,
+                profiles=profiles,
+                features=features,
+                meta_features=meta_features,
+                replicate_groups=replicate_groups,
+                similarity_metric=similarity_metric,
+                cache=cache,
+            )
+        operation_kwargs.update(operation_params)
+
+        if spec.similarity is not None:
+            operation_kwargs["similarity_melted_df"] = _melt_profiles(
+                profiles=profiles,
+                features=features,
+                meta_features=meta_features,
+                operation=operation,
+                similarity_metric=similarity_metric,
+                cache=cache,
+                plan=plan,
+            )
+
+        # Perform the input operation
+        with profile_stage(operation):
+            metric_result = get_operation(operation)(**operation_kwargs)
+
+        if cache is not None:
+            cache.put("result", result_key, metric_result)
+
+        return _format_result(metric_result, output_format)
+
+
+def _read_profiles(profiles, features: List[str], meta_features: List[str]):
+    # Files are read to arrays, and Polars frames are evaluated as the Arrow data they
+    # share memory with
+    if is_profile_path(profiles):
+        profiles = read_profile_arrays(
+            profiles, features=features, meta_features=meta_features
         )
-    elif operation == "grit":
-        metric_result = grit(
-            similarity_melted_df=similarity_melted_df,
-            control_perts=grit_control_perts,
-            profile_col=replicate_groups["profile_col"],
-            replicate_group_col=replicate_groups["replicate_group_col"],
-            replicate_summary_method=grit_replicate_summary_method,
+    if is_polars_frame(profiles):
+        profiles = polars_to_arrow(
+            profiles, columns=list(meta_features) + list(features)
         )
-    elif operation == "mp_value":
-        metric_result = mp_value(
-            df=profiles,
-            control_perts=grit_control_perts,
-            replicate_id=replicate_groups,
-            features=features,
-            params=mp_value_params,
+    return profiles
+
+
+def _has_missing_features(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles], features: List[str]
+) -> bool:
+    # Features on disk are not read to check; shared similarities are already computed
+    if isinstance(profiles, SharedProfiles) or (
+        isinstance(profiles, ProfileArrays) and profiles.feature_array is not None
+    ):
+        return False
+    if is_arrow_table(profiles):
+        return any([np.isnan(profiles.column(x).to_numpy()).any() for x in features])
+    if isinstance(profiles, ProfileArrays):
+        profiles = profiles.feature_df
+    return bool(profiles.loc[:, features].isna().values.any())
+
+
+def _melt_profiles(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    meta_features: List[str],
+    operation: str,
+    similarity_metric: str,
+    cache: EvaluationCache,
+    plan: dict,
+):
+    if isinstance(profiles, SharedProfiles):
+        # Melt the shared similarity matrix to long format
+        with profile_stage("metric_melt"):
+            return profiles.melt(meta_features=meta_features, eval_metric=operation)
+
+    # Melt the input profiles to long format
+    return metric_melt(
+        df=profiles,
+        features=features,
+        metadata_features=meta_features,
+        similarity_metric=similarity_metric,
+        eval_metric=operation,
+        cache=cache,
+        similarity_strategy=plan["similarity_strategy"],
+        block_size=plan["block_size"],
+    )
+
+
+def _to_profiles(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    meta_features: List[str],
+) -> pd.DataFrame:
+    # Operations that read profiles rather than similarities take pandas dataframes
+    if isinstance(profiles, (ProfileArrays, SharedProfiles)):
+        return profiles.to_profiles()
+    return profiles_to_pandas(profiles, features=features, meta_features=meta_features)
+
+
+def _format_result(metric_result, output_format: str):
+    if isinstance(metric_result, pd.DataFrame):
+        return pandas_to_frame(metric_result, output_format)
+    return metric_result
+
+
+def _shared_inputs(
+    spec: OperationSpec,
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    meta_features: List[str],
+    replicate_groups: Union[List[str], dict, str],
+    similarity_metric: str,
+    cache: EvaluationCache,
+) -> dict:
+    # Rows of all shared inputs follow the row order of profiles, which is also the
+    # order of the pair indices in melted similarities
+    inputs = {"replicate_groups": replicate_groups}
+
+    if is_arrow_table(profiles) and any(
+        [x in spec.inputs for x in ["group_codes", "features", "profiles"]]
+    ):
+        profiles = _to_profiles(profiles, features, meta_features)
+
+    if "similarity_matrix" in spec.inputs or "knn_graph" in spec.inputs:
+        inputs.update(
+            _similarity_inputs(
+                spec=spec,
+                profiles=profiles,
+                features=features,
+                similarity_metric=similarity_metric,
+                cache=cache,
+            )
         )
-    elif operation == "enrichment":
-        metric_result = enrichment(
-            similarity_melted_df=similarity_melted_df,
-            replicate_groups=replicate_groups,
-            percentile=enrichment_percentile,
+
+    if "group_codes" in spec.inputs:
+        inputs["group_codes"] = _group_codes(
+            profiles=profiles, replicate_groups=replicate_groups
         )
-    elif operation == "hitk":
-        metric_result = hitk(
-            similarity_melted_df=similarity_melted_df,
-            replicate_groups=replicate_groups,
-            groupby_columns=groupby_columns,
-            percent_list=hitk_percent_list,
+
+    if ("features" in spec.inputs or "profiles" in spec.inputs) and not isinstance(
+        profiles, ProfileArrays
+    ):
+        profiles = _to_profiles(profiles, features, meta_features)
+
+    if "features" in spec.inputs:
+        inputs["features"] = _feature_input(
+            profiles=profiles, features=features, meta_features=meta_features
         )
-    return metric_result
+
+    if "profiles" in spec.inputs:
+        inputs["profiles"] = _to_profiles(profiles, features, meta_features)
+
+    return inputs
+
+
+def _similarity_inputs(
+    spec: OperationSpec,
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    similarity_metric: str,
+    cache: EvaluationCache,
+) -> dict:
+    inputs = {}
+    with profile_stage("similarity_matrix"):
+        if isinstance(profiles, SharedProfiles):
+            similarity_matrix = pd.DataFrame(profiles.similarity())
+        else:
+            similarity_matrix = metric_matrix(
+                df=profiles,
+                features=features,
+                similarity_metric=similarity_metric,
+                cache=cache,
+            )
+    if "similarity_matrix" in spec.inputs:
+        inputs["similarity_matrix"] = similarity_matrix
+    if "knn_graph" in spec.inputs:
+        with profile_stage("knn_graph"):
+            inputs["knn_graph"] = get_knn_graph(
+                similarity_matrix=similarity_matrix, n_neighbors=spec.n_neighbors
+            )
+    return inputs
+
+
+def _group_codes(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    replicate_groups: Union[List[str], dict, str],
+):
+    if isinstance(replicate_groups, dict):
+        replicate_groups = replicate_groups["replicate_group_col"]
+    if isinstance(profiles, (ProfileArrays, SharedProfiles)):
+        return profiles.group_codes(replicate_groups)
+    return get_group_codes(df=profiles, replicate_groups=replicate_groups)
+
+
+def _feature_input(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    meta_features: List[str],
+) -> pd.DataFrame:
+    if isinstance(profiles, ProfileArrays):
+        # The feature matrix is passed on without a copy
+        _, feature_df = profiles.split(features=features, meta_features=[])
+        return assert_pandas_dtypes(df=feature_df, col_fix=float)
+
+    profiles = _to_profiles(profiles, features, meta_features)
+    return assert_pandas_dtypes(
+        df=profiles.reset_index(drop=True).loc[:, features], col_fix=float
+    )
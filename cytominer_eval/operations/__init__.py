@@ -1,15 +1,48 @@
-from .replicate_reproducibility import replicate_reproducibility
-from .precision_recall import precision_recall
-from .grit import grit
-from .mp_value import mp_value
-from .enrichment import enrichment
-from .hitk import hitk
-
-__all__ = [
-    replicate_reproducibility,
-    precision_recall,
-    grit,
-    mp_value,
-    enrichment,
-    hitk,
+"""Evaluation operations.
+
+Operations are imported on first attribute access (PEP 562), see
+:py:mod:`cytominer_eval.operations.registry`. Third-party operations are added with
+:py:func:`cytominer_eval.operations.register_operation`.
+"""
+import sys
+
+from .registry import (
+    OperationSpec,
+    get_operation,
+    get_registered_operations,
+    register_operation,
+    unregister_operation,
+)
+
+_operations = [
+    "replicate_reproducibility",
+    "precision_recall",
+    "grit",
+    "mp_value",
+    "enrichment",
+    "hitk",
 ]
+
+__all__ = _operations + [
+    "OperationSpec",
+    "get_operation",
+    "get_registered_operations",
+    "register_operation",
+    "unregister_operation",
+]
+
+
+def __getattr__(name):
+    if name in _operations:
+        return get_operation(name)
+    raise AttributeError("module {m} has no attribute {a}".format(m=__name__, a=name))
+
+
+def __dir__():
+    return sorted(list(globals()) + _operations)
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Modules cannot define __getattr__ before Python 3.7, so operations are imported
+    for _name in _operations:
+        get_operation(_name)
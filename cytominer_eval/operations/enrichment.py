@@ -2,9 +2,14 @@
 import numpy as np
 import pandas as pd
 from typing import List, Union
-import scipy
+import scipy.stats
 
 from cytominer_eval.utils.operation_utils import assign_replicates
+from cytominer_eval.utils.polars_utils import (
+    frame_to_pandas,
+    get_frame_format,
+    pandas_to_frame,
+)
 
 
 def enrichment(
@@ -18,7 +23,7 @@ def enrichment(
 
     Parameters
     ----------
-    similarity_melted_df : pandas.DataFrame
+    similarity_melted_df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
         An elongated symmetrical matrix indicating pairwise correlations between
         samples. Importantly, it must follow the exact structure as output from
         :py:func:`cytominer_eval.transform.transform.metric_melt`.
@@ -30,9 +35,13 @@ def enrichment(
 
     Returns
     -------
-    dict
-        percentile, threshold, odds ratio and p value
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        percentile, threshold, odds ratio and p value, of the type of
+        similarity_melted_df
     """
+    frame_format = get_frame_format(similarity_melted_df)
+    similarity_melted_df = frame_to_pandas(similarity_melted_df)
+
     result = []
     replicate_truth_df = assign_replicates(
         similarity_melted_df=similarity_melted_df, replicate_groups=replicate_groups
@@ -77,4 +86,4 @@ def enrichment(
             }
         )
     result_df = pd.DataFrame(result)
-    return result_df
+    return pandas_to_frame(result_df, frame_format)
@@ -5,12 +5,15 @@
 - Similarity to control perturbations
 """
 import pandas as pd
+from functools import partial
 from typing import List
 
 from cytominer_eval.utils.availability_utils import check_replicate_summary_method
 from cytominer_eval.utils.operation_utils import assign_replicates
+from cytominer_eval.utils.parallel_utils import apply_chunks
 from cytominer_eval.utils.transform_utils import set_pair_ids, assert_melt
-from cytominer_eval.utils.grit_utils import set_grit_column_info, calculate_grit
+from cytominer_eval.utils.grit_utils import set_grit_column_info, calculate_grit_groups
+from cytominer_eval.utils.polars_utils import get_frame_format, pandas_to_frame
 
 
 def grit(
@@ -19,13 +22,15 @@ def grit(
     profile_col: str,
     replicate_group_col: str,
     replicate_summary_method: str = "mean",
+    n_jobs: int = 1,
+    backend: str = "processes",
 ) -> pd.DataFrame:
     r"""Calculate grit
 
     Parameters
     ----------
-    similarity_melted_df : pandas.DataFrame
-        a long pandas dataframe output from cytominer_eval.transform.metric_melt
+    similarity_melted_df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        a long dataframe output from cytominer_eval.transform.metric_melt
     control_perts : list
         a list of control perturbations to calculate a null distribution
     profile_col : str
@@ -36,14 +41,22 @@ def grit(
         profile column. E.g. target gene vs. guide in a CRISPR experiment.
     replicate_summary_method : {'mean', 'median'}, optional
         how replicate z-scores to control perts are summarized. Defaults to "mean".
+    n_jobs : int, optional
+        How many workers to use. Defaults to 1 (serial), -1 uses all cores.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see
+        :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`. Defaults to
+        "processes".
 
     Returns
     -------
-    pandas.DataFrame
-        A dataframe of grit measurements per perturbation
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        A dataframe of grit measurements per perturbation, of the type of
+        similarity_melted_df
     """
     # Check if we support the provided summary method
     check_replicate_summary_method(replicate_summary_method)
+    frame_format = get_frame_format(similarity_melted_df)
 
     # Determine pairwise replicates
     similarity_melted_df = assign_replicates(
@@ -66,17 +79,17 @@ def grit(
     )
 
     # Calculate grit for each perturbation
-    grit_df = (
-        similarity_melted_df.groupby(profile_col_name)
-        .apply(
-            lambda x: calculate_grit(
-                replicate_group_df=x,
-                control_perts=control_perts,
-                column_id_info=column_id_info,
-                replicate_summary_method=replicate_summary_method,
-            )
-        )
-        .reset_index(drop=True)
-    )
+    grit_df = apply_chunks(
+        similarity_melted_df,
+        by=profile_col_name,
+        func=partial(
+            calculate_grit_groups,
+            control_perts=control_perts,
+            column_id_info=column_id_info,
+            replicate_summary_method=replicate_summary_method,
+        ),
+        n_jobs=n_jobs,
+        backend=backend,
+    ).reset_index(drop=True)
 
-    return grit_df
+    return pandas_to_frame(grit_df, frame_format)
@@ -1,10 +1,12 @@
 """Function to calculate the hits at k list and scores for a given similarity matrix."""
 import pandas as pd
+from functools import partial
 from typing import List, Union
 
 
-from cytominer_eval.utils.hitk_utils import add_hit_rank, percentage_scores
+from cytominer_eval.utils.hitk_utils import get_hit_ranks, percentage_scores
 from cytominer_eval.utils.operation_utils import assign_replicates
+from cytominer_eval.utils.parallel_utils import apply_chunks
 from cytominer_eval.utils.transform_utils import set_pair_ids, assert_melt
 
 
@@ -13,6 +15,8 @@ def hitk(
     replicate_groups: List[str],
     groupby_columns: List[str],
     percent_list: Union[int, List[int]],
+    n_jobs: int = 1,
+    backend: str = "processes",
 ) -> pd.DataFrame:
     """Calculate the hit@k hits list and percent scores.
     This function groups the similarity matrix by each sample (group_col) and by similarity score. It then determines the rank of each correct hit.
@@ -44,6 +48,12 @@ def hitk(
         A list of percentages at which to calculate the percent scores, ie the amount of hits below this percentage.
         If percent_list == "all" a full dict with the length of classes will be created.
         Percentages are given as integers, ie 50 means 50 %.
+    n_jobs : int, optional
+        How many workers to use. Defaults to 1 (serial), -1 uses all cores.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see
+        :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`. Defaults to
+        "processes".
 
     Returns
     -------
@@ -74,15 +84,16 @@ def hitk(
     ]
 
     # group the sim_df by the groupby_columns
-    grouped = similarity_melted_df.groupby(groupby_cols_suffix)
-    nr_of_groups = grouped.ngroups
-    # Within each group, add the ranks of each connection to a new column
-    similarity_melted_with_rank = grouped.apply(lambda x: add_hit_rank(x))
-
-    # make a list of the ranks of correct connection (hits), ie where the group_replicate is true
-    hits_list = similarity_melted_with_rank[
-        similarity_melted_with_rank["group_replicate"]
-    ]["rank"].tolist()
+    nr_of_groups = similarity_melted_df.groupby(groupby_cols_suffix).ngroups
+    # Within each group, rank each connection and make a list of the ranks of correct
+    # connections (hits), ie where the group_replicate is true
+    hits_list = apply_chunks(
+        similarity_melted_df,
+        by=groupby_cols_suffix,
+        func=partial(get_hit_ranks, groupby_columns=groupby_cols_suffix),
+        n_jobs=n_jobs,
+        backend=backend,
+    ).tolist()
 
     # calculate the scores at each percentage
     percent_scores = percentage_scores(hits_list, percent_list, nr_of_groups)
@@ -12,10 +12,20 @@ References
    doi: 10.1177/1087057112469257
 """
 
+import numpy as np
 import pandas as pd
 from typing import List
 
-from cytominer_eval.utils.mpvalue_utils import calculate_mp_value
+from cytominer_eval.utils.cache_utils import hash_pandas, hash_parameters
+from cytominer_eval.utils.checkpoint_utils import Checkpoint
+from cytominer_eval.utils.io_utils import ProfileArrays
+from cytominer_eval.utils.mpvalue_utils import ControlStatistics, calculate_mp_value
+from cytominer_eval.utils.parallel_utils import run_tasks
+from cytominer_eval.utils.polars_utils import (
+    get_frame_format,
+    pandas_to_frame,
+    profiles_to_pandas,
+)
 
 
 def mp_value(
@@ -24,12 +34,15 @@ def mp_value(
     replicate_id: str,
     features: List[str],
     params: dict = {},
+    n_jobs: int = 1,
+    checkpoint: str = None,
+    backend: str = "processes",
 ) -> pd.DataFrame:
     """Calculate multidimensional perturbation value (mp-value) [1]_.
 
     Parameters
     ----------
-    df : pandas.DataFrame
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame, cytominer_eval.utils.io_utils.ProfileArrays}
         profiles with measurements per row and features or metadata per column.
     control_perts : list
         The control perturbations against which the distances will be computed.
@@ -40,26 +53,125 @@ def mp_value(
     params : dict, optional
         Optional parameters provided. See list of parameters in
         :py:func:`cytominer_eval.operations.util.default_mp_value_parameters`
+    n_jobs : int, optional
+        How many worker processes to use. Defaults to 1 (serial), -1 uses all cores.
+    checkpoint : str, optional
+        A file to which the mp-value of each perturbation is appended as soon as it is
+        calculated. If the file exists, the perturbations it holds are not calculated
+        again, which resumes an interrupted run. The file must have been written with
+        the same profiles and parameters.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see
+        :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`. Defaults to
+        "processes".
 
     Returns
     -------
-    pd.DataFrame
-        mp-values per perturbation.
+    {pd.DataFrame, pyarrow.Table, polars.DataFrame}
+        mp-values per perturbation, of the type of df (a polars.DataFrame for a
+        polars.LazyFrame).
     """
+    frame_format = get_frame_format(df)
+    if isinstance(df, ProfileArrays):
+        df = df.to_profiles()
+    df = profiles_to_pandas(df, features=features, meta_features=[replicate_id])
 
     assert replicate_id in df.columns, "replicate_id not found in dataframe columns"
 
     # Extract features for control rows
     control_df = df.loc[df.loc[:, replicate_id].isin(control_perts), features]
 
-    # Calculate mp_value for each perturbation
-    mp_value_df = pd.DataFrame(
-        df.groupby(replicate_id).apply(
-            lambda x: calculate_mp_value(x[features], control_df, params)
+    # Control statistics are shared by all perturbations
+    control_statistics = None
+    if params.get("control_statistics") is not None:
+        control_statistics = ControlStatistics(
+            control_df, method=params["control_statistics"]
+        )
+
+    if n_jobs == 1 and checkpoint is None:
+        # Calculate mp_value for each perturbation
+        mp_value_df = pd.DataFrame(
+            df.groupby(replicate_id).apply(
+                lambda x: calculate_mp_value(
+                    x[features],
+                    control_df,
+                    params,
+                    control_statistics=control_statistics,
+                )
+            ),
+            columns=["mp_value"],
+        )
+
+        mp_value_df.reset_index(inplace=True)
+
+        return pandas_to_frame(mp_value_df, frame_format)
+
+    # Each perturbation draws permutations from its own seed, so that results do not
+    # depend on n_jobs or on which perturbations were restored from the checkpoint
+    seed = int(np.random.randint(2**31))
+    if checkpoint is not None:
+        checkpoint = Checkpoint(
+            checkpoint,
+            job={
+                "operation": "mp_value",
+                "profiles": hash_pandas(df.loc[:, [replicate_id] + list(features)]),
+                "control_perts": list(control_perts),
+                "replicate_id": replicate_id,
+                "features": list(features),
+                "params": params,
+            },
+            state={"seed": seed},
+        )
+        seed = checkpoint.state["seed"]
+
+    keys = []
+    tasks = []
+    for key, pert_df in df.groupby(replicate_id):
+        keys.append(key)
+        if checkpoint is None or key not in checkpoint:
+            pert_seed = int(hash_parameters(seed=seed, key=key)[:8], 16)
+            tasks.append(
+                (
+                    key,
+                    pert_df[features],
+                    control_df,
+                    params,
+                    control_statistics,
+                    pert_seed,
+                )
+            )
+
+    results = run_tasks(
+        _mp_value_task,
+        tasks,
+        n_jobs=n_jobs,
+        backend=backend,
+        callback=(
+            None
+            if checkpoint is None
+            else lambda i, result: checkpoint.save(tasks[i][0], result)
         ),
-        columns=["mp_value"],
     )
+    results = dict(zip([x[0] for x in tasks], results))
+
+    mp_value_df = pd.DataFrame(
+        {
+            replicate_id: keys,
+            "mp_value": [results[x] if x in results else checkpoint[x] for x in keys],
+        }
+    )
+
+    return pandas_to_frame(mp_value_df, frame_format)
 
-    mp_value_df.reset_index(inplace=True)
 
-    return mp_value_df
+def _mp_value_task(task) -> float:
+    _, pert_df, control_df, params, control_statistics, seed = task
+    return float(
+        calculate_mp_value(
+            pert_df,
+            control_df,
+            params,
+            control_statistics=control_statistics,
+            seed=seed,
+        )
+    )
@@ -1,11 +1,15 @@
 """Functions to calculate precision and recall at a given k."""
-
 import pandas as pd
+from functools import partial
 from typing import List, Union
 
-from cytominer_eval.utils.precisionrecall_utils import calculate_precision_recall
+from cytominer_eval.utils.precisionrecall_utils import (
+    calculate_precision_recall_groups,
+)
 from cytominer_eval.utils.operation_utils import assign_replicates
+from cytominer_eval.utils.parallel_utils import apply_chunks
 from cytominer_eval.utils.transform_utils import set_pair_ids, assert_melt
+from cytominer_eval.utils.polars_utils import get_frame_format, pandas_to_frame
 
 
 def precision_recall(
@@ -13,6 +17,8 @@ def precision_recall(
     replicate_groups: List[str],
     groupby_columns: List[str],
     k: Union[int, List[int]],
+    n_jobs: int = 1,
+    backend: str = "processes",
 ) -> pd.DataFrame:
     """Determine the precision and recall at k for all unique groupby_columns samples
     based on a predefined similarity metric (see cytominer_eval.transform.metric_melt)
@@ -33,12 +39,21 @@ def precision_recall(
         This is just less intuitive to understand.
     k : List of ints or int
         an integer indicating how many pairwise comparisons to threshold.
+    n_jobs : int, optional
+        How many workers to use. Defaults to 1 (serial), -1 uses all cores.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see
+        :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`. Defaults to
+        "processes".
 
     Returns
     -------
-    pandas.DataFrame
-        precision and recall metrics for all groupby_column groups given k
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        precision and recall metrics for all groupby_column groups given k, of the
+        type of similarity_melted_df. The recall of groups without replicates is NaN.
     """
+    frame_format = get_frame_format(similarity_melted_df)
+
     # Determine pairwise replicates and make sure to sort based on the metric!
     similarity_melted_df = assign_replicates(
         similarity_melted_df=similarity_melted_df, replicate_groups=replicate_groups
@@ -53,18 +68,31 @@ def precision_recall(
         "{x}{suf}".format(x=x, suf=pair_ids[list(pair_ids)[0]]["suffix"])
         for x in groupby_columns
     ]
-    # iterate over all k
-    precision_recall_df = pd.DataFrame()
     if type(k) == int:
         k = [k]
-    for k_ in k:
-        # Calculate precision and recall for all groups
-        precision_recall_df_at_k = similarity_melted_df.groupby(
-            groupby_cols_suffix
-        ).apply(lambda x: calculate_precision_recall(x, k=k_))
-        precision_recall_df = precision_recall_df.append(precision_recall_df_at_k)
+    # Calculate precision and recall for all groups and all k
+    precision_recall_df = apply_chunks(
+        similarity_melted_df,
+        by=groupby_cols_suffix,
+        func=partial(
+            calculate_precision_recall_groups, groupby_columns=groupby_cols_suffix, k=k
+        ),
+        n_jobs=n_jobs,
+        backend=backend,
+    )
+    # List all groups at one k after the other, also when groups were chunked
+    precision_recall_df = pd.concat(
+        [
+            precision_recall_df.loc[precision_recall_df.k == k_]
+            for k_ in dict.fromkeys(k)
+        ]
+    )
 
     # Rename the columns back to the replicate groups provided
     rename_cols = dict(zip(groupby_cols_suffix, groupby_columns))
 
-    return precision_recall_df.reset_index().rename(rename_cols, axis="columns")
+    precision_recall_df = precision_recall_df.reset_index().rename(
+        rename_cols, axis="columns"
+    )
+
+    return pandas_to_frame(precision_recall_df, frame_format)
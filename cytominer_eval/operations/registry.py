@@ -0,0 +1,306 @@
+"""Registry of evaluation operations.
+
+Operations are registered by the location of their implementation and imported on
+first use, so that importing cytominer_eval does not import the heavy dependencies
+(e.g. scikit-learn, scipy) of operations that are never used.
+
+Third-party operations are added with
+:py:func:`cytominer_eval.operations.registry.register_operation`, or by exposing an
+:py:class:`cytominer_eval.operations.registry.OperationSpec` in the
+"cytominer_eval.operations" entry point group of an installed package.
+"""
+import sys
+import warnings
+import importlib
+from collections import OrderedDict
+from typing import Callable, List, Union
+
+try:
+    from importlib.metadata import entry_points
+except ImportError:  # Python < 3.8
+    try:
+        from importlib_metadata import entry_points
+    except ImportError:
+        entry_points = None
+
+entry_point_group = "cytominer_eval.operations"
+
+
+def get_available_operation_inputs():
+    """Output the shared inputs that evaluate can precompute for an operation"""
+    return ["similarity_matrix", "knn_graph", "group_codes", "features", "profiles"]
+
+
+class OperationSpec:
+    """
+    Describe an evaluation operation and how to load it.
+
+    Parameters
+    ----------
+    name : str
+        The operation identifier used in :py:func:`cytominer_eval.evaluate.evaluate`
+    target : {str, callable}
+        Either the operation function itself, or its location as
+        "package.module:function" to import lazily.
+    similarity : {'upper', 'full', None}, optional
+        Which melted similarities the operation consumes as `similarity_melted_df`:
+        only the upper triangle of the pairwise similarity matrix ("upper"), the full
+        matrix without its diagonal ("full", default), or none (None).
+    inputs : list, optional
+        Additional shared inputs passed to the operation as keyword arguments of the
+        same name. See
+        :py:func:`cytominer_eval.operations.registry.get_available_operation_inputs`.
+        Defaults to no additional inputs.
+    replicate_groups : {'list', 'str', 'dict'}, optional
+        The type of `replicate_groups` the operation accepts. Defaults to "list".
+    replicate_group_keys : list, optional
+        Only used when `replicate_groups='dict'`. The keys the dict must contain.
+    n_neighbors : int, optional
+        Only used when "knn_graph" is an input. The number of nearest neighbors per
+        profile. Defaults to None (all other profiles).
+
+    Methods
+    -------
+    load()
+        Import (if necessary) and return the operation function
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: Union[str, Callable],
+        similarity: str = "full",
+        inputs: List[str] = [],
+        replicate_groups: str = "list",
+        replicate_group_keys: List[str] = [],
+        n_neighbors: int = None,
+    ):
+        assert similarity in [
+            "upper",
+            "full",
+            None,
+        ], "similarity must be one of 'upper', 'full' or None"
+        if isinstance(target, str):
+            assert ":" in target, "target must be formatted as 'module:function'"
+        avail_inputs = get_available_operation_inputs()
+        assert all(
+            [x in avail_inputs for x in inputs]
+        ), "inputs not supported. Select from {avail}".format(avail=avail_inputs)
+        assert replicate_groups in [
+            "list",
+            "str",
+            "dict",
+        ], "replicate_groups must be one of 'list', 'str' or 'dict'"
+        if n_neighbors is not None:
+            assert n_neighbors > 0, "n_neighbors must be positive"
+
+        self.name = name
+        self.target = target
+        self.similarity = similarity
+        self.inputs = list(inputs)
+        self.replicate_groups = replicate_groups
+        self.replicate_group_keys = list(replicate_group_keys)
+        self.n_neighbors = n_neighbors
+
+    def load(self) -> Callable:
+        """Import (if necessary) and return the operation function
+
+        Returns
+        -------
+        callable
+            The operation function
+        """
+        if callable(self.target):
+            return self.target
+
+        module_name, function_name = self.target.split(":")
+        self.target = getattr(importlib.import_module(module_name), function_name)
+        return self.target
+
+
+_registry = OrderedDict()
+_builtin_operations = []
+_entry_points_loaded = False
+
+
+def _register(spec: OperationSpec) -> None:
+    _registry[spec.name] = spec
+
+
+def _load_entry_points() -> None:
+    # Entry points are only discovered once an operation is looked up, since
+    # scanning the installed distributions is slow
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    if entry_points is not None:
+        discovered = entry_points()
+        if hasattr(discovered, "select"):
+            discovered = discovered.select(group=entry_point_group)
+        else:
+            discovered = discovered.get(entry_point_group, [])
+    else:
+        try:
+            import pkg_resources
+        except ImportError:
+            warnings.warn(
+                "Operations of the {group} entry point group cannot be discovered. "
+                "Install importlib_metadata to load them.".format(
+                    group=entry_point_group
+                )
+            )
+            return
+        discovered = pkg_resources.iter_entry_points(entry_point_group)
+
+    for entry_point in discovered:
+        spec = entry_point.load()
+        assert isinstance(
+            spec, OperationSpec
+        ), "Entry point {ep} must refer to an OperationSpec".format(ep=entry_point.name)
+        if spec.name not in _registry:
+            _register(spec)
+
+
+def register_operation(
+    name: str,
+    target: Union[str, Callable],
+    similarity: str = "full",
+    inputs: List[str] = [],
+    replicate_groups: str = "list",
+    replicate_group_keys: List[str] = [],
+    n_neighbors: int = None,
+    overwrite: bool = False,
+) -> OperationSpec:
+    r"""Register a third-party evaluation operation
+
+    Once registered, the operation is available in
+    :py:func:`cytominer_eval.evaluate.evaluate`. The operation is called with
+    `replicate_groups`, the shared inputs it declares (`similarity_melted_df` unless
+    `similarity=None`, and each entry of `inputs`), and the `operation_params` given to
+    evaluate, all as keyword arguments. Shared inputs are computed once and, if a cache
+    is given to evaluate, reused across operations.
+
+    Parameters
+    ----------
+    name : str
+        The operation identifier
+    target : {str, callable}
+        The operation function, or its location as "package.module:function" to
+        import it on first use.
+    overwrite : bool, optional
+        Whether or not to replace an operation registered under the same name.
+        Built-in operations cannot be replaced. Defaults to False.
+
+    Returns
+    -------
+    OperationSpec
+        The operation specification
+
+    Other Parameters
+    -----------------------------
+    similarity, inputs, replicate_groups, replicate_group_keys, n_neighbors
+        See :py:class:`cytominer_eval.operations.registry.OperationSpec`.
+    """
+    assert (
+        name not in _builtin_operations
+    ), "{op} is a built-in operation and cannot be replaced".format(op=name)
+    assert (
+        overwrite or name not in _registry
+    ), "{op} is already registered, set overwrite=True to replace it".format(op=name)
+
+    spec = OperationSpec(
+        name=name,
+        target=target,
+        similarity=similarity,
+        inputs=inputs,
+        replicate_groups=replicate_groups,
+        replicate_group_keys=replicate_group_keys,
+        n_neighbors=n_neighbors,
+    )
+    _register(spec)
+    return spec
+
+
+def unregister_operation(name: str) -> None:
+    r"""Remove a third-party evaluation operation
+
+    Parameters
+    ----------
+    name : str
+        The operation identifier
+    """
+    assert (
+        name not in _builtin_operations
+    ), "{op} is a built-in operation and cannot be removed".format(op=name)
+    get_operation_spec(name)
+    del _registry[name]
+
+
+def get_operation_spec(name: str) -> OperationSpec:
+    r"""Retrieve the specification of a registered operation
+
+    Parameters
+    ----------
+    name : str
+        The operation identifier
+
+    Returns
+    -------
+    OperationSpec
+        The operation specification
+    """
+    if name not in _registry:
+        _load_entry_points()
+    assert name in _registry, "{op} not supported. Select one of {avail}".format(
+        op=name, avail=list(_registry)
+    )
+    return _registry[name]
+
+
+def get_operation(name: str) -> Callable:
+    r"""Load a registered operation
+
+    Parameters
+    ----------
+    name : str
+        The operation identifier
+
+    Returns
+    -------
+    callable
+        The operation function
+    """
+    operation = get_operation_spec(name).load()
+    if name in _builtin_operations:
+        # Importing the submodule of a built-in operation binds the submodule to the
+        # package attribute of the same name, which refers to the operation instead
+        setattr(sys.modules[__package__], name, operation)
+    return operation
+
+
+def get_registered_operations() -> list:
+    r"""List the identifiers of all registered operations, in registration order"""
+    _load_entry_points()
+    return list(_registry)
+
+
+for _name, _similarity, _replicate_groups, _replicate_group_keys in [
+    ("replicate_reproducibility", "upper", "list", []),
+    ("precision_recall", "full", "list", []),
+    ("grit", "full", "dict", ["profile_col", "replicate_group_col"]),
+    ("mp_value", None, "str", []),
+    ("enrichment", "full", "list", []),
+    ("hitk", "full", "list", []),
+]:
+    _register(
+        OperationSpec(
+            name=_name,
+            target="cytominer_eval.operations.{op}:{op}".format(op=_name),
+            similarity=_similarity,
+            replicate_groups=_replicate_groups,
+            replicate_group_keys=_replicate_group_keys,
+        )
+    )
+    _builtin_operations.append(_name)
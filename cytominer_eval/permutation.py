@@ -0,0 +1,276 @@
+"""Label permutation tests of replicate reproducibility and enrichment.
+
+Replicate group labels are shuffled over a fixed pairwise similarity matrix. Many
+permutations are evaluated at once as arrays of group codes, so that neither the
+similarity matrix nor the melted similarities are ever recalculated.
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+from cytominer_eval.transform import metric_matrix
+from cytominer_eval.utils.availability_utils import check_permutation_operation
+from cytominer_eval.utils.cache_utils import EvaluationCache, hash_pandas
+from cytominer_eval.utils.checkpoint_utils import Checkpoint
+from cytominer_eval.utils.matrix_operation_utils import (
+    batch_enrichment,
+    batch_replicate_reproducibility,
+    get_upper_pairs,
+    get_valid_pairs,
+)
+from cytominer_eval.utils.io_utils import ProfileArrays
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.parallel_utils import run_tasks, share_array
+from cytominer_eval.utils.profiling_utils import profile_stage
+from cytominer_eval.utils.shared_utils import SharedProfiles
+
+
+def permutation_test(
+    profiles: Union[pd.DataFrame, ProfileArrays, SharedProfiles],
+    features: List[str],
+    replicate_groups: List[str],
+    operation: str = "replicate_reproducibility",
+    similarity_metric: str = "pearson",
+    replicate_reproducibility_quantile: float = 0.95,
+    enrichment_percentile: Union[float, List[float]] = 0.99,
+    n_permutations: int = 1000,
+    batch_size: int = 100,
+    seed: int = None,
+    n_jobs: int = 1,
+    cache: EvaluationCache = None,
+    checkpoint: str = None,
+) -> (pd.DataFrame, pd.DataFrame):
+    r"""Calculate empirical p-values of an evaluation metric by permuting replicate labels
+
+    Parameters
+    ----------
+    profiles : {pandas.DataFrame, cytominer_eval.utils.io_utils.ProfileArrays, cytominer_eval.utils.shared_utils.SharedProfiles}
+        profiles must be a pandas DataFrame with profile samples as rows and profile
+        features as columns. The columns should contain both metadata and feature
+        measurements. Alternatively, a feature array and a metadata table held
+        separately, or profiles in shared memory, whose similarity matrix is reused.
+    features : list
+        A list of strings corresponding to feature measurement column names in the
+        `profiles` DataFrame.
+    replicate_groups : list
+        A list of metadata column names indicating replicate profiles. The labels of
+        all columns are permuted jointly.
+    operation : {'replicate_reproducibility', 'enrichment'}, optional
+        The evaluation metric to test. Defaults to "replicate_reproducibility".
+    similarity_metric : {'pearson', 'spearman', 'kendall'}, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    replicate_reproducibility_quantile : float, optional
+        Only used when `operation='replicate_reproducibility'`. See
+        :py:func:`cytominer_eval.evaluate.evaluate`. Defaults to 0.95.
+    enrichment_percentile : float or list of floats, optional
+        Only used when `operation='enrichment'`. See
+        :py:func:`cytominer_eval.evaluate.evaluate`. Defaults to 0.99.
+    n_permutations : int, optional
+        The number of label permutations. Defaults to 1000.
+    batch_size : int, optional
+        How many permutations to evaluate at once. Peak memory is about
+        batch_size x the number of profile pairs x 9 bytes. Defaults to 100.
+    seed : int, optional
+        Seed of the permutations. Each batch draws from its own child seed, so results
+        do not depend on n_jobs.
+    n_jobs : int, optional
+        How many worker processes to use. Defaults to 1 (serial), -1 uses all cores.
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix is looked up in, and stored to, the
+        cache, shared with :py:func:`cytominer_eval.evaluate.evaluate`.
+    checkpoint : str, optional
+        A file to which the null distribution of each batch of permutations is appended
+        as soon as it is calculated. If the file exists, the batches it holds are not
+        calculated again, which resumes an interrupted run. The file must have been
+        written with the same profiles and parameters.
+
+    Returns
+    -------
+    (pd.DataFrame, pd.DataFrame)
+        A dataframe with one row per metric ("metric") holding the metric of the input
+        profiles ("observed") and its one-sided p-value ("p_value"), and a permutations
+        x metrics dataframe of the null distribution.
+    """
+    check_permutation_operation(operation)
+    assert n_permutations > 0, "n_permutations must be positive"
+    assert batch_size > 0, "batch_size must be positive"
+
+    if isinstance(enrichment_percentile, (int, float, np.floating)):
+        enrichment_percentile = [enrichment_percentile]
+
+    with profile_stage("permutation_test"):
+        shared = isinstance(profiles, SharedProfiles)
+        if shared:
+            profiles.check(features=features, similarity_metric=similarity_metric)
+            similarity = profiles.similarity()
+        else:
+            similarity = metric_matrix(
+                df=profiles,
+                features=features,
+                similarity_metric=similarity_metric,
+                cache=cache,
+            ).values
+        valid = get_valid_pairs(similarity=similarity)
+        if isinstance(profiles, (ProfileArrays, SharedProfiles)):
+            group_codes = profiles.group_codes(replicate_groups)
+        else:
+            group_codes = get_group_codes(
+                df=profiles, replicate_groups=replicate_groups
+            )
+        pair_similarity, pair_a, pair_b = get_upper_pairs(
+            similarity=similarity, valid=valid
+        )
+
+        if operation == "replicate_reproducibility":
+            names = ["replicate_reproducibility"]
+            params = {"quantile_over_null": replicate_reproducibility_quantile}
+        else:
+            names = ["ods_ratio_at_{p}".format(p=x) for x in enrichment_percentile]
+            params = {
+                "thresholds": np.quantile(similarity[valid], enrichment_percentile)
+            }
+
+        batch_sizes = [batch_size] * (n_permutations // batch_size)
+        if n_permutations % batch_size:
+            batch_sizes.append(n_permutations % batch_size)
+        entropy = np.random.SeedSequence(seed).entropy
+        if checkpoint is not None:
+            if shared:
+                profiles_key = profiles.key
+            else:
+                profile_df = profiles
+                if isinstance(profiles, ProfileArrays):
+                    profile_df = profiles.to_profiles()
+                profiles_key = hash_pandas(
+                    profile_df.loc[:, list(replicate_groups) + list(features)]
+                )
+            checkpoint = Checkpoint(
+                checkpoint,
+                job={
+                    "operation": operation,
+                    "profiles": profiles_key,
+                    "features": list(features),
+                    "replicate_groups": list(replicate_groups),
+                    "similarity_metric": similarity_metric,
+                    "replicate_reproducibility_quantile": replicate_reproducibility_quantile,
+                    "enrichment_percentile": enrichment_percentile,
+                    "n_permutations": n_permutations,
+                    "batch_size": batch_size,
+                    "seed": seed,
+                },
+                state={"entropy": entropy},
+            )
+            # Without a seed, resumed batches continue the seed sequence of the first run
+            entropy = checkpoint.state["entropy"]
+        seeds = np.random.SeedSequence(entropy).spawn(len(batch_sizes))
+
+        batches = [
+            i
+            for i in range(len(batch_sizes))
+            if checkpoint is None or i not in checkpoint
+        ]
+        with share_array(
+            pair_similarity, n_jobs=n_jobs
+        ) as shared_similarity, share_array(
+            pair_a, n_jobs=n_jobs
+        ) as shared_a, share_array(
+            pair_b, n_jobs=n_jobs
+        ) as shared_b:
+            tasks = [
+                (
+                    operation,
+                    shared_similarity,
+                    shared_a,
+                    shared_b,
+                    group_codes,
+                    params,
+                    seeds[i],
+                    batch_sizes[i],
+                )
+                for i in batches
+            ]
+            results = run_tasks(
+                _permutation_task,
+                tasks,
+                n_jobs=n_jobs,
+                callback=(
+                    None
+                    if checkpoint is None
+                    else lambda i, result: checkpoint.save(batches[i], result.tolist())
+                ),
+            )
+        results = dict(zip(batches, results))
+        null_distribution = np.concatenate(
+            [
+                results[i] if i in results else np.array(checkpoint[i], dtype=float)
+                for i in range(len(batch_sizes))
+            ],
+            axis=0,
+        )
+
+        observed = _batch_metric(
+            operation=operation,
+            pair_similarity=pair_similarity,
+            pair_a=pair_a,
+            pair_b=pair_b,
+            group_codes=group_codes[np.newaxis, :],
+            params=params,
+        )[0]
+
+    # Permutations with an undefined metric do not count towards the null
+    defined = ~np.isnan(null_distribution)
+    n_extreme = (defined & (null_distribution >= observed)).sum(axis=0)
+    p_value = (1 + n_extreme) / (1 + defined.sum(axis=0))
+
+    result_df = pd.DataFrame(
+        {"metric": names, "observed": observed, "p_value": p_value}
+    )
+    null_df = pd.DataFrame(null_distribution, columns=names)
+
+    return (result_df, null_df)
+
+
+def _batch_metric(
+    operation: str,
+    pair_similarity: np.ndarray,
+    pair_a: np.ndarray,
+    pair_b: np.ndarray,
+    group_codes: np.ndarray,
+    params: dict,
+) -> np.array:
+    if operation == "replicate_reproducibility":
+        result = batch_replicate_reproducibility(
+            pair_similarity=pair_similarity,
+            pair_a=pair_a,
+            pair_b=pair_b,
+            group_codes=group_codes,
+            **params
+        )
+        return result[:, np.newaxis]
+
+    return batch_enrichment(
+        pair_similarity=pair_similarity,
+        pair_a=pair_a,
+        pair_b=pair_b,
+        group_codes=group_codes,
+        **params
+    )
+
+
+def _permutation_task(task) -> np.array:
+    operation, pair_similarity, pair_a, pair_b, group_codes, params, seed, n = task
+    pair_similarity = np.asarray(pair_similarity)
+    pair_a = np.asarray(pair_a)
+    pair_b = np.asarray(pair_b)
+
+    rng = np.random.default_rng(seed)
+    permuted_codes = rng.permuted(np.tile(group_codes, (n, 1)), axis=1)
+
+    return _batch_metric(
+        operation=operation,
+        pair_similarity=pair_similarity,
+        pair_a=pair_a,
+        pair_b=pair_b,
+        group_codes=permuted_codes,
+        params=params,
+    )
@@ -0,0 +1,177 @@
+"""Evaluation of a stream of plates, one plate at a time.
+
+Each plate is evaluated as it arrives, and its replicate and non-replicate
+similarities are added to a mergeable sketch, so that campaign-level replicate
+reproducibility and enrichment are available after every plate without revisiting
+earlier plates. Pairs of profiles on different plates are never compared.
+"""
+import numpy as np
+import pandas as pd
+from typing import Iterable, Iterator, List, Union
+
+from cytominer_eval.evaluate import evaluate
+from cytominer_eval.transform import metric_matrix
+from cytominer_eval.utils.cache_utils import EvaluationCache
+from cytominer_eval.utils.matrix_operation_utils import get_valid_pairs
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.polars_utils import profiles_to_pandas
+from cytominer_eval.utils.profiling_utils import profile_stage
+from cytominer_eval.utils.sketch_utils import SimilaritySketch
+
+
+def stream_evaluate(
+    plates: Iterable,
+    features: List[str],
+    meta_features: List[str],
+    replicate_groups: Union[List[str], dict],
+    operation: str = "replicate_reproducibility",
+    similarity_metric: str = "pearson",
+    replicate_reproducibility_quantile: float = 0.95,
+    enrichment_percentile: Union[float, List[float]] = 0.99,
+    sketch: SimilaritySketch = None,
+    cache: EvaluationCache = None,
+    evaluate_params: dict = {},
+) -> Iterator[tuple]:
+    r"""Evaluate plates one at a time and keep running campaign-level metrics
+
+    Parameters
+    ----------
+    plates : iterable
+        Profiles of one plate at a time, as pandas DataFrames, pyarrow.Tables or
+        Polars frames, or (plate, profiles) tuples such as the items of a dict. Plates
+        are read from the iterable only when the previous plate is evaluated, so it
+        can be a generator of plates as they are imaged.
+    features : list
+        A list of strings corresponding to feature measurement column names
+    meta_features : list
+        A list of strings corresponding to metadata column names
+    replicate_groups : {str, list, dict}
+        Which metadata columns denote replicate profiles, see
+        :py:func:`cytominer_eval.evaluate.evaluate`
+    operation : str, optional
+        The evaluation metric of each plate, see
+        :py:func:`cytominer_eval.evaluate.evaluate`. Campaign-level metrics are kept
+        for "replicate_reproducibility" (default) and "enrichment".
+    similarity_metric : {'pearson', 'spearman', 'kendall'}, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    replicate_reproducibility_quantile : float, optional
+        Only used when `operation='replicate_reproducibility'`. Defaults to 0.95.
+    enrichment_percentile : float or list of floats, optional
+        Only used when `operation='enrichment'`. Defaults to 0.99.
+    sketch : cytominer_eval.utils.sketch_utils.SimilaritySketch, optional
+        The campaign sketch to add plates to, which is updated in place. For example,
+        a sketch of earlier plates restored with pickle, to resume a campaign.
+        Defaults to a new sketch.
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        The cache shared by the plate evaluation and the sketch, so that the
+        similarities of each plate are calculated once. Defaults to a cache of the
+        most recent plates, whose entries are shared rather than copied.
+    evaluate_params : {{}, ...}, optional
+        Other keyword arguments of :py:func:`cytominer_eval.evaluate.evaluate`
+
+    Yields
+    ------
+    (object, object, object)
+        The plate (its key if given, or its position), its evaluation result, and the
+        campaign-level result of all plates so far. The campaign-level result is the
+        operation output calculated from the sketch, see
+        :py:class:`cytominer_eval.utils.sketch_utils.SimilaritySketch`, or None for
+        other operations.
+    """
+    keep_sketch = operation in ["replicate_reproducibility", "enrichment"]
+    if sketch is None:
+        sketch = SimilaritySketch()
+    if cache is None:
+        cache = EvaluationCache(max_entries=8, copy_entries=False)
+
+    for position, plate in enumerate(plates):
+        if isinstance(plate, tuple):
+            plate_key, profiles = plate
+        else:
+            plate_key, profiles = position, plate
+
+        with profile_stage("stream_plate"):
+            profiles = profiles_to_pandas(
+                profiles, features=features, meta_features=meta_features
+            )
+            plate_result = evaluate(
+                profiles=profiles,
+                features=features,
+                meta_features=meta_features,
+                replicate_groups=replicate_groups,
+                operation=operation,
+                similarity_metric=similarity_metric,
+                replicate_reproducibility_quantile=replicate_reproducibility_quantile,
+                enrichment_percentile=enrichment_percentile,
+                cache=cache,
+                **evaluate_params
+            )
+
+            campaign_result = None
+            if keep_sketch:
+                update_sketch(
+                    sketch=sketch,
+                    profiles=profiles,
+                    features=features,
+                    replicate_groups=replicate_groups,
+                    similarity_metric=similarity_metric,
+                    cache=cache,
+                )
+                if operation == "replicate_reproducibility":
+                    campaign_result = sketch.replicate_reproducibility(
+                        quantile_over_null=replicate_reproducibility_quantile
+                    )
+                else:
+                    campaign_result = sketch.enrichment(
+                        percentile=enrichment_percentile
+                    )
+
+        yield plate_key, plate_result, campaign_result
+
+
+def update_sketch(
+    sketch: SimilaritySketch,
+    profiles: pd.DataFrame,
+    features: List[str],
+    replicate_groups: List[str],
+    similarity_metric: str = "pearson",
+    cache: EvaluationCache = None,
+) -> SimilaritySketch:
+    r"""Add the replicate and non-replicate similarities of one plate to a sketch
+
+    Parameters
+    ----------
+    sketch : cytominer_eval.utils.sketch_utils.SimilaritySketch
+        The sketch to update in place
+    profiles : pandas.DataFrame
+        The profiles of the plate
+    features : list
+        A list of strings corresponding to feature measurement column names
+    replicate_groups : list
+        A list of metadata column names indicating replicate profiles
+    similarity_metric : {'pearson', 'spearman', 'kendall'}, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix is looked up in, and stored to, the
+        cache
+
+    Returns
+    -------
+    cytominer_eval.utils.sketch_utils.SimilaritySketch
+        The updated sketch
+    """
+    similarity = metric_matrix(
+        df=profiles,
+        features=features,
+        similarity_metric=similarity_metric,
+        cache=cache,
+    ).values
+    group_codes = get_group_codes(df=profiles, replicate_groups=replicate_groups)
+
+    upper = np.triu(get_valid_pairs(similarity=similarity), k=1)
+    is_replicate = group_codes[:, np.newaxis] == group_codes[np.newaxis, :]
+    return sketch.update(
+        similarity=similarity[upper],
+        is_replicate=is_replicate[upper],
+        n_profiles=similarity.shape[0],
+    )
@@ -0,0 +1,246 @@
+import os
+import pytest
+import pathlib
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate, bootstrap_evaluate
+from cytominer_eval.utils.cache_utils import EvaluationCache
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def simulate_profiles(n_groups, n_replicates, n_features, signal, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_groups, n_features))
+    profiles = signal * np.repeat(centers, n_replicates, axis=0) + rng.normal(
+        size=(n_groups * n_replicates, n_features)
+    )
+    simulated_features = ["feature_{}".format(i) for i in range(n_features)]
+    simulated_df = pd.DataFrame(profiles, columns=simulated_features)
+    simulated_df["Metadata_group"] = np.repeat(
+        ["group_{}".format(i) for i in range(n_groups)], n_replicates
+    )
+    simulated_df["Metadata_well"] = [
+        "well_{}".format(i) for i in range(simulated_df.shape[0])
+    ]
+    return simulated_df, simulated_features
+
+
+def test_bootstrap_replicate_reproducibility():
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="replicate_reproducibility",
+    )
+
+    result, distribution = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        n_bootstrap=50,
+        seed=123,
+        return_distribution=True,
+    )
+
+    assert result.metric.tolist() == ["replicate_reproducibility"]
+    assert np.isclose(result.estimate[0], expected_result)
+    assert result.lower[0] <= result.estimate[0] <= result.upper[0]
+    assert distribution.shape == (50, 1)
+
+    # Resampling is deterministic given a seed, also across worker processes
+    parallel_result = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        n_bootstrap=50,
+        seed=123,
+        n_jobs=2,
+    )
+    assert_frame_equal(result, parallel_result)
+
+    group_result = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        n_bootstrap=50,
+        resample="groups",
+        seed=123,
+    )
+    assert np.isclose(group_result.estimate[0], expected_result)
+
+
+def test_bootstrap_operations():
+    cache = EvaluationCache()
+
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.99],
+        cache=cache,
+    )
+    result = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.99],
+        n_bootstrap=20,
+        seed=123,
+        cache=cache,
+    )
+    assert result.metric.tolist() == ["ods_ratio_at_0.9", "ods_ratio_at_0.99"]
+    assert np.allclose(result.estimate, expected_result.ods_ratio)
+    # The similarity matrix is reused from the cache
+    assert cache.hits == 1
+
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=["Metadata_broad_sample"],
+        operation="precision_recall",
+        groupby_columns=["Metadata_broad_sample"],
+        precision_recall_k=[5, 10],
+    )
+    expected_result = expected_result.groupby("k")[["precision", "recall"]].mean()
+    result = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=["Metadata_broad_sample"],
+        operation="precision_recall",
+        groupby_columns=["Metadata_broad_sample"],
+        precision_recall_k=[5, 10],
+        n_bootstrap=20,
+        seed=123,
+    )
+    assert result.metric.tolist() == [
+        "precision_at_5",
+        "precision_at_10",
+        "recall_at_5",
+        "recall_at_10",
+    ]
+    assert np.allclose(
+        result.estimate,
+        expected_result.precision.tolist() + expected_result.recall.tolist(),
+    )
+
+    _, expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="hitk",
+        groupby_columns=["Metadata_Well"],
+        hitk_percent_list=[2, 5, 10],
+    )
+    result = bootstrap_evaluate(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        operation="hitk",
+        groupby_columns=["Metadata_Well"],
+        hitk_percent_list=[2, 5, 10],
+        n_bootstrap=20,
+        seed=123,
+    )
+    assert result.estimate.tolist() == list(expected_result.values())
+
+
+@pytest.mark.parametrize("resample", ["profiles", "groups"])
+def test_bootstrap_coverage(resample):
+    # Copies of resampled profiles and groups are not replicates of each other, so
+    # the intervals are centered on the estimate
+    simulated_df, simulated_features = simulate_profiles(
+        n_groups=30, n_replicates=4, n_features=50, signal=0.6
+    )
+
+    for groupby_columns in [["Metadata_group"], ["Metadata_well"]]:
+        result = bootstrap_evaluate(
+            profiles=simulated_df,
+            features=simulated_features,
+            replicate_groups=["Metadata_group"],
+            operation="precision_recall",
+            groupby_columns=groupby_columns,
+            precision_recall_k=[3],
+            n_bootstrap=100,
+            resample=resample,
+            seed=123,
+        )
+        assert (result.lower <= result.estimate).all()
+        assert (result.estimate <= result.upper).all()
+
+    result = bootstrap_evaluate(
+        profiles=simulated_df,
+        features=simulated_features,
+        replicate_groups=["Metadata_group"],
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.99],
+        n_bootstrap=100,
+        resample=resample,
+        seed=123,
+    )
+    assert (result.lower <= result.estimate).all()
+    assert (result.estimate <= result.upper).all()
+
+
+def test_bootstrap_infinite_odds_ratio():
+    # Without non-replicates among the top connections, the odds ratio is infinite
+    simulated_df, simulated_features = simulate_profiles(
+        n_groups=10, n_replicates=3, n_features=20, signal=1.5
+    )
+
+    result, distribution = bootstrap_evaluate(
+        profiles=simulated_df,
+        features=simulated_features,
+        replicate_groups=["Metadata_group"],
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.95],
+        n_bootstrap=50,
+        seed=123,
+        return_distribution=True,
+    )
+
+    is_infinite = np.isinf(distribution.values)
+    assert is_infinite.any() and not is_infinite.all()
+    assert not result[["lower", "upper"]].isna().any().any()
+    assert np.isfinite(result.lower).all()
+    assert np.isinf(result.upper).all()
+    assert (result.lower <= result.estimate).all()
+
+
+def test_bootstrap_errors():
+    with pytest.raises(AssertionError) as ae:
+        bootstrap_evaluate(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            operation="grit",
+        )
+    assert "grit not supported" in str(ae.value)
+
+    with pytest.raises(AssertionError) as ae:
+        bootstrap_evaluate(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            resample="MISSING",
+        )
+    assert "MISSING not supported" in str(ae.value)
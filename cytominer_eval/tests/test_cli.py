@@ -0,0 +1,109 @@
+import os
+import pytest
+import pathlib
+import tempfile
+import pandas as pd
+
+from cytominer_eval import evaluate
+from cytominer_eval.cli import format_result, main, parse_bytes, write_results
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def test_parse_bytes():
+    assert parse_bytes("100") == 100
+    assert parse_bytes("4K") == 4096
+    assert parse_bytes("1.5gb") == int(1.5 * 2**30)
+
+
+def test_format_result():
+    result_df = format_result(0.5, "replicate_reproducibility")
+    assert result_df.to_dict("list") == {"replicate_reproducibility": [0.5]}
+
+    result_df = format_result(([0, 1], {2: 1.0, 5: -1.0}), "hitk")
+    assert result_df.to_dict("list") == {"percent": [2, 5], "score": [1.0, -1.0]}
+
+
+def test_write_results():
+    pytest.importorskip("pyarrow")
+
+    results_df = pd.DataFrame(
+        {"file": ["a.csv", "b.csv", "c.csv"], "metric": [0.5, "0.25", None]}
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output = os.path.join(tmpdir, "results.parquet")
+        write_results(results_df, output)
+        written_df = pd.read_parquet(output)
+
+    assert written_df.metric.tolist()[:2] == ["0.5", "0.25"]
+    assert written_df.metric.isna().tolist() == [False, False, True]
+
+
+def test_main():
+    pytest.importorskip("pyarrow")
+
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Two plates, in both supported formats
+        plate_a = os.path.join(tmpdir, "plate_a.csv.gz")
+        plate_b = os.path.join(tmpdir, "plate_b.parquet")
+        df.to_csv(plate_a, index=False)
+        df.to_parquet(plate_b, index=False)
+
+        for output in ["results.csv", "results.parquet"]:
+            output = os.path.join(tmpdir, output)
+            exit_status = main(
+                [
+                    "run",
+                    os.path.join(tmpdir, "plate_*"),
+                    "--output",
+                    output,
+                    "--operation",
+                    "replicate_reproducibility",
+                    "enrichment",
+                    "--replicate-groups",
+                ]
+                + replicate_groups
+                + ["--n-jobs", "2", "--memory-budget", "4G"]
+            )
+            assert exit_status == 0
+
+            if output.endswith(".csv"):
+                results_df = pd.read_csv(output)
+            else:
+                results_df = pd.read_parquet(output)
+
+            assert results_df.file.tolist() == [plate_a] * 2 + [plate_b] * 2
+            assert (
+                results_df.operation.tolist()
+                == [
+                    "replicate_reproducibility",
+                    "enrichment",
+                ]
+                * 2
+            )
+
+            reproducibility = results_df.replicate_reproducibility.dropna().tolist()
+            assert reproducibility == [expected_result] * 2
+            assert results_df.enrichment_percentile.dropna().tolist() == [0.99] * 2
+
+        with pytest.raises(AssertionError) as ae:
+            main(["run", os.path.join(tmpdir, "missing_*"), "--output", output])
+        assert "No profile files match" in str(ae.value)
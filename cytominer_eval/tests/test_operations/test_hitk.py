@@ -131,3 +131,17 @@ def test_empty_results():
     assert len(index_list_empty) == 0
     for p in percent_results:
         assert percent_results_empty[p] == 0
+
+
+def test_hitk_n_jobs():
+    for backend in ["threads", "processes"]:
+        parallel_index_list, parallel_percent_results = hitk(
+            similarity_melted_df=similarity_melted_df,
+            replicate_groups=["Metadata_moa"],
+            groupby_columns=groupby_columns,
+            percent_list=[2, 5, 10, 100],
+            n_jobs=2,
+            backend=backend,
+        )
+        assert parallel_index_list == index_list
+        assert parallel_percent_results == percent_results
@@ -1,6 +1,7 @@
 import os
 import pytest
 import pathlib
+import tempfile
 import numpy as np
 import pandas as pd
 from math import isclose
@@ -8,11 +9,13 @@ from math import isclose
 from cytominer_eval.operations import mp_value
 
 from cytominer_eval.utils.mpvalue_utils import (
+    batch_mahalanobis,
     calculate_mp_value,
     calculate_mahalanobis,
+    calculate_pca,
+    ControlStatistics,
 )
 
-
 # Load CRISPR dataset
 example_file = "SQ00014610_normalized_feature_select.csv.gz"
 example_file = pathlib.Path(
@@ -52,6 +55,62 @@ def test_calculate_mahalanobis():
     assert isclose(maha, 0, abs_tol=1e-05)
 
 
+def test_calculate_mahalanobis_estimators():
+    sub_df = df[(df.Metadata_WellRow == "A") & (df.Metadata_pert_name == "EMPTY")][
+        features
+    ]
+    control_df = df[df[replicate_id].isin(control_perts)][features]
+    pca_array, _ = calculate_pca(pd.concat([sub_df, control_df]))
+    pert_array = pca_array[: sub_df.shape[0]]
+    control_array = pca_array[sub_df.shape[0] :]
+
+    for estimator in ["empirical", "ledoit_wolf", "oas"]:
+        expected_maha = calculate_mahalanobis(
+            pert_df=pert_array, control_df=control_array, estimator=estimator
+        )
+        maha = calculate_mahalanobis(
+            pert_df=pert_array,
+            control_df=control_array,
+            estimator=estimator,
+            solver="cholesky",
+        )
+        assert isclose(maha, expected_maha, rel_tol=1e-9)
+
+        # Batched over partitions of the same array
+        pert_masks = np.zeros((3, pca_array.shape[0]), dtype=bool)
+        pert_masks[:, : sub_df.shape[0]] = True
+        pert_masks[1] = pert_masks[1][::-1]
+        pert_masks[2] = np.random.default_rng(0).permutation(pert_masks[2])
+        batch_maha = batch_mahalanobis(
+            pca_array, pert_masks=pert_masks, estimator=estimator
+        )
+        expected_batch_maha = [
+            calculate_mahalanobis(
+                pert_df=pca_array[x], control_df=pca_array[~x], estimator=estimator
+            )
+            for x in pert_masks
+        ]
+        assert np.allclose(batch_maha, expected_batch_maha, rtol=1e-9)
+
+    # With fewer controls than features, only shrunk covariances can be factorized
+    with pytest.raises(np.linalg.LinAlgError) as err:
+        calculate_mahalanobis(pert_df=sub_df, control_df=control_df, solver="cholesky")
+    assert "not positive definite" in str(err.value)
+
+    for estimator in ["ledoit_wolf", "oas"]:
+        maha = calculate_mahalanobis(
+            pert_df=sub_df,
+            control_df=control_df,
+            estimator=estimator,
+            solver="cholesky",
+        )
+        assert np.isfinite(maha)
+
+    with pytest.raises(AssertionError) as ae:
+        calculate_mahalanobis(pert_df=sub_df, control_df=control_df, solver="MISSING")
+    assert "MISSING not supported" in str(ae.value)
+
+
 def test_calculate_mp_value():
     # The mp-values are empirical p-values
     # so they range from 0 to 1, with low values
@@ -85,6 +144,177 @@ def test_calculate_mp_value():
     assert "Unknown parameters provided. Only" in str(ae.value)
 
 
+def test_calculate_pca():
+    sub_df = df[(df.Metadata_WellRow == "A") & (df.Metadata_pert_name == "EMPTY")][
+        features
+    ]
+    control_df = df[df[replicate_id].isin(control_perts)][features]
+    merge_df = pd.concat([sub_df, control_df])
+
+    expected_array, expected_ratio = calculate_pca(merge_df, solver="full")
+    assert expected_ratio.sum() >= 0.9
+    assert expected_ratio[:-1].sum() < 0.9
+
+    # Approximate solvers retain the same components (up to sign)
+    for solver, params in [
+        ("randomized", {"rank": 2}),
+        ("incremental", {"batch_size": merge_df.shape[0] - 1}),
+    ]:
+        pca_array, ratio = calculate_pca(merge_df, solver=solver, **params)
+        assert pca_array.shape == expected_array.shape
+        assert np.allclose(ratio, expected_ratio, atol=1e-3)
+        assert np.allclose(
+            np.abs(pca_array[:, 0]), np.abs(expected_array[:, 0]), atol=1e-3
+        )
+
+    with pytest.raises(AssertionError) as ae:
+        calculate_pca(merge_df, solver="MISSING")
+    assert "MISSING not supported" in str(ae.value)
+
+
+def test_calculate_mp_value_pca_solvers():
+    sub_df = df[(df.Metadata_WellRow == "A") & (df.Metadata_pert_name == "EMPTY")][
+        features
+    ]
+    control_df = df[df[replicate_id].isin(control_perts)][features]
+
+    np.random.seed(2020)
+    expected_result = calculate_mp_value(pert_df=sub_df, control_df=control_df)
+    for solver in ["randomized", "incremental"]:
+        np.random.seed(2020)
+        result = calculate_mp_value(
+            pert_df=sub_df, control_df=control_df, params={"pca_solver": solver}
+        )
+        assert isclose(result, expected_result, abs_tol=0.05)
+
+
+def test_calculate_mp_value_mahalanobis_solvers():
+    sub_df = df[(df.Metadata_WellRow == "A") & (df.Metadata_pert_name == "EMPTY")][
+        features
+    ]
+    control_df = df[df[replicate_id].isin(control_perts)][features]
+
+    for estimator in ["empirical", "ledoit_wolf", "oas"]:
+        np.random.seed(2020)
+        expected_result = calculate_mp_value(
+            pert_df=sub_df,
+            control_df=control_df,
+            params={"covariance_estimator": estimator},
+        )
+        np.random.seed(2020)
+        result = calculate_mp_value(
+            pert_df=sub_df,
+            control_df=control_df,
+            params={
+                "covariance_estimator": estimator,
+                "mahalanobis_solver": "cholesky",
+            },
+        )
+        assert isclose(result, expected_result, abs_tol=1e-09)
+
+
+def test_control_statistics():
+    sub_df = df[(df.Metadata_WellRow == "A") & (df.Metadata_pert_name == "EMPTY")][
+        features
+    ]
+    control_df = df[df[replicate_id].isin(control_perts)][features]
+
+    # Fewer controls than features (Gram matrix) and more (scatter matrix)
+    for controls in [control_df, pd.concat([control_df] * 100)]:
+        expected_array, expected_ratio = calculate_pca(pd.concat([sub_df, controls]))
+
+        control_statistics = ControlStatistics(controls)
+        pca_array, ratio = control_statistics.calculate_pca(sub_df)
+
+        assert np.allclose(ratio, expected_ratio)
+        assert np.allclose(np.abs(pca_array), np.abs(expected_array))
+
+    # Projecting perturbations onto the PCA of controls alone is not supported
+    with pytest.raises(AssertionError) as ae:
+        ControlStatistics(control_df, method="control_pca")
+    assert "control_pca not supported" in str(ae.value)
+
+
+def test_mp_value_control_statistics():
+    np.random.seed(2020)
+    expected_result = mp_value(
+        df=df,
+        control_perts=control_perts,
+        replicate_id=replicate_id,
+        features=features,
+        params={"nb_permutations": 20},
+    )
+
+    np.random.seed(2020)
+    result = mp_value(
+        df=df,
+        control_perts=control_perts,
+        replicate_id=replicate_id,
+        features=features,
+        params={"nb_permutations": 20, "control_statistics": "exact"},
+    )
+    pd.testing.assert_frame_equal(result, expected_result)
+
+    with pytest.raises(AssertionError) as ae:
+        mp_value(
+            df=df,
+            control_perts=control_perts,
+            replicate_id=replicate_id,
+            features=features,
+            params={"control_statistics": "exact", "pca_solver": "randomized"},
+        )
+    assert "control_statistics can only be combined" in str(ae.value)
+
+
+def test_mp_value_checkpoint():
+    perts = sorted(set(df[replicate_id]) - set(control_perts))[:3]
+    sub_df = df[df[replicate_id].isin(control_perts + perts)]
+    params = {"nb_permutations": 20}
+
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoint = os.path.join(checkpoint_dir, "mp_value.jsonl")
+
+        np.random.seed(2020)
+        expected_result = mp_value(
+            df=sub_df,
+            control_perts=control_perts,
+            replicate_id=replicate_id,
+            features=features,
+            params=params,
+            checkpoint=checkpoint,
+        )
+        assert expected_result.shape == (len(control_perts) + 3, 2)
+
+        # Resume a run interrupted after two perturbations
+        with open(checkpoint) as checkpoint_file:
+            lines = checkpoint_file.readlines()
+        with open(checkpoint, "w") as checkpoint_file:
+            checkpoint_file.writelines(lines[:3])
+
+        result = mp_value(
+            df=sub_df,
+            control_perts=control_perts,
+            replicate_id=replicate_id,
+            features=features,
+            params=params,
+            n_jobs=2,
+            checkpoint=checkpoint,
+        )
+        pd.testing.assert_frame_equal(result, expected_result)
+
+    # Results do not depend on the number of processes
+    np.random.seed(2020)
+    result = mp_value(
+        df=sub_df,
+        control_perts=control_perts,
+        replicate_id=replicate_id,
+        features=features,
+        params=params,
+        n_jobs=2,
+    )
+    pd.testing.assert_frame_equal(result, expected_result)
+
+
 def test_mp_value():
     result = mp_value(
         df=df,
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import pytest
+import pathlib
+import subprocess
+import numpy as np
+import pandas as pd
+
+import cytominer_eval.operations
+from cytominer_eval import evaluate
+from cytominer_eval.operations import (
+    replicate_reproducibility,
+    register_operation,
+    unregister_operation,
+)
+from cytominer_eval.operations.registry import (
+    OperationSpec,
+    get_operation,
+    get_operation_spec,
+    get_registered_operations,
+)
+from cytominer_eval.transform import metric_matrix
+from cytominer_eval.utils.cache_utils import EvaluationCache
+from cytominer_eval.utils.transform_utils import check_replicate_groups
+from cytominer_eval.utils.availability_utils import get_available_eval_metrics
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file).iloc[:60]
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample"]
+
+import_script = """
+import json, sys
+import cytominer_eval
+heavy = sorted(
+    m
+    for m in sys.modules
+    if m.split(".")[0] in ["sklearn", "scipy"]
+    or (
+        m.startswith("cytominer_eval.operations.")
+        and m != "cytominer_eval.operations.registry"
+    )
+)
+print(json.dumps({"heavy": heavy}))
+"""
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="operations are imported eagerly before 3.7"
+)
+def test_lazy_imports():
+    output = subprocess.run(
+        [sys.executable, "-c", import_script],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    result = json.loads(output)
+
+    # Heavy dependencies and operations are only imported on first use
+    assert result["heavy"] == []
+
+
+def test_registry():
+    assert get_registered_operations() == [
+        "replicate_reproducibility",
+        "precision_recall",
+        "grit",
+        "mp_value",
+        "enrichment",
+        "hitk",
+    ]
+    assert get_available_eval_metrics() == get_registered_operations()
+
+    assert get_operation_spec("replicate_reproducibility").similarity == "upper"
+    assert get_operation_spec("mp_value").similarity is None
+    assert get_operation_spec("hitk").similarity == "full"
+    assert get_operation("replicate_reproducibility") is replicate_reproducibility
+
+    # Package attributes are the operation functions, even after loading the
+    # operation imported its submodule
+    get_operation("enrichment")
+    assert callable(cytominer_eval.operations.enrichment)
+    assert "hitk" in dir(cytominer_eval.operations)
+
+    spec = OperationSpec("mean", target=sum, similarity=None)
+    assert spec.load() is sum
+
+    with pytest.raises(AssertionError) as ae:
+        get_operation("not_an_operation")
+    assert "not_an_operation not supported" in str(ae.value)
+
+
+def neighbor_agreement(
+    replicate_groups,
+    similarity_melted_df,
+    similarity_matrix,
+    knn_graph,
+    group_codes,
+    features,
+    weight=1,
+):
+    n_profiles = similarity_matrix.shape[0]
+    assert similarity_melted_df.shape[0] == n_profiles * (n_profiles - 1)
+    assert knn_graph.shape == (n_profiles, 3)
+    assert group_codes.shape == (n_profiles,)
+    assert features.shape == (n_profiles, len(features.columns))
+
+    return weight * np.mean(group_codes[knn_graph] == group_codes[:, np.newaxis])
+
+
+def test_register_operation():
+    register_operation(
+        "neighbor_agreement",
+        neighbor_agreement,
+        inputs=["similarity_matrix", "knn_graph", "group_codes", "features"],
+        n_neighbors=3,
+    )
+    try:
+        assert "neighbor_agreement" in get_available_eval_metrics()
+
+        cache = EvaluationCache()
+        result = evaluate(
+            profiles=df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            operation="neighbor_agreement",
+            operation_params={"weight": 2},
+            cache=cache,
+        )
+        assert 0 <= result <= 2
+
+        # Shared inputs are reused by other operations
+        misses = cache.misses
+        evaluate(
+            profiles=df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            operation="precision_recall",
+            groupby_columns=replicate_groups,
+            cache=cache,
+        )
+        assert cache.misses == misses + 1
+        metric_matrix(df, features, cache=cache)
+        assert cache.misses == misses + 1
+
+        with pytest.raises(AssertionError) as ae:
+            register_operation("neighbor_agreement", neighbor_agreement)
+        assert "already registered" in str(ae.value)
+        register_operation("neighbor_agreement", "os.path:join", overwrite=True)
+    finally:
+        unregister_operation("neighbor_agreement")
+
+    assert "neighbor_agreement" not in get_available_eval_metrics()
+
+    with pytest.raises(AssertionError) as ae:
+        register_operation("grit", neighbor_agreement)
+    assert "grit is a built-in operation" in str(ae.value)
+
+    with pytest.raises(AssertionError) as ae:
+        register_operation("bad", neighbor_agreement, inputs=["MISSING"])
+    assert "inputs not supported" in str(ae.value)
+
+
+def test_register_operation_replicate_groups():
+    register_operation(
+        "dict_groups",
+        sum,
+        similarity=None,
+        replicate_groups="dict",
+        replicate_group_keys=["profile_col"],
+    )
+    try:
+        check_replicate_groups("dict_groups", {"profile_col": "a"})
+        with pytest.raises(AssertionError) as ae:
+            check_replicate_groups("dict_groups", ["a"])
+        assert "For dict_groups, replicate_groups must be a dict" in str(ae.value)
+        with pytest.raises(AssertionError) as ae:
+            check_replicate_groups("dict_groups", {"replicate_group_col": "a"})
+        assert "replicate_groups for dict_groups not formed properly" in str(ae.value)
+    finally:
+        unregister_operation("dict_groups")
+
+
+def test_entry_points_fallback(monkeypatch):
+    import cytominer_eval.operations.registry as registry
+
+    # Without importlib.metadata or pkg_resources, plugins cannot be discovered
+    monkeypatch.setattr(registry, "entry_points", None)
+    monkeypatch.setattr(registry, "_entry_points_loaded", False)
+    monkeypatch.setitem(sys.modules, "pkg_resources", None)
+    with pytest.warns(UserWarning, match="entry point group cannot be discovered"):
+        registry._load_entry_points()
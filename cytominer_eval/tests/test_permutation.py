@@ -0,0 +1,149 @@
+import os
+import pytest
+import pathlib
+import tempfile
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate, permutation_test
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def test_permutation_test_replicate_reproducibility():
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="replicate_reproducibility",
+    )
+
+    result, null_df = permutation_test(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        n_permutations=250,
+        batch_size=100,
+        seed=123,
+    )
+
+    assert result.metric.tolist() == ["replicate_reproducibility"]
+    assert np.isclose(result.observed[0], expected_result)
+    assert null_df.shape == (250, 1)
+    # Replicates are far more similar than shuffled replicates
+    assert np.isclose(result.p_value[0], 1 / 251)
+    assert null_df.replicate_reproducibility.mean() < 0.1
+
+    # Permutations are deterministic given a seed, also across worker processes
+    _, parallel_null_df = permutation_test(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        n_permutations=250,
+        batch_size=100,
+        seed=123,
+        n_jobs=2,
+    )
+    assert_frame_equal(null_df, parallel_null_df)
+
+
+def test_permutation_test_enrichment():
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.99],
+    )
+
+    result, null_df = permutation_test(
+        profiles=df,
+        features=features,
+        replicate_groups=replicate_groups,
+        operation="enrichment",
+        enrichment_percentile=[0.9, 0.99],
+        n_permutations=50,
+        seed=123,
+    )
+
+    assert result.metric.tolist() == ["ods_ratio_at_0.9", "ods_ratio_at_0.99"]
+    assert np.allclose(result.observed, expected_result.ods_ratio)
+    assert null_df.shape == (50, 2)
+    assert (result.p_value < 0.05).all()
+
+    with pytest.raises(AssertionError) as ae:
+        permutation_test(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            operation="hitk",
+        )
+    assert "hitk not supported" in str(ae.value)
+
+
+def test_permutation_test_checkpoint():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoint = os.path.join(checkpoint_dir, "permutation.jsonl")
+
+        expected_result, expected_null_df = permutation_test(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_permutations=50,
+            batch_size=10,
+            seed=123,
+        )
+        result, null_df = permutation_test(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_permutations=50,
+            batch_size=10,
+            seed=123,
+            checkpoint=checkpoint,
+        )
+        assert_frame_equal(result, expected_result)
+        assert_frame_equal(null_df, expected_null_df)
+
+        # Resume a run interrupted after two batches
+        with open(checkpoint) as checkpoint_file:
+            lines = checkpoint_file.readlines()
+        with open(checkpoint, "w") as checkpoint_file:
+            checkpoint_file.writelines(lines[:3])
+
+        resumed_result, resumed_null_df = permutation_test(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_permutations=50,
+            batch_size=10,
+            seed=123,
+            n_jobs=2,
+            checkpoint=checkpoint,
+        )
+        assert_frame_equal(resumed_result, expected_result)
+        assert_frame_equal(resumed_null_df, expected_null_df)
+
+        with pytest.raises(AssertionError) as ae:
+            permutation_test(
+                profiles=df,
+                features=features,
+                replicate_groups=replicate_groups,
+                n_permutations=100,
+                checkpoint=checkpoint,
+            )
+        assert "was written by a different job" in str(ae.value)
@@ -0,0 +1,110 @@
+import os
+import pathlib
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate, stream_evaluate
+from cytominer_eval.utils.sketch_utils import SimilaritySketch
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+plates = {"first": df.iloc[:192], "second": df.iloc[192:]}
+
+
+def test_stream_evaluate_replicate_reproducibility():
+    sketch = SimilaritySketch()
+    results = list(
+        stream_evaluate(
+            plates=iter(plates.items()),
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            sketch=sketch,
+        )
+    )
+    assert [x[0] for x in results] == ["first", "second"]
+
+    for plate, plate_result, _ in results:
+        assert plate_result == evaluate(
+            profiles=plates[plate],
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+        )
+    assert results[0][2] == results[0][1]
+    assert sketch.n_plates == 2
+    assert sketch.n_profiles == df.shape[0]
+
+    # Campaign results continue from the sketch of earlier plates
+    resumed_sketch = SimilaritySketch()
+    list(
+        stream_evaluate(
+            plates=[plates["first"]],
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            sketch=resumed_sketch,
+        )
+    )
+    _, _, campaign_result = next(
+        stream_evaluate(
+            plates=[plates["second"]],
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            sketch=resumed_sketch,
+        )
+    )
+    assert campaign_result == results[1][2]
+
+
+def test_stream_evaluate_enrichment():
+    percentile = [0.9, 0.99]
+    results = list(
+        stream_evaluate(
+            plates=plates.values(),
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            operation="enrichment",
+            enrichment_percentile=percentile,
+        )
+    )
+    assert [x[0] for x in results] == [0, 1]
+
+    expected_df = evaluate(
+        profiles=plates["first"],
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        operation="enrichment",
+        enrichment_percentile=percentile,
+    )
+    assert_frame_equal(results[0][1], expected_df)
+    campaign_df = results[0][2]
+    assert np.allclose(campaign_df.threshold, expected_df.threshold, atol=2 / 4096)
+    assert np.allclose(campaign_df.ods_ratio, expected_df.ods_ratio, rtol=0.01)
+
+    # Other operations are evaluated per plate only
+    _, plate_result, campaign_result = next(
+        stream_evaluate(
+            plates=plates.values(),
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            operation="precision_recall",
+        )
+    )
+    assert isinstance(plate_result, pd.DataFrame)
+    assert campaign_result is None
@@ -4,8 +4,13 @@ import pytest
 import pathlib
 import numpy as np
 import pandas as pd
+from pandas.testing import assert_frame_equal
 
-from cytominer_eval.transform.transform import get_pairwise_metric, process_melt
+from cytominer_eval.transform.transform import (
+    get_pairwise_metric,
+    process_melt,
+    process_melt_tiled,
+)
 from cytominer_eval.transform import metric_melt
 
 random.seed(123)
@@ -111,3 +116,142 @@ def test_metric_melt():
 
         assert round(result_df.similarity_metric[0], 3) == round(example_sample_corr, 3)
         assert result_df.shape[0] == 147072
+
+
+def test_process_melt_tiled():
+    small_meta_df = meta_df.loc[:, ["Metadata_broad_sample", "Metadata_Well"]]
+    for eval_metric in ["replicate_reproducibility", "grit"]:
+        for similarity_metric in ["pearson", "spearman"]:
+            expected_df = process_melt(
+                df=get_pairwise_metric(feature_df, similarity_metric=similarity_metric),
+                meta_df=small_meta_df,
+                eval_metric=eval_metric,
+            )
+
+            result_df = process_melt_tiled(
+                df=feature_df,
+                meta_df=small_meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+            )
+            # The tiled pair_b index is an integer instead of an object column
+            assert result_df.pair_b_index.dtype == np.int64
+            assert_frame_equal(expected_df, result_df, check_dtype=False)
+
+            for block_size in [1, 7, df.shape[0]]:
+                block_df = process_melt_tiled(
+                    df=feature_df,
+                    meta_df=small_meta_df,
+                    eval_metric=eval_metric,
+                    similarity_metric=similarity_metric,
+                    block_size=block_size,
+                )
+                assert (block_df.pair_a_index == result_df.pair_a_index).all()
+                assert (block_df.pair_b_index == result_df.pair_b_index).all()
+                assert np.allclose(
+                    block_df.similarity_metric, result_df.similarity_metric
+                )
+
+    # Similarities of profiles without variance are undefined and dropped
+    constant_df = feature_df.copy()
+    constant_df.iloc[0, :] = 1
+    result_df = process_melt_tiled(df=constant_df, meta_df=small_meta_df)
+    assert result_df.shape[0] == 73536 - (df.shape[0] - 1)
+    assert 0 not in result_df.pair_a_index.tolist()
+
+    with pytest.raises(AssertionError) as ae:
+        process_melt_tiled(df=feature_df, meta_df=meta_df, similarity_metric="kendall")
+    assert "kendall not supported by the tiled strategy" in str(ae.value)
+
+
+def test_metric_melt_tiled():
+    small_meta_features = ["Metadata_broad_sample", "Metadata_Well"]
+    expected_df = metric_melt(df, features, small_meta_features, eval_metric="hitk")
+    result_df = metric_melt(
+        df,
+        features,
+        small_meta_features,
+        eval_metric="hitk",
+        similarity_strategy="tiled",
+        block_size=50,
+    )
+    assert_frame_equal(expected_df, result_df, check_dtype=False)
+
+    result_df = metric_melt(
+        df,
+        features,
+        small_meta_features,
+        eval_metric="hitk",
+        similarity_strategy="packed",
+        block_size=50,
+    )
+    assert_frame_equal(expected_df, result_df, check_dtype=False)
+
+    expected_df = metric_melt(df, features, small_meta_features)
+    result_df = metric_melt(
+        df, features, small_meta_features, similarity_strategy="packed"
+    )
+    assert_frame_equal(expected_df, result_df, check_dtype=False)
+
+    # Profiles with a missing feature value keep all their pairs
+    missing_df = df.copy()
+    missing_df.loc[3, features[5]] = np.nan
+    expected_df = metric_melt(missing_df, features, small_meta_features)
+    result_df = metric_melt(
+        missing_df, features, small_meta_features, similarity_strategy="packed"
+    )
+    assert result_df.shape[0] == df.shape[0] * (df.shape[0] - 1) // 2
+    assert_frame_equal(expected_df, result_df, check_dtype=False)
+
+    with pytest.raises(AssertionError) as ae:
+        metric_melt(
+            missing_df, features, small_meta_features, similarity_strategy="tiled"
+        )
+    assert "Missing feature values not supported" in str(ae.value)
+
+    with pytest.raises(AssertionError) as ae:
+        metric_melt(df, features, meta_features, similarity_strategy="sparse")
+    assert "sparse not supported. Available similarity strategies" in str(ae.value)
+
+
+def test_metric_melt_arrow():
+    pa = pytest.importorskip("pyarrow")
+
+    small_meta_features = ["Metadata_broad_sample", "Metadata_Well"]
+    expected_df = metric_melt(
+        df, features, small_meta_features, eval_metric="precision_recall"
+    )
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    for similarity_strategy in ["dense", "tiled"]:
+        result_df = metric_melt(
+            table,
+            features,
+            small_meta_features,
+            eval_metric="precision_recall",
+            similarity_strategy=similarity_strategy,
+        )
+        assert_frame_equal(result_df, expected_df, check_dtype=False)
+
+        result_table = metric_melt(
+            df,
+            features,
+            small_meta_features,
+            eval_metric="precision_recall",
+            similarity_strategy=similarity_strategy,
+            output_format="arrow",
+        )
+        assert pa.types.is_dictionary(
+            result_table.schema.field("Metadata_Well_pair_a").type
+        )
+        assert_frame_equal(
+            result_table.to_pandas().astype(
+                {x: str for x in result_table.column_names[:4]}
+            ),
+            expected_df,
+            check_dtype=False,
+        )
+
+    with pytest.raises(AssertionError) as ae:
+        metric_melt(df, features, small_meta_features, output_format="csv")
+    assert "csv not supported. Available output formats" in str(ae.value)
@@ -0,0 +1,107 @@
+import os
+import pytest
+import pathlib
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval.transform import metric_melt, write_melt_parquet
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+pq = pytest.importorskip("pyarrow.parquet")
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+
+
+def test_write_melt_parquet(tmp_path):
+    small_meta_features = ["Metadata_broad_sample", "Metadata_broad_sample_type"]
+    for eval_metric in ["replicate_reproducibility", "precision_recall"]:
+        expected_df = metric_melt(
+            df, features, small_meta_features, eval_metric=eval_metric
+        ).reset_index(drop=True)
+
+        path = tmp_path / eval_metric
+        paths = write_melt_parquet(
+            df,
+            str(path),
+            features,
+            small_meta_features,
+            eval_metric=eval_metric,
+            block_size=100,
+        )
+        assert paths == [str(path / "part-0.parquet")]
+        parquet_file = pq.ParquetFile(paths[0])
+        assert parquet_file.num_row_groups == 4
+        assert pa.types.is_dictionary(
+            parquet_file.schema_arrow.field("Metadata_broad_sample_pair_a").type
+        )
+        result_df = parquet_file.read().to_pandas()
+        assert_frame_equal(
+            result_df.astype({x: str for x in result_df.columns[:4]}),
+            expected_df,
+            check_dtype=False,
+        )
+
+    # Pairs are partitioned by the metadata of their pair_a profile
+    expected_df = metric_melt(df, features, small_meta_features)
+    path = tmp_path / "partitioned"
+    paths = write_melt_parquet(
+        df,
+        str(path),
+        features,
+        small_meta_features,
+        block_size=100,
+        metadata_storage="dimension",
+        partition_col="Metadata_broad_sample_type",
+        similarity_dtype="float32",
+    )
+    assert sorted(paths) == sorted(
+        [
+            str(path / "Metadata_broad_sample_type={x}".format(x=x) / "part-0.parquet")
+            for x in df.Metadata_broad_sample_type.unique()
+        ]
+    )
+    assert "Metadata_broad_sample_pair_a" not in pq.read_schema(paths[0]).names
+
+    dataset = ds.dataset(str(path), format="parquet", partitioning="hive")
+    result_df = dataset.to_table().to_pandas()
+    assert result_df.similarity_metric.dtype == np.float32
+    assert len(result_df) == len(expected_df)
+    profiles_df = pq.read_table(str(path / "_profiles.parquet")).to_pandas()
+    result_df = result_df.merge(
+        profiles_df.add_suffix("_pair_a"),
+        left_on="pair_a_index",
+        right_on="profile_index_pair_a",
+    ).sort_values(["pair_a_index", "pair_b_index"])
+    assert (
+        result_df.Metadata_broad_sample_type.astype(str)
+        == result_df.Metadata_broad_sample_type_pair_a.astype(str)
+    ).all()
+    assert np.allclose(
+        result_df.similarity_metric,
+        expected_df.sort_values(["pair_a_index", "pair_b_index"]).similarity_metric,
+        atol=1e-6,
+    )
+
+    with pytest.raises(AssertionError) as ae:
+        write_melt_parquet(
+            df, str(path), features, small_meta_features, metadata_storage="wide"
+        )
+    assert "wide not supported. Available metadata storages" in str(ae.value)
+
+    with pytest.raises(AssertionError) as ae:
+        write_melt_parquet(
+            df, str(path), features, small_meta_features, partition_col="Metadata_Well"
+        )
+    assert "Partition column not found" in str(ae.value)
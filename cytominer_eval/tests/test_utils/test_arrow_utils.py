@@ -0,0 +1,134 @@
+import pytest
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate
+from cytominer_eval.utils.arrow_utils import (
+    arrow_to_profiles,
+    dictionary_take,
+    get_feature_array,
+    is_arrow_backed,
+    is_arrow_table,
+    to_arrow,
+)
+
+pa = pytest.importorskip("pyarrow")
+
+random_state = np.random.RandomState(123)
+
+features = ["feature_{x}".format(x=x) for x in range(5)]
+meta_features = ["Metadata_pert", "Metadata_group"]
+
+df = pd.DataFrame(random_state.normal(size=(24, 5)), columns=features)
+df = df.assign(
+    Metadata_pert=["ctrl_{x}".format(x=x % 4) for x in range(8)]
+    + ["pert_{x}".format(x=x % 8) for x in range(16)],
+    Metadata_group=["ctrl"] * 8 + ["a", "b"] * 8,
+)
+table = pa.Table.from_pandas(df, preserve_index=False)
+
+
+def test_is_arrow_table():
+    assert is_arrow_table(table)
+    assert not is_arrow_table(df)
+
+    arrow_df = df.astype({x: pd.ArrowDtype(pa.float64()) for x in features})
+    assert is_arrow_backed(arrow_df, features)
+    assert not is_arrow_backed(df, features)
+
+
+def test_get_feature_array():
+    expected_result = df.loc[:, features].values
+    assert np.array_equal(get_feature_array(table, features), expected_result)
+
+    # Columns of several chunks, integers and missing values
+    chunked_table = pa.table(
+        {
+            "a": pa.chunked_array([[1.5, None], [2.5]]),
+            "b": pa.chunked_array([[1], [2, 3]]),
+        }
+    )
+    expected_result = np.array([[1.5, 1], [np.nan, 2], [2.5, 3]])
+    result = get_feature_array(chunked_table, ["a", "b"])
+    assert np.array_equal(result, expected_result, equal_nan=True)
+
+    # Rows of a preallocated array
+    out = np.zeros((5, 2))
+    get_feature_array(chunked_table, ["a", "b"], out=out[1:4])
+    assert np.array_equal(out[1:4], expected_result, equal_nan=True)
+    assert (out[[0, 4]] == 0).all()
+
+    arrow_df = chunked_table.to_pandas(types_mapper=pd.ArrowDtype)
+    result = get_feature_array(arrow_df, ["a", "b"])
+    assert np.array_equal(result, expected_result, equal_nan=True)
+
+    with pytest.raises(AssertionError) as ae:
+        get_feature_array(table, ["Metadata_pert"])
+    assert "Columns cannot be converted" in str(ae.value)
+
+
+def test_arrow_to_profiles():
+    result = arrow_to_profiles(table, features=features, meta_features=meta_features)
+    assert_frame_equal(result, df.loc[:, meta_features + features])
+
+    with pytest.raises(AssertionError) as ae:
+        arrow_to_profiles(table, features=features, meta_features=["MISSING"])
+    assert "Metadata feature not found" in str(ae.value)
+
+
+def test_dictionary_take():
+    result = dictionary_take(df.Metadata_group, np.array([0, 8, 9, 9]))
+    assert result.to_pylist() == ["ctrl", "a", "b", "b"]
+    assert result.dictionary.to_pylist() == ["ctrl", "a", "b"]
+
+
+def test_to_arrow():
+    result = to_arrow(df)
+    assert pa.types.is_dictionary(result.schema.field("Metadata_group").type)
+    assert pa.types.is_floating(result.schema.field("feature_0").type)
+    assert_frame_equal(result.to_pandas().astype({x: str for x in meta_features}), df)
+
+
+def test_evaluate_arrow():
+    grit_params = {
+        "replicate_groups": {
+            "profile_col": "Metadata_pert",
+            "replicate_group_col": "Metadata_group",
+        },
+        "operation": "grit",
+        "grit_control_perts": ["ctrl_{x}".format(x=x) for x in range(4)],
+    }
+    expected_result = evaluate(
+        profiles=df, features=features, meta_features=meta_features, **grit_params
+    )
+    result = evaluate(
+        profiles=table, features=features, meta_features=meta_features, **grit_params
+    )
+    assert_frame_equal(result, expected_result)
+
+    result = evaluate(
+        profiles=table,
+        features=features,
+        meta_features=meta_features,
+        output_format="arrow",
+        **grit_params
+    )
+    assert is_arrow_table(result)
+    assert pa.types.is_dictionary(result.schema.field("perturbation").type)
+    assert_frame_equal(
+        result.to_pandas().astype({"perturbation": str, "group": str}),
+        expected_result,
+    )
+
+    # Results that are not dataframes are returned as is
+    replicate_params = {"replicate_groups": ["Metadata_pert"]}
+    assert evaluate(
+        profiles=table,
+        features=features,
+        meta_features=meta_features,
+        output_format="arrow",
+        **replicate_params
+    ) == evaluate(
+        profiles=df, features=features, meta_features=meta_features, **replicate_params
+    )
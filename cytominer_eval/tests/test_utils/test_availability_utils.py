@@ -6,6 +6,9 @@ from cytominer_eval.utils.availability_utils import (
     get_available_similarity_metrics,
     get_available_summary_methods,
     get_available_distribution_compare_methods,
+    get_available_execution_backends,
+    get_available_kernel_backends,
+    get_available_output_formats,
     check_eval_metric,
     check_replicate_summary_method,
     check_similarity_metric,
@@ -35,6 +38,21 @@ def test_get_available_similarity_metrics():
     assert expected_result == get_available_similarity_metrics()
 
 
+def test_get_available_execution_backends():
+    expected_result = ["serial", "threads", "processes"]
+    assert expected_result == get_available_execution_backends()
+
+
+def test_get_available_kernel_backends():
+    expected_result = ["numba", "numpy"]
+    assert expected_result == get_available_kernel_backends()
+
+
+def test_get_available_output_formats():
+    expected_result = ["pandas", "arrow", "polars"]
+    assert expected_result == get_available_output_formats()
+
+
 def test_get_available_distribution_compare_methods():
     expected_result = ["zscore"]
     assert expected_result == get_available_distribution_compare_methods()
@@ -0,0 +1,236 @@
+import os
+import pytest
+import pathlib
+import tempfile
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.cache_utils import (
+    EvaluationCache,
+    hash_pandas,
+    hash_parameters,
+)
+from cytominer_eval.utils.quantize_utils import (
+    get_melt_similarity_dtype,
+    get_similarity_error,
+)
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def test_hash_pandas():
+    assert hash_pandas(df) == hash_pandas(df.copy())
+
+    # The index does not change the content
+    shuffled_index_df = df.copy()
+    shuffled_index_df.index = np.arange(df.shape[0])[::-1]
+    assert hash_pandas(df) == hash_pandas(shuffled_index_df)
+
+    changed_df = df.copy()
+    changed_df.loc[0, features[0]] = changed_df.loc[0, features[0]] + 1
+    assert hash_pandas(df) != hash_pandas(changed_df)
+
+    renamed_df = df.rename({features[0]: "renamed"}, axis="columns")
+    assert hash_pandas(df) != hash_pandas(renamed_df)
+
+
+def test_hash_parameters():
+    assert hash_parameters(a=1, b=[1, 2]) == hash_parameters(b=[1, 2], a=1)
+    assert hash_parameters(a=1, b=[1, 2]) != hash_parameters(a=1, b=[2, 1])
+
+
+def test_evaluation_cache_memory():
+    cache = EvaluationCache(max_entries=2)
+
+    assert cache.get("stage", "a") == (False, None)
+    cache.put("stage", "a", {"value": 1})
+    cache.put("stage", "b", {"value": 2})
+
+    found, value = cache.get("stage", "a")
+    assert found
+    assert value == {"value": 1}
+
+    # Entries are copies, modifying them does not alter the cache
+    value["value"] = 100
+    assert cache.get("stage", "a")[1] == {"value": 1}
+
+    # "b" is the least recently used and is evicted
+    cache.put("stage", "c", {"value": 3})
+    assert not cache.get("stage", "b")[0]
+    assert cache.get("stage", "a")[0]
+    assert cache.get("stage", "c")[0]
+
+    assert cache.hits == 4
+    assert cache.misses == 2
+
+    # Without copies, stored and retrieved entries are the same object
+    shared_cache = EvaluationCache(copy_entries=False)
+    value = {"value": 1}
+    shared_cache.put("stage", "a", value)
+    assert shared_cache.get("stage", "a")[1] is value
+
+    with pytest.raises(AssertionError) as ae:
+        EvaluationCache(max_entries=0)
+    assert "max_entries must be positive" in str(ae.value)
+
+
+def test_evaluation_cache_disk():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EvaluationCache(max_entries=1, cache_dir=cache_dir)
+        cache.put("stage", "a", np.zeros(10))
+        cache.put("stage", "b", np.ones(10))
+
+        # "a" is no longer in memory, but is recovered from disk
+        found, value = cache.get("stage", "a")
+        assert found
+        assert (value == 0).all()
+
+        # A new cache reuses the disk tier
+        new_cache = EvaluationCache(cache_dir=cache_dir)
+        assert new_cache.get("stage", "b")[0]
+
+        new_cache.clear()
+        assert len(os.listdir(cache_dir)) == 0
+
+        # Disk tier is bounded by size
+        small_cache = EvaluationCache(cache_dir=cache_dir, max_disk_bytes=1000)
+        small_cache.put("stage", "a", np.zeros(100))
+        small_cache.put("stage", "b", np.zeros(100))
+        assert len(os.listdir(cache_dir)) == 1
+
+
+def test_metric_melt_cache():
+    cache = EvaluationCache()
+
+    expected_df = metric_melt(df, features, meta_features)
+    result_df = metric_melt(df, features, meta_features, cache=cache)
+    assert_frame_equal(expected_df, result_df)
+    assert cache.misses == 2
+
+    # Changing the eval_metric only recomputes the melt stage
+    metric_melt(df, features, meta_features, eval_metric="grit", cache=cache)
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+    result_df = metric_melt(df, features, meta_features, cache=cache)
+    assert_frame_equal(expected_df, result_df)
+    assert cache.hits == 2
+
+
+def test_quantized_cache():
+    small_meta_features = ["Metadata_broad_sample", "Metadata_Well"]
+    expected_df = metric_melt(df, features, small_meta_features, eval_metric="grit")
+
+    for similarity_dtype in ["float16", "int8"]:
+        cache = EvaluationCache(similarity_dtype=similarity_dtype)
+        for similarity_strategy in ["dense", "packed"]:
+            results = [
+                metric_melt(
+                    df,
+                    features,
+                    small_meta_features,
+                    eval_metric="grit",
+                    similarity_strategy=similarity_strategy,
+                    cache=cache,
+                )
+                for _ in range(2)
+            ]
+            # Results do not depend on whether similarities were cached before
+            assert_frame_equal(results[0], results[1])
+            assert_frame_equal(
+                expected_df.drop("similarity_metric", axis="columns"),
+                results[0].drop("similarity_metric", axis="columns"),
+            )
+            error = np.abs(
+                results[0].similarity_metric.values
+                - expected_df.similarity_metric.values
+            ).max()
+            assert error <= get_similarity_error(similarity_dtype)
+
+        cached_melt_df = next(
+            value for (stage, _), value in cache._memory.items() if stage == "melt"
+        )
+        assert cached_melt_df.similarity_metric.dtype == get_melt_similarity_dtype(
+            similarity_dtype
+        )
+
+    result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        replicate_reproducibility_return_median_cor=True,
+        cache=EvaluationCache(similarity_dtype="int16"),
+    )
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        replicate_reproducibility_return_median_cor=True,
+    )
+    assert np.allclose(
+        result[1].similarity_metric,
+        expected_result[1].similarity_metric,
+        atol=get_similarity_error("int16"),
+    )
+
+    float16_df = metric_melt(
+        df, features, small_meta_features, similarity_dtype="float16"
+    )
+    assert float16_df.similarity_metric.dtype == np.float16
+
+    with pytest.raises(AssertionError) as ae:
+        EvaluationCache(similarity_dtype="int4")
+    assert "int4 not supported. Available similarity dtypes" in str(ae.value)
+
+
+def test_evaluate_cache():
+    cache = EvaluationCache()
+
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+    )
+
+    for _ in range(2):
+        result = evaluate(
+            profiles=df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            cache=cache,
+        )
+        assert result == expected_result
+
+    # result, melt and similarity stages missed once, then the result was found
+    assert cache.misses == 3
+    assert cache.hits == 1
+
+    # A different parameter reuses the melted dataframe
+    evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        replicate_reproducibility_quantile=0.5,
+        cache=cache,
+    )
+    assert cache.misses == 4
+    assert cache.hits == 2
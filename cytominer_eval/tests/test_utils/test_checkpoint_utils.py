@@ -0,0 +1,53 @@
+import os
+import pytest
+import tempfile
+
+from cytominer_eval.utils.checkpoint_utils import Checkpoint
+from cytominer_eval.utils.parallel_utils import run_tasks
+
+
+def _square(x):
+    return x * x
+
+
+def test_checkpoint():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        path = os.path.join(checkpoint_dir, "checkpoint.jsonl")
+        job = {"operation": "test", "n": 3}
+
+        checkpoint = Checkpoint(path, job=job, state={"seed": 1})
+        checkpoint.save("a", 1.5)
+        checkpoint.save(("b", 2), [1, 2])
+        assert len(checkpoint) == 2
+        assert "a" in checkpoint
+        assert "c" not in checkpoint
+
+        # Interrupted while writing the next task
+        with open(path, "a") as checkpoint_file:
+            checkpoint_file.write('{"key": "\\"c\\"", "val')
+
+        resumed = Checkpoint(path, job=job, state={"seed": 2})
+        assert resumed.state == {"seed": 1}
+        assert len(resumed) == 2
+        assert resumed["a"] == 1.5
+        assert resumed[("b", 2)] == [1, 2]
+
+        resumed.save("c", None)
+        assert len(Checkpoint(path, job=job)) == 3
+
+        with pytest.raises(AssertionError) as ae:
+            Checkpoint(path, job={"operation": "test", "n": 4})
+        assert "was written by a different job" in str(ae.value)
+
+
+def test_run_tasks_callback():
+    for n_jobs in [1, 2]:
+        completed = {}
+        result = run_tasks(
+            _square,
+            [1, 2, 3],
+            n_jobs=n_jobs,
+            callback=lambda i, x: completed.update({i: x}),
+        )
+        assert result == [1, 4, 9]
+        assert completed == {0: 1, 1: 4, 2: 9}
@@ -2,9 +2,14 @@ import random
 import tempfile
 import numpy as np
 import pandas as pd
+from pandas.testing import assert_frame_equal
 
-from cytominer_eval.utils.grit_utils import set_grit_column_info
-
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.grit_utils import (
+    set_grit_column_info,
+    calculate_grit,
+    calculate_grit_groups,
+)
 
 random.seed(123)
 tmpdir = tempfile.gettempdir()
@@ -34,3 +39,47 @@ def test_set_grit_column_info():
     assert result["group"]["comparison"] == "{group}_pair_b".format(
         group=replicate_group_col
     )
+
+
+def test_calculate_grit_groups():
+    profiles = pd.DataFrame(
+        np.random.RandomState(0).normal(size=(12, 5)).round(1),
+        columns=["feat_{x}".format(x=x) for x in range(5)],
+    )
+    profiles = profiles.assign(
+        pert=["ctrl_{x}".format(x=x) for x in range(4)]
+        + ["pert_{x}".format(x=x) for x in range(8)],
+        group=["ctrl"] * 4 + ["a"] * 3 + ["b"] * 4 + ["c"],
+    )
+    similarity_melted_df = metric_melt(
+        df=profiles,
+        features=profiles.columns[:5].tolist(),
+        metadata_features=["pert", "group"],
+        eval_metric="grit",
+    )
+    column_id_info = set_grit_column_info(
+        profile_col="pert", replicate_group_col="group"
+    )
+    control_perts = ["ctrl_{x}".format(x=x) for x in range(4)]
+
+    for replicate_summary_method in ["mean", "median"]:
+        expected_result = (
+            similarity_melted_df.groupby(column_id_info["profile"]["id"])
+            .apply(
+                lambda x: calculate_grit(
+                    x,
+                    control_perts=control_perts,
+                    column_id_info=column_id_info,
+                    replicate_summary_method=replicate_summary_method,
+                )
+            )
+            .reset_index(drop=True)
+        )
+        result = calculate_grit_groups(
+            similarity_melted_df,
+            control_perts=control_perts,
+            column_id_info=column_id_info,
+            replicate_summary_method=replicate_summary_method,
+        )
+        assert_frame_equal(result, expected_result, check_dtype=False)
+        assert np.isnan(result.set_index("perturbation").loc["pert_7", "grit"])
@@ -0,0 +1,361 @@
+import os
+import pytest
+import pathlib
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate
+from cytominer_eval.bootstrap import bootstrap_evaluate
+from cytominer_eval.operations import mp_value
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.io_utils import (
+    ProfileArrays,
+    is_chunked_array,
+    is_profile_path,
+    read_profile_arrays,
+    read_sqlite_plates,
+    read_sqlite_profile_arrays,
+)
+
+random_state = np.random.RandomState(123)
+
+
+class ChunkedArray:
+    # Reads rows by slicing, like a zarr.Array or h5py.Dataset
+    def __init__(self, array, chunk_rows):
+        self.array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.chunks = (chunk_rows, array.shape[1])
+        self.reads = []
+
+    def __getitem__(self, key):
+        self.reads.append((key.start, key.stop))
+        return self.array[key].copy()
+
+
+features = ["feature_{x}".format(x=x) for x in range(5)]
+meta_features = ["Metadata_pert", "Metadata_dose"]
+
+df = pd.DataFrame(random_state.normal(size=(24, 5)), columns=features)
+df = df.assign(
+    Metadata_pert=["ctrl_{x}".format(x=x % 4) for x in range(8)]
+    + ["pert_{x}".format(x=x % 8) for x in range(16)],
+    Metadata_dose=[np.nan] * 8 + [1, 10] * 8,
+)
+
+
+@pytest.fixture(params=["profiles.csv.gz", "profiles.parquet"])
+def profile_path(request):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, request.param)
+        if path.endswith(".parquet"):
+            pytest.importorskip("pyarrow")
+            df.to_parquet(path, index=False, row_group_size=10)
+        else:
+            df.to_csv(path, index=False)
+        yield path
+
+
+def test_is_profile_path(monkeypatch):
+    assert is_profile_path("profiles.csv")
+    assert is_profile_path(pathlib.Path("profiles.csv"))
+    assert not is_profile_path(df)
+
+    # os.PathLike does not exist before Python 3.6
+    monkeypatch.delattr(os, "PathLike")
+    assert is_profile_path("profiles.csv")
+    assert is_profile_path(pathlib.Path("profiles.csv"))
+    assert not is_profile_path(df)
+
+
+def test_read_profile_arrays(profile_path):
+    assert is_profile_path(profile_path)
+    assert not is_profile_path(df)
+
+    # Batches smaller than row groups, and spanning several row groups
+    for batch_size in [7, 15]:
+        result = read_profile_arrays(
+            profile_path,
+            features=features,
+            meta_features=meta_features,
+            batch_size=batch_size,
+        )
+        assert isinstance(result, ProfileArrays)
+        assert result.shape == (24, 7)
+
+        feature_array = result.feature_df.values
+        assert feature_array.flags.f_contiguous
+        assert np.allclose(feature_array, df.loc[:, features].values)
+
+        # Metadata are factorized across batches
+        assert result.meta_df.Metadata_pert.cat.categories.tolist() == (
+            df.Metadata_pert.unique().tolist()
+        )
+        assert_frame_equal(
+            result.to_profiles(),
+            df.loc[:, meta_features + features].astype({"Metadata_pert": object}),
+            check_dtype=False,
+        )
+
+    meta_df, feature_df = result.split(
+        features=features[:2], meta_features=["Metadata_pert"]
+    )
+    assert meta_df.columns.tolist() == ["Metadata_pert"]
+    assert feature_df.columns.tolist() == features[:2]
+
+    with pytest.raises(AssertionError) as ae:
+        read_profile_arrays(profile_path, features=features, meta_features=["MISSING"])
+    assert "Metadata feature not found" in str(ae.value)
+
+    with pytest.raises(AssertionError) as ae:
+        read_profile_arrays(
+            profile_path, features=["Metadata_pert"], meta_features=meta_features
+        )
+    assert "Columns cannot be converted" in str(ae.value)
+
+
+def test_evaluate_profile_path(profile_path):
+    expected_result = metric_melt(
+        df,
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+    )
+    result = metric_melt(
+        profile_path,
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+        similarity_strategy="tiled",
+    )
+    assert_frame_equal(result, expected_result, check_dtype=False)
+
+    grit_params = {
+        "replicate_groups": {
+            "profile_col": "Metadata_pert",
+            "replicate_group_col": "Metadata_dose",
+        },
+        "operation": "grit",
+        "grit_control_perts": ["ctrl_{x}".format(x=x) for x in range(4)],
+    }
+    expected_result = evaluate(
+        profiles=df, features=features, meta_features=meta_features, **grit_params
+    )
+    result = evaluate(
+        profiles=profile_path,
+        features=features,
+        meta_features=meta_features,
+        **grit_params
+    )
+    assert_frame_equal(result, expected_result)
+
+
+def test_read_sqlite_profile_arrays():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = [os.path.join(tmpdir, "plate_{x}.sqlite".format(x=x)) for x in "ab"]
+        cells_df = pd.concat([df, df.assign(**{x: df[x] + 1 for x in features})])
+        for path in paths:
+            with sqlite3.connect(path) as connection:
+                df.to_sql("profiles", connection, index=False)
+                cells_df.to_sql("cells", connection, index=False)
+
+        result = read_sqlite_profile_arrays(
+            paths[0],
+            features=features,
+            meta_features=meta_features,
+            table="profiles",
+            batch_size=5,
+        )
+        assert np.array_equal(result.feature_df.values, df.loc[:, features].values)
+        assert_frame_equal(
+            result.to_profiles(),
+            df.loc[:, meta_features + features].astype({"Metadata_pert": object}),
+            check_dtype=False,
+        )
+
+        # Features averaged per profile, which are listed in order of their metadata
+        results = read_sqlite_plates(
+            paths,
+            features=features,
+            meta_features=["Metadata_pert"],
+            table="cells",
+            aggregate=True,
+            n_jobs=2,
+        )
+        expected_result = df.groupby("Metadata_pert").agg({x: "mean" for x in features})
+        for result in results:
+            result_df = result.to_profiles().set_index("Metadata_pert")
+            assert_frame_equal(
+                result_df, expected_result + 0.5, check_names=False, atol=1e-12
+            )
+
+        # A custom query, e.g. joining metadata from another table
+        result = read_sqlite_profile_arrays(
+            paths[1],
+            features=features[:2],
+            meta_features=["Metadata_pert"],
+            query='SELECT "Metadata_pert", "feature_0", "feature_1" FROM profiles',
+        )
+        assert result.shape == (24, 3)
+
+        with pytest.raises(AssertionError) as ae:
+            read_sqlite_profile_arrays(
+                paths[1],
+                features=features,
+                meta_features=["Metadata_pert"],
+                query='SELECT "Metadata_pert", "feature_0" FROM profiles',
+            )
+        assert "Profile feature not found" in str(ae.value)
+
+
+def test_profile_arrays_split_inputs():
+    # A C-contiguous feature array and a metadata table held separately
+    feature_array = np.ascontiguousarray(df.loc[:, features].values)
+    meta_df = df.loc[:, meta_features].set_index(np.arange(24) + 100)
+    profiles = ProfileArrays(meta_df, feature_array, features=features)
+
+    split_meta_df, feature_df = profiles.split(
+        features=features, meta_features=meta_features
+    )
+    assert np.shares_memory(feature_df.values, feature_array)
+    assert split_meta_df.index.equals(pd.RangeIndex(24))
+    assert ProfileArrays(meta_df, feature_array).features[:2] == ["0", "1"]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        memmap = np.memmap(
+            os.path.join(tmpdir, "features.dat"),
+            dtype=np.float64,
+            mode="w+",
+            shape=feature_array.shape,
+        )
+        memmap[:] = feature_array
+        _, feature_df = ProfileArrays(meta_df, memmap, features=features).split(
+            features=features, meta_features=[]
+        )
+        assert np.shares_memory(feature_df.values, memmap)
+        del memmap, feature_df
+
+    expected_result = metric_melt(
+        df,
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+    )
+    result = metric_melt(
+        profiles,
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+    )
+    assert_frame_equal(result, expected_result, check_dtype=False)
+
+    pr_params = {
+        "replicate_groups": ["Metadata_pert"],
+        "operation": "precision_recall",
+        "groupby_columns": ["Metadata_pert"],
+    }
+    assert_frame_equal(
+        evaluate(profiles, features=features, meta_features=meta_features, **pr_params),
+        evaluate(df, features=features, meta_features=meta_features, **pr_params),
+    )
+
+    bootstrap_params = {
+        "features": features,
+        "replicate_groups": ["Metadata_pert"],
+        "n_bootstrap": 10,
+        "seed": 123,
+    }
+    assert_frame_equal(
+        bootstrap_evaluate(profiles, **bootstrap_params),
+        bootstrap_evaluate(df, **bootstrap_params),
+    )
+
+    mp_params = {
+        "control_perts": ["ctrl_0", "ctrl_1"],
+        "replicate_id": "Metadata_pert",
+        "features": features,
+        "params": {"nb_permutations": 10},
+    }
+    np.random.seed(123)
+    expected_result = mp_value(df, **mp_params)
+    np.random.seed(123)
+    assert_frame_equal(mp_value(profiles, **mp_params), expected_result)
+
+
+@pytest.mark.parametrize("eval_metric", ["replicate_reproducibility", "grit"])
+@pytest.mark.parametrize("similarity_metric", ["pearson", "spearman"])
+def test_profile_arrays_out_of_core(eval_metric, similarity_metric):
+    feature_array = df.loc[:, features].values
+    meta_df = df.loc[:, meta_features]
+    melt_params = {
+        "features": features,
+        "metadata_features": meta_features,
+        "eval_metric": eval_metric,
+        "similarity_metric": similarity_metric,
+    }
+    expected_result = metric_melt(df, **melt_params)
+
+    chunked = ChunkedArray(feature_array, chunk_rows=4)
+    assert is_chunked_array(chunked)
+    assert not is_chunked_array(feature_array)
+    profiles = ProfileArrays(meta_df, chunked, features=features)
+    for prefetch in [True, False]:
+        chunked.reads = []
+        result = metric_melt(
+            profiles, similarity_strategy="tiled", block_size=8, **melt_params
+        )
+        assert_frame_equal(result, expected_result, check_dtype=False)
+        # Each block of 8 rows is read once per sweep of the blocks it is compared to
+        if eval_metric == "grit":
+            assert len(chunked.reads) == 3 * 3
+        else:
+            assert chunked.reads[:3] == [(0, 8), (8, 16), (16, 24)]
+            assert len(chunked.reads) == 3 + 2 + 1
+    assert profiles._feature_df is None
+
+    # Other strategies read the features into memory
+    result = metric_melt(profiles, **melt_params)
+    assert_frame_equal(result, expected_result, check_dtype=False)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        memmap = np.memmap(
+            os.path.join(tmpdir, "features.dat"),
+            dtype=np.float32,
+            mode="w+",
+            shape=feature_array.shape,
+        )
+        memmap[:] = feature_array
+        expected_result = metric_melt(
+            ProfileArrays(meta_df, np.asarray(memmap, dtype=np.float64)),
+            **dict(melt_params, features=["0", "1", "2", "3", "4"])
+        )
+        profiles = ProfileArrays(meta_df, memmap)
+        assert is_chunked_array(memmap)
+        result = evaluate(
+            profiles,
+            features=profiles.features,
+            meta_features=meta_features,
+            replicate_groups=["Metadata_pert"],
+            operation="replicate_reproducibility",
+            similarity_metric=similarity_metric,
+            similarity_strategy="tiled",
+        )
+        assert result == evaluate(
+            df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=["Metadata_pert"],
+            operation="replicate_reproducibility",
+            similarity_metric=similarity_metric,
+        )
+        result = metric_melt(
+            profiles,
+            similarity_strategy="tiled",
+            **dict(melt_params, features=profiles.features)
+        )
+        assert_frame_equal(result, expected_result, check_dtype=False)
+        del memmap, profiles
@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from cytominer_eval.utils.kernel_utils import (
+    get_kernel_backend,
+    kendall_matrix,
+    numba_installed,
+    segment_median,
+    segment_ranks,
+    segment_topk_counts,
+)
+
+backends = ["numpy", "numba"] if numba_installed else ["numpy"]
+
+random_state = np.random.RandomState(123)
+
+# Profiles with tied features and a constant profile
+X = random_state.randint(0, 6, size=(12, 30)).astype(float)
+X[3, :] = 2.0
+
+values = random_state.normal(size=200).round(1)
+values[[5, 17]] = np.nan
+segment_codes = random_state.randint(0, 9, size=200)
+n_segments = 10  # The last segment is empty
+
+
+def test_get_kernel_backend():
+    assert get_kernel_backend() == ("numba" if numba_installed else "numpy")
+    assert get_kernel_backend("numpy") == "numpy"
+
+    with pytest.raises(AssertionError) as ae:
+        get_kernel_backend("MISSING")
+    assert "MISSING not supported" in str(ae.value)
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_kendall_matrix(backend):
+    expected_result = pd.DataFrame(X).transpose().corr(method="kendall").values
+    result = kendall_matrix(X, backend=backend)
+
+    assert np.allclose(result, expected_result, equal_nan=True)
+    assert np.isnan(result[3, 0])
+    assert np.array_equal(np.diag(result), np.ones(X.shape[0]))
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_segment_ranks(backend):
+    expected_result = (
+        pd.Series(-values)
+        .fillna(np.inf)
+        .groupby(segment_codes)
+        .rank(method="first")
+        .values
+        - 1
+    )
+    result = segment_ranks(values, segment_codes, backend=backend)
+
+    assert np.array_equal(result, expected_result)
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_segment_median(backend):
+    expected_result = (
+        pd.Series(values)
+        .groupby(segment_codes)
+        .agg(lambda x: x.median(skipna=False))
+        .reindex(range(n_segments))
+        .values
+    )
+    result = segment_median(values, segment_codes, n_segments, backend=backend)
+
+    assert np.allclose(result, expected_result, equal_nan=True)
+    assert np.isnan(result[-1])
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_segment_topk_counts(backend):
+    flags = values > 0
+    k = [1, 5, 100]
+    expected_result = np.array(
+        [[flags[segment_codes == x][:k_].sum() for k_ in k] for x in range(n_segments)]
+    )
+    result = segment_topk_counts(
+        flags, segment_codes, n_segments=n_segments, k=k, backend=backend
+    )
+
+    assert np.array_equal(result, expected_result)
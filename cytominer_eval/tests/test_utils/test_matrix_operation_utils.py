@@ -0,0 +1,116 @@
+import numpy as np
+
+from cytominer_eval.utils.matrix_operation_utils import (
+    batch_enrichment,
+    batch_replicate_reproducibility,
+    get_upper_pairs,
+    get_ranked_replicates,
+    get_valid_pairs,
+    matrix_enrichment,
+    matrix_hitk,
+    matrix_precision_recall,
+    matrix_replicate_reproducibility,
+)
+
+similarity = np.array(
+    [
+        [1, 0.9, 0.1, 0.2],
+        [0.9, 1, 0.3, np.nan],
+        [0.1, 0.3, 1, 0.8],
+        [0.2, np.nan, 0.8, 1],
+    ]
+)
+group_codes = np.array([0, 0, 1, 1])
+
+
+def test_get_valid_pairs():
+    valid = get_valid_pairs(similarity)
+    assert valid.sum() == 10
+    assert not valid[1, 3]
+    assert not valid.diagonal().any()
+
+    # Copies of the same profile are not compared
+    valid = get_valid_pairs(similarity, profile_ids=np.array([0, 0, 1, 2]))
+    assert not valid[0, 1]
+    assert valid.sum() == 8
+
+
+def test_matrix_replicate_reproducibility():
+    valid = get_valid_pairs(similarity)
+    result = matrix_replicate_reproducibility(
+        similarity, valid, group_codes, quantile_over_null=0.5
+    )
+    assert result == 1
+
+    result = matrix_replicate_reproducibility(
+        similarity, valid, np.arange(4), quantile_over_null=0.5
+    )
+    assert np.isnan(result)
+
+
+def test_matrix_enrichment():
+    valid = get_valid_pairs(similarity)
+    result = matrix_enrichment(similarity, valid, group_codes, percentile=[0.5])
+
+    # Both replicate pairs are above the median, none of the non-replicate pairs
+    assert np.isinf(result[0])
+
+
+def test_ranked_replicates_operations():
+    valid = get_valid_pairs(similarity)
+    ranked = get_ranked_replicates(similarity, valid, group_codes, np.arange(4))
+    expected_result = np.array(
+        [
+            [True, False, False, False],
+            [True, False, False, False],
+            [True, False, False, False],
+            [True, False, False, False],
+        ]
+    )
+    np.testing.assert_array_equal(ranked, expected_result)
+
+    # Connections of grouped profiles are ranked together
+    grouped = get_ranked_replicates(similarity, valid, group_codes, group_codes)
+    assert grouped.shape == (2, 8)
+    np.testing.assert_array_equal(grouped.sum(axis=1), [2, 2])
+    assert grouped[:, :2].all()
+
+    precision, recall = matrix_precision_recall(ranked, k=[1, 2])
+    np.testing.assert_array_equal(precision, [1, 0.5])
+    np.testing.assert_array_equal(recall, [1, 1])
+
+    result = matrix_hitk(ranked, percent_list=[25, 100])
+    np.testing.assert_array_equal(result, [3, 0])
+
+
+def test_batch_operations():
+    rng = np.random.default_rng(123)
+    random_similarity = np.corrcoef(rng.normal(size=(12, 20)))
+    random_codes = np.repeat(np.arange(4), 3)
+    valid = get_valid_pairs(random_similarity)
+
+    pair_similarity, pair_a, pair_b = get_upper_pairs(random_similarity, valid)
+    assert pair_similarity.shape == (66,)
+    assert (np.diff(pair_similarity) >= 0).all()
+    assert (pair_a < pair_b).all()
+
+    permuted_codes = np.array([rng.permutation(random_codes) for _ in range(5)])
+
+    result = batch_replicate_reproducibility(
+        pair_similarity, pair_a, pair_b, permuted_codes, quantile_over_null=0.8
+    )
+    expected_result = [
+        matrix_replicate_reproducibility(random_similarity, valid, x, 0.8)
+        for x in permuted_codes
+    ]
+    np.testing.assert_allclose(result, expected_result)
+
+    thresholds = np.quantile(random_similarity[valid], [0.5, 0.9])
+    result = batch_enrichment(
+        pair_similarity, pair_a, pair_b, permuted_codes, thresholds=thresholds
+    )
+    expected_result = [
+        matrix_enrichment(random_similarity, valid, x, [0.5, 0.9])
+        for x in permuted_codes
+    ]
+    np.testing.assert_allclose(result, expected_result)
@@ -15,6 +15,7 @@ from cytominer_eval.utils.availability_utils import get_available_summary_method
 from cytominer_eval.utils.operation_utils import (
     assign_replicates,
     compare_distributions,
+    get_group_codes,
 )
 
 
@@ -199,3 +200,20 @@ def test_compare_distributions():
         )
 
         assert result == grit_result
+
+
+def test_get_group_codes():
+    group_df = pd.DataFrame(
+        {"gene": ["b", "a", "b", "a"], "guide": ["1", "2", "1", "3"]},
+        index=[10, 11, 12, 13],
+    )
+
+    result = get_group_codes(group_df, replicate_groups="gene")
+    np.testing.assert_array_equal(result, [1, 0, 1, 0])
+
+    result = get_group_codes(group_df, replicate_groups=["gene", "guide"])
+    np.testing.assert_array_equal(result, [2, 0, 2, 1])
+
+    with pytest.raises(AssertionError) as ae:
+        get_group_codes(group_df, replicate_groups=["MISSING"])
+    assert "replicate_group not found" in str(ae.value)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from cytominer_eval.transform.transform import (
+    get_pairwise_metric,
+    get_packed_pairwise_metric,
+)
+from cytominer_eval.utils.packed_utils import PackedSimilarity, get_packed_offsets
+from cytominer_eval.utils.quantize_utils import get_similarity_error
+
+random_state = np.random.RandomState(123)
+feature_df = pd.DataFrame(random_state.normal(size=(23, 10)))
+
+
+def test_get_packed_offsets():
+    assert get_packed_offsets(4).tolist() == [0, 4, 7, 9, 10]
+    assert get_packed_offsets(0).tolist() == [0]
+
+
+def test_packed_similarity():
+    matrix = get_pairwise_metric(feature_df, similarity_metric="pearson").values
+    packed = PackedSimilarity.from_matrix(matrix)
+
+    assert packed.data.shape == (23 * 24 // 2,)
+    assert packed.shape == (23, 23)
+    assert np.array_equal(packed.to_dense(), matrix)
+    assert np.array_equal(packed.rows(5, 9), matrix[5:9])
+    assert np.array_equal(packed.row(0), matrix[0])
+    assert np.array_equal(packed.column(22), matrix[:, 22])
+
+
+def test_get_packed_pairwise_metric():
+    for similarity_metric in ["pearson", "spearman", "kendall"]:
+        expected = get_pairwise_metric(feature_df, similarity_metric).values
+        for block_size in [None, 1, 5]:
+            packed = get_packed_pairwise_metric(
+                feature_df, similarity_metric=similarity_metric, block_size=block_size
+            )
+            assert np.allclose(packed.to_dense(), expected)
+
+    # Pairs are correlated over the features both profiles have
+    missing_df = feature_df.copy()
+    missing_df.iloc[3, 5] = np.nan
+    expected = get_pairwise_metric(missing_df, "pearson").values
+    packed = get_packed_pairwise_metric(missing_df, similarity_metric="pearson")
+    assert not np.isnan(packed.row(3)).any()
+    assert np.allclose(packed.to_dense(), expected)
+
+
+def test_packed_similarity_quantize():
+    packed = get_packed_pairwise_metric(feature_df, similarity_metric="pearson")
+    assert packed.quantize("float64") is packed
+
+    for similarity_dtype in ["float16", "int16", "int8"]:
+        quantized = packed.quantize(similarity_dtype)
+        assert quantized.similarity_dtype == similarity_dtype
+        assert quantized.data.nbytes < packed.data.nbytes
+        error = np.abs(quantized.to_dense() - packed.to_dense()).max()
+        assert error <= get_similarity_error(similarity_dtype)
@@ -0,0 +1,141 @@
+import pickle
+import pytest
+import numpy as np
+import pandas as pd
+from functools import partial
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval.utils import parallel_utils
+from cytominer_eval.utils.parallel_utils import (
+    SharedArray,
+    apply_chunks,
+    apply_groups,
+    get_blas_threads,
+    get_n_workers,
+    run_tasks,
+    share_array,
+)
+
+df = pd.DataFrame(
+    {
+        "group": np.repeat(["c", "a", "b", "d", "e"], 4),
+        "value": np.arange(20, dtype=float),
+    }
+).sample(frac=1, random_state=0)
+
+
+def _summarize(group_df: pd.DataFrame, offset: float) -> pd.Series:
+    return pd.Series({"total": group_df.value.sum() + offset, "n": group_df.shape[0]})
+
+
+def _count_rows(chunk_df: pd.DataFrame, offset: float) -> pd.DataFrame:
+    return chunk_df.groupby("group").value.agg(["sum", "count"]) + offset
+
+
+def _sum_task(task) -> float:
+    array, index = task
+    return float(np.asarray(array)[index].sum())
+
+
+def _blas_threads_task(task) -> list:
+    from threadpoolctl import threadpool_info
+
+    return [x["num_threads"] for x in threadpool_info() if x["user_api"] == "blas"]
+
+
+def test_get_n_workers():
+    assert get_n_workers(3) == 3
+    assert get_n_workers(-1) >= 1
+
+    with pytest.raises(AssertionError) as ae:
+        get_n_workers(0)
+    assert "n_jobs must be a positive integer or -1" in str(ae.value)
+
+
+def test_run_tasks_backends():
+    tasks = [(np.arange(10), slice(i, i + 2)) for i in range(5)]
+    expected_result = [1.0, 3.0, 5.0, 7.0, 9.0]
+
+    for backend in ["serial", "threads", "processes"]:
+        assert run_tasks(_sum_task, tasks, n_jobs=2, backend=backend) == expected_result
+
+    with pytest.raises(AssertionError) as ae:
+        run_tasks(_sum_task, tasks, n_jobs=2, backend="MISSING")
+    assert "MISSING not supported" in str(ae.value)
+
+
+def test_run_tasks_blas_threads():
+    pytest.importorskip("threadpoolctl")
+
+    # Every task of a worker process runs with the BLAS threads of its share
+    results = run_tasks(_blas_threads_task, list(range(4)), n_jobs=2)
+    for threads in results:
+        assert all([x <= get_blas_threads(2) for x in threads])
+
+
+def test_apply_groups():
+    func = partial(_summarize, offset=0.5)
+    expected_result = df.groupby("group").apply(func)
+
+    for backend in ["threads", "processes"]:
+        for n_tasks in [None, 2, 100]:
+            result = apply_groups(
+                df, by="group", func=func, n_jobs=2, backend=backend, n_tasks=n_tasks
+            )
+            assert_frame_equal(result, expected_result)
+
+    assert_frame_equal(apply_groups(df, by=["group"], func=func), expected_result)
+
+
+def test_apply_chunks():
+    func = partial(_count_rows, offset=0.5)
+    expected_result = func(df).sort_index()
+
+    for n_tasks in [None, 2, 100]:
+        result = apply_chunks(
+            df, by="group", func=func, n_jobs=2, backend="processes", n_tasks=n_tasks
+        )
+        assert_frame_equal(result.sort_index(), expected_result)
+
+        # Each chunk holds whole groups
+        assert result.index.is_unique
+
+    assert_frame_equal(apply_chunks(df, by="group", func=func), func(df))
+
+
+def test_shared_array():
+    pytest.importorskip("multiprocessing.shared_memory")
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    with SharedArray(array) as shared:
+        # Handles are small, whatever the size of the array
+        handle = pickle.dumps(shared)
+        assert len(handle) < 200
+
+        attached = pickle.loads(handle)
+        assert np.array_equal(np.asarray(attached), array)
+        assert attached.get().dtype == np.float32
+
+        # Writes are visible to all handles
+        shared.get()[0, 0] = -1
+        assert attached.get()[0, 0] == -1
+        attached.close()
+
+        tasks = [(shared, slice(0, 2)), (shared, slice(2, 3))]
+        assert run_tasks(_sum_task, tasks, n_jobs=2) == [27.0, 38.0]
+
+
+def test_share_array(monkeypatch):
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    with share_array(array, n_jobs=1) as not_shared:
+        assert not_shared is array
+    with share_array(array, n_jobs=2, backend="threads") as not_shared:
+        assert not_shared is array
+
+    # Without shared memory (before Python 3.8), tasks receive copies of the array
+    monkeypatch.setattr(parallel_utils, "shared_memory", None)
+    with share_array(array, n_jobs=2) as not_shared:
+        assert not_shared is array
+        tasks = [(not_shared, slice(0, 2)), (not_shared, slice(2, 3))]
+        assert run_tasks(_sum_task, tasks, n_jobs=2) == [28.0, 38.0]
@@ -0,0 +1,211 @@
+import os
+import pytest
+import pathlib
+import numpy as np
+import pandas as pd
+
+from cytominer_eval import evaluate
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.profiling_utils import EvaluationProfiler
+from cytominer_eval.utils.planner_utils import (
+    estimate_memory,
+    get_default_block_size,
+    get_n_pairs,
+    plan_evaluation,
+)
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def test_get_default_block_size():
+    assert get_default_block_size(100) == 100
+    assert get_default_block_size(100000) == 83
+    assert get_default_block_size(100000, max_block_bytes=1) == 1
+
+
+def test_get_n_pairs():
+    assert get_n_pairs(384, "replicate_reproducibility") == 73536
+    assert get_n_pairs(384, "grit") == 147072
+
+
+def test_estimate_memory():
+    kwargs = {"n_profiles": 10000, "n_features": 1000, "n_meta_features": 10}
+    for operation in ["replicate_reproducibility", "grit", "enrichment"]:
+        dense = estimate_memory(operation=operation, **kwargs)
+        tiled = estimate_memory(
+            operation=operation, similarity_strategy="tiled", **kwargs
+        )
+        packed = estimate_memory(
+            operation=operation, similarity_strategy="packed", **kwargs
+        )
+        assert tiled < dense
+        assert tiled <= packed < dense
+
+    full = estimate_memory(operation="grit", **kwargs)
+    upper = estimate_memory(operation="replicate_reproducibility", **kwargs)
+    assert upper < full
+
+    assert estimate_memory(operation="mp_value", **kwargs) == 3 * 10000 * 1000 * 8
+
+
+def test_plan_evaluation():
+    kwargs = {"n_profiles": 10000, "n_features": 1000, "n_meta_features": 10}
+
+    plan = plan_evaluation(operation="replicate_reproducibility", **kwargs)
+    assert plan["similarity_strategy"] == "dense"
+    assert plan["block_size"] is None
+    assert plan["estimated_peak_bytes"] == plan["estimates"]["dense"]
+
+    # A budget below the dense estimate selects the tiled strategy
+    budget = plan["estimates"]["dense"] - 1
+    plan = plan_evaluation(
+        operation="replicate_reproducibility", memory_budget=budget, **kwargs
+    )
+    assert plan["similarity_strategy"] == "tiled"
+    assert plan["estimated_peak_bytes"] <= budget
+
+    # Only the dense strategy supports missing feature values
+    plan = plan_evaluation(
+        operation="replicate_reproducibility", missing_features=True, **kwargs
+    )
+    assert plan["similarity_strategy"] == "dense"
+    with pytest.raises(MemoryError) as me:
+        plan_evaluation(
+            operation="replicate_reproducibility",
+            memory_budget=budget,
+            missing_features=True,
+            **kwargs,
+        )
+    assert "tiled" not in str(me.value)
+
+    # Kendall correlation is only available densely
+    with pytest.raises(MemoryError) as me:
+        plan_evaluation(
+            operation="replicate_reproducibility",
+            similarity_metric="kendall",
+            memory_budget=budget,
+            **kwargs,
+        )
+    assert "No strategy fits the memory budget" in str(me.value)
+    assert "dense" in str(me.value)
+
+    with pytest.raises(MemoryError) as me:
+        plan_evaluation(operation="grit", memory_budget=1000, **kwargs)
+    assert "tiled" in str(me.value)
+
+    with pytest.raises(AssertionError) as ae:
+        plan_evaluation(
+            operation="grit",
+            similarity_metric="kendall",
+            similarity_strategy="tiled",
+            **kwargs,
+        )
+    assert "kendall not supported by the tiled strategy" in str(ae.value)
+
+
+def test_evaluate_plan():
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+    )
+
+    dense_estimate = plan_evaluation(
+        n_profiles=df.shape[0],
+        n_features=len(features),
+        n_meta_features=len(meta_features),
+        operation="replicate_reproducibility",
+        replicate_groups=replicate_groups,
+    )["estimated_peak_bytes"]
+
+    profiler = EvaluationProfiler()
+    result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        memory_budget=dense_estimate - 1,
+        profiler=profiler,
+    )
+    assert result == expected_result
+    assert profiler.annotations["plan"]["similarity_strategy"] == "tiled"
+    assert "process_melt_tiled" in profiler.report().stage.tolist()
+
+    with pytest.raises(MemoryError):
+        evaluate(
+            profiles=df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            memory_budget=1000,
+        )
+
+
+def test_evaluate_plan_missing_features():
+    # Dense correlations skip the features missing in either profile of a pair
+    missing_df = df.copy()
+    missing_df.loc[3, features[5]] = np.nan
+
+    expected_result = evaluate(
+        profiles=missing_df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        similarity_strategy="dense",
+    )
+    assert (
+        metric_melt(missing_df, features, meta_features).shape
+        == metric_melt(df, features, meta_features).shape
+    )
+
+    dense_estimate = plan_evaluation(
+        n_profiles=df.shape[0],
+        n_features=len(features),
+        n_meta_features=len(meta_features),
+        operation="replicate_reproducibility",
+        replicate_groups=replicate_groups,
+    )["estimated_peak_bytes"]
+
+    profiler = EvaluationProfiler()
+    result = evaluate(
+        profiles=missing_df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        memory_budget=dense_estimate,
+        profiler=profiler,
+    )
+    assert result == expected_result
+    assert profiler.annotations["plan"]["similarity_strategy"] == "dense"
+
+    # The tiled strategy would drop every pair of the profile with a missing value
+    with pytest.raises(MemoryError):
+        evaluate(
+            profiles=missing_df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            memory_budget=dense_estimate - 1,
+        )
+
+    with pytest.raises(AssertionError) as ae:
+        evaluate(
+            profiles=missing_df,
+            features=features,
+            meta_features=meta_features,
+            replicate_groups=replicate_groups,
+            similarity_strategy="tiled",
+        )
+    assert "Missing feature values not supported" in str(ae.value)
@@ -0,0 +1,139 @@
+import pytest
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate
+from cytominer_eval.operations import precision_recall
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.polars_utils import (
+    frame_to_pandas,
+    get_frame_format,
+    is_polars_frame,
+    pandas_to_frame,
+    polars_to_arrow,
+)
+
+pl = pytest.importorskip("polars")
+
+random_state = np.random.RandomState(123)
+
+features = ["feature_{x}".format(x=x) for x in range(5)]
+meta_features = ["Metadata_pert", "Metadata_group"]
+
+df = pd.DataFrame(random_state.normal(size=(24, 5)), columns=features)
+df = df.assign(
+    Metadata_pert=["ctrl_{x}".format(x=x % 4) for x in range(8)]
+    + ["pert_{x}".format(x=x % 8) for x in range(16)],
+    Metadata_group=["ctrl"] * 8 + ["a", "b"] * 8,
+)
+polars_df = pl.from_pandas(df)
+
+
+def test_is_polars_frame():
+    assert is_polars_frame(polars_df)
+    assert is_polars_frame(polars_df.lazy())
+    assert not is_polars_frame(df)
+
+    assert get_frame_format(polars_df.lazy()) == "polars"
+    assert get_frame_format(df) == "pandas"
+
+
+def test_polars_to_arrow():
+    result = polars_to_arrow(polars_df.lazy(), columns=["feature_1", "MISSING"])
+    assert result.column_names == ["feature_1"]
+    assert np.array_equal(result.column(0).to_numpy(), df.feature_1.values)
+
+    # Categorical columns convert to pandas
+    categorical_df = polars_df.with_columns(
+        pl.col("Metadata_pert").cast(pl.Categorical)
+    )
+    result = polars_to_arrow(categorical_df).to_pandas()
+    assert result.Metadata_pert.astype(str).tolist() == df.Metadata_pert.tolist()
+
+
+def test_frame_conversion():
+    result = pandas_to_frame(df, "polars")
+    assert isinstance(result, pl.DataFrame)
+    assert result.schema["Metadata_pert"] == pl.Categorical
+    assert_frame_equal(frame_to_pandas(result), df)
+    assert_frame_equal(frame_to_pandas(result.lazy()), df)
+
+    assert pandas_to_frame(df, "pandas") is df
+    assert frame_to_pandas(df) is df
+
+
+def test_metric_melt_polars():
+    expected_result = metric_melt(
+        df,
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+    )
+    result = metric_melt(
+        polars_df.lazy(),
+        features=features,
+        metadata_features=meta_features,
+        eval_metric="precision_recall",
+    )
+    assert isinstance(result, pl.DataFrame)
+    assert_frame_equal(frame_to_pandas(result), expected_result, check_dtype=False)
+
+    result = metric_melt(
+        polars_df,
+        features=features,
+        metadata_features=meta_features,
+        output_format="pandas",
+    )
+    assert isinstance(result, pd.DataFrame)
+
+    # Operations return results in the frame type of the melted similarities
+    pr_params = {
+        "replicate_groups": ["Metadata_pert"],
+        "groupby_columns": ["Metadata_pert"],
+        "k": 3,
+    }
+    result = precision_recall(
+        metric_melt(
+            polars_df,
+            features=features,
+            metadata_features=meta_features,
+            eval_metric="precision_recall",
+        ),
+        **pr_params
+    )
+    assert isinstance(result, pl.DataFrame)
+    assert_frame_equal(
+        frame_to_pandas(result), precision_recall(expected_result, **pr_params)
+    )
+
+
+def test_evaluate_polars():
+    grit_params = {
+        "replicate_groups": {
+            "profile_col": "Metadata_pert",
+            "replicate_group_col": "Metadata_group",
+        },
+        "operation": "grit",
+        "grit_control_perts": ["ctrl_{x}".format(x=x) for x in range(4)],
+    }
+    expected_result = evaluate(
+        profiles=df, features=features, meta_features=meta_features, **grit_params
+    )
+    result = evaluate(
+        profiles=polars_df.lazy(),
+        features=features,
+        meta_features=meta_features,
+        **grit_params
+    )
+    assert isinstance(result, pl.DataFrame)
+    assert_frame_equal(frame_to_pandas(result), expected_result)
+
+    result = evaluate(
+        profiles=polars_df,
+        features=features,
+        meta_features=meta_features,
+        output_format="pandas",
+        **grit_params
+    )
+    assert_frame_equal(result, expected_result)
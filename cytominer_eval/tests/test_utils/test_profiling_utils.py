@@ -0,0 +1,114 @@
+import os
+import pathlib
+import pandas as pd
+
+from cytominer_eval import evaluate
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.profiling_utils import (
+    EvaluationProfiler,
+    activate_profiler,
+    get_active_profiler,
+    get_peak_rss,
+    profile_stage,
+)
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def test_profile_stage_disabled():
+    assert get_active_profiler() is None
+
+    # Without an active profiler, stages are shared no-ops
+    with profile_stage("a") as record:
+        record["n_rows"] = 10
+    assert profile_stage("a") is profile_stage("b")
+
+    profiler = EvaluationProfiler()
+    with activate_profiler(profiler):
+        assert get_active_profiler() is profiler
+    assert get_active_profiler() is None
+
+    assert get_peak_rss() != 0
+
+
+def test_evaluation_profiler():
+    profiler = EvaluationProfiler(trace_memory=True)
+
+    with profiler:
+        with profile_stage("outer") as record:
+            with profile_stage("inner"):
+                x = [0] * 100000
+            record["n_rows"] = len(x)
+    profiler.annotate("note", "value")
+
+    report = profiler.report()
+    assert report.stage.tolist() == ["inner", "outer"]
+    assert report.depth.tolist() == [1, 0]
+    assert report.n_rows.tolist()[1] == 100000
+    assert (report.wall_time >= 0).all()
+    assert report.loc[0, "memory_peak"] > 0
+    assert profiler.annotations == {"note": "value"}
+
+
+def test_metric_melt_profiler():
+    profiler = EvaluationProfiler()
+    result_df = metric_melt(df, features, meta_features, profiler=profiler)
+
+    report = profiler.report().set_index("stage")
+    assert report.index.tolist() == [
+        "assert_pandas_dtypes",
+        "get_pairwise_metric",
+        "process_melt",
+        "metric_melt",
+    ]
+    assert report.loc["metric_melt", "n_rows"] == result_df.shape[0]
+    assert report.loc["get_pairwise_metric", "n_rows"] == df.shape[0]
+    assert report.memory_peak.isna().all()
+
+
+def test_evaluate_profiler():
+    profiler = EvaluationProfiler()
+    result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+        profiler=profiler,
+    )
+
+    expected_result = evaluate(
+        profiles=df,
+        features=features,
+        meta_features=meta_features,
+        replicate_groups=replicate_groups,
+    )
+    assert result == expected_result
+
+    report = profiler.report()
+    expected_stages = [
+        "validation",
+        "plan",
+        "assert_pandas_dtypes",
+        "get_pairwise_metric",
+        "process_melt",
+        "metric_melt",
+        "assign_replicates",
+        "replicate_reproducibility",
+        "evaluate",
+    ]
+    assert report.stage.tolist() == expected_stages
+
+    # The second evaluate call did not record anything
+    assert report.shape[0] == len(expected_stages)
+    assert report.query("stage == 'evaluate'").depth.values[0] == 0
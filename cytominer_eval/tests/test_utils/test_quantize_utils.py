@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+
+from cytominer_eval.utils.availability_utils import (
+    check_similarity_dtype,
+    get_available_similarity_dtypes,
+)
+from cytominer_eval.utils.quantize_utils import (
+    dequantize_similarity,
+    get_melt_similarity_dtype,
+    get_similarity_error,
+    quantize_similarity,
+)
+
+random_state = np.random.RandomState(123)
+values = np.concatenate([random_state.uniform(-1, 1, 10000), [-1, 0, 1, np.nan]])
+
+
+def test_quantize_similarity():
+    for similarity_dtype in get_available_similarity_dtypes():
+        codes = quantize_similarity(values, similarity_dtype)
+        assert codes.dtype == similarity_dtype
+
+        result = dequantize_similarity(codes)
+        assert result.dtype == np.float64
+        assert np.isnan(result[-1])
+        error = np.abs(result[:-1] - values[:-1]).max()
+        assert error <= get_similarity_error(similarity_dtype)
+
+    assert get_similarity_error("float64") == 0
+    assert quantize_similarity(values, "int8")[-1] == -128
+    assert quantize_similarity(np.array([1 + 1e-12]), "int16")[0] == 32767
+
+
+def test_get_melt_similarity_dtype():
+    assert get_melt_similarity_dtype("int8") == "float32"
+    assert get_melt_similarity_dtype("int16") == "float32"
+    assert get_melt_similarity_dtype("float16") == "float16"
+
+    for similarity_dtype in get_available_similarity_dtypes():
+        check_similarity_dtype(get_melt_similarity_dtype(similarity_dtype), melted=True)
+
+    with pytest.raises(AssertionError) as ae:
+        check_similarity_dtype("int8", melted=True)
+    assert "int8 not supported. Available similarity dtypes" in str(ae.value)
@@ -0,0 +1,174 @@
+import os
+import pickle
+import pytest
+import pathlib
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cytominer_eval import evaluate, bootstrap_evaluate, permutation_test
+from cytominer_eval.transform import metric_melt
+from cytominer_eval.utils.parallel_utils import run_tasks
+from cytominer_eval.utils.shared_utils import SharedProfiles
+
+# Shared memory requires Python 3.8 or later
+pytest.importorskip("multiprocessing.shared_memory")
+
+example_file = "SQ00015054_normalized_feature_select.csv.gz"
+example_file = pathlib.Path(
+    "{file}/../../example_data/compound/{eg}".format(
+        file=os.path.dirname(__file__), eg=example_file
+    )
+)
+
+df = pd.read_csv(example_file)
+
+meta_features = [x for x in df.columns if x.startswith("Metadata_")]
+features = df.drop(meta_features, axis="columns").columns.tolist()
+replicate_groups = ["Metadata_broad_sample", "Metadata_mg_per_ml"]
+
+
+def _evaluate_task(task) -> pd.DataFrame:
+    profiles, operation, params = task
+    return evaluate(
+        profiles=profiles,
+        features=features,
+        meta_features=meta_features,
+        operation=operation,
+        **params
+    )
+
+
+def test_shared_profiles_melt():
+    with SharedProfiles(
+        df, features=features, meta_features=meta_features
+    ) as shared_profiles:
+        assert shared_profiles.n_profiles == df.shape[0]
+        assert shared_profiles.similarity().shape == (df.shape[0], df.shape[0])
+        assert not shared_profiles.similarity().flags.writeable
+        assert np.array_equal(
+            shared_profiles.group_codes(replicate_groups).shape, [df.shape[0]]
+        )
+
+        for eval_metric in ["replicate_reproducibility", "precision_recall"]:
+            expected_result = metric_melt(
+                df=df,
+                features=features,
+                metadata_features=meta_features,
+                eval_metric=eval_metric,
+            )
+            result = shared_profiles.melt(eval_metric=eval_metric)
+            assert_frame_equal(
+                result.reset_index(drop=True),
+                expected_result.reset_index(drop=True),
+                check_dtype=False,
+            )
+
+        assert_frame_equal(
+            shared_profiles.to_profiles().loc[:, features],
+            df.reset_index(drop=True).loc[:, features],
+        )
+
+
+def test_shared_profiles_evaluate():
+    with SharedProfiles(
+        df, features=features, meta_features=meta_features
+    ) as shared_profiles:
+        for operation, params in [
+            ("replicate_reproducibility", {"replicate_groups": replicate_groups}),
+            (
+                "precision_recall",
+                {
+                    "replicate_groups": ["Metadata_broad_sample"],
+                    "groupby_columns": ["Metadata_broad_sample"],
+                },
+            ),
+            ("enrichment", {"replicate_groups": replicate_groups}),
+            (
+                "hitk",
+                {
+                    "replicate_groups": ["Metadata_broad_sample"],
+                    "groupby_columns": ["Metadata_Well"],
+                },
+            ),
+        ]:
+            expected_result = _evaluate_task((df, operation, params))
+            result = _evaluate_task((shared_profiles, operation, params))
+            if isinstance(expected_result, pd.DataFrame):
+                assert_frame_equal(result, expected_result, check_dtype=False)
+            else:
+                assert result == expected_result
+
+        # Worker processes map the shared memory of the handle
+        similarity_bytes = shared_profiles.similarity().nbytes
+        assert len(pickle.dumps(shared_profiles)) < similarity_bytes / 10
+        params = {"replicate_groups": replicate_groups}
+        results = run_tasks(
+            _evaluate_task,
+            [(shared_profiles, "replicate_reproducibility", params)] * 2,
+            n_jobs=2,
+        )
+        expected_result = _evaluate_task((df, "replicate_reproducibility", params))
+        assert results == [expected_result] * 2
+
+        with pytest.raises(AssertionError) as ae:
+            evaluate(
+                profiles=shared_profiles,
+                features=features[:-1],
+                meta_features=meta_features,
+                replicate_groups=replicate_groups,
+                operation="replicate_reproducibility",
+            )
+        assert "features must be the features" in str(ae.value)
+
+        with pytest.raises(AssertionError) as ae:
+            evaluate(
+                profiles=shared_profiles,
+                features=features,
+                meta_features=meta_features,
+                replicate_groups=replicate_groups,
+                operation="replicate_reproducibility",
+                similarity_metric="spearman",
+            )
+        assert "calculated with the pearson similarity metric" in str(ae.value)
+
+
+def test_shared_profiles_resampling():
+    with SharedProfiles(
+        df, features=features, meta_features=meta_features
+    ) as shared_profiles:
+        expected_result = bootstrap_evaluate(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_bootstrap=20,
+            seed=123,
+        )
+        for n_jobs in [1, 2]:
+            result = bootstrap_evaluate(
+                profiles=shared_profiles,
+                features=features,
+                replicate_groups=replicate_groups,
+                n_bootstrap=20,
+                seed=123,
+                n_jobs=n_jobs,
+            )
+            assert_frame_equal(result, expected_result)
+
+        expected_result, expected_null = permutation_test(
+            profiles=df,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_permutations=20,
+            seed=123,
+        )
+        result, null = permutation_test(
+            profiles=shared_profiles,
+            features=features,
+            replicate_groups=replicate_groups,
+            n_permutations=20,
+            seed=123,
+            n_jobs=2,
+        )
+        assert_frame_equal(result, expected_result)
+        assert_frame_equal(null, expected_null)
@@ -0,0 +1,60 @@
+import pytest
+import pickle
+import numpy as np
+
+from cytominer_eval.utils.sketch_utils import SimilaritySketch
+
+rng = np.random.default_rng(123)
+similarity = np.concatenate([rng.uniform(-1, 1, 5000), rng.uniform(0, 1, 500)])
+is_replicate = np.concatenate([np.zeros(5000, dtype=bool), np.ones(500, dtype=bool)])
+
+
+def test_similarity_sketch():
+    sketch = SimilaritySketch().update(similarity, is_replicate, n_profiles=100)
+    assert sketch.replicate_counts.sum() == 500
+    assert sketch.null_counts.sum() == 5000
+    assert sketch.n_plates == 1
+
+    threshold = np.quantile(similarity[~is_replicate], 0.95)
+    expected_result = np.mean(similarity[is_replicate] > threshold)
+    result = sketch.replicate_reproducibility(quantile_over_null=0.95)
+    # Only replicates within one bin of the threshold can be miscounted
+    near = np.abs(similarity[is_replicate] - threshold) <= 2 / 4096
+    assert np.abs(result - expected_result) <= near.mean()
+
+    enrichment_df = sketch.enrichment(percentile=[0.9, 0.99])
+    assert enrichment_df.columns.tolist() == [
+        "enrichment_percentile",
+        "threshold",
+        "ods_ratio",
+        "p-value",
+    ]
+    assert np.allclose(
+        enrichment_df.threshold, np.quantile(similarity, [0.9, 0.99]), atol=2 / 4096
+    )
+
+    # NaN similarities are ignored
+    nan_sketch = SimilaritySketch().update(
+        np.append(similarity, np.nan), np.append(is_replicate, True)
+    )
+    assert np.array_equal(nan_sketch.replicate_counts, sketch.replicate_counts)
+
+    assert np.isnan(SimilaritySketch().replicate_reproducibility())
+
+
+def test_similarity_sketch_merge():
+    sketch = SimilaritySketch().update(similarity, is_replicate, n_profiles=100)
+
+    first = SimilaritySketch().update(similarity[::2], is_replicate[::2], 50)
+    second = SimilaritySketch().update(similarity[1::2], is_replicate[1::2], 50)
+    merged = pickle.loads(pickle.dumps(first)).merge(second)
+
+    assert np.array_equal(merged.replicate_counts, sketch.replicate_counts)
+    assert np.array_equal(merged.null_counts, sketch.null_counts)
+    assert merged.n_plates == 2
+    assert merged.n_profiles == 100
+    assert merged.replicate_reproducibility() == sketch.replicate_reproducibility()
+
+    with pytest.raises(AssertionError) as ae:
+        sketch.merge(SimilaritySketch(n_bins=10))
+    assert "Sketch bins must match" in str(ae.value)
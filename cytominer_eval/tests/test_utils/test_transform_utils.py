@@ -11,6 +11,7 @@ from cytominer_eval.utils.transform_utils import (
     assert_pandas_dtypes,
     set_pair_ids,
     check_replicate_groups,
+    get_knn_graph,
 )
 from cytominer_eval.utils.availability_utils import get_available_eval_metrics
 
@@ -123,3 +124,25 @@ def test_check_replicate_groups():
         wrong_group_dict = {"MISSING": "nothing here", "MISSING_TOO": "nothing"}
         check_replicate_groups(eval_metric="grit", replicate_groups=wrong_group_dict)
     assert "replicate_groups for grit not formed properly." in str(ae.value)
+
+
+def test_get_knn_graph():
+    similarity_df = pd.DataFrame(
+        [
+            [1, 0.5, 0.9, np.nan],
+            [0.5, 1, 0.1, np.nan],
+            [0.9, 0.1, 1, np.nan],
+            [np.nan, np.nan, np.nan, np.nan],
+        ]
+    )
+
+    result = get_knn_graph(similarity_df)
+    expected_result = np.array([[2, 1, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])
+    np.testing.assert_array_equal(result, expected_result)
+
+    result = get_knn_graph(similarity_df, n_neighbors=1)
+    np.testing.assert_array_equal(result, expected_result[:, :1])
+
+    with pytest.raises(AssertionError) as ae:
+        get_knn_graph(similarity_df, n_neighbors=4)
+    assert "n_neighbors must be between 1" in str(ae.value)
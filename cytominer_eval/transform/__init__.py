@@ -1,3 +1,3 @@
-from .transform import metric_melt
+from .transform import metric_melt, metric_matrix, write_melt_parquet
 
-__all__ = [metric_melt]
+__all__ = [metric_melt, metric_matrix, write_melt_parquet]
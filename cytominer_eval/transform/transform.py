@@ -1,15 +1,59 @@
+import os
 import numpy as np
 import pandas as pd
-from typing import List
+from functools import partial
+from typing import Callable, Iterator, List, Union
 
 from cytominer_eval.utils.availability_utils import (
     check_similarity_metric,
+    check_similarity_strategy,
     check_eval_metric,
+    check_output_format,
+    check_metadata_storage,
+    check_similarity_dtype,
+    get_available_tiled_similarity_metrics,
+)
+from cytominer_eval.utils.arrow_utils import (
+    dictionary_take,
+    factorize_dictionary,
+    is_arrow_backed,
+    is_arrow_table,
+    split_arrow_profiles,
+)
+from cytominer_eval.utils.io_utils import (
+    ProfileArrays,
+    get_array_chunk_rows,
+    is_chunked_array,
+    is_profile_path,
+    iter_array_blocks,
+    read_profile_arrays,
+)
+from cytominer_eval.utils.polars_utils import (
+    is_polars_frame,
+    polars_to_arrow,
+    to_polars,
 )
 from cytominer_eval.utils.transform_utils import (
     assert_pandas_dtypes,
+    get_melt_similarity,
+    get_pair_offsets,
     get_upper_matrix,
     set_pair_ids,
+    standardize_profiles,
+)
+from cytominer_eval.utils.kernel_utils import kendall_matrix
+from cytominer_eval.utils.packed_utils import PackedSimilarity, get_packed_offsets
+from cytominer_eval.utils.quantize_utils import get_melt_similarity_dtype
+from cytominer_eval.utils.planner_utils import get_default_block_size
+from cytominer_eval.utils.cache_utils import (
+    EvaluationCache,
+    hash_pandas,
+    hash_parameters,
+)
+from cytominer_eval.utils.profiling_utils import (
+    EvaluationProfiler,
+    activate_profiler,
+    profile_stage,
 )
 
 
@@ -33,7 +77,13 @@ def get_pairwise_metric(df: pd.DataFrame, similarity_metric: str) -> pd.DataFram
     check_similarity_metric(similarity_metric)
     df = assert_pandas_dtypes(df=df, col_fix=float)
 
-    pair_df = df.transpose().corr(method=similarity_metric)
+    if similarity_metric == "kendall" and not df.isna().values.any():
+        # pandas calculates Kendall's tau one pair of profiles at a time
+        pair_df = pd.DataFrame(
+            kendall_matrix(df.values), index=df.index, columns=df.index
+        )
+    else:
+        pair_df = df.transpose().corr(method=similarity_metric)
 
     # Check if the metric calculation went wrong
     # (Current pandas version makes this check redundant)
@@ -45,6 +95,63 @@ def get_pairwise_metric(df: pd.DataFrame, similarity_metric: str) -> pd.DataFram
     return pair_df
 
 
+def get_packed_pairwise_metric(
+    df: pd.DataFrame, similarity_metric: str, block_size: int = None
+) -> PackedSimilarity:
+    """Helper function to calculate the upper triangle of the pairwise similarity
+    matrix of a feature-only dataframe
+
+    Pearson and spearman similarities are calculated one block of profiles at a time,
+    as dot products of standardized profiles with the profiles from the block onward.
+    Each similarity is calculated once, which halves the work and the memory of
+    :py:func:`cytominer_eval.transform.transform.get_pairwise_metric`. Kendall
+    similarities, and similarities of features with missing values, are calculated as
+    a square matrix, then packed, so that each pair is correlated over the features
+    both profiles have.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Samples x features, where all columns can be coerced to floats
+    similarity_metric : str
+        The pairwise comparison to calculate
+    block_size : int, optional
+        How many profiles to process at once. Defaults to a block size of at most
+        64 MiB.
+
+    Returns
+    -------
+    cytominer_eval.utils.packed_utils.PackedSimilarity
+        The packed pairwise similarity matrix
+    """
+    check_similarity_metric(similarity_metric)
+    df = assert_pandas_dtypes(df=df, col_fix=float)
+
+    if (
+        similarity_metric not in get_available_tiled_similarity_metrics()
+        or df.isna().values.any()
+    ):
+        return PackedSimilarity.from_matrix(
+            get_pairwise_metric(df=df, similarity_metric=similarity_metric).values
+        )
+
+    n_profiles = df.shape[0]
+    if block_size is None:
+        block_size = get_default_block_size(n_profiles)
+
+    # Rows are centered and scaled so that dot products are correlations
+    standardized = standardize_profiles(df.values, similarity_metric)
+    offsets = get_packed_offsets(n_profiles)
+    data = np.empty(offsets[-1], dtype=np.float64)
+    for start in range(0, n_profiles, block_size):
+        stop = min(start + block_size, n_profiles)
+        block = standardized[start:stop] @ standardized[start:].T
+        for i in range(start, stop):
+            data[offsets[i] : offsets[i + 1]] = block[i - start, i - start :]
+
+    return PackedSimilarity(data, n_profiles=n_profiles)
+
+
 def process_melt(
     df: pd.DataFrame,
     meta_df: pd.DataFrame,
@@ -77,10 +184,10 @@ def process_melt(
     pair_ids = set_pair_ids()
 
     # Subset the pairwise similarity metric depending on the eval metric given:
-    #   "replicate_reproducibility" - requires only the upper triangle of a symmetric matrix
-    #   "precision_recall" - requires the full symmetric matrix (no diagonal)
+    #   "upper" (e.g. replicate_reproducibility) - only the upper triangle of the matrix
+    #   "full" (e.g. precision_recall) - the full symmetric matrix (no diagonal)
     # Remove pairwise matrix diagonal and redundant pairwise comparisons
-    if eval_metric == "replicate_reproducibility":
+    if get_melt_similarity(eval_metric) == "upper":
         upper_tri = get_upper_matrix(df)
         df = df.where(upper_tri)
     else:
@@ -115,12 +222,329 @@ def process_melt(
     return output_df
 
 
+def process_melt_tiled(
+    df: pd.DataFrame,
+    meta_df: pd.DataFrame,
+    eval_metric: str = "replicate_reproducibility",
+    similarity_metric: str = "pearson",
+    block_size: int = None,
+    output_format: str = "pandas",
+    prefetch: bool = True,
+    similarity_dtype: str = "float64",
+) -> pd.DataFrame:
+    """Helper function to calculate and melt pairwise similarities one block of
+    profiles at a time
+
+    The full pairwise similarity matrix is never materialized. Instead, similarities
+    of a block of profiles to all other profiles are written directly into the melted
+    output. The output is identical to
+    :py:func:`cytominer_eval.transform.transform.process_melt` applied to the output of
+    :py:func:`cytominer_eval.transform.transform.get_pairwise_metric` (up to floating
+    point error), except that the pair_b index column is stored as integers.
+
+    Features on disk are never read into memory at once. Each block of rows is read
+    once, then compared to the other blocks in a single sweep over the array, which
+    skips blocks left of the diagonal when only the upper triangle is melted.
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, np.memmap, zarr.Array, h5py.Dataset}
+        Samples x features, where all columns are floats, or a samples x features
+        array on disk (see :py:func:`cytominer_eval.utils.io_utils.is_chunked_array`)
+    meta_df : pandas.DataFrame
+        A wide matrix of metadata information where the index aligns to the rows of df
+    eval_metric : str, optional
+        Which metric to ultimately calculate. Determines whether or not to keep the full
+        similarity matrix or only one diagonal. Defaults to "replicate_reproducibility".
+    similarity_metric : {'pearson', 'spearman'}, optional
+        The pairwise comparison to calculate. Defaults to "pearson".
+    block_size : int, optional
+        How many profiles to process at once. Peak memory of the similarity calculation
+        is block_size x n_profiles. Defaults to a block size of at most 64 MiB.
+    output_format : {'pandas', 'arrow', 'polars'}, optional
+        Whether to return a pandas.DataFrame (default), or a pyarrow.Table or
+        polars.DataFrame with dictionary-encoded (categorical) metadata columns.
+    prefetch : bool, optional
+        Only used for features on disk. Whether to read the next block of features on
+        a background thread while similarities of the current block are calculated.
+        Defaults to True.
+    similarity_dtype : {'float64', 'float32', 'float16'}, optional
+        The float type of the melted similarities. Defaults to "float64".
+
+    Returns
+    -------
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        A pairwise similarity matrix
+    """
+    check_eval_metric(eval_metric)
+    check_similarity_strategy(
+        similarity_strategy="tiled", similarity_metric=similarity_metric
+    )
+
+    get_block, block_size = _similarity_blocks(
+        df=df,
+        eval_metric=eval_metric,
+        similarity_metric=similarity_metric,
+        block_size=block_size,
+        prefetch=prefetch,
+    )
+
+    return _melt_blocks(
+        get_block=get_block,
+        n_profiles=df.shape[0],
+        meta_df=meta_df,
+        eval_metric=eval_metric,
+        block_size=block_size,
+        output_format=output_format,
+        similarity_dtype=similarity_dtype,
+    )
+
+
+def _similarity_blocks(
+    df: pd.DataFrame,
+    eval_metric: str,
+    similarity_metric: str,
+    block_size: int,
+    prefetch: bool,
+) -> (Callable[[int, int], np.ndarray], int):
+    if is_chunked_array(df):
+        if block_size is None:
+            block_size = get_default_block_size(df.shape[0])
+            # Blocks of whole chunks are read without decompressing a chunk twice
+            chunk_rows = get_array_chunk_rows(df)
+            if chunk_rows is not None and block_size > chunk_rows:
+                block_size -= block_size % chunk_rows
+
+        get_block = partial(
+            _chunked_similarity_block,
+            features=df,
+            similarity_metric=similarity_metric,
+            block_size=block_size,
+            upper=get_melt_similarity(eval_metric) == "upper",
+            prefetch=prefetch,
+        )
+        return get_block, block_size
+
+    # Rows are centered and scaled so that dot products are correlations
+    standardized = standardize_profiles(df.values, similarity_metric)
+    get_block = partial(_standardized_similarity_block, standardized=standardized)
+    return get_block, block_size
+
+
+def _standardized_similarity_block(
+    start: int, stop: int, standardized: np.ndarray
+) -> np.ndarray:
+    return standardized[start:stop] @ standardized.T
+
+
+def _chunked_similarity_block(
+    start: int,
+    stop: int,
+    features,
+    similarity_metric: str,
+    block_size: int,
+    upper: bool,
+    prefetch: bool,
+) -> np.ndarray:
+    # Similarities of rows start:stop to all profiles, from standardized blocks of
+    # features read in the order of the sweep. Similarities left of the diagonal are
+    # not calculated if only the upper triangle is melted.
+    n_profiles = features.shape[0]
+    bounds = [(start, stop)] + [
+        (x, min(x + block_size, n_profiles))
+        for x in range(0, n_profiles, block_size)
+        if x >= stop or (not upper and x + block_size <= start)
+    ]
+
+    block = np.empty((stop - start, n_profiles), dtype=np.float64)
+    blocks = iter_array_blocks(features, bounds=bounds, prefetch=prefetch)
+    rows = standardize_profiles(next(blocks), similarity_metric)
+    block[:, start:stop] = rows @ rows.T
+    for (col_start, col_stop), columns in zip(bounds[1:], blocks):
+        columns = standardize_profiles(columns, similarity_metric)
+        block[:, col_start:col_stop] = rows @ columns.T
+
+    return block
+
+
+def process_melt_matrix(
+    similarity: Union[np.ndarray, PackedSimilarity],
+    meta_df: pd.DataFrame,
+    eval_metric: str = "replicate_reproducibility",
+    block_size: int = None,
+    output_format: str = "pandas",
+    similarity_dtype: str = "float64",
+) -> pd.DataFrame:
+    """Helper function to melt a precomputed similarity matrix without modifying it
+
+    The output is identical to
+    :py:func:`cytominer_eval.transform.transform.process_melt_tiled`, so the matrix can
+    be read-only, e.g. shared by several processes (see
+    :py:class:`cytominer_eval.utils.shared_utils.SharedProfiles`).
+
+    Parameters
+    ----------
+    similarity : {np.ndarray, cytominer_eval.utils.packed_utils.PackedSimilarity}
+        A profiles x profiles similarity matrix. Rows of a packed matrix are gathered
+        one block at a time.
+    meta_df : pandas.DataFrame
+        A wide matrix of metadata information where the index aligns to the rows of
+        the similarity matrix
+    eval_metric : str, optional
+        Which metric to ultimately calculate. Determines whether or not to keep the full
+        similarity matrix or only one diagonal. Defaults to "replicate_reproducibility".
+    block_size : int, optional
+        How many rows of the matrix to melt at once. Defaults to a block size of at
+        most 64 MiB.
+    output_format : {'pandas', 'arrow', 'polars'}, optional
+        Whether to return a pandas.DataFrame (default), or a pyarrow.Table or
+        polars.DataFrame with dictionary-encoded (categorical) metadata columns.
+    similarity_dtype : {'float64', 'float32', 'float16'}, optional
+        The float type of the melted similarities. Defaults to "float64".
+
+    Returns
+    -------
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        A pairwise similarity matrix
+    """
+    check_eval_metric(eval_metric)
+    assert similarity.shape[0] == similarity.shape[1], "Matrix must be symmetrical"
+
+    if isinstance(similarity, PackedSimilarity):
+        get_block = similarity.rows
+    else:
+        get_block = partial(_matrix_block, similarity=similarity)
+
+    return _melt_blocks(
+        get_block=get_block,
+        n_profiles=similarity.shape[0],
+        meta_df=meta_df,
+        eval_metric=eval_metric,
+        block_size=block_size,
+        output_format=output_format,
+        similarity_dtype=similarity_dtype,
+    )
+
+
+def _matrix_block(start: int, stop: int, similarity: np.ndarray) -> np.ndarray:
+    return similarity[start:stop]
+
+
+def _iter_pair_blocks(
+    get_block: Callable[[int, int], np.ndarray],
+    n_profiles: int,
+    eval_metric: str,
+    block_size: int,
+) -> Iterator[tuple]:
+    # The similarity, pair_a and pair_b index of the melted pairs of each block of
+    # profiles, including undefined similarities
+    upper = get_melt_similarity(eval_metric) == "upper"
+    columns = np.arange(n_profiles)
+    for start in range(0, n_profiles, block_size):
+        stop = min(start + block_size, n_profiles)
+        rows = np.arange(start, stop)
+
+        block = get_block(start, stop)
+        if upper:
+            keep = columns[np.newaxis, :] > rows[:, np.newaxis]
+        else:
+            keep = columns[np.newaxis, :] != rows[:, np.newaxis]
+
+        yield start, stop, (
+            block[keep],
+            np.repeat(rows, keep.sum(axis=1)),
+            np.broadcast_to(columns, keep.shape)[keep],
+        )
+
+
+def _melt_blocks(
+    get_block: Callable[[int, int], np.ndarray],
+    n_profiles: int,
+    meta_df: pd.DataFrame,
+    eval_metric: str,
+    block_size: int,
+    output_format: str = "pandas",
+    similarity_dtype: str = "float64",
+) -> pd.DataFrame:
+    check_output_format(output_format)
+    check_similarity_dtype(similarity_dtype, melted=True)
+    pair_ids = set_pair_ids()
+    if block_size is None:
+        block_size = get_default_block_size(n_profiles)
+
+    # Melted rows are ordered by pair_a, then by pair_b, so each block of profiles
+    # fills a contiguous segment of the output
+    offsets = get_pair_offsets(n_profiles, eval_metric)
+    similarity = np.empty(offsets[-1], dtype=similarity_dtype)
+    pair_a = np.empty(offsets[-1], dtype=np.int64)
+    pair_b = np.empty(offsets[-1], dtype=np.int64)
+
+    for start, stop, block_pairs in _iter_pair_blocks(
+        get_block=get_block,
+        n_profiles=n_profiles,
+        eval_metric=eval_metric,
+        block_size=block_size,
+    ):
+        segment = slice(offsets[start], offsets[stop])
+        similarity[segment], pair_a[segment], pair_b[segment] = block_pairs
+
+    # Similarities of zero variance profiles are undefined
+    defined = ~np.isnan(similarity)
+    if not defined.all():
+        similarity = similarity[defined]
+        pair_a = pair_a[defined]
+        pair_b = pair_b[defined]
+
+    if output_format in ["arrow", "polars"]:
+        import pyarrow as pa
+
+        # Metadata columns store the profile of each row as an index into the
+        # distinct values of the column, instead of a copy of the value
+        output = {}
+        for pair, pair_index in [("pair_a", pair_a), ("pair_b", pair_b)]:
+            for col in meta_df.columns:
+                output["{col}{suf}".format(col=col, suf=pair_ids[pair]["suffix"])] = (
+                    dictionary_take(meta_df.loc[:, col], pair_index)
+                )
+        output[pair_ids["pair_a"]["index"]] = pair_a
+        output[pair_ids["pair_b"]["index"]] = pair_b
+        output["similarity_metric"] = similarity
+
+        if output_format == "polars":
+            return to_polars(pa.table(output))
+        return pa.table(output)
+
+    # Metadata is gathered into a single preallocated block, which pandas does not
+    # need to copy when building the output dataframe
+    meta_columns = []
+    meta_values = np.empty((similarity.shape[0], 2 * meta_df.shape[1]), dtype=object)
+    for pair, pair_index in [("pair_a", pair_a), ("pair_b", pair_b)]:
+        for col in meta_df.columns:
+            meta_values[:, len(meta_columns)] = meta_df.loc[:, col].values[pair_index]
+            meta_columns.append(
+                "{col}{suf}".format(col=col, suf=pair_ids[pair]["suffix"])
+            )
+
+    output_df = pd.DataFrame(meta_values, columns=meta_columns, copy=False)
+    output_df[pair_ids["pair_a"]["index"]] = pair_a
+    output_df[pair_ids["pair_b"]["index"]] = pair_b
+    output_df["similarity_metric"] = similarity
+
+    return output_df
+
+
 def metric_melt(
     df: pd.DataFrame,
     features: List[str],
     metadata_features: List[str],
     eval_metric: str = "replicate_reproducibility",
     similarity_metric: str = "pearson",
+    cache: EvaluationCache = None,
+    profiler: EvaluationProfiler = None,
+    similarity_strategy: str = "dense",
+    block_size: int = None,
+    output_format: str = None,
+    similarity_dtype: str = "float64",
 ) -> pd.DataFrame:
     """Helper function to fully transform an input dataframe of metadata and feature
     columns into a long, melted dataframe of pairwise metric comparisons between
@@ -128,8 +552,17 @@ def metric_melt(
 
     Parameters
     ----------
-    df : pandas.DataFrame
-        A profiling dataset with a mixture of metadata and feature columns
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame, str, cytominer_eval.utils.io_utils.ProfileArrays}
+        A profiling dataset with a mixture of metadata and feature columns. Feature
+        columns of a pyarrow.Table or Polars frame, or Arrow-backed columns of a pandas
+        DataFrame, are read without intermediate copies. Only the used columns of a
+        polars.LazyFrame are collected. The location of a CSV or Parquet file is read
+        in batches with
+        :py:func:`cytominer_eval.utils.io_utils.read_profile_arrays`. The float64
+        feature array of a :py:class:`cytominer_eval.utils.io_utils.ProfileArrays`,
+        which holds features and metadata separately, is used without a copy. Its
+        features on disk (np.memmap, zarr.Array, h5py.Dataset) are read one block at
+        a time if `similarity_strategy='tiled'` and no cache is given.
     features : list
         Which features make up the profile; included in the pairwise calculations
     metadata_features : list
@@ -140,13 +573,148 @@ def metric_melt(
         similarity matrix or only one diagonal. Defaults to "replicate_reproducibility".
     similarity_metric : str, optional
         The pairwise comparison to calculate
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix and the melted dataframe are looked
+        up in, and stored to, the cache as separate stages. Defaults to None.
+    profiler : cytominer_eval.utils.profiling_utils.EvaluationProfiler, optional
+        If provided, record timing and memory of the dtype conversion, pairwise
+        similarity and melting stages. Defaults to None.
+    similarity_strategy : {'dense', 'tiled', 'packed'}, optional
+        How to calculate and melt pairwise similarities. "dense" calculates the full
+        similarity matrix before melting it. "tiled" calculates similarities one block
+        of profiles at a time and writes them directly to the melted output, which
+        lowers peak memory (pearson and spearman only). "packed" calculates and stores
+        only the upper triangle of the similarity matrix, see
+        :py:func:`cytominer_eval.transform.transform.get_packed_pairwise_metric`, and
+        melts it one block of rows at a time. Defaults to "dense". See also
+        :py:func:`cytominer_eval.utils.planner_utils.plan_evaluation`.
+    block_size : int, optional
+        Only used when `similarity_strategy` is "tiled" or "packed". How many profiles
+        to process at once. See
+        :py:func:`cytominer_eval.transform.transform.process_melt_tiled`.
+    output_format : {'pandas', 'arrow', 'polars'}, optional
+        Whether to return a pandas.DataFrame, a pyarrow.Table or a polars.DataFrame.
+        Metadata columns of a pyarrow.Table or polars.DataFrame are dictionary-encoded
+        (categorical), which stores each distinct metadata value once instead of once
+        per pair of profiles. Defaults to "polars" for Polars profiles, and "pandas"
+        otherwise.
+    similarity_dtype : {'float64', 'float32', 'float16'}, optional
+        The float type of the melted similarities, which operations read directly.
+        Defaults to "float64". See
+        :py:mod:`cytominer_eval.utils.quantize_utils` for the error of each type.
 
     Returns
     -------
-    pandas.DataFrame
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
         A fully melted dataframe of pairwise correlations and associated metadata
     """
-    # Subset dataframes to specific features
+    with activate_profiler(profiler), profile_stage("metric_melt") as record:
+        check_similarity_metric(similarity_metric)
+        check_similarity_strategy(similarity_strategy, similarity_metric)
+        check_similarity_dtype(similarity_dtype, melted=True)
+        if output_format is None:
+            output_format = "polars" if is_polars_frame(df) else "pandas"
+        check_output_format(output_format)
+
+        # Subset dataframes to specific features. Features on disk are only read in
+        # blocks by the tiled strategy, the other stages read them into memory.
+        meta_df, df = _split_profiles(
+            df=df,
+            features=features,
+            metadata_features=metadata_features,
+            out_of_core=cache is None and similarity_strategy == "tiled",
+        )
+
+        # Convert pandas column types and assert conversion success
+        with profile_stage("assert_pandas_dtypes") as dtype_record:
+            meta_df = assert_pandas_dtypes(df=meta_df, col_fix=str)
+            if not is_chunked_array(df):
+                df = assert_pandas_dtypes(df=df, col_fix=float)
+            dtype_record["n_rows"] = df.shape[0]
+
+        if output_format in ["arrow", "polars"]:
+            output_df = _arrow_melt(
+                df=df,
+                meta_df=meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+                cache=cache,
+                similarity_strategy=similarity_strategy,
+                block_size=block_size,
+                output_format=output_format,
+                similarity_dtype=similarity_dtype,
+            )
+        elif cache is None and similarity_strategy == "packed":
+            output_df = _packed_melt(
+                df=df,
+                meta_df=meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+                cache=cache,
+                block_size=block_size,
+                similarity_dtype=similarity_dtype,
+            )
+        elif cache is None and similarity_strategy == "tiled":
+            output_df = _profiled_process_melt_tiled(
+                df=df,
+                meta_df=meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+                block_size=block_size,
+                similarity_dtype=similarity_dtype,
+            )
+        elif cache is None:
+            # Get pairwise metric matrix
+            pair_df = _profiled_pairwise_metric(
+                df=df, similarity_metric=similarity_metric
+            )
+
+            # Convert pairwise matrix into metadata-labeled melted matrix
+            output_df = _profiled_process_melt(
+                df=pair_df, meta_df=meta_df, eval_metric=eval_metric
+            )
+        else:
+            output_df = _cached_melt(
+                df=df,
+                meta_df=meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+                cache=cache,
+                similarity_strategy=similarity_strategy,
+                block_size=block_size,
+            )
+
+        if output_format == "pandas":
+            output_df = _cast_similarity(output_df, similarity_dtype=similarity_dtype)
+        record["n_rows"] = output_df.shape[0]
+
+    return output_df
+
+
+def _split_profiles(
+    df: pd.DataFrame,
+    features: List[str],
+    metadata_features: List[str],
+    out_of_core: bool = False,
+) -> (pd.DataFrame, pd.DataFrame):
+    # Arrow feature columns are gathered into one float array, while pandas would
+    # copy them once to subset and once more to convert their dtype
+    if is_profile_path(df):
+        df = read_profile_arrays(df, features=features, meta_features=metadata_features)
+
+    if isinstance(df, ProfileArrays):
+        return df.split(
+            features=features, meta_features=metadata_features, out_of_core=out_of_core
+        )
+
+    if is_polars_frame(df):
+        df = polars_to_arrow(df, columns=metadata_features + features)
+
+    if is_arrow_table(df):
+        return split_arrow_profiles(
+            df, features=features, meta_features=metadata_features
+        )
+
     df = df.reset_index(drop=True)
 
     assert all(
@@ -154,17 +722,532 @@ def metric_melt(
     ), "Metadata feature not found"
     assert all([x in df.columns for x in features]), "Profile feature not found"
 
-    meta_df = df.loc[:, metadata_features]
-    df = df.loc[:, features]
+    if is_arrow_backed(df, features):
+        return split_arrow_profiles(
+            df, features=features, meta_features=metadata_features
+        )
+
+    return df.loc[:, metadata_features], df.loc[:, features]
 
-    # Convert pandas column types and assert conversion success
+
+def _cached_melt(
+    df: pd.DataFrame,
+    meta_df: pd.DataFrame,
+    eval_metric: str,
+    similarity_metric: str,
+    cache: EvaluationCache,
+    similarity_strategy: str,
+    block_size: int,
+) -> pd.DataFrame:
+    # Each stage is keyed by the content of its inputs so that a change in metadata
+    # or eval_metric reuses the (expensive) pairwise similarity matrix, and eval
+    # metrics melting the same similarities share the melted dataframe
+    similarity_key = _similarity_key(
+        df=df, similarity_metric=similarity_metric, cache=cache
+    )
+    melt_key = hash_parameters(
+        similarity=similarity_key,
+        metadata=hash_pandas(meta_df),
+        melt_similarity=get_melt_similarity(eval_metric),
+    )
+
+    found, output_df = cache.get("melt", melt_key)
+    if found:
+        return output_df
+
+    melt_dtype = get_melt_similarity_dtype(cache.similarity_dtype)
+    if similarity_strategy == "tiled":
+        # The tiled strategy never materializes the pairwise similarity matrix
+        output_df = _profiled_process_melt_tiled(
+            df=df,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            similarity_metric=similarity_metric,
+            block_size=block_size,
+            similarity_dtype=melt_dtype,
+        )
+        cache.put("melt", melt_key, output_df)
+        return output_df
+
+    if similarity_strategy == "packed":
+        output_df = _packed_melt(
+            df=df,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            similarity_metric=similarity_metric,
+            cache=cache,
+            block_size=block_size,
+            similarity_key=similarity_key,
+            similarity_dtype=melt_dtype,
+        )
+        cache.put("melt", melt_key, output_df)
+        return output_df
+
+    pair_df = _cached_pairwise_metric(
+        df=df,
+        similarity_metric=similarity_metric,
+        cache=cache,
+        similarity_key=similarity_key,
+    )
+    output_df = _profiled_process_melt(
+        df=pair_df, meta_df=meta_df, eval_metric=eval_metric
+    )
+    output_df = _cast_similarity(output_df, similarity_dtype=melt_dtype)
+    cache.put("melt", melt_key, output_df)
+
+    return output_df
+
+
+def _cast_similarity(output_df: pd.DataFrame, similarity_dtype: str) -> pd.DataFrame:
+    # Cached dataframes are shared, so the column is replaced in a copy
+    if output_df["similarity_metric"].dtype == similarity_dtype:
+        return output_df
+    return output_df.assign(
+        similarity_metric=output_df["similarity_metric"].astype(similarity_dtype)
+    )
+
+
+def _arrow_melt(
+    df: pd.DataFrame,
+    meta_df: pd.DataFrame,
+    eval_metric: str,
+    similarity_metric: str,
+    cache: EvaluationCache,
+    similarity_strategy: str,
+    block_size: int,
+    output_format: str,
+    similarity_dtype: str,
+):
+    # Only the pairwise similarity matrix is cached, the melted table is built from
+    # pair indices, which is cheaper than a round trip through pandas
+    if similarity_strategy == "tiled":
+        with profile_stage("process_melt_tiled") as record:
+            output_table = process_melt_tiled(
+                df=df,
+                meta_df=meta_df,
+                eval_metric=eval_metric,
+                similarity_metric=similarity_metric,
+                block_size=block_size,
+                output_format=output_format,
+                similarity_dtype=similarity_dtype,
+            )
+            record["n_rows"] = output_table.shape[0]
+        return output_table
+
+    if similarity_strategy == "packed":
+        return _packed_melt(
+            df=df,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            similarity_metric=similarity_metric,
+            cache=cache,
+            block_size=block_size,
+            output_format=output_format,
+            similarity_dtype=similarity_dtype,
+        )
+
+    if cache is None:
+        pair_df = _profiled_pairwise_metric(df=df, similarity_metric=similarity_metric)
+    else:
+        pair_df = _cached_pairwise_metric(
+            df=df, similarity_metric=similarity_metric, cache=cache
+        )
+
+    with profile_stage("process_melt") as record:
+        output_table = process_melt_matrix(
+            similarity=pair_df.values,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            block_size=block_size,
+            output_format=output_format,
+            similarity_dtype=similarity_dtype,
+        )
+        record["n_rows"] = output_table.shape[0]
+    return output_table
+
+
+def _packed_melt(
+    df: pd.DataFrame,
+    meta_df: pd.DataFrame,
+    eval_metric: str,
+    similarity_metric: str,
+    cache: EvaluationCache,
+    block_size: int,
+    output_format: str = "pandas",
+    similarity_key: str = None,
+    similarity_dtype: str = "float64",
+):
+    # The packed matrix is a separate cache entry from the square matrix of the
+    # dense strategy, at half its size
+    if cache is None:
+        packed = _profiled_packed_pairwise_metric(
+            df=df, similarity_metric=similarity_metric, block_size=block_size
+        )
+    else:
+        if similarity_key is None:
+            similarity_key = _similarity_key(
+                df=df, similarity_metric=similarity_metric, cache=cache
+            )
+        packed_key = hash_parameters(similarity=similarity_key, storage="packed")
+        found, packed = cache.get("similarity", packed_key)
+        if not found:
+            packed = _profiled_packed_pairwise_metric(
+                df=df, similarity_metric=similarity_metric, block_size=block_size
+            ).quantize(cache.similarity_dtype)
+            cache.put("similarity", packed_key, packed)
+
+    with profile_stage("process_melt") as record:
+        output_df = process_melt_matrix(
+            similarity=packed,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            block_size=block_size,
+            output_format=output_format,
+            similarity_dtype=similarity_dtype,
+        )
+        record["n_rows"] = output_df.shape[0]
+    return output_df
+
+
+def write_melt_parquet(
+    df: pd.DataFrame,
+    path: str,
+    features: List[str],
+    metadata_features: List[str],
+    eval_metric: str = "replicate_reproducibility",
+    similarity_metric: str = "pearson",
+    block_size: int = None,
+    metadata_storage: str = "dictionary",
+    partition_col: str = None,
+    similarity_dtype: str = "float64",
+    prefetch: bool = True,
+) -> List[str]:
+    """Write melted pairwise similarities to Parquet files one block of profiles at a
+    time
+
+    Similarities of each block of profiles are calculated as in
+    :py:func:`cytominer_eval.transform.transform.process_melt_tiled` and written as
+    row groups, so that neither the similarity matrix nor the melted similarities are
+    held in memory. The files hold the rows of
+    :py:func:`cytominer_eval.transform.metric_melt`, in the same order, and are read
+    back with pyarrow.dataset.dataset(path, partitioning="hive").
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame, str, cytominer_eval.utils.io_utils.ProfileArrays}
+        A profiling dataset with a mixture of metadata and feature columns, as for
+        :py:func:`cytominer_eval.transform.metric_melt`. Features on disk of a
+        :py:class:`cytominer_eval.utils.io_utils.ProfileArrays` are read one block at
+        a time.
+    path : str
+        The directory to write to. Existing files of the same names are replaced.
+    features : list
+        Which features make up the profile; included in the pairwise calculations
+    metadata_features : list
+        Which features are considered metadata features
+    eval_metric : str, optional
+        Which metric the similarities are melted for, which determines whether to
+        write the upper triangle or the full matrix without diagonal. Defaults to
+        "replicate_reproducibility".
+    similarity_metric : {'pearson', 'spearman'}, optional
+        The pairwise comparison to calculate. Defaults to "pearson".
+    block_size : int, optional
+        How many profiles to process at once. Each block is written as one row group
+        per file. Defaults to a block size of at most 64 MiB.
+    metadata_storage : {'dictionary', 'dimension'}, optional
+        "dictionary" (default) writes the pair_a and pair_b metadata columns
+        dictionary-encoded in every row group. "dimension" writes them once, as a
+        `_profiles.parquet` table of the metadata by profile_index, which readers
+        join on the pair_a_index and pair_b_index columns.
+    partition_col : str, optional
+        A metadata column, e.g. the plate, to partition files by. Pairs are written to
+        `{partition_col}={value}` directories by the value of their pair_a profile.
+        Defaults to a single file.
+    similarity_dtype : {'float64', 'float32'}, optional
+        The float type of the written similarities. Defaults to "float64".
+    prefetch : bool, optional
+        Only used for features on disk, see
+        :py:func:`cytominer_eval.transform.transform.process_melt_tiled`. Defaults to
+        True.
+
+    Returns
+    -------
+    list
+        The locations of the written files
+    """
+    check_eval_metric(eval_metric)
+    check_similarity_metric(similarity_metric)
+    check_similarity_strategy(
+        similarity_strategy="tiled", similarity_metric=similarity_metric
+    )
+    check_metadata_storage(metadata_storage)
+    assert similarity_dtype in [
+        "float64",
+        "float32",
+    ], "{d} not supported by Parquet. Use one of: {avail}".format(
+        d=similarity_dtype, avail=["float64", "float32"]
+    )
+
+    meta_df, df = _split_profiles(
+        df=df, features=features, metadata_features=metadata_features, out_of_core=True
+    )
     meta_df = assert_pandas_dtypes(df=meta_df, col_fix=str)
+    if not is_chunked_array(df):
+        df = assert_pandas_dtypes(df=df, col_fix=float)
+    n_profiles = df.shape[0]
+    if block_size is None:
+        block_size = get_default_block_size(n_profiles)
+    get_block, block_size = _similarity_blocks(
+        df=df,
+        eval_metric=eval_metric,
+        similarity_metric=similarity_metric,
+        block_size=block_size,
+        prefetch=prefetch,
+    )
+
+    os.makedirs(path, exist_ok=True)
+    dictionaries = _write_parquet_metadata(
+        meta_df=meta_df, path=path, metadata_storage=metadata_storage
+    )
+    partition_codes, partition_paths = _get_parquet_partitions(
+        meta_df=meta_df, path=path, partition_col=partition_col
+    )
+
+    writers = {}
+    try:
+        for _, _, (similarity, pair_a, pair_b) in _iter_pair_blocks(
+            get_block=get_block,
+            n_profiles=n_profiles,
+            eval_metric=eval_metric,
+            block_size=block_size,
+        ):
+            # Similarities of zero variance profiles are undefined
+            defined = ~np.isnan(similarity)
+            table = _get_pair_table(
+                similarity=similarity[defined].astype(similarity_dtype),
+                pair_a=pair_a[defined],
+                pair_b=pair_b[defined],
+                dictionaries=dictionaries,
+            )
+            _write_row_groups(
+                writers=writers,
+                table=table,
+                block_partitions=partition_codes[pair_a[defined]],
+                partition_paths=partition_paths,
+            )
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return [partition_paths[x] for x in sorted(writers)]
+
+
+def _write_parquet_metadata(
+    meta_df: pd.DataFrame, path: str, metadata_storage: str
+) -> dict:
+    # The dictionary of each metadata column written with the pairs, none if the
+    # metadata is written once as a table by profile_index
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    n_profiles = meta_df.shape[0]
+    if metadata_storage == "dimension":
+        profile_table = pa.table({"profile_index": np.arange(n_profiles)})
+        for col in meta_df.columns:
+            profile_table = profile_table.append_column(
+                col, dictionary_take(meta_df.loc[:, col], np.arange(n_profiles))
+            )
+        pq.write_table(profile_table, os.path.join(path, "_profiles.parquet"))
+        return {}
+
+    # Each metadata column is encoded once, and each row group stores the
+    # dictionary of its column chunks
+    return {col: factorize_dictionary(meta_df.loc[:, col]) for col in meta_df.columns}
+
+
+def _get_parquet_partitions(
+    meta_df: pd.DataFrame, path: str, partition_col: str
+) -> (np.ndarray, List[str]):
+    # The partition of each profile, and the file of each partition
+    if partition_col is None:
+        partition_codes = np.zeros(meta_df.shape[0], dtype=np.int64)
+        return partition_codes, [os.path.join(path, "part-0.parquet")]
+
+    assert partition_col in meta_df.columns, "Partition column not found"
+    partition_codes, partition_values = pd.factorize(meta_df.loc[:, partition_col])
+    partition_paths = []
+    for value in partition_values:
+        partition_dir = os.path.join(
+            path, "{col}={value}".format(col=partition_col, value=value)
+        )
+        os.makedirs(partition_dir, exist_ok=True)
+        partition_paths.append(os.path.join(partition_dir, "part-0.parquet"))
+    return partition_codes, partition_paths
+
+
+def _get_pair_table(
+    similarity: np.ndarray,
+    pair_a: np.ndarray,
+    pair_b: np.ndarray,
+    dictionaries: dict,
+):
+    import pyarrow as pa
+
+    pair_ids = set_pair_ids()
+    columns = {}
+    for pair, pair_index in [("pair_a", pair_a), ("pair_b", pair_b)]:
+        for col, dictionary in dictionaries.items():
+            columns["{col}{suf}".format(col=col, suf=pair_ids[pair]["suffix"])] = (
+                dictionary_take(None, pair_index, dictionary=dictionary)
+            )
+    columns[pair_ids["pair_a"]["index"]] = pair_a
+    columns[pair_ids["pair_b"]["index"]] = pair_b
+    columns["similarity_metric"] = similarity
+    return pa.table(columns)
+
+
+def _write_row_groups(
+    writers: dict, table, block_partitions: np.ndarray, partition_paths: List[str]
+) -> None:
+    # Rows of each partition are written as one row group, opening the writer of a
+    # partition at its first rows
+    import pyarrow.parquet as pq
+
+    for partition in np.unique(block_partitions):
+        if partition not in writers:
+            writers[partition] = pq.ParquetWriter(
+                partition_paths[partition], table.schema
+            )
+        partition_table = table
+        if partition_paths[1:]:
+            partition_table = table.filter(block_partitions == partition)
+        writers[partition].write_table(
+            partition_table, row_group_size=max(1, partition_table.num_rows)
+        )
+
+
+def metric_matrix(
+    df: pd.DataFrame,
+    features: List[str],
+    similarity_metric: str = "pearson",
+    cache: EvaluationCache = None,
+) -> pd.DataFrame:
+    """Helper function to calculate the pairwise similarity matrix of profiles
+
+    The matrix is the same cached stage used by
+    :py:func:`cytominer_eval.transform.transform.metric_melt`, so that operations
+    consuming the matrix and operations consuming melted similarities share it.
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame, str, cytominer_eval.utils.io_utils.ProfileArrays}
+        A profiling dataset with a mixture of metadata and feature columns, or the
+        location of a CSV or Parquet file
+    features : list
+        Which features make up the profile; included in the pairwise calculations
+    similarity_metric : str, optional
+        The pairwise comparison to calculate
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix is looked up in, and stored to, the
+        cache. Defaults to None.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A profiles x profiles similarity matrix, in the row order of df
+    """
+    check_similarity_metric(similarity_metric)
+
+    _, df = _split_profiles(df=df, features=features, metadata_features=[])
     df = assert_pandas_dtypes(df=df, col_fix=float)
 
-    # Get pairwise metric matrix
-    pair_df = get_pairwise_metric(df=df, similarity_metric=similarity_metric)
+    if cache is None:
+        return _profiled_pairwise_metric(df=df, similarity_metric=similarity_metric)
+
+    return _cached_pairwise_metric(
+        df=df, similarity_metric=similarity_metric, cache=cache
+    )
 
-    # Convert pairwise matrix into metadata-labeled melted matrix
-    output_df = process_melt(df=pair_df, meta_df=meta_df, eval_metric=eval_metric)
 
+def _similarity_key(
+    df: pd.DataFrame, similarity_metric: str, cache: EvaluationCache
+) -> str:
+    return hash_parameters(
+        features=hash_pandas(df),
+        similarity_metric=similarity_metric,
+        similarity_dtype=cache.similarity_dtype,
+    )
+
+
+def _cached_pairwise_metric(
+    df: pd.DataFrame,
+    similarity_metric: str,
+    cache: EvaluationCache,
+    similarity_key: str = None,
+) -> pd.DataFrame:
+    if similarity_key is None:
+        similarity_key = _similarity_key(
+            df=df, similarity_metric=similarity_metric, cache=cache
+        )
+    found, pair_df = cache.get("similarity", similarity_key)
+    if not found:
+        pair_df = _profiled_pairwise_metric(df=df, similarity_metric=similarity_metric)
+        if cache.similarity_dtype != "float64":
+            # Quantized matrices are stored as their upper triangle
+            pair_df = PackedSimilarity.from_matrix(pair_df.values).quantize(
+                cache.similarity_dtype
+            )
+        cache.put("similarity", similarity_key, pair_df)
+
+    if isinstance(pair_df, PackedSimilarity):
+        pair_df = pd.DataFrame(pair_df.to_dense(), index=df.index, columns=df.index)
+
+    return pair_df
+
+
+def _profiled_pairwise_metric(df: pd.DataFrame, similarity_metric: str) -> pd.DataFrame:
+    with profile_stage("get_pairwise_metric") as record:
+        pair_df = get_pairwise_metric(df=df, similarity_metric=similarity_metric)
+        record["n_rows"] = pair_df.shape[0]
+    return pair_df
+
+
+def _profiled_packed_pairwise_metric(
+    df: pd.DataFrame, similarity_metric: str, block_size: int
+) -> PackedSimilarity:
+    with profile_stage("get_packed_pairwise_metric") as record:
+        packed = get_packed_pairwise_metric(
+            df=df, similarity_metric=similarity_metric, block_size=block_size
+        )
+        record["n_rows"] = packed.n_profiles
+    return packed
+
+
+def _profiled_process_melt(
+    df: pd.DataFrame, meta_df: pd.DataFrame, eval_metric: str
+) -> pd.DataFrame:
+    with profile_stage("process_melt") as record:
+        output_df = process_melt(df=df, meta_df=meta_df, eval_metric=eval_metric)
+        record["n_rows"] = output_df.shape[0]
+    return output_df
+
+
+def _profiled_process_melt_tiled(
+    df: pd.DataFrame,
+    meta_df: pd.DataFrame,
+    eval_metric: str,
+    similarity_metric: str,
+    block_size: int,
+    similarity_dtype: str = "float64",
+) -> pd.DataFrame:
+    with profile_stage("process_melt_tiled") as record:
+        output_df = process_melt_tiled(
+            df=df,
+            meta_df=meta_df,
+            eval_metric=eval_metric,
+            similarity_metric=similarity_metric,
+            block_size=block_size,
+            similarity_dtype=similarity_dtype,
+        )
+        record["n_rows"] = output_df.shape[0]
     return output_df
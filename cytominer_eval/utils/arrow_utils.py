@@ -0,0 +1,243 @@
+"""Exchange of profiles, melted similarities and results with Apache Arrow.
+
+pyarrow is an optional dependency, imported when Arrow data is first handled. Profiles
+can be a pyarrow.Table or a pandas DataFrame of Arrow-backed columns, whose feature
+columns are read in place instead of being converted by pandas.
+"""
+import sys
+import numpy as np
+import pandas as pd
+from typing import List
+
+
+def is_arrow_table(df) -> bool:
+    r"""Helper function to determine whether profiles are a pyarrow.Table
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table}
+        The profiles
+
+    Returns
+    -------
+    bool
+        Whether df is a pyarrow.Table
+    """
+    # A pyarrow.Table only exists if pyarrow was imported
+    return "pyarrow" in sys.modules and isinstance(df, sys.modules["pyarrow"].Table)
+
+
+def is_arrow_backed(df: pd.DataFrame, columns: List[str]) -> bool:
+    r"""Helper function to determine whether columns of a pandas DataFrame hold Arrow
+    arrays (pandas.ArrowDtype)
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The profiles
+    columns : list
+        The columns to check
+
+    Returns
+    -------
+    bool
+        Whether any of the columns is Arrow-backed
+    """
+    arrow_dtype = getattr(pd, "ArrowDtype", None)
+    if arrow_dtype is None:
+        return False
+    return any([isinstance(df[x].dtype, arrow_dtype) for x in columns])
+
+
+def get_feature_array(df, features: List[str], out: np.ndarray = None) -> np.array:
+    r"""Gather feature columns of Arrow data into a profiles x features float array
+
+    Numeric columns without missing values are read without intermediate copies, so
+    the output array is the only copy of the features.
+
+    Parameters
+    ----------
+    df : {pyarrow.Table, pandas.DataFrame}
+        A pyarrow.Table, or a pandas DataFrame of Arrow-backed columns
+    features : list
+        The feature columns
+    out : np.ndarray, optional
+        A float64 profiles x features array to write the features to, for example rows
+        of a larger preallocated array. Defaults to a new array.
+
+    Returns
+    -------
+    np.array
+        A float64 profiles x features array, in column-major order unless out is given
+    """
+    import pyarrow as pa
+
+    feature_array = out
+    if feature_array is None:
+        feature_array = np.empty(
+            (df.shape[0], len(features)), dtype=np.float64, order="F"
+        )
+    for i, feature in enumerate(features):
+        if is_arrow_table(df):
+            column = df.column(feature)
+        else:
+            column = df[feature].array
+            if hasattr(column, "__arrow_array__"):
+                column = column.__arrow_array__()
+            else:
+                column = pa.array(np.asarray(column))
+        if isinstance(column, pa.Array):
+            column = pa.chunked_array([column])
+
+        assert pa.types.is_integer(column.type) or pa.types.is_floating(
+            column.type
+        ), "Columns cannot be converted to {col}; check input features".format(
+            col=float
+        )
+
+        start = 0
+        for chunk in column.chunks:
+            # Chunks with missing values are copied and filled with NaN
+            values = chunk.to_numpy(zero_copy_only=chunk.null_count == 0)
+            feature_array[start : start + len(chunk), i] = values
+            start += len(chunk)
+
+    return feature_array
+
+
+def split_arrow_profiles(
+    df, features: List[str], meta_features: List[str]
+) -> (pd.DataFrame, pd.DataFrame):
+    r"""Split Arrow profiles into a metadata and a feature dataframe
+
+    Parameters
+    ----------
+    df : {pyarrow.Table, pandas.DataFrame}
+        A pyarrow.Table, or a pandas DataFrame with Arrow-backed feature columns
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+
+    Returns
+    -------
+    (pandas.DataFrame, pandas.DataFrame)
+        The metadata, and the features as float64 columns, with a range index
+    """
+    if is_arrow_table(df):
+        assert all(
+            [x in df.column_names for x in meta_features]
+        ), "Metadata feature not found"
+        assert all(
+            [x in df.column_names for x in features]
+        ), "Profile feature not found"
+        meta_df = df.select(meta_features).to_pandas()
+        # Missing values are NaN, as in dataframes read by pandas
+        meta_df = meta_df.where(meta_df.notna(), np.nan)
+    else:
+        df = df.reset_index(drop=True)
+        meta_df = df.loc[:, meta_features]
+
+    # The column-major feature array backs the dataframe without a copy
+    feature_df = pd.DataFrame(
+        get_feature_array(df, features), columns=features, copy=False
+    )
+
+    return meta_df, feature_df
+
+
+def arrow_to_profiles(
+    df, features: List[str], meta_features: List[str]
+) -> pd.DataFrame:
+    r"""Convert a pyarrow.Table of profiles to a pandas DataFrame
+
+    Parameters
+    ----------
+    df : pyarrow.Table
+        The profiles
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+
+    Returns
+    -------
+    pandas.DataFrame
+        The metadata and feature columns of the profiles
+    """
+    meta_df, feature_df = split_arrow_profiles(
+        df, features=features, meta_features=meta_features
+    )
+    # Features listed as metadata too are not duplicated
+    feature_df = feature_df.loc[:, [x for x in features if x not in meta_features]]
+    return pd.concat([meta_df, feature_df], axis="columns")
+
+
+def factorize_dictionary(values: pd.Series):
+    r"""Helper function to encode metadata values as codes into their distinct values
+
+    Parameters
+    ----------
+    values : pandas.Series
+        The metadata value of each profile
+
+    Returns
+    -------
+    (np.array, pyarrow.Array)
+        The int32 code of each profile, and the distinct values
+    """
+    import pyarrow as pa
+
+    codes, categories = pd.factorize(values)
+    return codes.astype(np.int32), pa.array(np.asarray(categories))
+
+
+def dictionary_take(values: pd.Series, index: np.ndarray, dictionary: tuple = None):
+    r"""Helper function to build a dictionary-encoded Arrow array of metadata values
+    at given rows
+
+    Parameters
+    ----------
+    values : pandas.Series
+        The metadata value of each profile
+    index : np.ndarray
+        The profile of each output row
+    dictionary : tuple, optional
+        The output of
+        :py:func:`cytominer_eval.utils.arrow_utils.factorize_dictionary` for values,
+        to encode values once for many calls. Defaults to encoding values.
+
+    Returns
+    -------
+    pyarrow.DictionaryArray
+        values[index], storing each distinct value once
+    """
+    import pyarrow as pa
+
+    if dictionary is None:
+        dictionary = factorize_dictionary(values)
+    codes, categories = dictionary
+    return pa.DictionaryArray.from_arrays(pa.array(codes[index]), categories)
+
+
+def to_arrow(df: pd.DataFrame):
+    r"""Convert a pandas DataFrame of results to a pyarrow.Table
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A dataframe, for example the output of an operation
+
+    Returns
+    -------
+    pyarrow.Table
+        The dataframe, with string columns dictionary-encoded
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+
+    return table
@@ -1,13 +1,9 @@
+from cytominer_eval.operations.registry import get_registered_operations
+
+
 def get_available_eval_metrics():
     """Output the available eval metrics in the cytominer_eval library"""
-    return [
-        "replicate_reproducibility",
-        "precision_recall",
-        "grit",
-        "mp_value",
-        "enrichment",
-        "hitk",
-    ]
+    return get_registered_operations()
 
 
 def get_available_similarity_metrics():
@@ -15,6 +11,81 @@ def get_available_similarity_metrics():
     return ["pearson", "kendall", "spearman"]
 
 
+def get_available_similarity_strategies():
+    """Output the available strategies for computing and melting pairwise similarity"""
+    return ["dense", "tiled", "packed"]
+
+
+def get_available_tiled_similarity_metrics():
+    """Output the similarity metrics supported by the tiled similarity strategy"""
+    return ["pearson", "spearman"]
+
+
+def get_available_bootstrap_operations():
+    """Output the eval metrics that can be bootstrapped from a similarity matrix"""
+    return ["replicate_reproducibility", "precision_recall", "enrichment", "hitk"]
+
+
+def get_available_permutation_operations():
+    """Output the eval metrics that can be tested by permuting replicate labels"""
+    return ["replicate_reproducibility", "enrichment"]
+
+
+def get_available_resample_methods():
+    """Output the available methods to resample profiles"""
+    return ["profiles", "groups"]
+
+
+def get_available_pca_solvers():
+    """Output the available solvers for the PCA of mp_value"""
+    return ["full", "randomized", "incremental"]
+
+
+def get_available_control_statistics_methods():
+    """Output the available methods to reuse control statistics in mp_value"""
+    return ["exact"]
+
+
+def get_available_covariance_estimators():
+    """Output the available covariance estimators for the mahalanobis distance"""
+    return ["empirical", "ledoit_wolf", "oas"]
+
+
+def get_available_mahalanobis_solvers():
+    """Output the available solvers for the mahalanobis distance"""
+    return ["pinv", "cholesky"]
+
+
+def get_available_execution_backends():
+    """Output the available backends to run independent tasks"""
+    return ["serial", "threads", "processes"]
+
+
+def get_available_kernel_backends():
+    """Output the available implementations of compiled kernels"""
+    return ["numba", "numpy"]
+
+
+def get_available_output_formats():
+    """Output the available formats of results and melted similarities"""
+    return ["pandas", "arrow", "polars"]
+
+
+def get_available_similarity_dtypes():
+    """Output the available storage types of similarities"""
+    return ["float64", "float32", "float16", "int16", "int8"]
+
+
+def get_available_melt_similarity_dtypes():
+    """Output the available storage types of melted similarities"""
+    return ["float64", "float32", "float16"]
+
+
+def get_available_metadata_storages():
+    """Output the available layouts of metadata in exported melted similarities"""
+    return ["dictionary", "dimension"]
+
+
 def get_available_summary_methods():
     """Output the available metrics for summarizing output scores"""
     return ["mean", "median"]
@@ -69,6 +140,308 @@ def check_similarity_metric(similarity_metric: str) -> None:
     )
 
 
+def check_similarity_strategy(similarity_strategy: str, similarity_metric: str) -> None:
+    """Helper function to ensure that we support the input similarity strategy
+
+    Parameters
+    ----------
+    similarity_strategy : str
+        The user input similarity strategy
+    similarity_metric : str
+        The user input similarity metric
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input similarity strategy for the
+        input similarity metric
+    """
+    avail_strategies = get_available_similarity_strategies()
+
+    assert (
+        similarity_strategy in avail_strategies
+    ), "{s} not supported. Available similarity strategies: {avail}".format(
+        s=similarity_strategy, avail=avail_strategies
+    )
+
+    if similarity_strategy == "tiled":
+        avail_metrics = get_available_tiled_similarity_metrics()
+        assert (
+            similarity_metric in avail_metrics
+        ), "{m} not supported by the tiled strategy. Use one of: {avail}".format(
+            m=similarity_metric, avail=avail_metrics
+        )
+
+
+def check_bootstrap_operation(operation: str) -> None:
+    """Helper function to ensure that we support bootstrapping the input eval metric
+
+    Parameters
+    ----------
+    operation : str
+        The user input eval metric
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support bootstrapping the input eval metric
+    """
+    avail_operations = get_available_bootstrap_operations()
+
+    assert (
+        operation in avail_operations
+    ), "{op} not supported. Select one of {avail}".format(
+        op=operation, avail=avail_operations
+    )
+
+
+def check_permutation_operation(operation: str) -> None:
+    """Helper function to ensure that we support permutation tests of the eval metric
+
+    Parameters
+    ----------
+    operation : str
+        The user input eval metric
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support permutation tests of the eval metric
+    """
+    avail_operations = get_available_permutation_operations()
+
+    assert (
+        operation in avail_operations
+    ), "{op} not supported. Select one of {avail}".format(
+        op=operation, avail=avail_operations
+    )
+
+
+def check_resample_method(resample: str) -> None:
+    """Helper function to ensure that we support the input resample method
+
+    Parameters
+    ----------
+    resample : str
+        The user input resample method
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input resample method
+    """
+    avail_methods = get_available_resample_methods()
+
+    assert (
+        resample in avail_methods
+    ), "{m} not supported. Available resample methods: {avail}".format(
+        m=resample, avail=avail_methods
+    )
+
+
+def check_pca_solver(pca_solver: str) -> None:
+    """Helper function to ensure that we support the input PCA solver
+
+    Parameters
+    ----------
+    pca_solver : str
+        The user input PCA solver
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input PCA solver
+    """
+    avail_solvers = get_available_pca_solvers()
+
+    assert (
+        pca_solver in avail_solvers
+    ), "{s} not supported. Available PCA solvers: {avail}".format(
+        s=pca_solver, avail=avail_solvers
+    )
+
+
+def check_control_statistics_method(method: str) -> None:
+    """Helper function to ensure that we support the input control statistics method
+
+    Parameters
+    ----------
+    method : str
+        The user input control statistics method
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input control statistics method
+    """
+    avail_methods = get_available_control_statistics_methods()
+
+    assert (
+        method in avail_methods
+    ), "{m} not supported. Available control statistics methods: {avail}".format(
+        m=method, avail=avail_methods
+    )
+
+
+def check_covariance_estimator(covariance_estimator: str) -> None:
+    """Helper function to ensure that we support the input covariance estimator
+
+    Parameters
+    ----------
+    covariance_estimator : str
+        The user input covariance estimator
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input covariance estimator
+    """
+    avail_estimators = get_available_covariance_estimators()
+
+    assert (
+        covariance_estimator in avail_estimators
+    ), "{e} not supported. Available covariance estimators: {avail}".format(
+        e=covariance_estimator, avail=avail_estimators
+    )
+
+
+def check_mahalanobis_solver(mahalanobis_solver: str) -> None:
+    """Helper function to ensure that we support the input mahalanobis solver
+
+    Parameters
+    ----------
+    mahalanobis_solver : str
+        The user input mahalanobis solver
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input mahalanobis solver
+    """
+    avail_solvers = get_available_mahalanobis_solvers()
+
+    assert (
+        mahalanobis_solver in avail_solvers
+    ), "{s} not supported. Available mahalanobis solvers: {avail}".format(
+        s=mahalanobis_solver, avail=avail_solvers
+    )
+
+
+def check_execution_backend(backend: str) -> None:
+    """Helper function to ensure that we support the input execution backend
+
+    Parameters
+    ----------
+    backend : str
+        The user input execution backend
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input execution backend
+    """
+    avail_backends = get_available_execution_backends()
+
+    assert (
+        backend in avail_backends
+    ), "{b} not supported. Available execution backends: {avail}".format(
+        b=backend, avail=avail_backends
+    )
+
+
+def check_kernel_backend(backend: str) -> None:
+    """Helper function to ensure that we support the input kernel backend
+
+    Parameters
+    ----------
+    backend : str
+        The user input kernel backend
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input kernel backend
+    """
+    avail_backends = get_available_kernel_backends()
+
+    assert (
+        backend in avail_backends
+    ), "{b} not supported. Available kernel backends: {avail}".format(
+        b=backend, avail=avail_backends
+    )
+
+
+def check_output_format(output_format: str) -> None:
+    """Helper function to ensure that we support the input output format
+
+    Parameters
+    ----------
+    output_format : str
+        The user input output format
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input output format
+    """
+    avail_formats = get_available_output_formats()
+
+    assert (
+        output_format in avail_formats
+    ), "{f} not supported. Available output formats: {avail}".format(
+        f=output_format, avail=avail_formats
+    )
+
+
+def check_similarity_dtype(similarity_dtype: str, melted: bool = False) -> None:
+    """Helper function to ensure that we support the input similarity storage type
+
+    Parameters
+    ----------
+    similarity_dtype : str
+        The user input similarity storage type
+    melted : bool, optional
+        Whether the similarities are melted, which only supports float types. Defaults
+        to False.
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input similarity storage type
+    """
+    avail_dtypes = get_available_similarity_dtypes()
+    if melted:
+        avail_dtypes = get_available_melt_similarity_dtypes()
+
+    assert (
+        similarity_dtype in avail_dtypes
+    ), "{d} not supported. Available similarity dtypes: {avail}".format(
+        d=similarity_dtype, avail=avail_dtypes
+    )
+
+
+def check_metadata_storage(metadata_storage: str) -> None:
+    """Helper function to ensure that we support the input metadata layout
+
+    Parameters
+    ----------
+    metadata_storage : str
+        The user input metadata layout
+
+    Returns
+    -------
+    None
+        Assertion will fail if we don't support the input metadata layout
+    """
+    avail_storages = get_available_metadata_storages()
+
+    assert (
+        metadata_storage in avail_storages
+    ), "{s} not supported. Available metadata storages: {avail}".format(
+        s=metadata_storage, avail=avail_storages
+    )
+
+
 def check_replicate_summary_method(replicate_summary_method: str) -> None:
     """Helper function to ensure that we support the user input replicate summary
 
@@ -0,0 +1,224 @@
+"""Content-addressed memoization of evaluation stages.
+
+Results are keyed by a hash of the input data and every parameter that affects the
+output. Each stage (pairwise similarity matrix, melted similarities, final metric) is
+stored separately so that changing a downstream parameter only recomputes downstream
+stages.
+"""
+import os
+import copy
+import json
+import pickle
+import hashlib
+import collections
+import pandas as pd
+from typing import Any, Tuple
+
+from cytominer_eval.utils.availability_utils import check_similarity_dtype
+
+
+def hash_pandas(df: pd.DataFrame) -> str:
+    r"""Helper function to compute a fast content hash of a pandas DataFrame
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataframe to hash. The index is ignored; column names and dtypes are not.
+
+    Returns
+    -------
+    str
+        A hexadecimal digest of the dataframe content
+    """
+    # The hash identifies cache entries, it is not used for security
+    hasher = hashlib.sha1()
+    hasher.update(
+        json.dumps([[str(x) for x in df.columns], [str(x) for x in df.dtypes]]).encode()
+    )
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return hasher.hexdigest()
+
+
+def hash_parameters(**kwargs) -> str:
+    r"""Helper function to compute a stable hash of keyword parameters
+
+    Parameters
+    ----------
+    **kwargs
+        Any parameters that define a computation. Values are serialized with their
+        string representation if they are not JSON serializable.
+
+    Returns
+    -------
+    str
+        A hexadecimal digest of the parameters
+    """
+    serialized = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Two-tier (memory and disk) least recently used cache of evaluation stages.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        The maximum number of entries held in memory. Defaults to 32.
+    cache_dir : str, optional
+        A directory to persist entries to. If None (default), only the memory tier is
+        used.
+    max_disk_bytes : int, optional
+        The maximum size of the disk tier in bytes. The least recently used files are
+        removed once the limit is exceeded. Defaults to 1 GiB.
+    similarity_dtype : {'float64', 'float32', 'float16', 'int16', 'int8'}, optional
+        The storage type of cached similarities. Other types than "float64" (default)
+        store similarity matrices as their quantized upper triangle, and melted
+        similarities as float32 (float16 for "float16"). Results are then calculated
+        from the stored similarities, whether or not they were cached before. See
+        :py:mod:`cytominer_eval.utils.quantize_utils` for the error of each type.
+    copy_entries : bool, optional
+        Whether entries are copied when they are stored and retrieved, so that
+        modifying them does not alter the cache. Defaults to True. Copies hold the
+        memory of an entry twice, e.g. of a melted similarity dataframe, while it is
+        stored or retrieved. If False, stored and retrieved entries are shared with
+        the cache, and must not be modified.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the memory or disk tier
+    misses : int
+        Number of lookups that required computation
+
+    Methods
+    -------
+    get(stage, key)
+        Retrieve a cached entry
+    put(stage, key, value)
+        Store an entry in both tiers
+    clear()
+        Remove all entries from both tiers
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        cache_dir: str = None,
+        max_disk_bytes: int = 2**30,
+        similarity_dtype: str = "float64",
+        copy_entries: bool = True,
+    ):
+        assert max_entries > 0, "max_entries must be positive"
+        check_similarity_dtype(similarity_dtype)
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.similarity_dtype = similarity_dtype
+        self.copy_entries = copy_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, stage: str, key: str) -> str:
+        return os.path.join(
+            self.cache_dir, "{stage}-{key}.pkl".format(stage=stage, key=key)
+        )
+
+    def get(self, stage: str, key: str) -> Tuple[bool, Any]:
+        """Retrieve a cached entry
+
+        Parameters
+        ----------
+        stage : str
+            The evaluation stage the entry belongs to (e.g. "similarity")
+        key : str
+            The content hash identifying the entry
+
+        Returns
+        -------
+        (bool, object)
+            Whether or not the entry was found, and the entry, copied if copy_entries
+            is True (None if the entry was not found)
+        """
+        memory_key = (stage, key)
+        if memory_key in self._memory:
+            self._memory.move_to_end(memory_key)
+            self.hits += 1
+            return True, self._copy(self._memory[memory_key])
+
+        if self.cache_dir is not None:
+            path = self._disk_path(stage, key)
+            if os.path.exists(path):
+                with open(path, "rb") as fh:
+                    value = pickle.load(fh)
+                # Touch the file so that disk eviction is least recently used
+                os.utime(path)
+                self._put_memory(memory_key, value)
+                self.hits += 1
+                return True, self._copy(value)
+
+        self.misses += 1
+        return False, None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        """Store an entry in both tiers
+
+        Parameters
+        ----------
+        stage : str
+            The evaluation stage the entry belongs to (e.g. "similarity")
+        key : str
+            The content hash identifying the entry
+        value : object
+            Any picklable object
+
+        Returns
+        -------
+        None
+        """
+        value = self._copy(value)
+        self._put_memory((stage, key), value)
+
+        if self.cache_dir is not None:
+            path = self._disk_path(stage, key)
+            with open(path, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            self._evict_disk()
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers"""
+        self._memory.clear()
+        for path in self._disk_files():
+            os.remove(path)
+
+    def _copy(self, value: Any) -> Any:
+        if self.copy_entries:
+            return copy.deepcopy(value)
+        return value
+
+    def _put_memory(self, memory_key: tuple, value: Any) -> None:
+        self._memory[memory_key] = value
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_files(self) -> list:
+        if self.cache_dir is None:
+            return []
+        return [
+            os.path.join(self.cache_dir, x)
+            for x in os.listdir(self.cache_dir)
+            if x.endswith(".pkl")
+        ]
+
+    def _evict_disk(self) -> None:
+        files = sorted(self._disk_files(), key=os.path.getmtime)
+        total_bytes = sum([os.path.getsize(x) for x in files])
+        while total_bytes > self.max_disk_bytes and len(files) > 0:
+            path = files.pop(0)
+            total_bytes -= os.path.getsize(path)
+            os.remove(path)
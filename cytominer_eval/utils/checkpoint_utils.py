@@ -0,0 +1,101 @@
+"""Append-only checkpoints of long-running jobs made of independent tasks.
+
+Each completed task is written to a JSON lines file as soon as it finishes, so that an
+interrupted job can be resumed by skipping the tasks found in the file. The first line
+describes the job; resuming with a different job raises an error rather than mixing
+results.
+"""
+import os
+import json
+from typing import Any
+
+
+class Checkpoint:
+    """
+    JSON lines file of the results of completed tasks, keyed by task.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint file. It is created if it does not exist, and resumed otherwise.
+    job : dict
+        JSON serializable parameters identifying the job. Resuming a checkpoint
+        written by a job with different parameters raises an AssertionError.
+    state : dict, optional
+        JSON serializable values stored when the checkpoint is created and restored
+        when it is resumed, for example the random seed of the job. Defaults to {}.
+
+    Attributes
+    ----------
+    state : dict
+        The state stored when the checkpoint was created
+
+    Methods
+    -------
+    save(key, value)
+        Append the result of a completed task
+    """
+
+    def __init__(self, path: str, job: dict, state: dict = {}):
+        self.path = path
+        self.results = {}
+        job = json.loads(json.dumps(job, default=str))
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path) as checkpoint_file:
+                lines = [x for x in checkpoint_file if x.strip()]
+
+            if not lines[-1].endswith("\n"):
+                # End the line left partially written by an interrupted job
+                with open(path, "a") as checkpoint_file:
+                    checkpoint_file.write("\n")
+
+            header = json.loads(lines[0])
+            assert (
+                header["job"] == job
+            ), "{p} was written by a different job. Remove it to start over.".format(
+                p=path
+            )
+            self.state = header["state"]
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A task interrupted while it was written is recomputed
+                    continue
+                self.results[entry["key"]] = entry["value"]
+        else:
+            self.state = json.loads(json.dumps(state, default=str))
+            self._append({"job": job, "state": self.state})
+
+    def __contains__(self, key: Any) -> bool:
+        return self._key(key) in self.results
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.results[self._key(key)]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def save(self, key: Any, value: Any) -> None:
+        """Append the result of a completed task, and flush it to disk
+
+        Parameters
+        ----------
+        key : object
+            A JSON serializable task key
+        value : object
+            The JSON serializable result of the task
+        """
+        self.results[self._key(key)] = value
+        self._append({"key": self._key(key), "value": value})
+
+    def _append(self, entry: dict) -> None:
+        with open(self.path, "a") as checkpoint_file:
+            checkpoint_file.write(json.dumps(entry) + "\n")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+    @staticmethod
+    def _key(key: Any) -> str:
+        return json.dumps(key, default=str)
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 from typing import List
 
+from cytominer_eval.utils.kernel_utils import segment_median
 from cytominer_eval.utils.operation_utils import compare_distributions
 from cytominer_eval.utils.transform_utils import set_pair_ids
 from cytominer_eval.utils.availability_utils import (
@@ -90,6 +91,112 @@ def calculate_grit(
     return pd.Series(return_bundle)
 
 
+def calculate_grit_groups(
+    similarity_melted_df: pd.DataFrame,
+    control_perts: List[str],
+    column_id_info: dict,
+    distribution_compare_method: str = "zscore",
+    replicate_summary_method: str = "mean",
+) -> pd.DataFrame:
+    """Given an elongated pairwise correlation dataframe, calculate grit of all
+    perturbations at once.
+
+    Equals calculate_grit applied to the rows of each perturbation. See
+    :py:func:`cytominer_eval.operations.grit.grit`.
+
+    Parameters
+    ----------
+    similarity_melted_df : pandas.DataFrame
+        An elongated dataframe storing pairwise correlations of all profiles
+    control_perts : list
+        The profile_ids that should be considered controls (the reference)
+    column_id_info: dict
+        A dictionary of column identifiers noting profile and replicate group ids. This
+        variable is autogenerated in
+        :py:func:`cytominer_eval.transform.util.set_grit_column_info`.
+    distribution_compare_method : {'zscore'}, optional
+        How to compare the replicate and reference distributions of pairwise similarity
+    replicate_summary_method : {'mean', 'median'}, optional
+        How to summarize replicate z-scores. Defaults to "mean".
+
+    Returns
+    -------
+    pandas.DataFrame
+        The "perturbation", "group" and "grit" of each perturbation, in sort order of
+        the perturbations. "grit" is NaN if no other profiles exist in the group.
+    """
+    # Confirm that we support the user provided methods
+    check_compare_distribution_method(distribution_compare_method)
+    check_replicate_summary_method(replicate_summary_method)
+
+    grouped = similarity_melted_df.groupby(column_id_info["profile"]["id"])
+    codes = grouped.ngroup().values
+    n_perts = grouped.ngroups
+
+    assert (
+        grouped[column_id_info["group"]["id"]].nunique() == 1
+    ).all(), "grit is calculated for each perturbation independently"
+    group_entry = grouped[column_id_info["group"]["id"]].first().astype(str).values
+    pert = grouped[column_id_info["profile"]["id"]].first().astype(str).values
+
+    similarity = similarity_melted_df["similarity_metric"].values
+    profile_comparison = similarity_melted_df[
+        column_id_info["profile"]["comparison"]
+    ].values
+    group_comparison = similarity_melted_df[
+        column_id_info["group"]["comparison"]
+    ].values
+
+    # Define distributions for control perturbations
+    is_control = np.isin(profile_comparison, control_perts)
+    n_control = np.bincount(codes, weights=is_control, minlength=n_perts)
+
+    assert (n_control > 1).all(), "Error! No control perturbations found."
+
+    # Define distributions for same group (but not same perturbation)
+    is_target = (group_comparison == group_entry[codes]) & (
+        profile_comparison != pert[codes]
+    )
+    n_target = np.bincount(codes, weights=is_target, minlength=n_perts)
+
+    # z-score to the controls of each perturbation, like sklearn's StandardScaler
+    control_mean = (
+        np.bincount(
+            codes, weights=np.where(is_control, similarity, 0), minlength=n_perts
+        )
+        / n_control
+    )
+    deviation = similarity - control_mean[codes]
+    control_var = (
+        np.bincount(
+            codes, weights=np.where(is_control, deviation**2, 0), minlength=n_perts
+        )
+        / n_control
+    )
+    eps = np.finfo(np.float64).eps
+    constant = (
+        control_var
+        <= n_control * eps * control_var + (n_control * control_mean * eps) ** 2
+    )
+    control_scale = np.where(constant, 1.0, np.sqrt(control_var))
+    scores = (deviation / control_scale[codes])[is_target]
+
+    if replicate_summary_method == "mean":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grit_score = (
+                np.bincount(codes[is_target], weights=scores, minlength=n_perts)
+                / n_target
+            )
+    elif replicate_summary_method == "median":
+        grit_score = segment_median(scores, codes[is_target], n_segments=n_perts)
+
+    grit_score[n_target == 0] = np.nan
+
+    return pd.DataFrame(
+        {"perturbation": pert, "group": group_entry, "grit": grit_score}
+    )
+
+
 def get_grit_entry(df: pd.DataFrame, col: str) -> str:
     """Helper function to define the perturbation identifier of interest
 
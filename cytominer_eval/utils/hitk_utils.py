@@ -1,3 +1,9 @@
+import numpy as np
+import pandas as pd
+
+from cytominer_eval.utils.kernel_utils import segment_ranks
+
+
 def add_hit_rank(df):
     """Adds the rank/index of each connection to the dataframe.
     This column will later be used to create a full list of hits.
@@ -18,6 +24,30 @@ def add_hit_rank(df):
     return df
 
 
+def get_hit_ranks(df, groupby_columns):
+    """Ranks the connections of each group by similarity, and lists the ranks of hits.
+    Equals the ranks of hits after applying add_hit_rank to each group, but handles all
+    groups at once.
+
+    Parameters
+    ----------
+    df : similarity_melted_df with a group_replicate column
+    groupby_columns : the columns defining the groups whose connections are ranked
+
+    Returns
+    -------
+    pandas.Series of the ranks of hits, in order of group and rank
+
+    """
+    codes = df.groupby(groupby_columns).ngroup().values
+    ranks = segment_ranks(df["similarity_metric"].values, codes)
+    hits = df["group_replicate"].values.astype(bool)
+
+    # list hits by group, and by rank within each group
+    order = np.lexsort((ranks, codes))
+    return pd.Series(ranks[order][hits[order]])
+
+
 def percentage_scores(hits_list, p_list, nr_of_groups):
     """Calculates the percent score which is the cumulative number of hits below a given percentage.
     The function counts the number of hits in the hits_list contains below a percentage of the maximum hit score (nr_of_groups).
@@ -0,0 +1,689 @@
+import os
+import sqlite3
+import pathlib
+import numpy as np
+import pandas as pd
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Union
+
+from cytominer_eval.utils.arrow_utils import get_feature_array
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.parallel_utils import run_tasks
+
+
+def get_profile_format(path: str) -> str:
+    r"""Helper function to determine the file format of a profile file
+
+    Parameters
+    ----------
+    path : str
+        Location of a CSV (optionally compressed) or Parquet file
+
+    Returns
+    -------
+    str
+        Either "csv" or "parquet"
+    """
+    path = str(path)
+    if path.endswith(".parquet") or path.endswith(".pq"):
+        return "parquet"
+    return "csv"
+
+
+def read_profile_columns(path: str) -> List[str]:
+    r"""Read the column names of a profile file without reading its rows
+
+    Parameters
+    ----------
+    path : str
+        Location of a CSV (optionally compressed) or Parquet file
+
+    Returns
+    -------
+    list
+        The column names
+    """
+    if get_profile_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_profiles(path: str, columns: List[str] = None) -> pd.DataFrame:
+    r"""Read a profile file, restricted to specific columns
+
+    Parameters
+    ----------
+    path : str
+        Location of a CSV (optionally compressed) or Parquet file. Parquet files
+        require pyarrow.
+    columns : list, optional
+        The columns to read. If None (default), read all columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The profiles
+    """
+    if get_profile_format(path) == "parquet":
+        return pd.read_parquet(path, columns=columns)
+
+    return pd.read_csv(path, usecols=columns)
+
+
+def select_metadata_columns(
+    columns: List[str], meta_prefixes: List[str] = ["Metadata_"]
+) -> List[str]:
+    r"""Select metadata columns by prefix
+
+    Parameters
+    ----------
+    columns : list
+        All column names of a profile dataframe
+    meta_prefixes : list, optional
+        Column name prefixes denoting metadata. Defaults to ["Metadata_"].
+
+    Returns
+    -------
+    list
+        The metadata columns, in the order of columns
+    """
+    return [x for x in columns if any([x.startswith(p) for p in meta_prefixes])]
+
+
+def is_profile_path(profiles) -> bool:
+    r"""Helper function to determine whether profiles are given as a file location
+
+    Parameters
+    ----------
+    profiles : {str, os.PathLike, pandas.DataFrame}
+        The profiles
+
+    Returns
+    -------
+    bool
+        Whether profiles is a str or path-like object
+    """
+    # os.PathLike requires Python 3.6
+    return isinstance(profiles, (str, pathlib.PurePath, getattr(os, "PathLike", str)))
+
+
+def is_chunked_array(features) -> bool:
+    r"""Helper function to determine whether features are an array stored on disk
+
+    Parameters
+    ----------
+    features : {pandas.DataFrame, np.ndarray, np.memmap, zarr.Array, h5py.Dataset}
+        A profiles x features array
+
+    Returns
+    -------
+    bool
+        Whether features are a np.memmap, or a 2-D array that is not a numpy array or
+        dataframe and reads rows by slicing, such as a zarr.Array or h5py.Dataset
+    """
+    if isinstance(features, np.memmap):
+        return True
+    if isinstance(features, (np.ndarray, pd.DataFrame)):
+        return False
+    return (
+        all([hasattr(features, x) for x in ["shape", "dtype", "__getitem__"]])
+        and len(features.shape) == 2
+    )
+
+
+def read_array_rows(features, start: int, stop: int) -> np.ndarray:
+    r"""Read a block of rows of a feature array into memory
+
+    Parameters
+    ----------
+    features : {np.ndarray, np.memmap, zarr.Array, h5py.Dataset}
+        A profiles x features array
+    start : int
+        The first row to read
+    stop : int
+        The row after the last row to read
+
+    Returns
+    -------
+    np.ndarray
+        A float64 copy of the rows, which is read from disk when the copy is made
+    """
+    assert np.issubdtype(
+        features.dtype, np.number
+    ), "Columns cannot be converted to {col}; check input features".format(col=float)
+    return np.array(features[start:stop], dtype=np.float64)
+
+
+def iter_array_blocks(
+    features, bounds: List[tuple], prefetch: bool = True
+) -> Iterator[np.ndarray]:
+    r"""Read blocks of rows of a feature array in order
+
+    Parameters
+    ----------
+    features : {np.ndarray, np.memmap, zarr.Array, h5py.Dataset}
+        A profiles x features array
+    bounds : list
+        The (start, stop) rows of each block to read
+    prefetch : bool, optional
+        Whether to read the next block on a background thread while the current block
+        is used. Defaults to True. Readers of numpy, Zarr and HDF5 arrays release the
+        GIL, so that reading overlaps with computation on the current block.
+
+    Yields
+    ------
+    np.ndarray
+        The float64 rows of each block, see
+        :py:func:`cytominer_eval.utils.io_utils.read_array_rows`
+    """
+    if not prefetch:
+        for start, stop in bounds:
+            yield read_array_rows(features, start, stop)
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = None
+        for i, (start, stop) in enumerate(bounds):
+            if future is None:
+                future = executor.submit(read_array_rows, features, start, stop)
+            block = future.result()
+            future = None
+            if i + 1 < len(bounds):
+                future = executor.submit(read_array_rows, features, *bounds[i + 1])
+            yield block
+
+
+def get_array_chunk_rows(features) -> int:
+    r"""Helper function to find how many rows an array stores per chunk on disk
+
+    Parameters
+    ----------
+    features : {np.memmap, zarr.Array, h5py.Dataset}
+        A profiles x features array
+
+    Returns
+    -------
+    int
+        The rows per chunk of a chunked zarr.Array or h5py.Dataset, and None for
+        arrays stored contiguously
+    """
+    chunks = getattr(features, "chunks", None)
+    if not chunks:
+        return None
+    return int(chunks[0])
+
+
+class ProfileArrays:
+    """
+    Metadata and features of profiles, with features stored in one contiguous matrix.
+
+    Built by :py:func:`cytominer_eval.utils.io_utils.read_profile_arrays`, or from a
+    feature array and a metadata table that are already separate. Pass the object in
+    place of the `profiles` dataframe of :py:func:`cytominer_eval.evaluate.evaluate`,
+    :py:func:`cytominer_eval.transform.metric_melt`,
+    :py:func:`cytominer_eval.operations.mp_value`,
+    :py:func:`cytominer_eval.bootstrap.bootstrap_evaluate` or
+    :py:func:`cytominer_eval.permutation.permutation_test`, which then use the feature
+    matrix as is instead of subsetting and converting dataframe columns.
+
+    Parameters
+    ----------
+    meta_df : pandas.DataFrame
+        The metadata, with one row per profile
+    feature_df : {pandas.DataFrame, np.ndarray, np.memmap, zarr.Array, h5py.Dataset}
+        The features. A float64 profiles x features array, including a np.memmap, is
+        used without a copy, in C or Fortran order. Arrays on disk, such as a
+        np.memmap, zarr.Array or h5py.Dataset, are read one block of rows at a time by
+        the tiled similarity strategy of
+        :py:func:`cytominer_eval.transform.metric_melt`, and are otherwise read into
+        memory when first used.
+    features : list, optional
+        The names of the columns of a feature array. Defaults to their positions as
+        strings, "0", "1", ... Not used if feature_df is a dataframe.
+
+    Attributes
+    ----------
+    meta_features : list
+        The metadata columns
+    features : list
+        The feature columns
+    feature_df : pandas.DataFrame
+        The features, in memory
+    feature_array : {np.memmap, zarr.Array, h5py.Dataset}
+        The features on disk, or None if feature_df was given in memory
+    shape : tuple
+        The number of profiles, and the number of metadata and feature columns
+
+    Methods
+    -------
+    split(features, meta_features, out_of_core=False)
+        Return the metadata and feature dataframes
+    group_codes(replicate_groups)
+        Encode the replicate group of each profile as an integer
+    to_profiles()
+        Return a profiles dataframe of metadata and features
+    """
+
+    def __init__(
+        self,
+        meta_df: pd.DataFrame,
+        feature_df: Union[pd.DataFrame, np.ndarray],
+        features: List[str] = None,
+    ):
+        self.feature_array = None
+        if not isinstance(feature_df, pd.DataFrame):
+            assert len(feature_df.shape) == 2, "Features must be a 2-D array"
+            if features is None:
+                features = [str(x) for x in range(feature_df.shape[1])]
+            if is_chunked_array(feature_df):
+                self.feature_array = feature_df
+            if isinstance(feature_df, np.ndarray):
+                # A 2-D array of a single dtype backs the dataframe without a copy
+                feature_df = pd.DataFrame(feature_df, columns=features, copy=False)
+        assert meta_df.shape[0] == feature_df.shape[0], "Profiles must align"
+
+        # Rows are aligned by position
+        default_index = pd.RangeIndex(meta_df.shape[0])
+        if not meta_df.index.equals(default_index):
+            meta_df = meta_df.reset_index(drop=True)
+        if isinstance(feature_df, pd.DataFrame):
+            if not feature_df.index.equals(default_index):
+                feature_df = feature_df.reset_index(drop=True)
+            features = feature_df.columns.tolist()
+        else:
+            # Arrays on disk are read into memory on first use of feature_df
+            feature_df = None
+
+        self.meta_df = meta_df
+        self._feature_df = feature_df
+        self.meta_features = meta_df.columns.tolist()
+        self.features = list(features)
+        self.shape = (meta_df.shape[0], meta_df.shape[1] + len(self.features))
+
+    @property
+    def feature_df(self) -> pd.DataFrame:
+        if self._feature_df is None:
+            self._feature_df = pd.DataFrame(
+                read_array_rows(self.feature_array, 0, self.shape[0]),
+                columns=self.features,
+                copy=False,
+            )
+        return self._feature_df
+
+    def split(
+        self, features: List[str], meta_features: List[str], out_of_core: bool = False
+    ) -> (pd.DataFrame, pd.DataFrame):
+        """Return the metadata and feature dataframes
+
+        Parameters
+        ----------
+        features : list
+            The feature columns, a subset of the features that were read
+        meta_features : list
+            The metadata columns, a subset of the metadata that was read
+        out_of_core : bool, optional
+            Whether to return a feature array on disk as is instead of a dataframe, if
+            features are all its columns, in the same order. Defaults to False.
+
+        Returns
+        -------
+        (pandas.DataFrame, {pandas.DataFrame, np.memmap, zarr.Array, h5py.Dataset})
+            The metadata, and the features. The feature matrix is not copied if
+            features are all features that were read, in the same order.
+        """
+        assert set(meta_features) <= set(
+            self.meta_features
+        ), "Metadata feature not found"
+
+        if out_of_core and self.feature_array is not None:
+            if list(features) == self.features:
+                return self.meta_df.loc[:, meta_features], self.feature_array
+
+        feature_df = self.feature_df
+        if list(features) != self.features:
+            assert set(features) <= set(self.features), "Profile feature not found"
+            feature_df = feature_df.loc[:, features]
+
+        return self.meta_df.loc[:, meta_features], feature_df
+
+    def group_codes(self, replicate_groups: Union[List[str], str]) -> np.array:
+        """Encode the replicate group of each profile as an integer, see
+        :py:func:`cytominer_eval.utils.operation_utils.get_group_codes`
+
+        Parameters
+        ----------
+        replicate_groups : {str, list}
+            The metadata column name(s) that together define a replicate group
+
+        Returns
+        -------
+        np.array
+            An integer array with one code per profile
+        """
+        return get_group_codes(df=self.meta_df, replicate_groups=replicate_groups)
+
+    def to_profiles(self) -> pd.DataFrame:
+        """Return a profiles dataframe of metadata and features
+
+        Returns
+        -------
+        pandas.DataFrame
+            The metadata with their original values, and the features
+        """
+        features = [x for x in self.features if x not in self.meta_features]
+        return pd.concat(
+            [self.meta_df.astype(object), self.feature_df.loc[:, features]],
+            axis="columns",
+        )
+
+
+def read_profile_arrays(
+    path: str,
+    features: List[str],
+    meta_features: List[str],
+    batch_size: int = 8192,
+) -> ProfileArrays:
+    r"""Read the metadata and features of a profile file in batches of rows
+
+    Only the metadata and feature columns are read. Each batch of rows is written
+    into a preallocated float64 profiles x features matrix, and metadata are stored as
+    codes into their distinct values, so that peak memory is about the size of the
+    feature matrix rather than the size of the file.
+
+    Parameters
+    ----------
+    path : str
+        Location of a CSV (optionally compressed) or Parquet file. Parquet files
+        require pyarrow and are read in row groups.
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+    batch_size : int, optional
+        How many rows to read at once. Defaults to 8192.
+
+    Returns
+    -------
+    cytominer_eval.utils.io_utils.ProfileArrays
+        The metadata and features of the profiles
+    """
+    columns = read_profile_columns(path)
+    assert all([x in columns for x in meta_features]), "Metadata feature not found"
+    assert all([x in columns for x in features]), "Profile feature not found"
+
+    meta_features = list(meta_features)
+    features = list(features)
+    used_columns = list(dict.fromkeys(meta_features + features))
+
+    if get_profile_format(path) == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        n_profiles = parquet_file.metadata.num_rows
+        feature_array = np.empty((n_profiles, len(features)), order="F")
+
+        meta_batches = []
+        start = 0
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_size, columns=used_columns
+        ):
+            batch = pa.Table.from_batches([batch])
+            stop = start + batch.num_rows
+            get_feature_array(batch, features, out=feature_array[start:stop])
+            meta_batches.append(batch.select(meta_features).to_pandas())
+            start = stop
+
+        return _to_profile_arrays(
+            meta_batches, feature_array, features=features, meta_features=meta_features
+        )
+
+    return _stack_batches(
+        pd.read_csv(path, usecols=used_columns, chunksize=batch_size),
+        features=features,
+        meta_features=meta_features,
+    )
+
+
+def get_sqlite_query(
+    table: str, features: List[str], meta_features: List[str], aggregate: bool = False
+) -> str:
+    r"""Build the query of the metadata and feature columns of a SQLite table
+
+    Parameters
+    ----------
+    table : str
+        The table of profiles, or of single cell measurements to aggregate
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+    aggregate : bool, optional
+        If True, average features per combination of metadata values, e.g. to build
+        per-well profiles from single cells. Defaults to False.
+
+    Returns
+    -------
+    str
+        A SELECT statement
+    """
+    select = [_quote_identifier(x) for x in meta_features]
+    features = [x for x in features if x not in meta_features]
+    if aggregate:
+        select += [
+            "AVG({col}) AS {col}".format(col=_quote_identifier(x)) for x in features
+        ]
+    else:
+        select += [_quote_identifier(x) for x in features]
+
+    query = "SELECT {select} FROM {table}".format(
+        select=", ".join(select), table=_quote_identifier(table)
+    )
+    if aggregate and len(meta_features) > 0:
+        query += " GROUP BY {cols}".format(
+            cols=", ".join([_quote_identifier(x) for x in meta_features])
+        )
+
+    return query
+
+
+def read_sqlite_profile_arrays(
+    path: str,
+    features: List[str],
+    meta_features: List[str],
+    table: str = None,
+    query: str = None,
+    aggregate: bool = False,
+    batch_size: int = 8192,
+) -> ProfileArrays:
+    r"""Read the metadata and features of profiles from a SQLite file in batches of rows
+
+    Rows are fetched with cursor.fetchmany() and stacked into a float64 profiles x
+    features matrix and factorized metadata, like
+    :py:func:`cytominer_eval.utils.io_utils.read_profile_arrays`. The file is opened
+    read-only.
+
+    Parameters
+    ----------
+    path : str
+        Location of a SQLite file, e.g. written by CellProfiler or cytominer-database
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+    table : str, optional
+        The table to read, see
+        :py:func:`cytominer_eval.utils.io_utils.get_sqlite_query`. Either table or query
+        must be provided.
+    query : str, optional
+        A SELECT statement returning the metadata and feature columns, for example
+        joining per-image metadata to aggregated object measurements. Overrides table.
+    aggregate : bool, optional
+        Only used with table. If True, average features per combination of metadata
+        values in the query. Defaults to False.
+    batch_size : int, optional
+        How many rows to fetch at once. Defaults to 8192.
+
+    Returns
+    -------
+    cytominer_eval.utils.io_utils.ProfileArrays
+        The metadata and features of the profiles
+    """
+    assert table is not None or query is not None, "Provide a table or a query"
+    if query is None:
+        query = get_sqlite_query(
+            table, features=features, meta_features=meta_features, aggregate=aggregate
+        )
+
+    connection = sqlite3.connect(
+        "{uri}?mode=ro".format(uri=pathlib.Path(path).resolve().as_uri()), uri=True
+    )
+    try:
+        cursor = connection.execute(query)
+        columns = [x[0] for x in cursor.description]
+        assert all([x in columns for x in meta_features]), "Metadata feature not found"
+        assert all([x in columns for x in features]), "Profile feature not found"
+
+        return _stack_batches(
+            _fetch_batches(cursor, columns=columns, batch_size=batch_size),
+            features=list(features),
+            meta_features=list(meta_features),
+        )
+    finally:
+        connection.close()
+
+
+def read_sqlite_plates(
+    paths: List[str],
+    features: List[str],
+    meta_features: List[str],
+    table: str = None,
+    query: str = None,
+    aggregate: bool = False,
+    batch_size: int = 8192,
+    n_jobs: int = 4,
+) -> List[ProfileArrays]:
+    r"""Read the profiles of several SQLite files concurrently
+
+    Parameters
+    ----------
+    paths : list
+        Locations of SQLite files, e.g. one per plate
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+    table : str, optional
+        See :py:func:`cytominer_eval.utils.io_utils.read_sqlite_profile_arrays`
+    query : str, optional
+        See :py:func:`cytominer_eval.utils.io_utils.read_sqlite_profile_arrays`
+    aggregate : bool, optional
+        See :py:func:`cytominer_eval.utils.io_utils.read_sqlite_profile_arrays`
+    batch_size : int, optional
+        How many rows to fetch at once. Defaults to 8192.
+    n_jobs : int, optional
+        How many files to read at once, each with its own connection. SQLite releases
+        the GIL while reading, so files are read by threads. Defaults to 4.
+
+    Returns
+    -------
+    list
+        The cytominer_eval.utils.io_utils.ProfileArrays of each file, in the order of
+        paths
+    """
+    read_file = partial(
+        read_sqlite_profile_arrays,
+        features=features,
+        meta_features=meta_features,
+        table=table,
+        query=query,
+        aggregate=aggregate,
+        batch_size=batch_size,
+    )
+    return run_tasks(read_file, list(paths), n_jobs=n_jobs, backend="threads")
+
+
+def _quote_identifier(name: str) -> str:
+    return '"{name}"'.format(name=name.replace('"', '""'))
+
+
+def _fetch_batches(
+    cursor: sqlite3.Cursor, columns: List[str], batch_size: int
+) -> Iterator[pd.DataFrame]:
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if len(rows) == 0:
+            return
+        # Columns with NULL values are numeric, with NaN for NULL
+        yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+def _stack_batches(
+    batches: Iterable[pd.DataFrame], features: List[str], meta_features: List[str]
+) -> ProfileArrays:
+    # For sources that do not know their number of rows in advance
+    feature_batches = []
+    meta_batches = []
+    for batch in batches:
+        # A batch of a column of only missing values has no numeric type
+        assert all(
+            [
+                pd.api.types.is_numeric_dtype(batch[x]) or batch[x].isna().all()
+                for x in features
+            ]
+        ), "Columns cannot be converted to {col}; check input features".format(
+            col=float
+        )
+        feature_batches.append(batch.loc[:, features].to_numpy(dtype=np.float64))
+        meta_batches.append(batch.loc[:, meta_features])
+
+    # Memory of the matrix is only committed as batches are copied into it, and each
+    # batch is released once copied
+    n_profiles = sum([x.shape[0] for x in feature_batches])
+    feature_array = np.empty((n_profiles, len(features)), order="F")
+    start = 0
+    while len(feature_batches) > 0:
+        batch = feature_batches.pop(0)
+        feature_array[start : start + batch.shape[0]] = batch
+        start += batch.shape[0]
+
+    return _to_profile_arrays(
+        meta_batches, feature_array, features=features, meta_features=meta_features
+    )
+
+
+def _to_profile_arrays(
+    meta_batches: List[pd.DataFrame],
+    feature_array: np.ndarray,
+    features: List[str],
+    meta_features: List[str],
+) -> ProfileArrays:
+    meta_df = pd.DataFrame(
+        {x: _factorize_batches([y[x] for y in meta_batches]) for x in meta_features},
+        index=pd.RangeIndex(feature_array.shape[0]),
+    )
+    feature_df = pd.DataFrame(feature_array, columns=features, copy=False)
+
+    return ProfileArrays(meta_df=meta_df, feature_df=feature_df)
+
+
+def _factorize_batches(batches: List[pd.Series]) -> pd.Categorical:
+    # Codes of each batch are mapped to codes of the distinct values of all batches
+    categories = {}
+    codes = []
+    for batch in batches:
+        batch_codes, batch_categories = pd.factorize(batch)
+        mapping = [categories.setdefault(x, len(categories)) for x in batch_categories]
+        # Missing values keep the code -1
+        codes.append(np.array(mapping + [-1], dtype=np.int64)[batch_codes])
+
+    if len(codes) == 0:
+        return pd.Categorical([])
+
+    return pd.Categorical.from_codes(
+        np.concatenate(codes), categories=pd.Index(list(categories), dtype=object)
+    )
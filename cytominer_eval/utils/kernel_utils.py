@@ -0,0 +1,217 @@
+"""Kernels for loops that do not vectorize well in NumPy.
+
+Each kernel is compiled with Numba when it is installed, and otherwise runs an
+equivalent NumPy implementation. Both implementations return the same results, so
+Numba is an optional accelerator rather than a dependency. The compiled kernels live in
+:py:mod:`cytominer_eval.utils.numba_utils`, which is imported on first use.
+"""
+import numpy as np
+from importlib.util import find_spec
+from typing import List
+
+from cytominer_eval.utils.availability_utils import check_kernel_backend
+
+numba_installed = find_spec("numba") is not None
+
+
+def get_kernel_backend(backend: str = None) -> str:
+    r"""Helper function to resolve the implementation of kernels
+
+    Parameters
+    ----------
+    backend : {'numba', 'numpy'}, optional
+        The implementation to use. Defaults to "numba" if Numba is installed, and
+        "numpy" otherwise.
+
+    Returns
+    -------
+    str
+        The kernel backend
+    """
+    if backend is None:
+        return "numba" if numba_installed else "numpy"
+
+    check_kernel_backend(backend)
+    assert backend != "numba" or numba_installed, "numba is not installed"
+    return backend
+
+
+def kendall_matrix(X: np.ndarray, backend: str = None) -> np.array:
+    r"""Calculate the Kendall rank correlation (tau-b) between all pairs of rows
+
+    Equals pandas.DataFrame(X).transpose().corr(method="kendall") for arrays without
+    missing values.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        A profiles x features array without missing values
+    backend : {'numba', 'numpy'}, optional
+        The kernel implementation, see
+        :py:func:`cytominer_eval.utils.kernel_utils.get_kernel_backend`
+
+    Returns
+    -------
+    np.array
+        A profiles x profiles similarity matrix. Rows with constant values have NaN
+        similarities to other rows.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    if get_kernel_backend(backend) == "numba":
+        orders = np.argsort(X, axis=1, kind="mergesort")
+        return _numba_utils().kendall_matrix(X, orders)
+
+    # The product of the signs of all feature differences of two rows counts
+    # concordant minus discordant feature pairs, one feature at a time to bound memory
+    n_profiles, n_features = X.shape
+    concordance = np.zeros((n_profiles, n_profiles))
+    n_untied = np.zeros(n_profiles)
+    for feature in range(n_features - 1):
+        signs = np.sign(X[:, feature, np.newaxis] - X[:, feature + 1 :])
+        concordance += signs @ signs.T
+        n_untied += np.abs(signs).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = concordance / np.sqrt(np.outer(n_untied, n_untied))
+    np.fill_diagonal(similarity, 1)
+    return similarity
+
+
+def segment_ranks(
+    values: np.ndarray, segment_codes: np.ndarray, backend: str = None
+) -> np.array:
+    r"""Rank values by decreasing value within each segment
+
+    Ties are ranked in the order of the input, and missing values are ranked last.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The values to rank
+    segment_codes : np.ndarray
+        The integer segment code of each value, from 0 to the number of segments - 1
+    backend : {'numba', 'numpy'}, optional
+        The kernel implementation, see
+        :py:func:`cytominer_eval.utils.kernel_utils.get_kernel_backend`
+
+    Returns
+    -------
+    np.array
+        The rank of each value within its segment, starting at 0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    segment_codes = np.asarray(segment_codes, dtype=np.int64)
+    if get_kernel_backend(backend) == "numba":
+        return _numba_utils().segment_ranks(values, segment_codes)
+
+    order = np.lexsort((-values, segment_codes))
+    starts = _segment_starts(segment_codes)
+    ranks = np.empty(values.shape[0], dtype=np.int64)
+    ranks[order] = np.arange(values.shape[0]) - starts[segment_codes[order]]
+    return ranks
+
+
+def segment_median(
+    values: np.ndarray,
+    segment_codes: np.ndarray,
+    n_segments: int,
+    backend: str = None,
+) -> np.array:
+    r"""Calculate the median of each segment of values
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The values to summarize
+    segment_codes : np.ndarray
+        The integer segment code of each value, from 0 to n_segments - 1
+    n_segments : int
+        The number of segments
+    backend : {'numba', 'numpy'}, optional
+        The kernel implementation, see
+        :py:func:`cytominer_eval.utils.kernel_utils.get_kernel_backend`
+
+    Returns
+    -------
+    np.array
+        The median per segment, NaN for empty segments and segments with missing values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    segment_codes = np.asarray(segment_codes, dtype=np.int64)
+    if get_kernel_backend(backend) == "numba":
+        return _numba_utils().segment_median(values, segment_codes, n_segments)
+
+    order = np.lexsort((values, segment_codes))
+    sorted_values = values[order]
+    counts = np.bincount(segment_codes, minlength=n_segments)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    median = np.full(n_segments, np.nan)
+    filled = counts > 0
+    lower = sorted_values[starts[filled] + (counts[filled] - 1) // 2]
+    upper = sorted_values[starts[filled] + counts[filled] // 2]
+    median[filled] = (lower + upper) / 2
+
+    has_nan = np.bincount(segment_codes, weights=np.isnan(values), minlength=n_segments)
+    median[has_nan > 0] = np.nan
+    return median
+
+
+def segment_topk_counts(
+    flags: np.ndarray,
+    segment_codes: np.ndarray,
+    n_segments: int,
+    k: List[int],
+    backend: str = None,
+) -> np.array:
+    r"""Count the True flags among the first k rows of each segment
+
+    Parameters
+    ----------
+    flags : np.ndarray
+        A boolean array, in order of rank within each segment
+    segment_codes : np.ndarray
+        The integer segment code of each flag, from 0 to n_segments - 1
+    n_segments : int
+        The number of segments
+    k : list of ints
+        How many rows of each segment to consider
+    backend : {'numba', 'numpy'}, optional
+        The kernel implementation, see
+        :py:func:`cytominer_eval.utils.kernel_utils.get_kernel_backend`
+
+    Returns
+    -------
+    np.array
+        A segments x k array of counts
+    """
+    flags = np.asarray(flags, dtype=bool)
+    segment_codes = np.asarray(segment_codes, dtype=np.int64)
+    k = np.asarray(k, dtype=np.int64)
+    if get_kernel_backend(backend) == "numba":
+        return _numba_utils().segment_topk_counts(flags, segment_codes, n_segments, k)
+
+    order = np.argsort(segment_codes, kind="stable")
+    starts = _segment_starts(segment_codes)
+    positions = np.empty(flags.shape[0], dtype=np.int64)
+    positions[order] = np.arange(flags.shape[0]) - starts[segment_codes[order]]
+
+    return np.stack(
+        [
+            np.bincount(segment_codes[flags & (positions < k_)], minlength=n_segments)
+            for k_ in k
+        ],
+        axis=1,
+    )
+
+
+def _segment_starts(segment_codes: np.ndarray) -> np.array:
+    counts = np.bincount(segment_codes)
+    return np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+
+def _numba_utils():
+    # Deferred import, numba is slow to import and compiles kernels on first call
+    from cytominer_eval.utils import numba_utils
+
+    return numba_utils
@@ -0,0 +1,353 @@
+"""Calculate evaluation metrics directly from a pairwise similarity matrix.
+
+The functions mirror the replicate_reproducibility, precision_recall, enrichment and
+hitk operations, but take a similarity matrix and integer group codes instead of a
+melted dataframe. Resampling and permuting profiles then only gathers from arrays,
+which avoids recomputing and re-melting pairwise similarities.
+"""
+import numpy as np
+from typing import List
+
+
+def get_valid_pairs(similarity: np.ndarray, profile_ids: np.ndarray = None) -> np.array:
+    r"""Helper function to determine which pairwise similarities to consider
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    profile_ids : np.ndarray, optional
+        The original profile of each row. Pairs of a profile with itself (or a copy of
+        itself) are excluded. Defaults to None (each row is a distinct profile).
+
+    Returns
+    -------
+    np.array
+        A profiles x profiles boolean matrix, True for pairs of distinct profiles with a
+        defined similarity
+    """
+    if profile_ids is None:
+        profile_ids = np.arange(similarity.shape[0])
+
+    valid = profile_ids[:, np.newaxis] != profile_ids[np.newaxis, :]
+    valid &= ~np.isnan(similarity)
+    return valid
+
+
+def get_ranked_replicates(
+    similarity: np.ndarray,
+    valid: np.ndarray,
+    group_codes: np.ndarray,
+    groupby_codes: np.ndarray,
+) -> np.array:
+    r"""Helper function to rank the connections of each group by similarity
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    valid : np.ndarray
+        A profiles x profiles boolean matrix of pairs to consider, see
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_valid_pairs`
+    group_codes : np.ndarray
+        The replicate group code of each profile
+    groupby_codes : np.ndarray
+        The code of the groupby_columns of each profile. Connections of all profiles
+        sharing a code are ranked together.
+
+    Returns
+    -------
+    np.array
+        A groups x connections boolean matrix. Row i indicates, in order of decreasing
+        similarity, which connections of group i are replicates. Rows of groups with
+        fewer connections are padded with False.
+    """
+    is_replicate = (group_codes[:, np.newaxis] == group_codes[np.newaxis, :]) & valid
+    distance = np.where(valid, -similarity, np.inf)
+
+    _, inverse, counts = np.unique(
+        groupby_codes, return_inverse=True, return_counts=True
+    )
+    if counts.max() == 1:
+        # Each group is a single profile, so rows can be ranked all at once
+        order = np.argsort(distance, axis=1, kind="stable")
+        ranked = np.take_along_axis(is_replicate, order, axis=1)
+        return ranked[np.argsort(inverse)]
+
+    ranked = np.zeros((counts.shape[0], counts.max() * similarity.shape[1]), dtype=bool)
+    for group in range(counts.shape[0]):
+        members = inverse == group
+        group_distance = distance[members].ravel()
+        order = np.argsort(group_distance, kind="stable")
+        ranked[group, : order.shape[0]] = is_replicate[members].ravel()[order]
+
+    return ranked
+
+
+def matrix_replicate_reproducibility(
+    similarity: np.ndarray,
+    valid: np.ndarray,
+    group_codes: np.ndarray,
+    quantile_over_null: float = 0.95,
+) -> float:
+    r"""Calculate replicate reproducibility from a similarity matrix
+
+    See :py:func:`cytominer_eval.operations.replicate_reproducibility`.
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    valid : np.ndarray
+        A profiles x profiles boolean matrix of pairs to consider
+    group_codes : np.ndarray
+        The replicate group code of each profile
+    quantile_over_null : float, optional
+        The quantile of non-replicate similarities a replicate similarity must exceed.
+        Defaults to 0.95.
+
+    Returns
+    -------
+    float
+        The fraction of replicate pairs more similar than the null quantile, NaN if
+        there are no replicate pairs
+    """
+    upper = np.triu(valid, k=1)
+    is_replicate = group_codes[:, np.newaxis] == group_codes[np.newaxis, :]
+
+    replicate_similarity = similarity[upper & is_replicate]
+    null_similarity = similarity[upper & ~is_replicate]
+    if replicate_similarity.shape[0] == 0 or null_similarity.shape[0] == 0:
+        return np.nan
+
+    threshold = np.quantile(null_similarity, quantile_over_null)
+    return np.mean(replicate_similarity > threshold)
+
+
+def matrix_enrichment(
+    similarity: np.ndarray,
+    valid: np.ndarray,
+    group_codes: np.ndarray,
+    percentile: List[float],
+) -> np.array:
+    r"""Calculate enrichment odds ratios from a similarity matrix
+
+    See :py:func:`cytominer_eval.operations.enrichment`.
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    valid : np.ndarray
+        A profiles x profiles boolean matrix of pairs to consider
+    group_codes : np.ndarray
+        The replicate group code of each profile
+    percentile : list of floats
+        The percentiles of similarities defining the top connections
+
+    Returns
+    -------
+    np.array
+        The odds ratio of replicates among the top connections, per percentile
+    """
+    is_replicate = (group_codes[:, np.newaxis] == group_codes[np.newaxis, :])[valid]
+    valid_similarity = similarity[valid]
+
+    thresholds = np.quantile(valid_similarity, percentile)
+    above = valid_similarity[np.newaxis, :] > thresholds[:, np.newaxis]
+
+    v11 = (above & is_replicate).sum(axis=1)
+    v12 = (above & ~is_replicate).sum(axis=1)
+    v21 = (~above & is_replicate).sum(axis=1)
+    v22 = (~above & ~is_replicate).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (v11 * v22) / (v12 * v21)
+
+
+def matrix_precision_recall(
+    ranked_replicates: np.ndarray, k: List[int]
+) -> (np.array, np.array):
+    r"""Calculate mean precision and recall at k over groups
+
+    See :py:func:`cytominer_eval.operations.precision_recall`.
+
+    Parameters
+    ----------
+    ranked_replicates : np.ndarray
+        Output from
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_ranked_replicates`
+    k : list of ints
+        How many connections of each group to consider
+
+    Returns
+    -------
+    (np.array, np.array)
+        The mean precision and the mean recall over groups, per k. Groups without
+        replicates are excluded from the mean recall.
+    """
+    n_relevant = ranked_replicates.sum(axis=1)
+    hits = np.cumsum(ranked_replicates, axis=1)
+
+    precision = []
+    recall = []
+    for k_ in k:
+        hits_at_k = hits[:, min(k_, hits.shape[1]) - 1]
+        precision.append(np.mean(hits_at_k / k_))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            recall.append(
+                np.nanmean(np.where(n_relevant > 0, hits_at_k / n_relevant, np.nan))
+            )
+
+    return np.array(precision), np.array(recall)
+
+
+def matrix_hitk(ranked_replicates: np.ndarray, percent_list: List[int]) -> np.array:
+    r"""Calculate hit@k percent scores
+
+    See :py:func:`cytominer_eval.operations.hitk` and
+    :py:func:`cytominer_eval.utils.hitk_utils.percentage_scores`.
+
+    Parameters
+    ----------
+    ranked_replicates : np.ndarray
+        Output from
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_ranked_replicates`
+    percent_list : list of ints
+        The percentages at which to calculate percent scores
+
+    Returns
+    -------
+    np.array
+        The percent score per percentage
+    """
+    hits = np.nonzero(ranked_replicates)[1]
+    nr_of_groups = ranked_replicates.shape[0]
+    total_hits = hits.shape[0]
+
+    return np.array(
+        [
+            (hits <= p * nr_of_groups / 100).sum() - int(p * total_hits / 100)
+            for p in percent_list
+        ]
+    )
+
+
+def get_upper_pairs(
+    similarity: np.ndarray, valid: np.ndarray
+) -> (np.array, np.array, np.array):
+    r"""Helper function to list the upper triangle pairs in order of similarity
+
+    Parameters
+    ----------
+    similarity : np.ndarray
+        A profiles x profiles similarity matrix
+    valid : np.ndarray
+        A profiles x profiles boolean matrix of pairs to consider
+
+    Returns
+    -------
+    (np.array, np.array, np.array)
+        The similarities of all valid pairs i < j in ascending order, and the indices
+        i and j of each pair
+    """
+    pair_a, pair_b = np.nonzero(np.triu(valid, k=1))
+    pair_similarity = similarity[pair_a, pair_b]
+
+    order = np.argsort(pair_similarity, kind="stable")
+    return pair_similarity[order], pair_a[order], pair_b[order]
+
+
+def batch_replicate_reproducibility(
+    pair_similarity: np.ndarray,
+    pair_a: np.ndarray,
+    pair_b: np.ndarray,
+    group_codes: np.ndarray,
+    quantile_over_null: float = 0.95,
+) -> np.array:
+    r"""Calculate replicate reproducibility for many group assignments at once
+
+    Parameters
+    ----------
+    pair_similarity, pair_a, pair_b : np.ndarray
+        Output from
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_upper_pairs`
+    group_codes : np.ndarray
+        An assignments x profiles array of replicate group codes
+    quantile_over_null : float, optional
+        The quantile of non-replicate similarities a replicate similarity must exceed.
+        Defaults to 0.95.
+
+    Returns
+    -------
+    np.array
+        The replicate reproducibility per group assignment, see
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.matrix_replicate_reproducibility`
+    """
+    is_replicate = group_codes[:, pair_a] == group_codes[:, pair_b]
+    n_replicate = is_replicate.sum(axis=1)
+    n_null = is_replicate.shape[1] - n_replicate
+
+    # Pairs are sorted by similarity, so the null quantile interpolates between the
+    # lo-th and (lo + 1)-th non-replicate pair (numpy's default linear method)
+    position = (n_null - 1) * quantile_over_null
+    lo = np.floor(position).astype(np.int64)
+    null_rank = np.cumsum(~is_replicate, axis=1, dtype=np.int32)
+    lo_index = np.argmax(null_rank >= (lo + 1)[:, np.newaxis], axis=1)
+    hi_index = np.argmax(null_rank >= np.minimum(lo + 2, n_null)[:, np.newaxis], axis=1)
+    threshold = pair_similarity[lo_index] + (position - lo) * (
+        pair_similarity[hi_index] - pair_similarity[lo_index]
+    )
+
+    # Count replicate pairs ranked after the threshold
+    replicate_rank = np.cumsum(is_replicate, axis=1, dtype=np.int32)
+    n_below = np.searchsorted(pair_similarity, threshold, side="right")
+    n_replicate_below = np.where(
+        n_below > 0,
+        replicate_rank[np.arange(group_codes.shape[0]), np.maximum(n_below - 1, 0)],
+        0,
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (n_replicate - n_replicate_below) / n_replicate
+    result[(n_replicate == 0) | (n_null == 0)] = np.nan
+    return result
+
+
+def batch_enrichment(
+    pair_similarity: np.ndarray,
+    pair_a: np.ndarray,
+    pair_b: np.ndarray,
+    group_codes: np.ndarray,
+    thresholds: np.ndarray,
+) -> np.array:
+    r"""Calculate enrichment odds ratios for many group assignments at once
+
+    Parameters
+    ----------
+    pair_similarity, pair_a, pair_b : np.ndarray
+        Output from
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.get_upper_pairs`
+    group_codes : np.ndarray
+        An assignments x profiles array of replicate group codes
+    thresholds : np.ndarray
+        The similarity thresholds defining the top connections. Thresholds are
+        percentiles of all similarities, which do not depend on the group codes.
+
+    Returns
+    -------
+    np.array
+        An assignments x thresholds array of odds ratios, see
+        :py:func:`cytominer_eval.utils.matrix_operation_utils.matrix_enrichment`
+    """
+    is_replicate = group_codes[:, pair_a] == group_codes[:, pair_b]
+    above = pair_similarity[np.newaxis, :] > thresholds[:, np.newaxis]
+
+    # Each pair appears twice in the full matrix, which does not change odds ratios
+    v11 = is_replicate.astype(np.float64) @ above.T.astype(np.float64)
+    v21 = is_replicate.sum(axis=1)[:, np.newaxis] - v11
+    v12 = above.sum(axis=1)[np.newaxis, :] - v11
+    v22 = pair_similarity.shape[0] - v11 - v12 - v21
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (v11 * v22) / (v12 * v21)
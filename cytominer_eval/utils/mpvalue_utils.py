@@ -2,8 +2,17 @@ import numpy as np
 import pandas as pd
 from typing import Union
 
-from sklearn.decomposition import PCA
-from sklearn.covariance import EmpiricalCovariance
+from sklearn.decomposition import PCA, IncrementalPCA
+from scipy.linalg import solve_triangular
+from sklearn.covariance import OAS, EmpiricalCovariance, LedoitWolf
+from sklearn.utils.extmath import randomized_svd
+
+from cytominer_eval.utils.availability_utils import (
+    check_control_statistics_method,
+    check_covariance_estimator,
+    check_mahalanobis_solver,
+    check_pca_solver,
+)
 
 
 class MahalanobisEstimator:
@@ -15,11 +24,22 @@ class MahalanobisEstimator:
     ----------
     arr : {pandas.DataFrame, np.ndarray}
         the matrix used to calculate covariance
+    estimator : {'empirical', 'ledoit_wolf', 'oas'}, optional
+        The covariance estimator. "empirical" (default) is the maximum likelihood
+        covariance. "ledoit_wolf" and "oas" shrink it towards a scaled identity, which
+        keeps it well conditioned when the number of samples is close to the number of
+        features.
+    solver : {'pinv', 'cholesky'}, optional
+        How to apply the inverse covariance. "pinv" (default) uses its pseudo-inverse.
+        "cholesky" factorizes the covariance once and solves triangular systems, which
+        requires a positive definite covariance.
 
     Attributes
     ----------
-    sigma : np.array
-        Fitted covariance matrix of sklearn.covariance.EmpiricalCovariance()
+    sigma : object
+        Fitted covariance estimator of sklearn.covariance
+    cholesky : np.array
+        Only if `solver='cholesky'`. The lower Cholesky factor of the covariance.
 
     Methods
     -------
@@ -28,8 +48,25 @@ class MahalanobisEstimator:
         array as provided
     """
 
-    def __init__(self, arr: Union[pd.DataFrame, np.ndarray]):
-        self.sigma = EmpiricalCovariance().fit(arr)
+    def __init__(
+        self,
+        arr: Union[pd.DataFrame, np.ndarray],
+        estimator: str = "empirical",
+        solver: str = "pinv",
+    ):
+        check_covariance_estimator(estimator)
+        check_mahalanobis_solver(solver)
+        self.solver = solver
+
+        if estimator == "ledoit_wolf":
+            self.sigma = LedoitWolf().fit(arr)
+        elif estimator == "oas":
+            self.sigma = OAS().fit(arr)
+        else:
+            self.sigma = EmpiricalCovariance().fit(arr)
+
+        if solver == "cholesky":
+            self.cholesky = _cholesky(self.sigma.covariance_)
 
     def mahalanobis(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
         """Compute the mahalanobis distance between the empirical distribution described
@@ -46,10 +83,20 @@ class MahalanobisEstimator:
         numpy.array
             Mahalanobis distance between the input array and the original sigma
         """
-        return self.sigma.mahalanobis(X)
+        if self.solver == "pinv":
+            return self.sigma.mahalanobis(X)
+
+        centered = np.asarray(X, dtype=np.float64) - self.sigma.location_
+        solved = solve_triangular(self.cholesky, centered.T, lower=True)
+        return np.square(solved).sum(axis=0)
 
 
-def calculate_mahalanobis(pert_df: pd.DataFrame, control_df: pd.DataFrame) -> pd.Series:
+def calculate_mahalanobis(
+    pert_df: pd.DataFrame,
+    control_df: pd.DataFrame,
+    estimator: str = "empirical",
+    solver: str = "pinv",
+) -> pd.Series:
     """Given perturbation and control dataframes, calculate mahalanobis distance per
     perturbation
 
@@ -63,6 +110,12 @@ def calculate_mahalanobis(pert_df: pd.DataFrame, control_df: pd.DataFrame) -> pd
     control_df : pandas.DataFrame
         A pandas dataframe of control perturbations (samples by features). Must have the
         same feature measurements as pert_df
+    estimator : {'empirical', 'ledoit_wolf', 'oas'}, optional
+        The covariance estimator, see
+        :py:class:`cytominer_eval.utils.mpvalue_utils.MahalanobisEstimator`
+    solver : {'pinv', 'cholesky'}, optional
+        How to apply the inverse covariance, see
+        :py:class:`cytominer_eval.utils.mpvalue_utils.MahalanobisEstimator`
 
     Returns
     -------
@@ -72,7 +125,9 @@ def calculate_mahalanobis(pert_df: pd.DataFrame, control_df: pd.DataFrame) -> pd
     assert len(control_df) > 1, "Error! No control perturbations found."
 
     # Get dispersion and center estimators for the control perturbations
-    control_estimators = MahalanobisEstimator(control_df)
+    control_estimators = MahalanobisEstimator(
+        control_df, estimator=estimator, solver=solver
+    )
 
     # Distance between mean of perturbation and control
     maha = control_estimators.mahalanobis(np.array(np.mean(pert_df, 0)).reshape(1, -1))[
@@ -81,6 +136,95 @@ def calculate_mahalanobis(pert_df: pd.DataFrame, control_df: pd.DataFrame) -> pd
     return maha
 
 
+def batch_mahalanobis(
+    X: np.ndarray, pert_masks: np.ndarray, estimator: str = "empirical"
+) -> np.array:
+    """Calculate the mahalanobis distance between perturbation and control samples for
+    many partitions of the same array at once
+
+    Equals :py:func:`cytominer_eval.utils.mpvalue_utils.calculate_mahalanobis` with
+    `solver='cholesky'` for each partition. The covariances of all partitions are
+    estimated with stacked array operations and factorized in a single batched
+    Cholesky decomposition, instead of fitting one estimator per partition.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        A samples by features array
+    pert_masks : np.ndarray
+        A partitions by samples boolean array, True for perturbation samples. The other
+        samples are controls.
+    estimator : {'empirical', 'ledoit_wolf', 'oas'}, optional
+        The covariance estimator, see
+        :py:class:`cytominer_eval.utils.mpvalue_utils.MahalanobisEstimator`
+
+    Returns
+    -------
+    np.array
+        The mahalanobis distance of each partition
+    """
+    check_covariance_estimator(estimator)
+    X = np.asarray(X, dtype=np.float64)
+    n_features = X.shape[1]
+    control_masks = np.logical_not(pert_masks).astype(np.float64)
+
+    n_controls = control_masks.sum(axis=1)
+    assert np.all(n_controls > 1), "Error! No control perturbations found."
+    control_mean = (control_masks @ X) / n_controls[:, np.newaxis]
+    pert_mean = (pert_masks @ X) / (X.shape[0] - n_controls)[:, np.newaxis]
+
+    # Partitions x samples x features, centered on the control mean of each partition
+    centered = X[np.newaxis, :, :] - control_mean[:, np.newaxis, :]
+    covariance = (
+        np.transpose(centered * control_masks[:, :, np.newaxis], (0, 2, 1)) @ centered
+    ) / n_controls[:, np.newaxis, np.newaxis]
+
+    # Same shrinkage as sklearn.covariance.LedoitWolf and sklearn.covariance.OAS
+    mu = np.trace(covariance, axis1=1, axis2=2) / n_features
+    if estimator == "ledoit_wolf":
+        squared_norms = np.square(centered).sum(axis=2)
+        beta_ = (control_masks * np.square(squared_norms)).sum(axis=1)
+        delta_ = np.square(covariance).sum(axis=(1, 2))
+        beta = (beta_ / n_controls - delta_) / (n_features * n_controls)
+        delta = (delta_ - n_features * np.square(mu)) / n_features
+        beta = np.minimum(beta, delta)
+        shrinkage = np.divide(
+            beta, delta, out=np.zeros_like(beta), where=(beta != 0) & (delta != 0)
+        )
+    elif estimator == "oas":
+        alpha = np.square(covariance).mean(axis=(1, 2))
+        numerator = alpha + np.square(mu)
+        denominator = (n_controls + 1) * (alpha - np.square(mu) / n_features)
+        shrinkage = np.minimum(
+            np.divide(
+                numerator,
+                denominator,
+                out=np.ones_like(numerator),
+                where=denominator != 0,
+            ),
+            1.0,
+        )
+    else:
+        shrinkage = np.zeros(covariance.shape[0])
+
+    covariance *= (1 - shrinkage)[:, np.newaxis, np.newaxis]
+    covariance += (shrinkage * mu)[:, np.newaxis, np.newaxis] * np.eye(n_features)
+
+    cholesky = _cholesky(covariance)
+    solved = np.linalg.solve(cholesky, (pert_mean - control_mean)[:, :, np.newaxis])
+    return np.square(solved).sum(axis=(1, 2))
+
+
+def _cholesky(covariance: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        raise np.linalg.LinAlgError(
+            "The control covariance is not positive definite. Use a shrinkage "
+            "covariance_estimator or the 'pinv' mahalanobis_solver."
+        )
+
+
 def default_mp_value_parameters():
     """Set the different default parameters used for mp-values.
 
@@ -88,17 +232,216 @@ def default_mp_value_parameters():
     -------
     dict
         A default parameter set with keys: rescale_pca (whether the PCA should be
-        scaled by variance explained) and nb_permutations (how many permutations to
-        calculate empirical p-value). Defaults to True and 100, respectively.
+        scaled by variance explained), nb_permutations (how many permutations to
+        calculate empirical p-value), pca_solver (how to fit the PCA, see
+        :py:func:`cytominer_eval.utils.mpvalue_utils.calculate_pca`), pca_rank (the
+        initial rank of the "randomized" solver) and pca_batch_size (the batch size of
+        the "incremental" solver) and control_statistics (whether and how to reuse
+        statistics of the control profiles across perturbations, see
+        :py:class:`cytominer_eval.utils.mpvalue_utils.ControlStatistics`),
+        covariance_estimator and mahalanobis_solver (how to estimate and invert the
+        control covariance, see
+        :py:class:`cytominer_eval.utils.mpvalue_utils.MahalanobisEstimator`). Defaults
+        to True, 100, "full", 32, 1000, None, "empirical" and "pinv", respectively.
     """
-    params = {"rescale_pca": True, "nb_permutations": 100}
+    params = {
+        "rescale_pca": True,
+        "nb_permutations": 100,
+        "pca_solver": "full",
+        "pca_rank": 32,
+        "pca_batch_size": 1000,
+        "control_statistics": None,
+        "covariance_estimator": "empirical",
+        "mahalanobis_solver": "pinv",
+    }
     return params
 
 
+class ControlStatistics:
+    """
+    Precompute statistics of control profiles that are shared by all perturbations
+    compared to the same controls.
+
+    Parameters
+    ----------
+    control_df : {pandas.DataFrame, np.ndarray}
+        A samples by features matrix of control profiles
+    method : {'exact'}, optional
+        "exact" (default) stores the feature sums and the Gram (samples x samples) or
+        scatter (features x features) matrix of the controls, whichever is smaller.
+        The PCA of controls and a perturbation is then obtained from low-rank updates
+        of these statistics, and equals the "full" PCA solver up to floating point
+        error.
+    variance : float, optional
+        The fraction of variance the retained components must explain. Defaults to 0.9.
+
+    Attributes
+    ----------
+    n_samples : int
+        The number of control profiles
+    feature_sums : np.array
+        The sum of each feature over control profiles
+
+    Methods
+    -------
+    calculate_pca(pert_df)
+        Project perturbation and control profiles onto their principal components
+    """
+
+    def __init__(
+        self,
+        control_df: Union[pd.DataFrame, np.ndarray],
+        method: str = "exact",
+        variance: float = 0.9,
+    ):
+        check_control_statistics_method(method)
+        self.method = method
+        self.variance = variance
+        self.control = np.asarray(control_df, dtype=np.float64)
+        self.n_samples = self.control.shape[0]
+        self.feature_sums = self.control.sum(axis=0)
+
+        if self.n_samples < self.control.shape[1]:
+            self.gram = self.control @ self.control.T
+        else:
+            self.scatter = self.control.T @ self.control
+
+    def calculate_pca(
+        self, pert_df: Union[pd.DataFrame, np.ndarray]
+    ) -> (np.ndarray, np.ndarray):
+        """Project perturbation and control profiles onto their principal components
+
+        Parameters
+        ----------
+        pert_df : {pandas.DataFrame, np.ndarray}
+            A samples by features matrix of perturbation profiles
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The (perturbation + control samples) by components projection, with
+            perturbation samples first, and the explained variance ratio of each
+            component. See :py:func:`cytominer_eval.utils.mpvalue_utils.calculate_pca`.
+        """
+        pert = np.asarray(pert_df, dtype=np.float64)
+        n_samples = pert.shape[0] + self.n_samples
+        mean = (pert.sum(axis=0) + self.feature_sums) / n_samples
+
+        if hasattr(self, "gram"):
+            # Centered Gram matrix of all samples; its eigenvectors scaled by the
+            # singular values are the principal component scores
+            cross = pert @ self.control.T
+            gram = np.block([[pert @ pert.T, cross], [cross.T, self.gram]])
+            projected_mean = np.concatenate([pert @ mean, self.control @ mean])
+            gram -= projected_mean[:, np.newaxis] + projected_mean[np.newaxis, :]
+            gram += mean @ mean
+            eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        else:
+            # Centered scatter matrix of all samples, a rank-n update of the controls
+            scatter = self.scatter + pert.T @ pert - n_samples * np.outer(mean, mean)
+            eigenvalues, eigenvectors = np.linalg.eigh(scatter)
+
+        eigenvalues = np.clip(eigenvalues[::-1], 0, None)
+        eigenvectors = eigenvectors[:, ::-1]
+        ratio = eigenvalues / eigenvalues.sum()
+        n_components = min(
+            np.searchsorted(np.cumsum(ratio), self.variance, side="right") + 1,
+            ratio.shape[0],
+        )
+
+        if hasattr(self, "gram"):
+            pca_array = eigenvectors[:, :n_components] * np.sqrt(
+                eigenvalues[:n_components]
+            )
+        else:
+            components = eigenvectors[:, :n_components]
+            pca_array = np.concatenate(
+                [(pert - mean) @ components, (self.control - mean) @ components]
+            )
+
+        return pca_array, ratio[:n_components]
+
+
+def calculate_pca(
+    X: np.ndarray,
+    variance: float = 0.9,
+    solver: str = "full",
+    rank: int = 32,
+    batch_size: int = 1000,
+) -> (np.ndarray, np.ndarray):
+    """Project samples onto the principal components explaining a fraction of variance
+
+    Parameters
+    ----------
+    X : np.ndarray
+        A samples by features array
+    variance : float, optional
+        The fraction of variance the retained components must explain. Defaults to 0.9.
+    solver : {'full', 'randomized', 'incremental'}, optional
+        "full" (default) uses a full SVD. "randomized" uses a randomized truncated SVD
+        of rank `rank`, doubling the rank until the variance target is reached.
+        "incremental" fits the PCA in batches of `batch_size` samples, which bounds the
+        memory of the decomposition, with as many components as fit a batch. Both
+        approximate solvers retain the same number of components as the "full" solver
+        on the example data, with explained variance ratios agreeing to 1e-3 and
+        mp-values to 0.05.
+    rank : int, optional
+        Only used when `solver='randomized'`. The initial rank. Defaults to 32.
+    batch_size : int, optional
+        Only used when `solver='incremental'`. Defaults to 1000.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        The samples by components projection and the explained variance ratio of each
+        component
+    """
+    check_pca_solver(solver)
+    X = np.asarray(X, dtype=np.float64)
+    max_rank = min(X.shape)
+
+    if solver == "randomized":
+        centered = X - X.mean(axis=0)
+        total_variance = np.square(centered).sum()
+
+        rank = min(rank, max_rank)
+        while True:
+            U, S, _ = randomized_svd(centered, n_components=rank, random_state=0)
+            ratio = np.square(S) / total_variance
+            # Close to full rank, a truncated SVD is no cheaper than a full one
+            if ratio.sum() >= variance or 2 * rank > max_rank:
+                break
+            rank = 2 * rank
+
+        if ratio.sum() >= variance:
+            n_components = np.searchsorted(np.cumsum(ratio), variance, side="right") + 1
+            return U[:, :n_components] * S[:n_components], ratio[:n_components]
+        solver = "full"
+
+    if solver == "incremental":
+        batch_size = min(batch_size, X.shape[0])
+        pca = IncrementalPCA(
+            n_components=min(batch_size, X.shape[1]), batch_size=batch_size
+        )
+        pca_array = pca.fit_transform(X)
+        ratio = pca.explained_variance_ratio_
+        n_components = min(
+            np.searchsorted(np.cumsum(ratio), variance, side="right") + 1,
+            ratio.shape[0],
+        )
+        return pca_array[:, :n_components], ratio[:n_components]
+
+    pca = PCA(n_components=variance, svd_solver="full")
+    pca_array = pca.fit_transform(X)
+    return pca_array, pca.explained_variance_ratio_
+
+
 def calculate_mp_value(
     pert_df: pd.DataFrame,
     control_df: pd.DataFrame,
     params: dict = {},
+    control_statistics: ControlStatistics = None,
+    seed: int = None,
 ) -> pd.Series:
     """Given perturbation and control dataframes, calculate mp-value per perturbation
 
@@ -115,6 +458,12 @@ def calculate_mp_value(
     params : {dict}, optional
         the parameters to use when calculating mp value. See
         :py:func:`cytominer_eval.operations.util.default_mp_value_parameters`.
+    control_statistics : cytominer_eval.utils.mpvalue_utils.ControlStatistics, optional
+        Precomputed statistics of control_df to reuse across perturbations. If None
+        (default), they are computed if `params["control_statistics"]` is set.
+    seed : int, optional
+        Seed of the permutations. If None (default), permutations are drawn from the
+        global numpy random state.
 
     Returns
     -------
@@ -130,18 +479,33 @@ def calculate_mp_value(
     assert all(
         [x in p.keys() for x in params.keys()]
     ), "Unknown parameters provided. Only {e} are supported.".format(e=p.keys())
-    for (k, v) in params.items():
+    for k, v in params.items():
         p[k] = v
 
-    merge_df = pd.concat([pert_df, control_df]).reset_index(drop=True)
+    if control_statistics is None and p["control_statistics"] is not None:
+        control_statistics = ControlStatistics(
+            control_df, method=p["control_statistics"], variance=0.9
+        )
 
     # We reduce the dimensionality with PCA
     # so that 90% of the variance is conserved
-    pca = PCA(n_components=0.9, svd_solver="full")
-    pca_array = pca.fit_transform(merge_df)
+    if control_statistics is not None:
+        assert (
+            p["pca_solver"] == "full"
+        ), "control_statistics can only be combined with the 'full' pca_solver"
+        pca_array, explained_variance_ratio = control_statistics.calculate_pca(pert_df)
+    else:
+        merge_df = pd.concat([pert_df, control_df]).reset_index(drop=True)
+        pca_array, explained_variance_ratio = calculate_pca(
+            merge_df,
+            variance=0.9,
+            solver=p["pca_solver"],
+            rank=p["pca_rank"],
+            batch_size=p["pca_batch_size"],
+        )
     # We scale columns by the variance explained
     if p["rescale_pca"]:
-        pca_array = pca_array * pca.explained_variance_ratio_
+        pca_array = pca_array * explained_variance_ratio
     # This seems useless, as the point of using the Mahalanobis
     # distance instead of the Euclidean distance is to be independent
     # of axes scales
@@ -150,18 +514,34 @@ def calculate_mp_value(
     obs = calculate_mahalanobis(
         pert_df=pca_array[: pert_df.shape[0]],
         control_df=pca_array[-control_df.shape[0] :],
+        estimator=p["covariance_estimator"],
+        solver=p["mahalanobis_solver"],
     )
     # In the paper's methods section it mentions the covariance used
     # might be modified to include variation of the perturbation as well.
 
     # Permutation test
-    sim = np.zeros(p["nb_permutations"])
     pert_mask = np.zeros(pca_array.shape[0], dtype=bool)
     pert_mask[: pert_df.shape[0]] = 1
-    for i in range(p["nb_permutations"]):
-        pert_mask_perm = np.random.permutation(pert_mask)
-        pert_perm = pca_array[pert_mask_perm]
-        control_perm = pca_array[np.logical_not(pert_mask_perm)]
-        sim[i] = calculate_mahalanobis(pert_df=pert_perm, control_df=control_perm)
+    random_state = np.random if seed is None else np.random.RandomState(seed)
+    pert_masks = np.array(
+        [random_state.permutation(pert_mask) for _ in range(p["nb_permutations"])]
+    ).reshape(-1, pca_array.shape[0])
+
+    if p["mahalanobis_solver"] == "cholesky":
+        # All permutations are estimated and factorized at once
+        sim = batch_mahalanobis(
+            pca_array, pert_masks=pert_masks, estimator=p["covariance_estimator"]
+        )
+    else:
+        sim = np.zeros(p["nb_permutations"])
+        for i, pert_mask_perm in enumerate(pert_masks):
+            pert_perm = pca_array[pert_mask_perm]
+            control_perm = pca_array[np.logical_not(pert_mask_perm)]
+            sim[i] = calculate_mahalanobis(
+                pert_df=pert_perm,
+                control_df=control_perm,
+                estimator=p["covariance_estimator"],
+            )
 
     return np.mean([x >= obs for x in sim])
@@ -0,0 +1,166 @@
+"""Numba-compiled kernels of :py:mod:`cytominer_eval.utils.kernel_utils`.
+
+This module requires Numba. Use the functions of
+:py:mod:`cytominer_eval.utils.kernel_utils` instead, which fall back to NumPy when
+Numba is not installed.
+"""
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def count_inversions(values: np.ndarray, buffer: np.ndarray) -> (int, np.ndarray):
+    # Bottom-up merge sort of values, counting pairs i < j with values[i] > values[j].
+    # values and buffer are overwritten, the sorted values are returned.
+    n = values.shape[0]
+    inversions = 0
+    width = 1
+    while width < n:
+        for start in range(0, n, 2 * width):
+            middle = min(start + width, n)
+            stop = min(start + 2 * width, n)
+            i, j, out = start, middle, start
+            while i < middle and j < stop:
+                # Branchless merge step, as comparisons of random values are
+                # unpredictable
+                right = values[j] < values[i]
+                buffer[out] = values[j] if right else values[i]
+                inversions += (middle - i) * right
+                j += right
+                i += 1 - right
+                out += 1
+            while i < middle:
+                buffer[out] = values[i]
+                i += 1
+                out += 1
+            while j < stop:
+                buffer[out] = values[j]
+                j += 1
+                out += 1
+        values, buffer = buffer, values
+        width *= 2
+    return inversions, values
+
+
+@numba.njit(cache=True)
+def count_ties(sorted_values: np.ndarray) -> int:
+    # Number of pairs of equal values in a sorted array
+    ties = 0
+    start = 0
+    for end in range(1, sorted_values.shape[0] + 1):
+        if end == sorted_values.shape[0] or sorted_values[end] != sorted_values[start]:
+            ties += (end - start) * (end - start - 1) // 2
+            start = end
+    return ties
+
+
+@numba.njit(cache=True)
+def kendall_pair(
+    x: np.ndarray,
+    y: np.ndarray,
+    order_x: np.ndarray,
+    x_ties: int,
+    values: np.ndarray,
+    buffer: np.ndarray,
+) -> float:
+    # Knight's algorithm: sort by x then y, and count discordant pairs as inversions.
+    # order_x sorts x, x_ties counts its tied pairs, values and buffer are workspaces.
+    n = x.shape[0]
+    for i in range(n):
+        values[i] = y[order_x[i]]
+
+    joint_ties = 0
+    if x_ties > 0:
+        i = 0
+        while i < n:
+            j = i + 1
+            while j < n and x[order_x[j]] == x[order_x[i]]:
+                j += 1
+            if j - i > 1:
+                values[i:j] = np.sort(values[i:j])
+                joint_ties += count_ties(values[i:j])
+            i = j
+
+    discordant, sorted_y = count_inversions(values, buffer)
+    y_ties = count_ties(sorted_y)
+
+    n_pairs = n * (n - 1) // 2
+    if x_ties == n_pairs or y_ties == n_pairs:
+        return np.nan
+    concordance = n_pairs - x_ties - y_ties + joint_ties - 2 * discordant
+    return concordance / np.sqrt(float(n_pairs - x_ties) * float(n_pairs - y_ties))
+
+
+@numba.njit(parallel=True, cache=True)
+def kendall_matrix(X: np.ndarray, orders: np.ndarray) -> np.ndarray:
+    n = X.shape[0]
+    similarity = np.empty((n, n))
+    for a in numba.prange(n):
+        x_ties = count_ties(X[a][orders[a]])
+        values = np.empty(X.shape[1])
+        buffer = np.empty(X.shape[1])
+        similarity[a, a] = 1.0
+        for b in range(a + 1, n):
+            similarity[a, b] = kendall_pair(
+                X[a], X[b], orders[a], x_ties, values, buffer
+            )
+            similarity[b, a] = similarity[a, b]
+    return similarity
+
+
+@numba.njit(cache=True)
+def segment_members(segment_codes: np.ndarray) -> (np.ndarray, np.ndarray):
+    # The rows of each segment, in order, as slices starts[s]:starts[s + 1] of members
+    counts = np.bincount(segment_codes)
+    starts = np.zeros(counts.shape[0] + 1, dtype=np.int64)
+    starts[1:] = np.cumsum(counts)
+    members = np.empty(segment_codes.shape[0], dtype=np.int64)
+    filled = starts[:-1].copy()
+    for i in range(segment_codes.shape[0]):
+        members[filled[segment_codes[i]]] = i
+        filled[segment_codes[i]] += 1
+    return starts, members
+
+
+@numba.njit(parallel=True, cache=True)
+def segment_ranks(values: np.ndarray, segment_codes: np.ndarray) -> np.ndarray:
+    starts, members = segment_members(segment_codes)
+    ranks = np.empty(values.shape[0], dtype=np.int64)
+    for segment in numba.prange(starts.shape[0] - 1):
+        rows = members[starts[segment] : starts[segment + 1]]
+        segment_values = -values[rows]
+        # Missing values are ranked last
+        segment_values[np.isnan(segment_values)] = np.inf
+        order = np.argsort(segment_values, kind="mergesort")
+        for rank in range(order.shape[0]):
+            ranks[rows[order[rank]]] = rank
+    return ranks
+
+
+@numba.njit(parallel=True, cache=True)
+def segment_median(
+    values: np.ndarray, segment_codes: np.ndarray, n_segments: int
+) -> np.ndarray:
+    starts, members = segment_members(segment_codes)
+    median = np.full(n_segments, np.nan)
+    for segment in numba.prange(starts.shape[0] - 1):
+        segment_values = values[members[starts[segment] : starts[segment + 1]]]
+        if segment_values.shape[0] > 0 and not np.isnan(segment_values).any():
+            median[segment] = np.median(segment_values)
+    return median
+
+
+@numba.njit(cache=True)
+def segment_topk_counts(
+    flags: np.ndarray, segment_codes: np.ndarray, n_segments: int, k: np.ndarray
+) -> np.ndarray:
+    counts = np.zeros((n_segments, k.shape[0]), dtype=np.int64)
+    seen = np.zeros(n_segments, dtype=np.int64)
+    for i in range(flags.shape[0]):
+        segment = segment_codes[i]
+        if flags[i]:
+            for j in range(k.shape[0]):
+                if seen[segment] < k[j]:
+                    counts[segment, j] += 1
+        seen[segment] += 1
+    return counts
@@ -1,10 +1,10 @@
 import numpy as np
 import pandas as pd
-from typing import List
-
-from sklearn.preprocessing import StandardScaler
+from typing import List, Union
 
 from cytominer_eval.utils.transform_utils import set_pair_ids
+from cytominer_eval.utils.polars_utils import frame_to_pandas
+from cytominer_eval.utils.profiling_utils import profile_stage
 from cytominer_eval.utils.availability_utils import (
     check_compare_distribution_method,
     check_replicate_summary_method,
@@ -22,8 +22,8 @@ def assign_replicates(
 
     Parameters
     ----------
-    similarity_melted_df : pandas.DataFrame
-        Long pandas DataFrame of annotated pairwise correlations output from
+    similarity_melted_df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        Long DataFrame of annotated pairwise correlations output from
         :py:func:`cytominer_eval.transform.transform.metric_melt`.
     replicate_groups : list
         a list of metadata column names in the original profile dataframe used to
@@ -36,44 +36,78 @@ def assign_replicates(
         pairwise similarity metric is comparing replicates or not. Used in most eval
         operations.
     """
-    pair_ids = set_pair_ids()
-    replicate_col_names = {x: "{x}_replicate".format(x=x) for x in replicate_groups}
-
-    compare_dfs = []
-    for replicate_col in replicate_groups:
-        replicate_cols_with_suffix = [
-            "{col}{suf}".format(col=replicate_col, suf=pair_ids[x]["suffix"])
-            for x in pair_ids
-        ]
-
-        assert all(
-            [x in similarity_melted_df.columns for x in replicate_cols_with_suffix]
-        ), "replicate_group not found in melted dataframe columns"
-
-        replicate_col_name = replicate_col_names[replicate_col]
-
-        compare_df = similarity_melted_df.loc[:, replicate_cols_with_suffix]
-        compare_df.loc[:, replicate_col_name] = False
-
-        compare_df.loc[
-            np.where(compare_df.iloc[:, 0] == compare_df.iloc[:, 1])[0],
-            replicate_col_name,
-        ] = True
-        compare_dfs.append(compare_df)
-
-    compare_df = pd.concat(compare_dfs, axis="columns").reset_index(drop=True)
-    compare_df = compare_df.assign(
-        group_replicate=compare_df.loc[:, replicate_col_names.values()].min(
-            axis="columns"
+    with profile_stage("assign_replicates") as record:
+        similarity_melted_df = frame_to_pandas(similarity_melted_df)
+        pair_ids = set_pair_ids()
+        replicate_col_names = {x: "{x}_replicate".format(x=x) for x in replicate_groups}
+
+        compare_dfs = []
+        for replicate_col in replicate_groups:
+            replicate_cols_with_suffix = [
+                "{col}{suf}".format(col=replicate_col, suf=pair_ids[x]["suffix"])
+                for x in pair_ids
+            ]
+
+            assert all(
+                [x in similarity_melted_df.columns for x in replicate_cols_with_suffix]
+            ), "replicate_group not found in melted dataframe columns"
+
+            replicate_col_name = replicate_col_names[replicate_col]
+
+            compare_df = similarity_melted_df.loc[:, replicate_cols_with_suffix]
+            compare_df.loc[:, replicate_col_name] = False
+
+            compare_df.loc[
+                np.where(compare_df.iloc[:, 0] == compare_df.iloc[:, 1])[0],
+                replicate_col_name,
+            ] = True
+            compare_dfs.append(compare_df)
+
+        compare_df = pd.concat(compare_dfs, axis="columns").reset_index(drop=True)
+        compare_df = compare_df.assign(
+            group_replicate=compare_df.loc[:, replicate_col_names.values()].min(
+                axis="columns"
+            )
+        ).loc[:, list(replicate_col_names.values()) + ["group_replicate"]]
+
+        similarity_melted_df = similarity_melted_df.merge(
+            compare_df, left_index=True, right_index=True
         )
-    ).loc[:, list(replicate_col_names.values()) + ["group_replicate"]]
+        record["n_rows"] = similarity_melted_df.shape[0]
 
-    similarity_melted_df = similarity_melted_df.merge(
-        compare_df, left_index=True, right_index=True
-    )
     return similarity_melted_df
 
 
+def get_group_codes(
+    df: pd.DataFrame, replicate_groups: Union[List[str], str]
+) -> np.array:
+    """Encode the replicate group of each profile as an integer.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A profiling dataset with the replicate group metadata columns
+    replicate_groups : {str, list}
+        The metadata column name(s) that together define a replicate group
+
+    Returns
+    -------
+    np.array
+        An integer array with one code per row of df. Profiles share a code if and only
+        if they are replicates. Codes are consecutive, starting at 0.
+    """
+    if isinstance(replicate_groups, str):
+        replicate_groups = [replicate_groups]
+
+    assert all(
+        [x in df.columns for x in replicate_groups]
+    ), "replicate_group not found in profile columns"
+
+    # Compare as strings, as the melted metadata does
+    group_df = df.loc[:, replicate_groups].astype(str).reset_index(drop=True)
+    return group_df.groupby(replicate_groups, sort=True).ngroup().values
+
+
 def compare_distributions(
     target_distrib: List[float],
     control_distrib: List[float],
@@ -109,6 +143,9 @@ def compare_distributions(
     check_replicate_summary_method(replicate_summary_method)
 
     if method == "zscore":
+        # Deferred import, scikit-learn is slow to import
+        from sklearn.preprocessing import StandardScaler
+
         scaler = StandardScaler()
         scaler.fit(control_distrib)
         scores = scaler.transform(target_distrib)
@@ -0,0 +1,199 @@
+"""Symmetric similarity matrices stored as their packed upper triangle.
+
+Pairwise similarities are symmetric, so the upper triangle and the diagonal hold every
+value of the matrix in about half its memory. Rows are stored one after the other,
+each starting at the diagonal, so that the part of a row right of the diagonal is a
+contiguous slice and the part left of the diagonal is a strided gather from the rows
+above it. The values can be stored quantized, see
+:py:mod:`cytominer_eval.utils.quantize_utils`, and are converted back to floats one
+block of rows at a time.
+"""
+import numpy as np
+
+from cytominer_eval.utils.availability_utils import check_similarity_dtype
+from cytominer_eval.utils.quantize_utils import (
+    dequantize_similarity,
+    quantize_similarity,
+)
+
+
+def get_packed_offsets(n_profiles: int) -> np.array:
+    r"""Helper function to find where each row starts in packed upper triangle storage
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of rows (and columns) of the symmetric matrix
+
+    Returns
+    -------
+    np.array
+        An int64 array of n_profiles + 1 offsets. Row i holds columns i to
+        n_profiles - 1 at positions offsets[i] to offsets[i + 1] - 1.
+    """
+    rows = np.arange(n_profiles + 1, dtype=np.int64)
+    return rows * n_profiles - rows * (rows - 1) // 2
+
+
+class PackedSimilarity:
+    """
+    A symmetric profiles x profiles similarity matrix, storing only the upper triangle
+    and the diagonal.
+
+    Built by :py:func:`cytominer_eval.transform.transform.get_packed_pairwise_metric`,
+    which calculates each similarity once, or from a square matrix with
+    `PackedSimilarity.from_matrix()`. Full rows are gathered on request, so operations
+    that need all similarities of a profile never hold the square matrix.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        The n_profiles * (n_profiles + 1) / 2 values of the upper triangle, including
+        the diagonal, in row-major order. Integer values are codes of quantized
+        similarities.
+    n_profiles : int
+        The number of profiles
+
+    Attributes
+    ----------
+    data : np.ndarray
+        The packed values
+    n_profiles : int
+        The number of profiles
+    similarity_dtype : str
+        The storage type of the values
+    shape : tuple
+        The shape of the square matrix
+    offsets : np.ndarray
+        Where each row starts in data, see
+        :py:func:`cytominer_eval.utils.packed_utils.get_packed_offsets`
+
+    Methods
+    -------
+    from_matrix(matrix)
+        Pack the upper triangle of a symmetric matrix
+    quantize(similarity_dtype)
+        Return the packed matrix in a smaller storage type
+    row(index)
+        Return all similarities of one profile
+    column(index)
+        Return all similarities to one profile, which equal its row
+    rows(start, stop)
+        Return all similarities of a block of profiles
+    to_dense()
+        Return the square similarity matrix
+    """
+
+    def __init__(self, data: np.ndarray, n_profiles: int):
+        self.offsets = get_packed_offsets(n_profiles)
+        assert data.shape == (self.offsets[-1],), "Packed data must align to profiles"
+
+        self.data = data
+        self.n_profiles = n_profiles
+        self.similarity_dtype = data.dtype.name
+        self.shape = (n_profiles, n_profiles)
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray):
+        """Pack the upper triangle of a symmetric matrix
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            A profiles x profiles symmetric matrix
+
+        Returns
+        -------
+        cytominer_eval.utils.packed_utils.PackedSimilarity
+            The upper triangle and diagonal of the matrix
+        """
+        matrix = np.asarray(matrix)
+        assert matrix.shape[0] == matrix.shape[1], "Matrix must be symmetrical"
+        return cls(matrix[np.triu_indices(matrix.shape[0])], n_profiles=matrix.shape[0])
+
+    def quantize(self, similarity_dtype: str):
+        """Return the packed matrix in a smaller storage type
+
+        Parameters
+        ----------
+        similarity_dtype : {'float64', 'float32', 'float16', 'int16', 'int8'}
+            The storage type, see
+            :py:func:`cytominer_eval.utils.quantize_utils.get_similarity_error` for
+            the error of each type
+
+        Returns
+        -------
+        cytominer_eval.utils.packed_utils.PackedSimilarity
+            The quantized matrix, or the matrix itself if it already has the storage
+            type
+        """
+        check_similarity_dtype(similarity_dtype)
+        if similarity_dtype == self.similarity_dtype:
+            return self
+        return PackedSimilarity(
+            quantize_similarity(self.data, similarity_dtype),
+            n_profiles=self.n_profiles,
+        )
+
+    def row(self, index: int) -> np.ndarray:
+        """Return all similarities of one profile
+
+        Parameters
+        ----------
+        index : int
+            The position of the profile
+
+        Returns
+        -------
+        np.ndarray
+            The n_profiles float64 similarities of the profile, including to itself
+        """
+        return self.rows(index, index + 1)[0]
+
+    def column(self, index: int) -> np.ndarray:
+        """Return all similarities to one profile, which equal its row
+
+        Parameters
+        ----------
+        index : int
+            The position of the profile
+
+        Returns
+        -------
+        np.ndarray
+            The n_profiles float64 similarities to the profile, including to itself
+        """
+        return self.row(index)
+
+    def rows(self, start: int, stop: int) -> np.ndarray:
+        """Return all similarities of a block of profiles
+
+        Parameters
+        ----------
+        start : int
+            The first profile of the block
+        stop : int
+            The profile after the last profile of the block
+
+        Returns
+        -------
+        np.ndarray
+            A (stop - start) x n_profiles float64 block of the square matrix
+        """
+        block = np.empty((stop - start, self.n_profiles), dtype=self.data.dtype)
+        columns = np.arange(self.n_profiles)
+        for i in range(start, stop):
+            # Similarities left of the diagonal are stored in the rows above
+            block[i - start, :i] = self.data[self.offsets[:i] + i - columns[:i]]
+            block[i - start, i:] = self.data[self.offsets[i] : self.offsets[i + 1]]
+        return dequantize_similarity(block)
+
+    def to_dense(self) -> np.ndarray:
+        """Return the square similarity matrix
+
+        Returns
+        -------
+        np.ndarray
+            A profiles x profiles symmetric float64 matrix
+        """
+        return self.rows(0, self.n_profiles)
@@ -0,0 +1,386 @@
+"""Execution of independent tasks on a serial, thread or process backend.
+
+Worker pools limit the threads of BLAS libraries, so that n_jobs workers together use
+about as many threads as there are cores. Large arrays are passed to worker processes
+through shared memory instead of being pickled into every task.
+"""
+import os
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Union
+
+from cytominer_eval.utils.availability_utils import check_execution_backend
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover (scikit-learn < 0.23)
+    threadpool_limits = None
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover (Python 3.7)
+    shared_memory = None
+
+
+def get_n_workers(n_jobs: int = 1) -> int:
+    r"""Helper function to resolve the number of workers
+
+    Parameters
+    ----------
+    n_jobs : int, optional
+        A positive number of workers, or -1 to use all available cores. Defaults to 1.
+
+    Returns
+    -------
+    int
+        The number of workers
+    """
+    assert n_jobs == -1 or n_jobs > 0, "n_jobs must be a positive integer or -1"
+
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def get_blas_threads(n_workers: int) -> int:
+    r"""Helper function to split the available cores between the BLAS thread pools of
+    concurrent workers
+
+    Parameters
+    ----------
+    n_workers : int
+        The number of concurrent workers
+
+    Returns
+    -------
+    int
+        The number of BLAS threads per worker
+    """
+    return max(1, (os.cpu_count() or 1) // n_workers)
+
+
+def run_tasks(
+    func: Callable,
+    tasks: List[Any],
+    n_jobs: int = 1,
+    callback: Callable[[int, Any], None] = None,
+    backend: str = "processes",
+) -> List[Any]:
+    r"""Helper function to apply a function to independent tasks
+
+    Parameters
+    ----------
+    func : callable
+        A function accepting a single task. Must be picklable for the "processes"
+        backend.
+    tasks : list
+        The tasks to process
+    n_jobs : int, optional
+        How many workers to use. If 1 (default), tasks are processed serially in the
+        current process. If -1, use all available cores.
+    callback : callable, optional
+        Called in the current process with the index and output of each task as soon
+        as the task completes, in order of completion. For example, to save finished
+        tasks before the others complete.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers if n_jobs is not 1. "processes" (default) suits work that
+        holds the GIL, such as pandas operations. "threads" avoids copying tasks to
+        other processes, and suits work that releases the GIL, such as BLAS.
+        "serial" ignores n_jobs.
+
+    Returns
+    -------
+    list
+        The output of func per task, in the order of the tasks
+    """
+    check_execution_backend(backend)
+    n_workers = min(get_n_workers(n_jobs), len(tasks))
+
+    if n_workers <= 1 or backend == "serial":
+        results = []
+        for index, task in enumerate(tasks):
+            results.append(func(task))
+            if callback is not None:
+                callback(index, results[-1])
+        return results
+
+    blas_threads = get_blas_threads(n_workers)
+    if backend == "threads":
+        executor = ThreadPoolExecutor(max_workers=n_workers)
+    else:
+        # Tasks limit the threads of their worker, as pool initializers require
+        # Python 3.7
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        func = partial(_limited_task, func=func, n_threads=blas_threads)
+
+    with _blas_thread_limit(blas_threads if backend == "threads" else None), executor:
+        if callback is None:
+            return list(executor.map(func, tasks))
+
+        futures = {executor.submit(func, task): i for i, task in enumerate(tasks)}
+        results = [None] * len(tasks)
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            callback(futures[future], results[futures[future]])
+        return results
+
+
+def apply_groups(
+    df: pd.DataFrame,
+    by: Union[str, List[str]],
+    func: Callable,
+    n_jobs: int = 1,
+    backend: str = "processes",
+    n_tasks: int = None,
+) -> Union[pd.DataFrame, pd.Series]:
+    r"""Helper function to run a pandas.DataFrame().groupby().apply() on n_jobs workers
+
+    Groups are split into contiguous chunks, each chunk is applied as a separate task,
+    and the results are concatenated, which equals applying to all groups at once.
+    Each task only holds the rows of its own groups.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataframe to group
+    by : {str, list}
+        The columns to group by
+    func : callable
+        The function to apply to each group. Must be picklable for the "processes"
+        backend, e.g. a module level function or a functools.partial of one.
+    n_jobs : int, optional
+        How many workers to use. If 1 (default), this is df.groupby(by).apply(func).
+        If -1, use all available cores.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`
+    n_tasks : int, optional
+        How many chunks to split groups into. Defaults to 4 chunks per worker.
+
+    Returns
+    -------
+    {pandas.DataFrame, pandas.Series}
+        The output of df.groupby(by).apply(func)
+    """
+    return apply_chunks(
+        df,
+        by=by,
+        func=partial(_apply_task, by=by, func=func),
+        n_jobs=n_jobs,
+        backend=backend,
+        n_tasks=n_tasks,
+    )
+
+
+def apply_chunks(
+    df: pd.DataFrame,
+    by: Union[str, List[str]],
+    func: Callable,
+    n_jobs: int = 1,
+    backend: str = "processes",
+    n_tasks: int = None,
+) -> Union[pd.DataFrame, pd.Series]:
+    r"""Helper function to apply a function to chunks of whole groups on n_jobs workers
+
+    Like :py:func:`cytominer_eval.utils.parallel_utils.apply_groups`, but func
+    processes many groups per call, for functions that handle all groups of a
+    dataframe at once.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataframe to group
+    by : {str, list}
+        The columns to group by
+    func : callable
+        The function to apply to a dataframe of whole groups, in their original row
+        order. Must be picklable for the "processes" backend.
+    n_jobs : int, optional
+        How many workers to use. If 1 (default), this is func(df). If -1, use all
+        available cores.
+    backend : {'serial', 'threads', 'processes'}, optional
+        How to run workers, see :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`
+    n_tasks : int, optional
+        How many chunks to split groups into. Defaults to 4 chunks per worker.
+
+    Returns
+    -------
+    {pandas.DataFrame, pandas.Series}
+        The outputs of func per chunk, concatenated in the sort order of the groups
+    """
+    check_execution_backend(backend)
+    grouped = df.groupby(by)
+    n_groups = grouped.ngroups
+    n_workers = get_n_workers(n_jobs)
+
+    if n_workers == 1 or backend == "serial" or n_groups <= 1:
+        return func(df)
+
+    if n_tasks is None:
+        n_tasks = 4 * n_workers
+
+    # Rows sorted by group, so that each chunk of groups is a contiguous slice
+    codes = grouped.ngroup().values
+    order = np.argsort(codes, kind="stable")
+    chunks = np.array_split(np.arange(n_groups), min(n_tasks, n_groups))
+    bounds = np.searchsorted(codes[order], [x[0] for x in chunks] + [n_groups])
+
+    tasks = [
+        (df.iloc[order[start:end]], func) for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+    return pd.concat(run_tasks(_chunk_task, tasks, n_jobs=n_jobs, backend=backend))
+
+
+class SharedArray:
+    """
+    A numpy array copied into shared memory, which pickles as a lightweight handle.
+
+    Worker processes that unpickle the handle map the same memory instead of
+    receiving a copy of the array. The process that creates the array owns the memory,
+    and releases it on close() or when leaving a `with` block.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The array to share
+
+    Attributes
+    ----------
+    name : str
+        The name of the shared memory block
+    shape : tuple
+        The shape of the array
+    dtype : str
+        The dtype of the array
+
+    Methods
+    -------
+    get()
+        Return the shared array without copying it
+    close()
+        Release the shared memory
+    """
+
+    def __init__(self, array: np.ndarray):
+        assert shared_memory is not None, "SharedArray requires Python 3.8 or later"
+
+        array = np.ascontiguousarray(array)
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=max(array.nbytes, 1)
+        )
+        self._owner = True
+        self.name = self._memory.name
+        self.get()[...] = array
+
+    def __getstate__(self) -> dict:
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._owner = False
+        self._memory = None
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        return np.asarray(self.get(), dtype=dtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get(self) -> np.ndarray:
+        """Return the shared array without copying it
+
+        Returns
+        -------
+        np.ndarray
+            An array backed by the shared memory
+        """
+        if self._memory is None:
+            self._memory = shared_memory.SharedMemory(name=self.name)
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._memory.buf)
+
+    def close(self) -> None:
+        """Release the shared memory. Arrays returned by get() must no longer be used."""
+        if self._memory is not None:
+            self._memory.close()
+            if self._owner:
+                self._memory.unlink()
+            self._memory = None
+
+
+@contextmanager
+def share_array(
+    array: Union[np.ndarray, SharedArray], n_jobs: int = 1, backend: str = "processes"
+) -> Union[np.ndarray, SharedArray]:
+    r"""Helper function to pass an array to the tasks of
+    :py:func:`cytominer_eval.utils.parallel_utils.run_tasks`
+
+    Parameters
+    ----------
+    array : {np.ndarray, cytominer_eval.utils.parallel_utils.SharedArray}
+        The array used by all tasks
+    n_jobs : int, optional
+        The n_jobs of run_tasks. Defaults to 1.
+    backend : {'serial', 'threads', 'processes'}, optional
+        The backend of run_tasks. Defaults to "processes".
+
+    Yields
+    ------
+    {np.ndarray, cytominer_eval.utils.parallel_utils.SharedArray}
+        A SharedArray if tasks are run in worker processes, and the array itself
+        otherwise. A SharedArray input is yielded as is. Tasks get the array with
+        np.asarray().
+    """
+    if isinstance(array, SharedArray):
+        yield array
+        return
+
+    if get_n_workers(n_jobs) == 1 or backend != "processes" or shared_memory is None:
+        yield array
+        return
+
+    with SharedArray(array) as shared:
+        yield shared
+
+
+def _chunk_task(task) -> Union[pd.DataFrame, pd.Series]:
+    df, func = task
+    return func(df)
+
+
+def _apply_task(
+    df: pd.DataFrame, by: Union[str, List[str]], func: Callable
+) -> Union[pd.DataFrame, pd.Series]:
+    return df.groupby(by).apply(func)
+
+
+def _limited_task(task, func: Callable, n_threads: int) -> Any:
+    _limit_blas_threads(n_threads)
+    return func(task)
+
+
+_blas_threads = None
+
+
+def _limit_blas_threads(n_threads: int) -> None:
+    # The limit holds for the rest of the worker process, so it is set once
+    global _blas_threads
+    if threadpool_limits is not None and _blas_threads != n_threads:
+        threadpool_limits(limits=n_threads)
+        _blas_threads = n_threads
+
+
+@contextmanager
+def _blas_thread_limit(n_threads: int = None):
+    if n_threads is None or threadpool_limits is None:
+        yield
+        return
+
+    with threadpool_limits(limits=n_threads):
+        yield
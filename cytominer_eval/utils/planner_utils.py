@@ -0,0 +1,291 @@
+"""Choose how to execute an evaluation based on its estimated memory footprint.
+
+The estimates are deliberately simple models of the arrays and dataframes each
+strategy allocates. They are meant to rank strategies and to fail fast before an
+evaluation exhausts memory, not to predict peak memory exactly.
+"""
+
+from typing import List, Union
+
+from cytominer_eval.utils.availability_utils import (
+    check_eval_metric,
+    check_similarity_metric,
+    check_similarity_strategy,
+    get_available_tiled_similarity_metrics,
+)
+from cytominer_eval.operations.registry import get_operation_spec
+from cytominer_eval.utils.transform_utils import get_melt_similarity
+
+# Bytes per float64 or object pointer
+_ITEM_BYTES = 8
+# Peak memory of each stage as multiples of the melted dataframe size plus a fixed
+# number of bytes per melted row. Calibrated with tracemalloc on synthetic profiles.
+_DENSE_MELT_COPIES, _DENSE_MELT_ROW_BYTES = 4, 44
+_TILED_MELT_COPIES, _TILED_MELT_ROW_BYTES = 1, 48
+_OPERATION_ROW_BYTES = 24
+# Copies of the melted dataframe made by each operation. All operations copy the
+# melted dataframe when assigning replicates; precision_recall and hitk also sort it.
+# Third-party operations are assumed to copy it as often as the most expensive ones.
+_DEFAULT_OPERATION_COPIES = 3
+_OPERATION_COPIES = {
+    "replicate_reproducibility": 2,
+    "precision_recall": 3,
+    "grit": 2,
+    "enrichment": 2,
+    "hitk": 3,
+}
+
+
+def get_default_block_size(n_profiles: int, max_block_bytes: int = 2**26) -> int:
+    r"""Helper function to determine how many profiles to process per tile
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of profiles
+    max_block_bytes : int, optional
+        The maximum size of a single block x n_profiles tile. Defaults to 64 MiB.
+
+    Returns
+    -------
+    int
+        The number of profiles per block
+    """
+    return int(max(1, min(n_profiles, max_block_bytes // (_ITEM_BYTES * n_profiles))))
+
+
+def get_n_pairs(n_profiles: int, eval_metric: str) -> int:
+    r"""Helper function to count the rows of a melted similarity dataframe
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of profiles
+    eval_metric : str
+        Which metric to ultimately calculate
+
+    Returns
+    -------
+    int
+        The number of pairwise comparisons kept for the eval_metric
+    """
+    if get_melt_similarity(eval_metric) == "upper":
+        return n_profiles * (n_profiles - 1) // 2
+    return n_profiles * (n_profiles - 1)
+
+
+def estimate_melted_bytes(n_pairs: int, n_meta_features: int) -> int:
+    r"""Estimate the size of a melted similarity dataframe
+
+    Parameters
+    ----------
+    n_pairs : int
+        The number of melted rows
+    n_meta_features : int
+        The number of metadata columns (each is stored twice, once per pair)
+
+    Returns
+    -------
+    int
+        The estimated size in bytes
+    """
+    row_bytes = _ITEM_BYTES * (2 * n_meta_features + 3)
+    return n_pairs * row_bytes
+
+
+def estimate_memory(
+    n_profiles: int,
+    n_features: int,
+    n_meta_features: int,
+    operation: str,
+    similarity_strategy: str = "dense",
+    block_size: int = None,
+    n_replicate_columns: int = 1,
+) -> int:
+    r"""Estimate the peak memory of an evaluation
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of profiles (rows)
+    n_features : int
+        The number of feature measurements
+    n_meta_features : int
+        The number of metadata columns
+    operation : str
+        The evaluation metric to calculate
+    similarity_strategy : {'dense', 'tiled', 'packed'}, optional
+        How pairwise similarities are calculated and melted. Defaults to "dense".
+    block_size : int, optional
+        Only used when `similarity_strategy` is "tiled" or "packed". The number of
+        profiles per tile.
+    n_replicate_columns : int, optional
+        The number of replicate columns. Defaults to 1.
+
+    Returns
+    -------
+    int
+        The estimated peak memory in bytes
+    """
+    check_eval_metric(operation)
+    spec = get_operation_spec(operation)
+    feature_bytes = n_profiles * n_features * _ITEM_BYTES
+
+    # Shared similarity matrix and nearest neighbor inputs of the operation
+    matrix_bytes = 0
+    if "similarity_matrix" in spec.inputs or "knn_graph" in spec.inputs:
+        matrix_bytes = 2 * feature_bytes + 2 * n_profiles**2 * _ITEM_BYTES
+
+    if spec.similarity is None:
+        # mp_value copies features once per perturbation, and once more by the PCA
+        return int(max(3 * feature_bytes, matrix_bytes))
+
+    n_pairs = get_n_pairs(n_profiles, operation)
+    melted_bytes = estimate_melted_bytes(n_pairs, n_meta_features)
+
+    if similarity_strategy == "dense":
+        # The full similarity matrix, and the intermediate melted and merged
+        # dataframes of process_melt()
+        melt_bytes = (
+            2 * feature_bytes
+            + n_profiles**2 * _ITEM_BYTES
+            + _DENSE_MELT_COPIES * melted_bytes
+            + _DENSE_MELT_ROW_BYTES * n_pairs
+        )
+    else:
+        if block_size is None:
+            block_size = get_default_block_size(n_profiles)
+        # Standardized features, a tile and its mask, and the preallocated output
+        melt_bytes = (
+            2 * feature_bytes
+            + block_size * n_profiles * (_ITEM_BYTES + 1)
+            + _TILED_MELT_COPIES * melted_bytes
+            + _TILED_MELT_ROW_BYTES * n_pairs
+        )
+        if similarity_strategy == "packed":
+            # The upper triangle of the similarity matrix, including the diagonal
+            melt_bytes += n_profiles * (n_profiles + 1) // 2 * _ITEM_BYTES
+
+    # The melted dataframe, the copies each operation makes, and one boolean and the
+    # compared metadata per replicate column
+    operation_bytes = (
+        melted_bytes
+        + _OPERATION_COPIES.get(operation, _DEFAULT_OPERATION_COPIES) * melted_bytes
+        + n_pairs * (_OPERATION_ROW_BYTES + 2 * _ITEM_BYTES * n_replicate_columns)
+    )
+
+    return int(max(melt_bytes, operation_bytes, matrix_bytes))
+
+
+def plan_evaluation(
+    n_profiles: int,
+    n_features: int,
+    n_meta_features: int,
+    operation: str,
+    similarity_metric: str = "pearson",
+    similarity_strategy: str = "auto",
+    memory_budget: int = None,
+    replicate_groups: Union[List[str], dict, str] = None,
+    missing_features: bool = False,
+) -> dict:
+    r"""Choose a similarity strategy that fits a memory budget
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of profiles (rows)
+    n_features : int
+        The number of feature measurements
+    n_meta_features : int
+        The number of metadata columns
+    operation : str
+        The evaluation metric to calculate
+    similarity_metric : str, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    similarity_strategy : {'auto', 'dense', 'tiled', 'packed'}, optional
+        If "auto" (default), prefer the "dense" strategy if it fits the memory budget
+        and the "tiled" strategy otherwise. Tiles are shrunk until they fit the memory
+        budget. Other values only estimate the memory of the requested strategy.
+    memory_budget : int, optional
+        The memory available to the evaluation in bytes. If None (default), no limit
+        is enforced.
+    replicate_groups : {list, dict, str}, optional
+        The replicate_groups argument of the evaluation, used to count the replicate
+        columns.
+    missing_features : bool, optional
+        Whether features have missing values. The "auto" strategy is then "dense",
+        whose correlations skip the features missing in either profile of a pair.
+        Defaults to False.
+
+    Returns
+    -------
+    dict
+        The plan with keys "operation", "similarity_strategy", "block_size",
+        "estimated_peak_bytes", "memory_budget" and "estimates" (the estimated peak
+        memory of every strategy considered).
+
+    Raises
+    ------
+    MemoryError
+        If no strategy is estimated to fit the memory budget
+    """
+    check_eval_metric(operation)
+    check_similarity_metric(similarity_metric)
+
+    if isinstance(replicate_groups, (list, dict)):
+        n_replicate_columns = len(replicate_groups)
+    else:
+        n_replicate_columns = 1
+
+    if similarity_strategy == "auto":
+        candidates = ["dense"]
+        if (
+            similarity_metric in get_available_tiled_similarity_metrics()
+            and not missing_features
+        ):
+            candidates.append("tiled")
+    else:
+        check_similarity_strategy(similarity_strategy, similarity_metric)
+        candidates = [similarity_strategy]
+
+    block_size = get_default_block_size(n_profiles)
+    estimates = {}
+    for strategy in candidates:
+        estimates[strategy] = estimate_memory(
+            n_profiles=n_profiles,
+            n_features=n_features,
+            n_meta_features=n_meta_features,
+            operation=operation,
+            similarity_strategy=strategy,
+            block_size=block_size,
+            n_replicate_columns=n_replicate_columns,
+        )
+
+        if strategy in ["tiled", "packed"] and memory_budget is not None:
+            # Smaller tiles lower peak memory of the similarity calculation
+            while estimates[strategy] > memory_budget and block_size > 1:
+                block_size = max(1, block_size // 2)
+                estimates[strategy] = estimate_memory(
+                    n_profiles=n_profiles,
+                    n_features=n_features,
+                    n_meta_features=n_meta_features,
+                    operation=operation,
+                    similarity_strategy=strategy,
+                    block_size=block_size,
+                    n_replicate_columns=n_replicate_columns,
+                )
+
+        if memory_budget is None or estimates[strategy] <= memory_budget:
+            return {
+                "operation": operation,
+                "similarity_strategy": strategy,
+                "block_size": block_size if strategy in ["tiled", "packed"] else None,
+                "estimated_peak_bytes": estimates[strategy],
+                "memory_budget": memory_budget,
+                "estimates": estimates,
+            }
+
+    raise MemoryError(
+        "No strategy fits the memory budget of {budget} bytes. Estimated peak memory "
+        "per strategy (bytes): {est}".format(budget=memory_budget, est=estimates)
+    )
@@ -0,0 +1,199 @@
+"""Exchange of profiles, melted similarities and results with Polars.
+
+polars is an optional dependency. Polars frames share their memory with Apache Arrow,
+so profiles are evaluated through the Arrow path of
+:py:mod:`cytominer_eval.utils.arrow_utils` without a conversion to pandas.
+"""
+import sys
+import pandas as pd
+from typing import List
+
+from cytominer_eval.utils.arrow_utils import arrow_to_profiles, is_arrow_table, to_arrow
+
+
+def is_polars_frame(df) -> bool:
+    r"""Helper function to determine whether profiles are a Polars frame
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame}
+        The profiles
+
+    Returns
+    -------
+    bool
+        Whether df is a polars.DataFrame or a polars.LazyFrame
+    """
+    # A Polars frame only exists if polars was imported
+    if "polars" not in sys.modules:
+        return False
+    pl = sys.modules["polars"]
+    return isinstance(df, (pl.DataFrame, pl.LazyFrame))
+
+
+def polars_to_arrow(df, columns: List[str] = None):
+    r"""Select columns of a Polars frame as a pyarrow.Table
+
+    Parameters
+    ----------
+    df : {polars.DataFrame, polars.LazyFrame}
+        The profiles
+    columns : list, optional
+        The columns to select. Defaults to all columns.
+
+    Returns
+    -------
+    pyarrow.Table
+        The selected columns that exist, sharing memory with the Polars frame
+    """
+    import polars as pl
+    import pyarrow as pa
+
+    if isinstance(df, pl.LazyFrame) and hasattr(df, "collect_schema"):
+        all_columns = df.collect_schema().names()
+    else:
+        all_columns = df.columns
+    if columns is None:
+        columns = all_columns
+
+    # Missing columns are reported when the Arrow profiles are split
+    df = df.select([x for x in dict.fromkeys(columns) if x in all_columns])
+    if isinstance(df, pl.LazyFrame):
+        # Only the selected columns of the query are computed, or read from disk
+        df = df.collect()
+
+    table = df.to_arrow()
+    for i, field in enumerate(table.schema):
+        # Polars categoricals have unsigned dictionary indices, which pandas rejects
+        if pa.types.is_dictionary(field.type) and not pa.types.is_signed_integer(
+            field.type.index_type
+        ):
+            dictionary_type = pa.dictionary(pa.int64(), field.type.value_type)
+            table = table.set_column(
+                i, field.name, table.column(i).cast(dictionary_type)
+            )
+
+    return table
+
+
+def to_polars(df):
+    r"""Convert a pandas DataFrame or pyarrow.Table to a polars.DataFrame
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table}
+        A dataframe, for example the output of an operation. The index of a pandas
+        DataFrame is dropped, like in polars.from_pandas().
+
+    Returns
+    -------
+    polars.DataFrame
+        The dataframe, with string columns as categoricals
+    """
+    import polars as pl
+
+    if isinstance(df, pd.DataFrame):
+        df = to_arrow(df.reset_index(drop=True))
+
+    return pl.from_arrow(df)
+
+
+def get_frame_format(df) -> str:
+    r"""Helper function to determine the output format matching an input frame
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame}
+        An input dataframe
+
+    Returns
+    -------
+    str
+        One of "pandas", "arrow" or "polars"
+    """
+    if is_polars_frame(df):
+        return "polars"
+    if is_arrow_table(df):
+        return "arrow"
+    return "pandas"
+
+
+def frame_to_pandas(df) -> pd.DataFrame:
+    r"""Convert a frame of melted similarities to a pandas DataFrame
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame}
+        Melted similarities, for example the output of
+        :py:func:`cytominer_eval.transform.metric_melt`
+
+    Returns
+    -------
+    pandas.DataFrame
+        The melted similarities, with dictionary-encoded (categorical) columns as
+        strings
+    """
+    if is_polars_frame(df):
+        df = polars_to_arrow(df)
+
+    if not is_arrow_table(df):
+        return df
+
+    df = df.to_pandas()
+    # Categoricals with different categories cannot be compared, as pair_a and
+    # pair_b metadata are when assigning replicates
+    categorical_cols = [x for x in df.columns if df[x].dtype.name == "category"]
+    return df.astype({x: str for x in categorical_cols})
+
+
+def profiles_to_pandas(
+    df, features: List[str], meta_features: List[str]
+) -> pd.DataFrame:
+    r"""Convert the used columns of profiles to a pandas DataFrame
+
+    Parameters
+    ----------
+    df : {pandas.DataFrame, pyarrow.Table, polars.DataFrame, polars.LazyFrame}
+        The profiles
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+
+    Returns
+    -------
+    pandas.DataFrame
+        The metadata and feature columns of Arrow or Polars profiles, and pandas
+        profiles as is
+    """
+    if is_polars_frame(df):
+        df = polars_to_arrow(df, columns=list(meta_features) + list(features))
+
+    if is_arrow_table(df):
+        return arrow_to_profiles(df, features=features, meta_features=meta_features)
+
+    return df
+
+
+def pandas_to_frame(df: pd.DataFrame, frame_format: str):
+    r"""Convert a pandas DataFrame, e.g. of results, to the frame type of the input
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A dataframe, for example the output of an operation
+    frame_format : {'pandas', 'arrow', 'polars'}
+        The frame type to return, see
+        :py:func:`cytominer_eval.utils.polars_utils.get_frame_format`
+
+    Returns
+    -------
+    {pandas.DataFrame, pyarrow.Table, polars.DataFrame}
+        The dataframe, with dictionary-encoded (categorical) string columns for
+        Arrow and Polars
+    """
+    if frame_format == "arrow":
+        return to_arrow(df)
+    if frame_format == "polars":
+        return to_polars(df)
+    return df
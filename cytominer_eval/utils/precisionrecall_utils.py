@@ -1,4 +1,8 @@
+import numpy as np
 import pandas as pd
+from typing import List
+
+from cytominer_eval.utils.kernel_utils import segment_topk_counts
 
 
 def calculate_precision_recall(replicate_group_df: pd.DataFrame, k: int) -> pd.Series:
@@ -41,3 +45,64 @@ def calculate_precision_recall(replicate_group_df: pd.DataFrame, k: int) -> pd.S
     return_bundle = {"k": k, "precision": precision_at_k, "recall": recall_at_k}
 
     return pd.Series(return_bundle)
+
+
+def calculate_precision_recall_groups(
+    similarity_melted_df: pd.DataFrame, groupby_columns: List[str], k: List[int]
+) -> pd.DataFrame:
+    """Given an elongated pairwise correlation dataframe, calculate precision and recall
+    of all groups at once.
+
+    Equals calculate_precision_recall applied to each group and each k, except that
+    the recall of groups without replicates is NaN. See
+    :py:func:`cytominer_eval.operations.precision_recall.precision_recall`.
+
+    Parameters
+    ----------
+    similarity_melted_df : pandas.DataFrame
+        An elongated dataframe storing pairwise correlations, sorted by decreasing
+        similarity.
+    groupby_columns : list
+        The columns defining the groups for which to calculate precision and recall
+    k : list of ints
+        how many pairwise comparisons to threshold.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The "k", "precision" and "recall" of each group, indexed by group. Groups are
+        listed for one k after the other.
+    """
+    assert (
+        "group_replicate" in similarity_melted_df.columns
+    ), "'group_replicate' not found in dataframe; remember to call assign_replicates()."
+
+    grouped = similarity_melted_df.groupby(groupby_columns)
+    codes = grouped.ngroup().values
+    replicates = similarity_melted_df.group_replicate.values.astype(bool)
+
+    num_recommended_items_at_k = segment_topk_counts(
+        replicates, codes, n_segments=grouped.ngroups, k=k
+    )
+    recall_denom__total_relevant_items = np.bincount(
+        codes, weights=replicates, minlength=grouped.ngroups
+    )
+
+    precision_recall_df = []
+    for i, k_ in enumerate(k):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            recall_at_k = (
+                num_recommended_items_at_k[:, i] / recall_denom__total_relevant_items
+            )
+        precision_recall_df.append(
+            pd.DataFrame(
+                {
+                    "k": float(k_),
+                    "precision": num_recommended_items_at_k[:, i] / k_,
+                    "recall": recall_at_k,
+                },
+                index=grouped.size().index,
+            )
+        )
+
+    return pd.concat(precision_recall_df)
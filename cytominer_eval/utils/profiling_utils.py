@@ -0,0 +1,236 @@
+"""Per-stage timing and memory instrumentation of evaluation pipelines.
+
+Instrumentation is opt-in. Functions mark their stages with
+:py:func:`profile_stage`, which records into the active
+:py:class:`EvaluationProfiler` and does nothing if no profiler is active.
+"""
+import sys
+import time
+import threading
+import tracemalloc
+import pandas as pd
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (not available on Windows)
+    resource = None
+
+_active = threading.local()
+
+
+def get_peak_rss() -> int:
+    r"""Helper function to get the peak resident set size of the current process
+
+    Returns
+    -------
+    int
+        The peak resident set size in bytes, or -1 if it cannot be determined
+    """
+    if resource is None:
+        return -1
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes while macOS reports bytes
+    if sys.platform != "darwin":
+        peak_rss = peak_rss * 1024
+    return peak_rss
+
+
+class EvaluationProfiler:
+    """
+    Record wall time, CPU time, memory and row counts of evaluation stages.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether or not to trace python memory allocations with tracemalloc. Tracing
+        adds overhead to every allocation. Defaults to False.
+
+    Attributes
+    ----------
+    records : list
+        One dictionary per completed stage
+    annotations : dict
+        Additional information attached to the run (e.g. the execution plan)
+
+    Methods
+    -------
+    stage(name)
+        Context manager measuring a single stage
+    annotate(key, value)
+        Attach additional information to the profile
+    report()
+        Summarize all recorded stages in a dataframe
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.annotations = {}
+        self._depth = 0
+
+    def __enter__(self):
+        self._previous = getattr(_active, "profiler", None)
+        _active.profiler = self
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.profiler = self._previous
+        if self.trace_memory and self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def stage(self, name: str) -> "_ProfiledStage":
+        """Context manager measuring a single stage
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage
+
+        Returns
+        -------
+        _ProfiledStage
+            A context manager yielding a dictionary. Set the "n_rows" key of the
+            dictionary to record how many rows the stage produced.
+        """
+        return _ProfiledStage(self, name)
+
+    def annotate(self, key: str, value: Any) -> None:
+        """Attach additional information to the profile
+
+        Parameters
+        ----------
+        key : str
+            The annotation identifier
+        value : object
+            The annotation
+
+        Returns
+        -------
+        None
+        """
+        self.annotations[key] = value
+
+    def report(self) -> pd.DataFrame:
+        """Summarize all recorded stages in a dataframe
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per stage (in the order the stages completed) with columns:
+            stage, depth, wall_time, cpu_time, peak_rss, memory_delta, memory_peak and
+            n_rows. Memory columns are in bytes; tracemalloc columns are NaN if
+            `trace_memory=False`.
+        """
+        columns = [
+            "stage",
+            "depth",
+            "wall_time",
+            "cpu_time",
+            "peak_rss",
+            "memory_delta",
+            "memory_peak",
+            "n_rows",
+        ]
+        return pd.DataFrame(self.records, columns=columns)
+
+
+class _ProfiledStage:
+    def __init__(self, profiler: EvaluationProfiler, name: str):
+        self.profiler = profiler
+        self.record = {"stage": name, "depth": profiler._depth, "n_rows": None}
+
+    def __enter__(self) -> dict:
+        self.profiler._depth += 1
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record["wall_time"] = time.perf_counter() - self._wall_start
+        self.record["cpu_time"] = time.process_time() - self._cpu_start
+        self.record["peak_rss"] = get_peak_rss()
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.record["memory_delta"] = current - self._memory_start
+            self.record["memory_peak"] = peak - self._memory_start
+        self.profiler._depth -= 1
+        self.profiler.records.append(self.record)
+        return False
+
+
+class _NullStage:
+    def __init__(self):
+        self.record = {}
+
+    def __enter__(self) -> dict:
+        return self.record
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_stage = _NullStage()
+
+
+def get_active_profiler() -> EvaluationProfiler:
+    r"""Helper function to retrieve the profiler active in the current thread
+
+    Returns
+    -------
+    EvaluationProfiler
+        The active profiler, or None if instrumentation is disabled
+    """
+    return getattr(_active, "profiler", None)
+
+
+def profile_stage(name: str):
+    r"""Helper function to measure a stage with the active profiler, if any
+
+    Usage: ``with profile_stage("process_melt") as record: ...``. Setting
+    ``record["n_rows"]`` stores the number of rows the stage produced.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage
+
+    Returns
+    -------
+    context manager
+        A context manager yielding a dictionary for additional stage information.
+        If no profiler is active, a shared no-op context manager is returned.
+    """
+    profiler = getattr(_active, "profiler", None)
+    if profiler is None:
+        return _null_stage
+    return profiler.stage(name)
+
+
+def activate_profiler(profiler: EvaluationProfiler):
+    r"""Helper function to activate a profiler for the duration of a with block
+
+    Parameters
+    ----------
+    profiler : EvaluationProfiler
+        The profiler to activate. If None, the currently active profiler (if any)
+        remains active.
+
+    Returns
+    -------
+    context manager
+        The profiler itself, or a no-op context manager if profiler is None
+    """
+    if profiler is None or profiler is get_active_profiler():
+        return _null_stage
+    return profiler
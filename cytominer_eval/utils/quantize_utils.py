@@ -0,0 +1,126 @@
+"""Quantized storage of similarities, which are bounded in [-1, 1].
+
+Similarities are stored as float32 or float16, or as int16 or int8 codes with a fixed
+scale, where code k stands for the similarity k / scale. Missing similarities are
+stored as the smallest integer code. Stored similarities differ from float64
+similarities by at most :py:func:`get_similarity_error`:
+
+========  =====  ====================
+dtype     bytes  maximum error
+========  =====  ====================
+float64   8      0
+float32   4      2 ** -25 (3.0e-8)
+float16   2      2 ** -12 (2.4e-4)
+int16     2      0.5 / 32767 (1.5e-5)
+int8      1      0.5 / 127 (3.9e-3)
+========  =====  ====================
+
+Metrics inherit the error as follows, for a maximum similarity error e:
+
+* replicate_reproducibility: the median replicate similarity is off by at most e. The
+  fraction of replicates above the null percentile changes only through pairs within
+  2e of the percentile cutoff.
+* precision_recall and hitk: only the order of pairs whose similarities are within 2e
+  changes, including pairs that quantize to ties.
+* enrichment: only pairs within 2e of the percentile threshold change sides.
+* grit: z-scores of a similarity against controls with standard deviation s are off
+  by about (2 + |z|) e / s.
+* mp_value does not use similarities.
+"""
+import numpy as np
+
+_SCALES = {"int16": 32767, "int8": 127}
+_ERRORS = {
+    "float64": 0.0,
+    "float32": 2.0**-25,
+    "float16": 2.0**-12,
+    "int16": 0.5 / 32767,
+    "int8": 0.5 / 127,
+}
+
+
+def get_similarity_error(similarity_dtype: str) -> float:
+    r"""Helper function to look up the maximum error of stored similarities
+
+    Parameters
+    ----------
+    similarity_dtype : {'float64', 'float32', 'float16', 'int16', 'int8'}
+        The storage type of similarities
+
+    Returns
+    -------
+    float
+        The maximum absolute difference between a similarity in [-1, 1] and its
+        stored value
+    """
+    return _ERRORS[similarity_dtype]
+
+
+def get_melt_similarity_dtype(similarity_dtype: str) -> str:
+    r"""Helper function to find the float type melted similarities are stored as
+
+    Parameters
+    ----------
+    similarity_dtype : {'float64', 'float32', 'float16', 'int16', 'int8'}
+        The storage type of similarity matrices
+
+    Returns
+    -------
+    str
+        similarity_dtype for float types, and "float32" for integer codes, whose
+        values float32 holds within the error of the codes
+    """
+    if similarity_dtype in _SCALES:
+        return "float32"
+    return similarity_dtype
+
+
+def quantize_similarity(values: np.ndarray, similarity_dtype: str) -> np.ndarray:
+    r"""Convert similarities to their storage type
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Similarities in [-1, 1], and NaN for missing similarities
+    similarity_dtype : {'float64', 'float32', 'float16', 'int16', 'int8'}
+        The storage type of similarities
+
+    Returns
+    -------
+    np.ndarray
+        The stored similarities, or their integer codes
+    """
+    if similarity_dtype not in _SCALES:
+        return np.asarray(values).astype(similarity_dtype, copy=False)
+
+    scale = _SCALES[similarity_dtype]
+    codes = np.rint(np.clip(values, -1, 1) * scale)
+    codes[np.isnan(codes)] = -scale - 1
+    return codes.astype(similarity_dtype)
+
+
+def dequantize_similarity(codes: np.ndarray, dtype: type = np.float64) -> np.ndarray:
+    r"""Convert stored similarities back to floats
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Similarities stored by
+        :py:func:`cytominer_eval.utils.quantize_utils.quantize_similarity`
+    dtype : type, optional
+        The float type to return. Defaults to np.float64.
+
+    Returns
+    -------
+    np.ndarray
+        The similarities, with NaN for missing similarities. Float similarities of
+        dtype are returned without a copy.
+    """
+    if codes.dtype.name not in _SCALES:
+        return codes.astype(dtype, copy=False)
+
+    scale = _SCALES[codes.dtype.name]
+    values = codes.astype(dtype)
+    values[codes == -scale - 1] = np.nan
+    values /= scale
+    return values
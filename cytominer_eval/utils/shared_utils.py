@@ -0,0 +1,262 @@
+"""Profiles, similarities and metadata in shared memory for multi-process evaluation.
+
+A :py:class:`SharedProfiles` object pickles as a lightweight handle. Worker processes
+that receive the handle map the same physical copy of the pairwise similarity matrix,
+the features and the factorized metadata, instead of receiving their own copy.
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+from cytominer_eval.transform import metric_matrix
+from cytominer_eval.transform.transform import process_melt_matrix
+from cytominer_eval.utils.availability_utils import check_similarity_metric
+from cytominer_eval.utils.cache_utils import EvaluationCache, hash_pandas
+from cytominer_eval.utils.operation_utils import get_group_codes
+from cytominer_eval.utils.parallel_utils import SharedArray
+from cytominer_eval.utils.transform_utils import assert_pandas_dtypes
+
+
+class SharedProfiles:
+    """
+    Pairwise similarity matrix, features and factorized metadata of profiles in shared
+    memory.
+
+    Pass the object in place of the `profiles` dataframe of
+    :py:func:`cytominer_eval.evaluate.evaluate`,
+    :py:func:`cytominer_eval.bootstrap.bootstrap_evaluate` or
+    :py:func:`cytominer_eval.permutation.permutation_test`, in the current process or
+    in worker processes it was sent to. The similarity matrix is then never
+    recalculated, and all processes read the same copy. The process that creates the
+    object owns the memory, and releases it on close() or when leaving a `with` block.
+
+    Parameters
+    ----------
+    profiles : pandas.DataFrame
+        profiles must be a pandas DataFrame with profile samples as rows and profile
+        features as columns. The columns should contain both metadata and feature
+        measurements.
+    features : list
+        A list of strings corresponding to feature measurement column names in the
+        `profiles` DataFrame.
+    meta_features : list
+        A list of strings corresponding to metadata column names in the `profiles`
+        DataFrame. Metadata are compared as strings, like in
+        :py:func:`cytominer_eval.transform.metric_melt`.
+    similarity_metric : {'pearson', 'spearman', 'kendall'}, optional
+        How to calculate pairwise similarity. Defaults to "pearson".
+    cache : cytominer_eval.utils.cache_utils.EvaluationCache, optional
+        If provided, the pairwise similarity matrix is looked up in, and stored to, the
+        cache.
+
+    Attributes
+    ----------
+    features : list
+        The feature columns
+    meta_features : list
+        The metadata columns
+    similarity_metric : str
+        The metric of the similarity matrix
+    n_profiles : int
+        The number of profiles
+    key : str
+        A hash of the profile content, which identifies the profiles in caches
+    similarity_array : cytominer_eval.utils.parallel_utils.SharedArray
+        The shared profiles x profiles similarity matrix
+
+    Methods
+    -------
+    similarity()
+        Return the similarity matrix
+    metadata(columns)
+        Return metadata columns
+    group_codes(replicate_groups)
+        Encode the replicate group of each profile as an integer
+    melt(meta_features, eval_metric)
+        Melt the similarity matrix like :py:func:`cytominer_eval.transform.metric_melt`
+    to_profiles()
+        Return a profiles dataframe of metadata and features
+    check(features, similarity_metric)
+        Ensure that the similarity matrix matches the input features and metric
+    close()
+        Release the shared memory
+    """
+
+    def __init__(
+        self,
+        profiles: pd.DataFrame,
+        features: List[str],
+        meta_features: List[str],
+        similarity_metric: str = "pearson",
+        cache: EvaluationCache = None,
+    ):
+        check_similarity_metric(similarity_metric)
+        profiles = profiles.reset_index(drop=True)
+        assert all(
+            [x in profiles.columns for x in meta_features]
+        ), "Metadata feature not found"
+        assert all(
+            [x in profiles.columns for x in features]
+        ), "Profile feature not found"
+
+        self.features = list(features)
+        self.meta_features = list(meta_features)
+        self.similarity_metric = similarity_metric
+        self.n_profiles = profiles.shape[0]
+        used_columns = sorted(set(self.meta_features) | set(self.features))
+        self.key = hash_pandas(profiles.loc[:, used_columns])
+
+        similarity = metric_matrix(
+            df=profiles,
+            features=features,
+            similarity_metric=similarity_metric,
+            cache=cache,
+        ).values
+        feature_values = assert_pandas_dtypes(
+            df=profiles.loc[:, features], col_fix=float
+        ).values
+        meta_df = assert_pandas_dtypes(df=profiles.loc[:, meta_features], col_fix=str)
+
+        self.similarity_array = SharedArray(similarity)
+        self._features = SharedArray(feature_values)
+        self._codes = {}
+        self._categories = {}
+        for col in self.meta_features:
+            codes, categories = pd.factorize(meta_df.loc[:, col])
+            self._codes[col] = SharedArray(codes)
+            self._categories[col] = np.asarray(categories, dtype=object)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def similarity(self) -> np.ndarray:
+        """Return the similarity matrix
+
+        Returns
+        -------
+        np.ndarray
+            A read-only profiles x profiles array backed by the shared memory
+        """
+        similarity = self.similarity_array.get()
+        similarity.flags.writeable = False
+        return similarity
+
+    def metadata(self, columns: Union[List[str], str] = None) -> pd.DataFrame:
+        """Return metadata columns
+
+        Parameters
+        ----------
+        columns : {list, str}, optional
+            The metadata columns. Defaults to all metadata columns.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The metadata of each profile, as strings
+        """
+        if columns is None:
+            columns = self.meta_features
+        if isinstance(columns, str):
+            columns = [columns]
+
+        assert all(
+            [x in self.meta_features for x in columns]
+        ), "Metadata feature not found"
+
+        return pd.DataFrame(
+            {x: self._categories[x][self._codes[x].get()] for x in columns},
+            columns=columns,
+        )
+
+    def group_codes(self, replicate_groups: Union[List[str], str]) -> np.array:
+        """Encode the replicate group of each profile as an integer, see
+        :py:func:`cytominer_eval.utils.operation_utils.get_group_codes`
+
+        Parameters
+        ----------
+        replicate_groups : {str, list}
+            The metadata column name(s) that together define a replicate group
+
+        Returns
+        -------
+        np.array
+            An integer array with one code per profile
+        """
+        return get_group_codes(
+            df=self.metadata(replicate_groups), replicate_groups=replicate_groups
+        )
+
+    def melt(
+        self,
+        meta_features: List[str] = None,
+        eval_metric: str = "replicate_reproducibility",
+    ) -> pd.DataFrame:
+        """Melt the similarity matrix like :py:func:`cytominer_eval.transform.metric_melt`
+
+        Parameters
+        ----------
+        meta_features : list, optional
+            The metadata columns annotating the melted dataframe. Defaults to all
+            metadata columns.
+        eval_metric : str, optional
+            Which metric to ultimately calculate. Defaults to
+            "replicate_reproducibility".
+
+        Returns
+        -------
+        pandas.DataFrame
+            A fully melted dataframe of pairwise correlations and associated metadata
+        """
+        return process_melt_matrix(
+            similarity=self.similarity(),
+            meta_df=self.metadata(meta_features),
+            eval_metric=eval_metric,
+        )
+
+    def to_profiles(self) -> pd.DataFrame:
+        """Return a profiles dataframe of metadata and features
+
+        Returns
+        -------
+        pandas.DataFrame
+            A copy of the metadata (as strings) and features of the profiles
+        """
+        feature_df = pd.DataFrame(self._features.get(), columns=self.features)
+        return pd.concat([self.metadata(), feature_df], axis="columns")
+
+    def check(self, features: List[str], similarity_metric: str) -> None:
+        """Helper function to ensure that the shared similarity matrix matches the
+        input features and similarity metric
+
+        Parameters
+        ----------
+        features : list
+            The user input features
+        similarity_metric : str
+            The user input similarity metric
+
+        Returns
+        -------
+        None
+            Assertion will fail if the similarity matrix was calculated from other
+            features or with another similarity metric
+        """
+        assert list(features) == self.features, (
+            "features must be the features the shared similarities were calculated "
+            "from"
+        )
+        assert similarity_metric == self.similarity_metric, (
+            "The shared similarities were calculated with the {m} similarity "
+            "metric".format(m=self.similarity_metric)
+        )
+
+    def close(self) -> None:
+        """Release the shared memory. Arrays returned by other methods must no longer
+        be used."""
+        self.similarity_array.close()
+        self._features.close()
+        for codes in self._codes.values():
+            codes.close()
@@ -0,0 +1,203 @@
+"""Mergeable summaries of replicate and non-replicate similarities.
+
+Similarities of replicate and non-replicate pairs are counted in fixed histogram bins,
+so summaries of separate plates merge by adding counts, and campaign-level replicate
+reproducibility and enrichment are calculated without the similarities themselves.
+Quantile thresholds are resolved to a bin edge. Only pairs in the bin of a threshold
+can be counted on the wrong side of it, which bounds the error of the metrics by the
+pairs within one bin width (2 / n_bins for correlations) of the threshold.
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+
+class SimilaritySketch:
+    """
+    Histograms of the similarities of replicate and non-replicate profile pairs.
+
+    Each pair of distinct profiles is counted once, as in the upper triangle of a
+    similarity matrix. Sketches with the same bins are merged with `merge()`, for
+    example sketches of plates processed by different workers, or a sketch of earlier
+    plates restored with pickle.
+
+    Parameters
+    ----------
+    n_bins : int, optional
+        The number of equal width bins. Defaults to 4096.
+    lower : float, optional
+        The lower edge of the first bin. Defaults to -1.
+    upper : float, optional
+        The upper edge of the last bin. Similarities outside of lower and upper are
+        counted in the first and last bin. Defaults to 1.
+
+    Attributes
+    ----------
+    edges : np.ndarray
+        The n_bins + 1 bin edges
+    replicate_counts : np.ndarray
+        The number of replicate pairs per bin
+    null_counts : np.ndarray
+        The number of non-replicate pairs per bin
+    n_plates : int
+        The number of plates added
+    n_profiles : int
+        The number of profiles added
+
+    Methods
+    -------
+    update(similarity, is_replicate, n_profiles)
+        Add the pairs of one plate
+    merge(other)
+        Add the counts of another sketch
+    replicate_reproducibility(quantile_over_null)
+        Calculate replicate reproducibility of all added pairs
+    enrichment(percentile)
+        Calculate enrichment of all added pairs
+    """
+
+    def __init__(self, n_bins: int = 4096, lower: float = -1.0, upper: float = 1.0):
+        assert n_bins > 0, "n_bins must be positive"
+        assert lower < upper, "lower must be less than upper"
+
+        self.edges = np.linspace(lower, upper, n_bins + 1)
+        self.replicate_counts = np.zeros(n_bins, dtype=np.int64)
+        self.null_counts = np.zeros(n_bins, dtype=np.int64)
+        self.n_plates = 0
+        self.n_profiles = 0
+
+    def update(
+        self, similarity: np.ndarray, is_replicate: np.ndarray, n_profiles: int = 0
+    ):
+        """Add the pairs of one plate
+
+        Parameters
+        ----------
+        similarity : np.ndarray
+            The similarity of each pair of distinct profiles. NaN similarities are
+            ignored.
+        is_replicate : np.ndarray
+            Whether each pair is a replicate pair
+        n_profiles : int, optional
+            The number of profiles of the plate. Defaults to 0.
+
+        Returns
+        -------
+        cytominer_eval.utils.sketch_utils.SimilaritySketch
+            The sketch itself
+        """
+        similarity = np.asarray(similarity, dtype=np.float64)
+        is_replicate = np.asarray(is_replicate, dtype=bool)
+        defined = ~np.isnan(similarity)
+
+        n_bins = self.replicate_counts.shape[0]
+        bins = np.searchsorted(self.edges, similarity[defined], side="right") - 1
+        bins = np.clip(bins, 0, n_bins - 1)
+        is_replicate = is_replicate[defined]
+
+        self.replicate_counts += np.bincount(bins[is_replicate], minlength=n_bins)
+        self.null_counts += np.bincount(bins[~is_replicate], minlength=n_bins)
+        self.n_plates += 1
+        self.n_profiles += n_profiles
+        return self
+
+    def merge(self, other: "SimilaritySketch"):
+        """Add the counts of another sketch
+
+        Parameters
+        ----------
+        other : cytominer_eval.utils.sketch_utils.SimilaritySketch
+            A sketch with the same bins
+
+        Returns
+        -------
+        cytominer_eval.utils.sketch_utils.SimilaritySketch
+            The sketch itself
+        """
+        assert np.array_equal(self.edges, other.edges), "Sketch bins must match"
+
+        self.replicate_counts += other.replicate_counts
+        self.null_counts += other.null_counts
+        self.n_plates += other.n_plates
+        self.n_profiles += other.n_profiles
+        return self
+
+    def replicate_reproducibility(self, quantile_over_null: float = 0.95) -> float:
+        """Calculate replicate reproducibility of all added pairs
+
+        See :py:func:`cytominer_eval.operations.replicate_reproducibility`.
+
+        Parameters
+        ----------
+        quantile_over_null : float, optional
+            The quantile of non-replicate similarities a replicate similarity must
+            exceed. Defaults to 0.95.
+
+        Returns
+        -------
+        float
+            The fraction of replicate pairs above the null quantile, NaN if there are
+            no replicate or no non-replicate pairs
+        """
+        assert (
+            0 < quantile_over_null and 1 >= quantile_over_null
+        ), "quantile_over_null must be between 0 and 1"
+
+        n_replicate = self.replicate_counts.sum()
+        if n_replicate == 0 or self.null_counts.sum() == 0:
+            return np.nan
+
+        threshold_bin = _get_quantile_bin(self.null_counts, quantile_over_null)
+        return self.replicate_counts[threshold_bin + 1 :].sum() / n_replicate
+
+    def enrichment(self, percentile: Union[float, List[float]] = 0.99) -> pd.DataFrame:
+        """Calculate enrichment of all added pairs
+
+        See :py:func:`cytominer_eval.operations.enrichment`. Like the operation, which
+        counts both orders of each pair, the contingency tables count each pair
+        twice.
+
+        Parameters
+        ----------
+        percentile : float or list of floats, optional
+            The percentiles of similarities defining the top connections. Defaults to
+            0.99.
+
+        Returns
+        -------
+        pandas.DataFrame
+            percentile, threshold (the upper edge of the bin of the percentile), odds
+            ratio and p value
+        """
+        import scipy.stats
+
+        if isinstance(percentile, (int, float, np.floating)):
+            percentile = [percentile]
+
+        all_counts = self.replicate_counts + self.null_counts
+        result = []
+        for p in percentile:
+            threshold_bin = _get_quantile_bin(all_counts, p)
+            v11 = self.replicate_counts[threshold_bin + 1 :].sum()
+            v12 = self.null_counts[threshold_bin + 1 :].sum()
+            v21 = self.replicate_counts[: threshold_bin + 1].sum()
+            v22 = self.null_counts[: threshold_bin + 1].sum()
+
+            v = 2 * np.asarray([[v11, v12], [v21, v22]])
+            r = scipy.stats.fisher_exact(v, alternative="greater")
+            result.append(
+                {
+                    "enrichment_percentile": p,
+                    "threshold": self.edges[threshold_bin + 1],
+                    "ods_ratio": r[0],
+                    "p-value": r[1],
+                }
+            )
+
+        return pd.DataFrame(result)
+
+
+def _get_quantile_bin(counts: np.ndarray, quantile: float) -> int:
+    # The bin of the value below numpy's linearly interpolated quantile
+    position = np.floor((counts.sum() - 1) * quantile)
+    return int(np.searchsorted(np.cumsum(counts), position, side="right"))
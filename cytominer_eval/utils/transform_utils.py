@@ -5,6 +5,7 @@ import pandas.api.types as ptypes
 from collections import OrderedDict
 
 from cytominer_eval.utils.availability_utils import check_eval_metric
+from cytominer_eval.operations.registry import get_operation_spec
 
 
 def get_upper_matrix(df: pd.DataFrame) -> np.array:
@@ -23,6 +24,144 @@ def get_upper_matrix(df: pd.DataFrame) -> np.array:
     return np.triu(np.ones(df.shape), k=1).astype(bool)
 
 
+def get_pair_offsets(n_profiles: int, eval_metric: str) -> np.array:
+    r"""Helper function to locate the melted rows of each profile
+
+    Melted similarity dataframes are ordered by the first pair index, then by the
+    second pair index. This function returns where the rows of each first pair start.
+
+    Parameters
+    ----------
+    n_profiles : int
+        The number of profiles in the pairwise similarity matrix
+    eval_metric : str
+        Which metric to ultimately calculate. Metrics consuming "upper" similarities
+        (e.g. "replicate_reproducibility") keep only the upper triangle, all other
+        metrics keep the full matrix without diagonal.
+
+    Returns
+    -------
+    np.array
+        An array of length n_profiles + 1 where entries i and i + 1 are the first and
+        last (exclusive) melted row of profile i
+    """
+    check_eval_metric(eval_metric)
+
+    rows = np.arange(n_profiles + 1, dtype=np.int64)
+    if get_melt_similarity(eval_metric) == "upper":
+        return rows * n_profiles - rows * (rows + 1) // 2
+    return rows * (n_profiles - 1)
+
+
+def get_melt_similarity(eval_metric: str) -> str:
+    r"""Helper function to determine which pairwise similarities an eval metric melts
+
+    Parameters
+    ----------
+    eval_metric : str
+        Which metric to ultimately calculate
+
+    Returns
+    -------
+    str
+        "upper" if the metric requires only the upper triangle of the similarity
+        matrix, and "full" if it requires the full matrix without diagonal (also for
+        metrics that do not consume melted similarities).
+    """
+    check_eval_metric(eval_metric)
+    similarity = get_operation_spec(eval_metric).similarity
+    return "full" if similarity is None else similarity
+
+
+def standardize_profiles(X: np.ndarray, similarity_metric: str) -> np.ndarray:
+    r"""Helper function to scale profiles such that their dot products are similarities
+
+    Parameters
+    ----------
+    X : np.ndarray
+        A samples by features array without missing values. Dot products of
+        standardized profiles cannot skip the features missing in either profile of a
+        pair, as the pairwise complete correlations of pandas do.
+    similarity_metric : {'pearson', 'spearman'}
+        The pairwise comparison to calculate. Spearman correlation is calculated as the
+        pearson correlation of ranks (ties receive average ranks).
+
+    Returns
+    -------
+    np.ndarray
+        A float64 samples by features array with centered, unit norm rows. Rows with
+        zero variance are set to NaN, as their correlation is undefined.
+    """
+    assert similarity_metric in [
+        "pearson",
+        "spearman",
+    ], "{m} cannot be computed from standardized profiles".format(m=similarity_metric)
+    X = np.asarray(X, dtype=np.float64)
+    assert not np.isnan(X).any(), (
+        "Missing feature values not supported by the tiled strategy. Use the dense "
+        "similarity strategy"
+    )
+
+    if similarity_metric == "spearman":
+        X = pd.DataFrame(X).rank(axis="columns").values
+
+    Z = np.array(X, dtype=np.float64)
+    Z -= Z.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum("ij,ij->i", Z, Z))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        Z /= norms[:, np.newaxis]
+    Z[norms == 0, :] = np.nan
+
+    return Z
+
+
+def get_knn_graph(similarity_matrix: pd.DataFrame, n_neighbors: int = None) -> np.array:
+    r"""Helper function to find the nearest neighbors of each profile
+
+    Parameters
+    ----------
+    similarity_matrix : pandas.DataFrame
+        A pairwise similarity matrix output from
+        :py:func:`cytominer_eval.transform.transform.metric_matrix`
+    n_neighbors : int, optional
+        The number of neighbors per profile. Defaults to None (all other profiles).
+
+    Returns
+    -------
+    np.array
+        A profiles x n_neighbors integer array. Row i holds the positional indices of
+        the profiles most similar to profile i, in order of decreasing similarity. A
+        profile is never its own neighbor, and profiles with undefined similarity are
+        the most distant neighbors.
+    """
+    n_profiles = similarity_matrix.shape[0]
+    assert similarity_matrix.shape[1] == n_profiles, "Matrix must be symmetrical"
+    if n_neighbors is None:
+        n_neighbors = n_profiles - 1
+    assert (
+        0 < n_neighbors < n_profiles
+    ), "n_neighbors must be between 1 and the number of profiles - 1"
+
+    # Correlations are in [-1, 1], so undefined similarities (2) and the profile
+    # itself (3) rank after all defined similarities
+    distance = -np.array(similarity_matrix, dtype=np.float64)
+    distance[np.isnan(distance)] = 2
+    np.fill_diagonal(distance, 3)
+
+    if n_neighbors < n_profiles - 1:
+        candidates = np.sort(
+            np.argpartition(distance, n_neighbors - 1, axis=1)[:, :n_neighbors], axis=1
+        )
+    else:
+        candidates = np.tile(np.arange(n_profiles), (n_profiles, 1))
+
+    order = np.argsort(
+        np.take_along_axis(distance, candidates, axis=1), axis=1, kind="stable"
+    )
+    return np.take_along_axis(candidates, order, axis=1)[:, :n_neighbors]
+
+
 def convert_pandas_dtypes(df: pd.DataFrame, col_fix: type = float) -> pd.DataFrame:
     r"""Helper funtion to convert pandas column dtypes
 
@@ -39,7 +178,8 @@ def convert_pandas_dtypes(df: pd.DataFrame, col_fix: type = float) -> pd.DataFra
         A dataframe with converted columns
     """
     try:
-        df = df.astype(col_fix)
+        # Columns of the requested type are not copied
+        df = df.astype(col_fix, copy=False)
     except ValueError:
         raise ValueError(
             "Columns cannot be converted to {col}; check input features".format(
@@ -110,13 +250,10 @@ def assert_melt(
     assert_error = "{err} This is a fatal error providing incorrect results".format(
         err=assert_error
     )
-    if eval_metric == "replicate_reproducibility":
+    similarity = get_operation_spec(eval_metric).similarity
+    if similarity == "upper":
         assert index_sums[0] != index_sums[1], assert_error
-    elif eval_metric == "precision_recall":
-        assert index_sums[0] == index_sums[1], assert_error
-    elif eval_metric == "grit":
-        assert index_sums[0] == index_sums[1], assert_error
-    elif eval_metric == "hitk":
+    elif similarity == "full":
         assert index_sums[0] == index_sums[1], assert_error
 
 
@@ -167,23 +304,24 @@ def check_replicate_groups(
         Assertion will fail for improperly constructed replicate_groups
     """
     check_eval_metric(eval_metric=eval_metric)
+    spec = get_operation_spec(eval_metric)
 
-    if eval_metric == "grit":
+    if spec.replicate_groups == "dict":
         assert isinstance(
             replicate_groups, dict
-        ), "For grit, replicate_groups must be a dict"
+        ), "For {op}, replicate_groups must be a dict".format(op=eval_metric)
 
-        replicate_key_ids = ["profile_col", "replicate_group_col"]
+        replicate_key_ids = spec.replicate_group_keys
 
         assert all(
             [x in replicate_groups for x in replicate_key_ids]
-        ), "replicate_groups for grit not formed properly. Must contain {id}".format(
-            id=replicate_key_ids
+        ), "replicate_groups for {op} not formed properly. Must contain {id}".format(
+            op=eval_metric, id=replicate_key_ids
         )
-    elif eval_metric == "mp_value":
+    elif spec.replicate_groups == "str":
         assert isinstance(
             replicate_groups, str
-        ), "For mp_value, replicate_groups must be a single string."
+        ), "For {op}, replicate_groups must be a single string.".format(op=eval_metric)
     else:
         assert isinstance(
             replicate_groups, list
@@ -23,4 +23,5 @@ setup(
     install_requires=["numpy", "pandas", "scikit-learn"],
     python_requires=">=3.5",
     include_package_data=True,
+    entry_points={"console_scripts": ["cytominer-eval=cytominer_eval.cli:main"]},
 )